@@ -0,0 +1,101 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_CHECKPOINT_H
+#define TONIC_CHECKPOINT_H
+
+#include "Random.h"
+#include <cstdint>
+#include <fstream>
+#include <random>
+#include <string>
+#include <type_traits>
+#include <vector>
+
+/**
+ * Binary checkpoint writer. The checkpoint is written to <path>.tmp and renamed to <path> by commit(), so an
+ * interrupted write never replaces the previous checkpoint. Values are written in the native byte order: a checkpoint
+ * is meant to be resumed on the same machine and build
+ */
+class CheckpointWriter {
+
+public:
+
+    // -- "TONICCKP" followed by the format version
+    constexpr static uint64_t MAGIC = 0x504B43434943544EULL;
+    constexpr static uint32_t VERSION = 4;
+
+    explicit CheckpointWriter(const std::string &path);
+
+    bool is_open() const { return out_.is_open(); }
+
+    template<typename T>
+    void write(const T &value) {
+        static_assert(std::is_standard_layout<T>::value, "Only plain values can be checkpointed");
+        out_.write(reinterpret_cast<const char *>(&value), sizeof(T));
+    }
+
+    template<typename T>
+    void write_array(const T *data, size_t n) {
+        static_assert(std::is_standard_layout<T>::value, "Only plain values can be checkpointed");
+        write((uint64_t) n);
+        out_.write(reinterpret_cast<const char *>(data), (std::streamsize) (n * sizeof(T)));
+    }
+
+    void write_string(const std::string &s);
+
+    void write_rng(const Xoshiro256 &gen);
+
+    bool commit();
+
+private:
+
+    std::string path_;
+    std::string tmp_path_;
+    std::ofstream out_;
+
+};
+
+/**
+ * Binary checkpoint reader, counterpart of CheckpointWriter. Any read past the end of the file or any mismatch of the
+ * magic number and version sets ok() to false
+ */
+class CheckpointReader {
+
+public:
+
+    explicit CheckpointReader(const std::string &path);
+
+    bool ok() const { return ok_; }
+
+    template<typename T>
+    T read() {
+        static_assert(std::is_standard_layout<T>::value, "Only plain values can be checkpointed");
+        T value{};
+        in_.read(reinterpret_cast<char *>(&value), sizeof(T));
+        if (!in_) ok_ = false;
+        return value;
+    }
+
+    template<typename T>
+    void read_array(std::vector<T> &data) {
+        uint64_t n = read<uint64_t>();
+        if (!ok_) return;
+        data.resize(n);
+        in_.read(reinterpret_cast<char *>(data.data()), (std::streamsize) (n * sizeof(T)));
+        if (!in_) ok_ = false;
+    }
+
+    std::string read_string();
+
+    void read_rng(Xoshiro256 &gen);
+
+private:
+
+    std::ifstream in_;
+    bool ok_ = true;
+
+};
+
+#endif //TONIC_CHECKPOINT_H
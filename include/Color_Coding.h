@@ -0,0 +1,87 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_COLOR_CODING_H
+#define TONIC_COLOR_CODING_H
+
+#include <cstdint>
+
+/**
+ * Coloring of the nodes by hash, in [0, num_colors). The colors of the three nodes of a triangle form a multiset
+ * {a <= b <= c}, and the triangles are partitioned by these multisets: a shard {a, b, c} receives the edges whose
+ * endpoint colors are two of its colors, and counts the triangles of its own colors only (ColorShard), so every
+ * triangle of the stream is counted by exactly one shard whatever the coloring
+ */
+class NodeColoring {
+
+public:
+
+    NodeColoring() = default;
+
+    NodeColoring(int num_colors, uint64_t seed) : num_colors_(num_colors), seed_(seed) {}
+
+    inline int color(const int u) const {
+        if (num_colors_ <= 1) return 0;
+        // -- splitmix64 finalizer
+        uint64_t x = (uint64_t) (uint32_t) u ^ seed_;
+        x += 0x9E3779B97F4A7C15ULL;
+        x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9ULL;
+        x = (x ^ (x >> 27)) * 0x94D049BB133111EBULL;
+        x ^= x >> 31;
+        return (int) (((unsigned __int128) x * (uint64_t) num_colors_) >> 64);
+    }
+
+    int num_colors() const { return num_colors_; }
+
+    // -- number of color multisets {a <= b <= c}, i.e. of shards
+    static int num_shards(int num_colors) {
+        return num_colors * (num_colors + 1) * (num_colors + 2) / 6;
+    }
+
+private:
+
+    int num_colors_ = 1;
+    uint64_t seed_ = 0;
+
+};
+
+/**
+ * Color multiset {a <= b <= c} of a shard, with the coloring of the nodes
+ */
+class ColorShard {
+
+public:
+
+    ColorShard() = default;
+
+    ColorShard(const NodeColoring &coloring, int a, int b, int c) : coloring_(coloring), colors_{a, b, c} {}
+
+    inline int color(const int u) const { return coloring_.color(u); }
+
+    /**
+     * Color that the third node of a triangle closed by an edge must have to belong to the shard
+     * @param cu color of an endpoint of the edge
+     * @param cv color of the other endpoint
+     * @return the missing color of the shard, -1 if the edge does not belong to the shard
+     */
+    inline int third_color(int cu, int cv) const {
+        int missing[3] = {colors_[0], colors_[1], colors_[2]};
+        int n = 3;
+        for (int c: {cu, cv}) {
+            int i = 0;
+            while (i < n and missing[i] != c) i++;
+            if (i == n) return -1;
+            missing[i] = missing[--n];
+        }
+        return missing[0];
+    }
+
+private:
+
+    NodeColoring coloring_;
+    int colors_[3] = {0, 0, 0};
+
+};
+
+#endif //TONIC_COLOR_CODING_H
@@ -0,0 +1,158 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_COMPRESSED_INPUT_H
+#define TONIC_COMPRESSED_INPUT_H
+
+#include <condition_variable>
+#include <cstdint>
+#include <cstdio>
+#include <fstream>
+#include <istream>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <queue>
+#include <string>
+#include <thread>
+#include <vector>
+
+/**
+ * Stream buffer that decompresses a gzip or zstd file in the background. A reader thread reads the compressed file and
+ * produces blocks of decompressed bytes, numbered in file order, that the consumer takes in order. A gzip stream is
+ * inflated by the reader thread itself (gzip cannot be split), while the independent frames of a zstd file (as written
+ * by pzstd or zstd --block-size) are decompressed in parallel by a pool of workers. At most MAX_IN_FLIGHT blocks are
+ * buffered, so memory does not grow with the size of the file. Only forward seeks are supported. A plain file that
+ * cannot be opened twice (a pipe or a FIFO) is read through the same blocks, without decompression
+ */
+class DecompressBuffer : public std::streambuf {
+
+public:
+
+    enum Format { PLAIN, GZIP, ZSTD };
+
+    static Format detect(const std::string &magic);
+
+    DecompressBuffer(std::FILE *file, const std::string &path, Format format, std::string prefix, int num_threads);
+
+    ~DecompressBuffer() override;
+
+    DecompressBuffer(const DecompressBuffer &) = delete;
+
+    DecompressBuffer &operator=(const DecompressBuffer &) = delete;
+
+    bool is_open() const { return file_ != nullptr; }
+
+    bool failed();
+
+    Format format() const { return format_; }
+
+protected:
+
+    int_type underflow() override;
+
+    pos_type seekoff(off_type off, std::ios_base::seekdir dir, std::ios_base::openmode which) override;
+
+    pos_type seekpos(pos_type pos, std::ios_base::openmode which) override;
+
+private:
+
+    // -- compressed bytes read at once, and largest decompressed block of the reader thread
+    constexpr static size_t READ_BYTES = 1 << 22;
+    constexpr static size_t BLOCK_BYTES = 1 << 22;
+    // -- zstd frames larger than this (compressed or decompressed) are decompressed by the reader thread as a stream
+    constexpr static size_t MAX_FRAME_BYTES = 1 << 26;
+    // -- blocks decompressed ahead of the consumer, per worker
+    constexpr static size_t MAX_IN_FLIGHT = 4;
+
+    // -- a zstd frame to be decompressed by a worker
+    struct Job {
+        uint64_t seq;
+        std::string frame;
+        size_t content_size;
+    };
+
+    std::string path_;
+    std::FILE *file_ = nullptr;
+    Format format_;
+    // -- first bytes of the file, read by the caller to detect the format
+    std::string prefix_;
+
+    std::vector<std::thread> workers_;
+    std::thread reader_;
+    std::mutex mutex_;
+    std::condition_variable ready_cv_;
+    std::condition_variable space_cv_;
+    std::condition_variable jobs_cv_;
+    std::queue<Job> jobs_;
+    std::map<uint64_t, std::string> done_;
+    uint64_t issued_ = 0;
+    uint64_t consumed_ = 0;
+    size_t max_in_flight_;
+    bool eof_ = false;
+    bool stop_ = false;
+    bool failed_ = false;
+
+    // -- block being read by the consumer, and decompressed bytes before it
+    std::string current_;
+    uint64_t position_ = 0;
+
+    void read_plain();
+
+    void read_gzip();
+
+    void read_zstd();
+
+    void run_worker();
+
+    size_t read_bytes(char *data, size_t n);
+
+    bool read_more(std::string &buffer);
+
+    uint64_t reserve_block();
+
+    void publish(uint64_t seq, std::string block);
+
+    void finish(bool failed, const std::string &message = "");
+
+};
+
+/**
+ * Input text file that is transparently decompressed when it is gzip or zstd-compressed (detected from its first
+ * bytes, not from its extension), and read as a plain file otherwise. A drop-in replacement of std::ifstream for the
+ * datasets, streams and oracles read by the binaries
+ */
+class InputFile : public std::istream {
+
+public:
+
+    explicit InputFile(const std::string &path, int num_threads = 0);
+
+    InputFile() : std::istream(nullptr) {}
+
+    void open(const std::string &path, int num_threads = 0);
+
+    void close();
+
+    bool is_open() const { return plain_.is_open() or (compressed_ and compressed_->is_open()); }
+
+    bool is_compressed() const { return compressed_ != nullptr and compressed_->format() != DecompressBuffer::PLAIN; }
+
+    /**
+     * Whether the file could not be read to the end: a read error, or a truncated or corrupted compressed file. The
+     * stream then ends early like a complete file, so the readers check it after their last line
+     * @return
+     */
+    bool failed() const { return bad() or (compressed_ != nullptr and compressed_->failed()); }
+
+    static int default_threads();
+
+private:
+
+    std::filebuf plain_;
+    std::unique_ptr<DecompressBuffer> compressed_;
+
+};
+
+#endif //TONIC_COMPRESSED_INPUT_H
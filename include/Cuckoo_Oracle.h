@@ -0,0 +1,135 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_CUCKOO_ORACLE_H
+#define TONIC_CUCKOO_ORACLE_H
+
+#include "hash_table5.hpp"
+#include <cstdint>
+#include <string>
+#include <vector>
+
+/**
+ * Compact edge oracle: a cuckoo filter whose slots store, next to the fingerprint of an edge id, its heaviness
+ * quantized on a log scale. A slot takes fingerprint_bits + value_bits bits, and buckets of BUCKET_SIZE slots are
+ * filled up to ~95%, so the memory per entry is tuned by the two widths. Edges not in the oracle are reported as
+ * found (with a random heaviness) with probability ~2 * BUCKET_SIZE / 2^fingerprint_bits. Quantization keeps the
+ * order of heaviness values, merging close ones
+ */
+class CuckooEdgeOracle {
+
+public:
+
+    constexpr static int BUCKET_SIZE = 4;
+
+    CuckooEdgeOracle() = default;
+
+    CuckooEdgeOracle(size_t num_entries, int fingerprint_bits, int value_bits, int max_heaviness,
+                     double load_factor = 0.95);
+
+    static bool build(const emhash5::HashMap<long, int> &edge_oracle, int fingerprint_bits, int value_bits,
+                      CuckooEdgeOracle &oracle);
+
+    bool insert(unsigned long long edge_id, int heaviness);
+
+    /**
+     * Look up the heaviness of an edge
+     * @param edge_id
+     * @return the (quantized) heaviness if the edge is found, -1 otherwise
+     */
+    inline int find(unsigned long long edge_id) const {
+        uint64_t h = mix(edge_id);
+        uint32_t fingerprint = fingerprint_of(h);
+        uint64_t i1 = bucket_of(h);
+        int q = find_in_bucket(i1, fingerprint);
+        if (q < 0) q = find_in_bucket(alt_bucket(i1, fingerprint), fingerprint);
+        return q < 0 ? -1 : dequantize(q);
+    }
+
+    bool save(const std::string &path, int num_dense_nodes) const;
+
+    bool load(const std::string &path);
+
+    size_t size() const { return size_; }
+
+    size_t memory_bytes() const { return table_.size() * sizeof(uint64_t) + levels_.size() * sizeof(int); }
+
+    int num_dense_nodes() const { return num_dense_nodes_; }
+
+    int fingerprint_bits() const { return fingerprint_bits_; }
+
+    int value_bits() const { return value_bits_; }
+
+private:
+
+    constexpr static int MAX_KICKS = 500;
+
+    int fingerprint_bits_ = 0;
+    int value_bits_ = 0;
+    int slot_bits_ = 0;
+    uint64_t num_buckets_ = 0;
+    // -- q = round(log2(1 + heaviness) * scale_)
+    double scale_ = 1.0;
+    size_t size_ = 0;
+    int num_dense_nodes_ = 0;
+    uint64_t kick_state_ = 0x9E3779B97F4A7C15ULL;
+    // -- packed slots, (fingerprint << value_bits) | q, 0 for an empty slot
+    std::vector<uint64_t> table_;
+    // -- heaviness of each quantization level
+    std::vector<int> levels_;
+
+    static inline uint64_t mix(uint64_t x) {
+        // -- splitmix64 finalizer
+        x += 0x9E3779B97F4A7C15ULL;
+        x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9ULL;
+        x = (x ^ (x >> 27)) * 0x94D049BB133111EBULL;
+        return x ^ (x >> 31);
+    }
+
+    inline uint32_t fingerprint_of(uint64_t h) const {
+        uint32_t fingerprint = (uint32_t) (h >> (64 - fingerprint_bits_));
+        return fingerprint == 0 ? 1 : fingerprint;
+    }
+
+    inline uint64_t bucket_of(uint64_t h) const {
+        return (uint64_t) (((unsigned __int128) (uint32_t) h * num_buckets_) >> 32);
+    }
+
+    // -- involution: alt_bucket(alt_bucket(i, f), f) == i, for any number of buckets
+    inline uint64_t alt_bucket(uint64_t i, uint32_t fingerprint) const {
+        uint64_t offset = mix(fingerprint) % num_buckets_;
+        return (offset + num_buckets_ - i) % num_buckets_;
+    }
+
+    inline uint32_t get_slot(uint64_t slot) const {
+        uint64_t bit = slot * slot_bits_;
+        uint64_t word = bit >> 6, offset = bit & 63;
+        uint64_t value = table_[word] >> offset;
+        if (offset + slot_bits_ > 64) value |= table_[word + 1] << (64 - offset);
+        return (uint32_t) (value & ((1ULL << slot_bits_) - 1));
+    }
+
+    void set_slot(uint64_t slot, uint32_t value);
+
+    inline int find_in_bucket(uint64_t bucket, uint32_t fingerprint) const {
+        for (int j = 0; j < BUCKET_SIZE; j++) {
+            uint32_t slot = get_slot(bucket * BUCKET_SIZE + j);
+            if ((slot >> value_bits_) == fingerprint) return (int) (slot & ((1u << value_bits_) - 1));
+        }
+        return -1;
+    }
+
+    bool insert_in_bucket(uint64_t bucket, uint32_t slot_value);
+
+    int quantize(int heaviness) const;
+
+    inline int dequantize(int q) const {
+        return levels_[q];
+    }
+
+    void compute_levels();
+
+};
+
+#endif //TONIC_CUCKOO_ORACLE_H
@@ -0,0 +1,145 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_DATASET_CACHE_H
+#define TONIC_DATASET_CACHE_H
+
+#include "Compressed_Input.h"
+#include <cstdint>
+#include <fstream>
+#include <memory>
+#include <string>
+
+/**
+ * An edge of a decoded stream: sign is +1 for insertions (and for the edges of insertion-only streams), -1 for
+ * deletions
+ */
+struct CachedEdge {
+    int32_t u;
+    int32_t v;
+    int32_t t;
+    int32_t sign;
+};
+
+/**
+ * Read-only decoded copy of a preprocessed stream, shared by concurrent runs. The stream is decoded once into
+ * <dir>/tonic-<name>-<key>.edges (by default in /dev/shm, so in RAM) and every run maps the same file. The key is a
+ * hash of the real path, size and modification time of the stream, so a modified stream gets a new cache file.
+ * Layout: a 64 byte header (magic, version, record size, number of edges, size and mtime of the stream) followed by
+ * the CachedEdge records, also read by scripts/tools/dataset_cache.py
+ */
+class DatasetCache {
+
+public:
+
+    constexpr static uint64_t MAGIC = 0x435344434943544EULL;
+    constexpr static uint32_t VERSION = 1;
+    constexpr static size_t HEADER_SIZE = 64;
+
+    static std::string cache_dir(const std::string &flag_value);
+
+    static std::unique_ptr<DatasetCache> attach(const std::string &dataset_path, const std::string &dir);
+
+    static std::string cache_path(const std::string &dataset_path, const std::string &dir);
+
+    ~DatasetCache();
+
+    DatasetCache(const DatasetCache &) = delete;
+
+    DatasetCache &operator=(const DatasetCache &) = delete;
+
+    const CachedEdge *edges() const { return edges_; }
+
+    size_t size() const { return n_edges_; }
+
+    const std::string &path() const { return path_; }
+
+private:
+
+    std::string path_;
+    void *data_ = nullptr;
+    size_t data_size_ = 0;
+    const CachedEdge *edges_ = nullptr;
+    size_t n_edges_ = 0;
+
+    DatasetCache() = default;
+
+    static bool build(const std::string &dataset_path, const std::string &path, uint64_t source_size,
+                      int64_t source_mtime);
+
+    bool map(const std::string &path, uint64_t source_size, int64_t source_mtime);
+
+};
+
+/**
+ * Sequential reader of the edges "u v t [sign]" of a stream, from the text file or from its DatasetCache
+ */
+class EdgeReader {
+
+public:
+
+    // -- offset of the edges read from a cache, where only the position in edges is known
+    constexpr static unsigned long long UNKNOWN_OFFSET = ~0ULL;
+
+    EdgeReader(const std::string &dataset_path, const DatasetCache *cache);
+
+    bool is_open() const { return cache_ != nullptr or file_.is_open(); }
+
+    // -- whether the text file could not be read to the end (or has a malformed line), checked once next() returns
+    // -- false
+    bool failed() const { return cache_ == nullptr and (malformed_ or file_.failed()); }
+
+    /**
+     * Read the next edge
+     * @param u
+     * @param v
+     * @param t
+     * @param sign +1 for insertions (default when the line has no sign), -1 for deletions
+     * @return false at the end of the stream, or at a malformed line
+     */
+    inline bool next(int &u, int &v, int &t, int &sign) {
+        if (cache_ != nullptr) {
+            if (line_ >= (long) cache_->size()) return false;
+            const CachedEdge &edge = cache_->edges()[line_++];
+            u = edge.u;
+            v = edge.v;
+            t = edge.t;
+            sign = edge.sign;
+            return true;
+        }
+        while (std::getline(file_, line_buffer_)) {
+            offset_ += line_buffer_.size() + 1;
+            if (line_buffer_.empty()) continue;
+            line_++;
+            if (!parse(line_buffer_, u, v, t, sign)) {
+                report_malformed();
+                return false;
+            }
+            return true;
+        }
+        return false;
+    }
+
+    void seek(unsigned long long offset, long line);
+
+    // -- byte offset of the next edge in the text file, UNKNOWN_OFFSET when reading from a cache
+    unsigned long long offset() const { return cache_ != nullptr ? UNKNOWN_OFFSET : offset_; }
+
+    static bool parse(const std::string &line, int &u, int &v, int &t, int &sign);
+
+private:
+
+    const DatasetCache *cache_;
+    std::string dataset_path_;
+    InputFile file_;
+    std::string line_buffer_;
+    unsigned long long offset_ = 0;
+    long line_ = 0;
+    bool malformed_ = false;
+
+    void report_malformed();
+
+};
+
+#endif //TONIC_DATASET_CACHE_H
@@ -0,0 +1,45 @@
+// File: Edge_Space_Saving.h
+#ifndef EDGE_SPACE_SAVING_H
+#define EDGE_SPACE_SAVING_H
+
+#include "hash_table5.hpp"
+#include "Random.h"
+#include <vector>
+#include <random>
+
+/**
+ * Weighted Unbiased Space Saving over edge ids: tracks at most capacity edges with the largest total weight of the
+ * updates. An update of an untracked edge adds its weight to the lightest tracked edge, whose label is replaced by
+ * the new edge with probability weight / (new total weight), so the weights stay unbiased estimates of the totals
+ */
+class EdgeSpaceSaving {
+public:
+
+    struct HeapEntry {
+        long edge;
+        double weight;
+    };
+
+    EdgeSpaceSaving(int capacity, int seed);
+
+    void update(long edge, double weight);
+
+    std::vector<HeapEntry> top_n(int n) const;
+
+    int size() const { return size_; }
+
+private:
+
+    int capacity_;
+    int size_ = 0;
+    // -- min-heap on the weight
+    std::vector<HeapEntry> heap_;
+    emhash5::HashMap<long, int> edge_to_index_;
+    Xoshiro256 gen_;
+
+    void sift_up(int i);
+    void sift_down(int i);
+    void swap_entries(int i, int j);
+};
+
+#endif
@@ -0,0 +1,41 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_EXACT_COUNTER_H
+#define TONIC_EXACT_COUNTER_H
+
+#include "hash_table5.hpp"
+#include "hash_set8.hpp"
+
+/**
+ * Exact triangle counter fed one edge at a time, so that the count of every prefix of the stream is available while
+ * the stream is read. The counts are the ones of Utils::run_exact_algorithm (insertion-only streams: self-loops and
+ * repeated edges are skipped) and of Utils::run_exact_algorithm_FD (fully-dynamic streams)
+ */
+class ExactCounter {
+
+public:
+
+    ExactCounter() = default;
+
+    void process_edge(const int u, const int v);
+
+    void process_edge(const int u, const int v, const int sign);
+
+    long get_triangles() const { return total_T_; }
+
+    long get_num_edges() const { return num_edges_; }
+
+private:
+
+    emhash5::HashMap<int, emhash8::HashSet<int>> graph_;
+
+    long total_T_ = 0;
+    long num_edges_ = 0;
+
+    long count_common_neighbors(const int u, const int v) const;
+
+};
+
+#endif //TONIC_EXACT_COUNTER_H
@@ -0,0 +1,261 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_EXTERNAL_SORT_H
+#define TONIC_EXTERNAL_SORT_H
+
+#include <algorithm>
+#include <cstdio>
+#include <filesystem>
+#include <functional>
+#include <iostream>
+#include <queue>
+#include <string>
+#include <type_traits>
+#include <vector>
+
+/**
+ * Buffered sequential reader of a binary file of trivially copyable records
+ */
+template<typename T>
+class RecordReader {
+
+public:
+
+    explicit RecordReader(const std::string &path) : file_(std::fopen(path.c_str(), "rb")), pos_(0), size_(0) {
+        if (file_ == nullptr) {
+            std::cerr << "RecordReader - Error! Unable to open " << path << "\n";
+            exit(1);
+        }
+        buffer_.resize(BUFFER_RECORDS);
+    }
+
+    RecordReader(RecordReader &&other) noexcept: file_(other.file_), buffer_(std::move(other.buffer_)),
+                                                  pos_(other.pos_), size_(other.size_) {
+        other.file_ = nullptr;
+    }
+
+    RecordReader(const RecordReader &) = delete;
+
+    ~RecordReader() {
+        if (file_ != nullptr) std::fclose(file_);
+    }
+
+    /**
+     * Read the next record
+     * @param record filled with the next record
+     * @return false at the end of the file
+     */
+    bool next(T &record) {
+        if (pos_ == size_) {
+            size_ = std::fread(buffer_.data(), sizeof(T), buffer_.size(), file_);
+            pos_ = 0;
+            if (size_ == 0) return false;
+        }
+        record = buffer_[pos_++];
+        return true;
+    }
+
+private:
+
+    constexpr static size_t BUFFER_RECORDS = 1 << 14;
+
+    std::FILE *file_;
+    std::vector<T> buffer_;
+    size_t pos_, size_;
+};
+
+/**
+ * Buffered sequential writer of a binary file of trivially copyable records
+ */
+template<typename T>
+class RecordWriter {
+
+public:
+
+    explicit RecordWriter(const std::string &path) : path_(path), file_(std::fopen(path.c_str(), "wb")) {
+        if (file_ == nullptr) {
+            std::cerr << "RecordWriter - Error! Unable to open " << path << "\n";
+            exit(1);
+        }
+        buffer_.reserve(BUFFER_RECORDS);
+    }
+
+    RecordWriter(const RecordWriter &) = delete;
+
+    ~RecordWriter() {
+        flush();
+        std::fclose(file_);
+    }
+
+    void write(const T &record) {
+        buffer_.push_back(record);
+        if (buffer_.size() == BUFFER_RECORDS) flush();
+    }
+
+private:
+
+    constexpr static size_t BUFFER_RECORDS = 1 << 14;
+
+    std::string path_;
+    std::FILE *file_;
+    std::vector<T> buffer_;
+
+    void flush() {
+        if (std::fwrite(buffer_.data(), sizeof(T), buffer_.size(), file_) != buffer_.size()) {
+            std::cerr << "RecordWriter - Error! Unable to write " << path_ << "\n";
+            exit(1);
+        }
+        buffer_.clear();
+    }
+};
+
+/**
+ * External-memory sorter for trivially copyable records. Records are buffered in RAM up to a fixed number of
+ * records, then each full buffer is sorted and spilled to disk as a sorted run. merge() performs a k-way merge of
+ * all the runs (and of the records still in memory), calling a callback on every record in sorted order.
+ * Optionally, records that are equal according to a dedup predicate are collapsed inside each run, keeping the first
+ * one in sorted order.
+ */
+template<typename T, typename Compare>
+class ExternalSorter {
+
+    static_assert(std::is_trivially_copyable<T>::value, "ExternalSorter requires trivially copyable records");
+
+public:
+
+    using Equal = std::function<bool(const T &, const T &)>;
+
+    /**
+     * Constructor for ExternalSorter
+     * @param max_records_in_memory maximum number of records buffered in RAM before spilling a run
+     * @param tmp_dir folder where the sorted runs are written
+     * @param name prefix of the run files
+     * @param cmp comparator defining the sort order
+     * @param dedup optional predicate, records equal to the previous one in a run are dropped before spilling
+     */
+    ExternalSorter(size_t max_records_in_memory, const std::string &tmp_dir, const std::string &name,
+                   Compare cmp = Compare(), Equal dedup = nullptr) :
+            max_records_(std::max<size_t>(max_records_in_memory, 1)), tmp_dir_(tmp_dir), name_(name), cmp_(cmp),
+            dedup_(dedup) {
+        buffer_.reserve(std::min<size_t>(max_records_, 1 << 20));
+    }
+
+    ~ExternalSorter() {
+        for (const auto &run: runs_) {
+            std::filesystem::remove(run);
+        }
+    }
+
+    ExternalSorter(const ExternalSorter &) = delete;
+
+    ExternalSorter &operator=(const ExternalSorter &) = delete;
+
+    /**
+     * Add a record, spilling a sorted run to disk if the in-memory buffer is full
+     * @param record
+     */
+    void push(const T &record) {
+        buffer_.push_back(record);
+        if (buffer_.size() >= max_records_) {
+            spill();
+        }
+    }
+
+    /**
+     * @return the number of runs spilled to disk so far
+     */
+    size_t num_runs() const { return runs_.size(); }
+
+    /**
+     * K-way merge of all the runs and the in-memory buffer. The sorter is empty afterwards
+     * @param callback called on each record in sorted order
+     */
+    template<typename Callback>
+    void merge(Callback callback) {
+
+        sort_buffer();
+
+        if (runs_.empty()) {
+            // -- everything fits in memory
+            for (const auto &record: buffer_) {
+                callback(record);
+            }
+            buffer_.clear();
+            return;
+        }
+
+        std::vector<RecordReader<T>> readers;
+        readers.reserve(runs_.size() + 1);
+        for (const auto &run: runs_) {
+            readers.emplace_back(run);
+        }
+
+        // -- heap of (record, reader index), the smallest record on top
+        auto heap_cmp = [this](const std::pair<T, size_t> &a, const std::pair<T, size_t> &b) {
+            if (cmp_(b.first, a.first)) return true;
+            if (cmp_(a.first, b.first)) return false;
+            return a.second > b.second;
+        };
+        std::priority_queue<std::pair<T, size_t>, std::vector<std::pair<T, size_t>>, decltype(heap_cmp)> heap(heap_cmp);
+
+        T record;
+        for (size_t i = 0; i < readers.size(); i++) {
+            if (readers[i].next(record)) heap.push({record, i});
+        }
+        // -- records still in memory act as the last run
+        size_t buffer_idx = 0, buffer_run = readers.size();
+        if (buffer_idx < buffer_.size()) heap.push({buffer_[buffer_idx++], buffer_run});
+
+        while (!heap.empty()) {
+            auto top = heap.top();
+            heap.pop();
+            callback(top.first);
+            if (top.second == buffer_run) {
+                if (buffer_idx < buffer_.size()) heap.push({buffer_[buffer_idx++], buffer_run});
+            } else if (readers[top.second].next(record)) {
+                heap.push({record, top.second});
+            }
+        }
+
+        readers.clear();
+        buffer_.clear();
+        for (const auto &run: runs_) {
+            std::filesystem::remove(run);
+        }
+        runs_.clear();
+    }
+
+private:
+
+    size_t max_records_;
+    std::string tmp_dir_;
+    std::string name_;
+    Compare cmp_;
+    Equal dedup_;
+    std::vector<T> buffer_;
+    std::vector<std::string> runs_;
+
+    void sort_buffer() {
+        std::sort(buffer_.begin(), buffer_.end(), cmp_);
+        if (dedup_) {
+            buffer_.erase(std::unique(buffer_.begin(), buffer_.end(), dedup_), buffer_.end());
+        }
+    }
+
+    void spill() {
+        sort_buffer();
+        std::string path = (std::filesystem::path(tmp_dir_) /
+                            (name_ + "_run" + std::to_string(runs_.size()) + ".bin")).string();
+        RecordWriter<T> writer(path);
+        for (const auto &record: buffer_) {
+            writer.write(record);
+        }
+        runs_.push_back(path);
+        buffer_.clear();
+    }
+
+};
+
+#endif //TONIC_EXTERNAL_SORT_H
@@ -0,0 +1,90 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_HEAVY_EDGE_STORE_H
+#define TONIC_HEAVY_EDGE_STORE_H
+
+#include "hash_table5.hpp"
+#include "Random.h"
+#include "Utils.h"
+#include <cstdint>
+#include <map>
+#include <utility>
+#include <vector>
+
+using Edge = std::pair<int, int>;
+using Heavy_edge = std::pair<Edge, int>;
+
+/**
+ * Set of the heavy edges (H) of Tonic, as a bucket queue on the heaviness: bucket h + 1 holds the edges of heaviness
+ * h (h >= -1). The buckets of the first DIRECT_KEYS keys are indexed directly, and a bitmap of the non-empty ones gives
+ * the lightest bucket with a word scan; heavier buckets are kept in an ordered map, so memory does not grow with the
+ * largest heaviness of the oracle. Most heaviness values are small integers (triangle counts or degrees), so replacing
+ * the lightest edge is O(1) amortized: in insertion-only streams the lightest heaviness never decreases. The lightest
+ * edge to evict is drawn uniformly at random among the ties. With index_edges, edges can also be removed by value
+ * (deletions of fully-dynamic streams)
+ */
+class HeavyEdgeStore {
+
+public:
+
+    HeavyEdgeStore() = default;
+
+    HeavyEdgeStore(size_t capacity, bool index_edges);
+
+    inline size_t size() const { return size_; }
+
+    inline bool empty() const { return size_ == 0; }
+
+    // -- heaviness of the lightest edges, the store must not be empty
+    inline int min_heaviness() const { return (int) (min_key_ - 1); }
+
+    void push(const Edge &edge, int heaviness);
+
+    Edge replace_min(const Edge &edge, int heaviness, Xoshiro256 &gen);
+
+    bool erase(const Edge &edge);
+
+    bool contains(const Edge &edge) const;
+
+    void get_edges(std::vector<Heavy_edge> &edges) const;
+
+    size_t memory_bytes() const;
+
+private:
+
+    // -- position of an edge in the buckets
+    struct Slot {
+        uint32_t key;
+        uint32_t pos;
+    };
+
+    // -- keys indexed directly, larger keys go to overflow_
+    constexpr static size_t DIRECT_KEYS = 1 << 14;
+
+    std::vector<std::vector<Edge>> buckets_;
+    // -- bit key is set iff buckets_[key] is not empty
+    std::vector<uint64_t> non_empty_;
+    // -- non-empty buckets of the keys >= DIRECT_KEYS
+    std::map<size_t, std::vector<Edge>> overflow_;
+    size_t size_ = 0;
+    size_t min_key_ = 0;
+    bool index_edges_ = false;
+    emhash5::HashMap<long, Slot> slots_;
+
+    static inline size_t key_of(int heaviness) {
+        return heaviness < -1 ? 0 : (size_t) heaviness + 1;
+    }
+
+    void grow(size_t key);
+
+    std::vector<Edge> &bucket_at(size_t key);
+
+    void remove_at(size_t key, size_t pos);
+
+    size_t next_non_empty(size_t key) const;
+
+};
+
+#endif //TONIC_HEAVY_EDGE_STORE_H
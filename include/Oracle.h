@@ -0,0 +1,179 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_ORACLE_H
+#define TONIC_ORACLE_H
+
+#include "hash_table5.hpp"
+#include "Cuckoo_Oracle.h"
+#include "Utils.h"
+#include <algorithm>
+#include <memory>
+#include <vector>
+
+/**
+ * Register-blocked Bloom filter: the NUM_PROBES bits of a key are all in the same 64-bit word, so a query reads a
+ * single word. With BITS_PER_KEY bits per key, ~0.5% of the keys not in the filter are reported as present
+ */
+class BlockedBloomFilter {
+
+public:
+
+    constexpr static int BITS_PER_KEY = 16;
+    constexpr static int NUM_PROBES = 4;
+
+    BlockedBloomFilter() = default;
+
+    explicit BlockedBloomFilter(size_t num_keys);
+
+    void insert(uint64_t key);
+
+    /**
+     * Check if a key may be in the filter
+     * @param key
+     * @return false if the key is surely not in the filter
+     */
+    inline bool may_contain(uint64_t key) const {
+        uint64_t h = mix(key);
+        uint64_t mask = mask_of(h);
+        return (words_[(h >> 32) & word_mask_] & mask) == mask;
+    }
+
+    size_t memory_bytes() const { return words_.size() * sizeof(uint64_t); }
+
+private:
+
+    uint64_t word_mask_ = 0;
+    std::vector<uint64_t> words_;
+
+    static inline uint64_t mix(uint64_t x) {
+        // -- splitmix64 finalizer
+        x += 0x9E3779B97F4A7C15ULL;
+        x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9ULL;
+        x = (x ^ (x >> 27)) * 0x94D049BB133111EBULL;
+        return x ^ (x >> 31);
+    }
+
+    // -- NUM_PROBES bits of the word, from 6-bit slices of the low half of the hash
+    static inline uint64_t mask_of(uint64_t h) {
+        uint64_t mask = 0;
+        for (int i = 0; i < NUM_PROBES; i++) mask |= 1ULL << ((h >> (6 * i)) & 63);
+        return mask;
+    }
+
+};
+
+/**
+ * Heaviness predictor of Tonic: node oracle (by original or dense node ids), edge oracle or compact cuckoo edge
+ * oracle. An Oracle is immutable once built, so a single instance is shared, through a SharedOracle handle, by all
+ * the Tonic, Tonic_FD and Tonic_MultiBudget instances of a process: they cost the memory of one oracle and no copy,
+ * and can look it up concurrently from different threads. Node and edge oracles keyed by hash maps are fronted by a
+ * BlockedBloomFilter of their keys, which answers most of the misses without probing the hash map
+ */
+class Oracle {
+
+public:
+
+    enum class Type { NODES, DENSE_NODES, EDGES, CUCKOO };
+
+    explicit Oracle(emhash5::HashMap<int, int> node_oracle);
+
+    explicit Oracle(std::vector<int> dense_node_oracle);
+
+    explicit Oracle(emhash5::HashMap<long, int> edge_oracle);
+
+    explicit Oracle(CuckooEdgeOracle cuckoo_oracle);
+
+    Oracle(const Oracle &) = delete;
+
+    Oracle &operator=(const Oracle &) = delete;
+
+    /**
+     * Check the prefilter of the oracle for the edge (u, v)
+     * @param u
+     * @param v
+     * @return false if the edge (or one of the nodes) is surely not in the oracle
+     */
+    inline bool may_contain(const int u, const int v) const {
+        switch (type_) {
+            case Type::EDGES:
+                return filter_.may_contain(Utils::edge_to_id(u, v));
+            case Type::NODES:
+                return filter_.may_contain((uint64_t) (uint32_t) u) and filter_.may_contain((uint64_t) (uint32_t) v);
+            default:
+                // -- dense and cuckoo oracles are already answered by a single probe
+                return true;
+        }
+    }
+
+    /**
+     * Look up the heaviness of the edge (u, v) in the oracle, without the prefilter
+     * @param u
+     * @param v
+     * @return heaviness if the edge or both nodes are found in the predictor, -1 otherwise (also for dense node ids
+     * out of range)
+     */
+    inline int find(const int u, const int v) const {
+        switch (type_) {
+            case Type::CUCKOO:
+                return cuckoo_oracle_.find(Utils::edge_to_id(u, v));
+            case Type::EDGES: {
+                auto id_it = edge_oracle_.find((long) Utils::edge_to_id(u, v));
+                return id_it != edge_oracle_.end() ? id_it->second : -1;
+            }
+            case Type::DENSE_NODES: {
+                // -- ids outside [0, num_dense_nodes) are not in the oracle
+                if ((size_t) (uint32_t) u >= dense_node_oracle_.size() or
+                    (size_t) (uint32_t) v >= dense_node_oracle_.size()) return -1;
+                int u_heaviness = dense_node_oracle_[u];
+                int v_heaviness = dense_node_oracle_[v];
+                if (u_heaviness > -1 and v_heaviness > -1) return std::min(u_heaviness, v_heaviness);
+                return -1;
+            }
+            default: {
+                auto u_it = node_oracle_.find(u);
+                if (u_it == node_oracle_.end()) return -1;
+                auto v_it = node_oracle_.find(v);
+                if (v_it == node_oracle_.end()) return -1;
+                return std::min(u_it->second, v_it->second);
+            }
+        }
+    }
+
+    /**
+     * Look up the heaviness of the edge (u, v)
+     * @param u
+     * @param v
+     * @return heaviness if the edge or both nodes are found in the predictor, -1 otherwise
+     */
+    inline int lookup(const int u, const int v) const {
+        return may_contain(u, v) ? find(u, v) : -1;
+    }
+
+    Type type() const { return type_; }
+
+    bool is_edge_oracle() const { return type_ == Type::EDGES or type_ == Type::CUCKOO; }
+
+    // -- number of dense node ids of a node oracle indexed by dense node ids, 0 otherwise
+    int num_dense_nodes() const { return (int) dense_node_oracle_.size(); }
+
+    size_t size() const;
+
+    size_t memory_bytes() const;
+
+private:
+
+    Type type_;
+    emhash5::HashMap<int, int> node_oracle_;
+    std::vector<int> dense_node_oracle_;
+    emhash5::HashMap<long, int> edge_oracle_;
+    CuckooEdgeOracle cuckoo_oracle_;
+    BlockedBloomFilter filter_;
+
+};
+
+// -- handle of a read-only oracle shared by several instances
+using SharedOracle = std::shared_ptr<const Oracle>;
+
+#endif //TONIC_ORACLE_H
@@ -0,0 +1,175 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_PHASE_PROFILER_H
+#define TONIC_PHASE_PROFILER_H
+
+#include <algorithm>
+#include <array>
+#include <chrono>
+#include <cstdint>
+#include <cstdio>
+#include <string>
+#include <vector>
+
+#ifndef TONIC_PROFILE_EVERY
+#define TONIC_PROFILE_EVERY 64
+#endif
+
+/**
+ * Log-scale latency histogram in nanoseconds. Each power of two is split into SUB_BUCKETS linear sub-buckets, so the
+ * relative error of a quantile is at most 1 / SUB_BUCKETS
+ */
+class LatencyHistogram {
+
+public:
+
+    void add(uint64_t ns) {
+        buckets_[bucket_index(ns)]++;
+        count_++;
+        sum_ += ns;
+        max_ = std::max(max_, ns);
+    }
+
+    /**
+     * Return the q-quantile of the recorded latencies, as the upper bound of the bucket containing it
+     * @param q in [0, 1]
+     * @return latency in ns
+     */
+    uint64_t quantile(double q) const {
+        if (count_ == 0) return 0;
+        auto rank = (uint64_t) (q * (double) (count_ - 1)) + 1;
+        uint64_t cumulative = 0;
+        for (size_t i = 0; i < buckets_.size(); i++) {
+            cumulative += buckets_[i];
+            if (cumulative >= rank) return std::min(bucket_upper_bound(i), max_);
+        }
+        return max_;
+    }
+
+    uint64_t count() const { return count_; }
+
+    double mean() const { return count_ > 0 ? (double) sum_ / (double) count_ : 0.0; }
+
+    uint64_t max() const { return max_; }
+
+private:
+
+    constexpr static int SUB_BITS = 2;
+    constexpr static int SUB_BUCKETS = 1 << SUB_BITS;
+
+    std::array<uint64_t, 64 * SUB_BUCKETS> buckets_{};
+    uint64_t count_ = 0;
+    uint64_t sum_ = 0;
+    uint64_t max_ = 0;
+
+    static size_t bucket_index(uint64_t ns) {
+        if (ns < SUB_BUCKETS) return ns;
+        int exponent = 63 - __builtin_clzll(ns);
+        auto sub = (size_t) ((ns >> (exponent - SUB_BITS)) & (SUB_BUCKETS - 1));
+        return (size_t) (exponent - SUB_BITS + 1) * SUB_BUCKETS + sub;
+    }
+
+    static uint64_t bucket_upper_bound(size_t index) {
+        if (index < SUB_BUCKETS) return index;
+        int exponent = (int) (index / SUB_BUCKETS) + SUB_BITS - 1;
+        uint64_t sub = index % SUB_BUCKETS;
+        return ((SUB_BUCKETS + sub + 1) << (exponent - SUB_BITS)) - 1;
+    }
+
+};
+
+/**
+ * Per-phase latency profiler of process_edge. Only one edge every sample_every is timed, so that reading the clock
+ * does not dominate the cost of cheap edges. Compiled in only with -DTONIC_PROFILE, see the PROFILE_* macros
+ */
+class PhaseProfiler {
+
+public:
+
+    explicit PhaseProfiler(std::vector<std::string> phase_names, uint64_t sample_every = TONIC_PROFILE_EVERY) :
+            phase_names_(std::move(phase_names)), histograms_(phase_names_.size()),
+            sample_every_(std::max<uint64_t>(sample_every, 1)) {}
+
+    /**
+     * Start a new edge, deciding whether its phases are timed
+     */
+    inline void begin_edge() {
+        active_ = (n_edges_++ % sample_every_) == 0;
+        if (active_) edge_start_ = now();
+    }
+
+    /**
+     * Close the current edge, recording its total latency in the last phase
+     */
+    inline void end_edge() {
+        if (active_) histograms_.back().add(now() - edge_start_);
+    }
+
+    inline bool active() const { return active_; }
+
+    inline void add(size_t phase, uint64_t ns) { histograms_[phase].add(ns); }
+
+    static inline uint64_t now() {
+        return (uint64_t) std::chrono::duration_cast<std::chrono::nanoseconds>(
+                std::chrono::steady_clock::now().time_since_epoch()).count();
+    }
+
+    /**
+     * Print p50/p99/p999 and mean latency of every phase
+     * @param algo_name printed in the header of the report
+     */
+    void report(const std::string &algo_name) const {
+        printf("%s per-phase latency (ns) | sampled 1 edge every %lu, %lu edges processed\n", algo_name.c_str(),
+               (unsigned long) sample_every_, (unsigned long) n_edges_);
+        printf("%-18s %12s %10s %10s %10s %12s %12s\n", "phase", "samples", "p50", "p99", "p999", "max", "mean");
+        for (size_t i = 0; i < histograms_.size(); i++) {
+            const auto &h = histograms_[i];
+            printf("%-18s %12lu %10lu %10lu %10lu %12lu %12.1f\n", phase_names_[i].c_str(), (unsigned long) h.count(),
+                   (unsigned long) h.quantile(0.5), (unsigned long) h.quantile(0.99),
+                   (unsigned long) h.quantile(0.999), (unsigned long) h.max(), h.mean());
+        }
+    }
+
+    /**
+     * Time a phase of a sampled edge for the lifetime of the scope
+     */
+    class Scope {
+    public:
+        Scope(PhaseProfiler &profiler, size_t phase) : profiler_(profiler), phase_(phase),
+                                                        start_(profiler.active() ? now() : 0) {}
+
+        ~Scope() {
+            if (profiler_.active()) profiler_.add(phase_, now() - start_);
+        }
+
+    private:
+        PhaseProfiler &profiler_;
+        size_t phase_;
+        uint64_t start_;
+    };
+
+private:
+
+    std::vector<std::string> phase_names_;
+    std::vector<LatencyHistogram> histograms_;
+    uint64_t sample_every_;
+    uint64_t n_edges_ = 0;
+    bool active_ = false;
+    uint64_t edge_start_ = 0;
+
+};
+
+// -- instrumentation macros, no-ops unless built with -DTONIC_PROFILE=ON
+#ifdef TONIC_PROFILE
+#define PROFILE_EDGE_BEGIN(profiler) (profiler).begin_edge()
+#define PROFILE_EDGE_END(profiler) (profiler).end_edge()
+#define PROFILE_PHASE(profiler, phase) PhaseProfiler::Scope profile_scope_##phase((profiler), (phase))
+#else
+#define PROFILE_EDGE_BEGIN(profiler) ((void) 0)
+#define PROFILE_EDGE_END(profiler) ((void) 0)
+#define PROFILE_PHASE(profiler, phase) ((void) 0)
+#endif
+
+#endif //TONIC_PHASE_PROFILER_H
@@ -0,0 +1,146 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_RANDOM_H
+#define TONIC_RANDOM_H
+
+#include <cmath>
+#include <cstdint>
+#include <limits>
+
+/**
+ * xoshiro256** pseudo-random generator (Blackman and Vigna), seeded through splitmix64. Much faster than std::mt19937
+ * and with a 32-byte state, so every sampler owns its generator and a run is reproducible from its seed alone. Also
+ * usable as a UniformRandomBitGenerator with the std distributions
+ */
+class Xoshiro256 {
+
+public:
+
+    using result_type = uint64_t;
+
+    Xoshiro256() : Xoshiro256(0) {}
+
+    explicit Xoshiro256(uint64_t seed) {
+        for (uint64_t &s: state_) {
+            // -- splitmix64, so that close seeds give unrelated states
+            seed += 0x9E3779B97F4A7C15ULL;
+            uint64_t z = seed;
+            z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL;
+            z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL;
+            s = z ^ (z >> 31);
+        }
+    }
+
+    static constexpr result_type min() { return 0; }
+
+    static constexpr result_type max() { return std::numeric_limits<result_type>::max(); }
+
+    inline result_type operator()() {
+        uint64_t result = rotl(state_[1] * 5, 7) * 9;
+        uint64_t t = state_[1] << 17;
+        state_[2] ^= state_[0];
+        state_[3] ^= state_[1];
+        state_[1] ^= state_[2];
+        state_[0] ^= state_[3];
+        state_[2] ^= t;
+        state_[3] = rotl(state_[3], 45);
+        return result;
+    }
+
+    /**
+     * Uniform double in [0, 1), from the 53 high bits of the next output
+     * @return random double
+     */
+    inline double next_double() {
+        return (double) ((*this)() >> 11) * 0x1.0p-53;
+    }
+
+    /**
+     * Uniform double in (0, 1], safe for log()
+     * @return random double
+     */
+    inline double next_double_open() {
+        return (double) (((*this)() >> 11) + 1) * 0x1.0p-53;
+    }
+
+    /**
+     * Uniform integer in [0, n), by Lemire's multiply-shift (bias below n / 2^64, negligible for sample sizes)
+     * @param n
+     * @return random integer
+     */
+    inline uint64_t next_int(uint64_t n) {
+        return (uint64_t) (((unsigned __int128) (*this)() * n) >> 64);
+    }
+
+    const uint64_t *state() const { return state_; }
+
+    uint64_t *state() { return state_; }
+
+private:
+
+    uint64_t state_[4];
+
+    static inline uint64_t rotl(uint64_t x, int k) {
+        return (x << k) | (x >> (64 - k));
+    }
+
+};
+
+/**
+ * Skip counter of Li's Algorithm L for a reservoir of fixed size: once the reservoir is full, it draws directly the
+ * position of the next item that enters the reservoir, so the items in between cost no random draws. The sample has
+ * the same distribution as with one coin flip per item (each of the n items seen so far is in the reservoir with
+ * probability size / n)
+ */
+class ReservoirSkip {
+
+public:
+
+    ReservoirSkip() = default;
+
+    /**
+     * Start skipping after the reservoir has been filled by its first size items
+     * @param size reservoir size
+     * @param gen
+     */
+    void start(long size, Xoshiro256 &gen) {
+        size_ = size;
+        w_ = std::exp(std::log(gen.next_double_open()) / (double) size_);
+        next_ = size_;
+        advance(gen);
+    }
+
+    /**
+     * Check if the n-th item (1-based) enters the reservoir, and in this case draw the next admitted item
+     * @param n items seen so far, including the current one
+     * @param gen
+     * @return true if the item replaces a uniformly random item of the reservoir
+     */
+    inline bool admit(long n, Xoshiro256 &gen) {
+        if (n != next_) return false;
+        w_ *= std::exp(std::log(gen.next_double_open()) / (double) size_);
+        advance(gen);
+        return true;
+    }
+
+    long next() const { return next_; }
+
+private:
+
+    long size_ = 0;
+    // -- largest key of the reservoir, in the formulation with random keys u^(1/size)
+    double w_ = 0.0;
+    // -- 1-based index of the next admitted item
+    long next_ = 0;
+
+    void advance(Xoshiro256 &gen) {
+        double skip = std::floor(std::log(gen.next_double_open()) / std::log1p(-w_));
+        next_ += skip < (double) std::numeric_limits<long>::max() / 2 ? (long) skip + 1 :
+                 std::numeric_limits<long>::max() / 2;
+    }
+
+};
+
+#endif //TONIC_RANDOM_H
@@ -0,0 +1,55 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_RESULTS_STORE_H
+#define TONIC_RESULTS_STORE_H
+
+#include <string>
+
+/**
+ * One row of the results store
+ */
+struct ResultRecord {
+    std::string algo;
+    std::string dataset;
+    long seed = -1;
+    double alpha = 0.0;
+    double beta = 0.0;
+    long memory_budget = 0;
+    std::string oracle_type;
+    std::string oracle_path;
+    long oracle_size = 0;
+    double oracle_time = 0.0;
+    // -- memory of the oracle in bytes
+    long oracle_bytes = 0;
+    double estimate = 0.0;
+    double time = 0.0;
+};
+
+/**
+ * Append-only results store. Each process writes its rows to its own shard <dir>/shard-<host>-<pid>.csv, so
+ * concurrent runs never write to the same file; scripts/tools/results_store.py merges the shards on read
+ */
+class ResultsStore {
+
+public:
+
+    explicit ResultsStore(const std::string &dir);
+
+    bool append(const ResultRecord &record);
+
+    static bool append_locked(const std::string &csv_path, const std::string &header, const std::string &row);
+
+    static std::string results_dir(const std::string &flag_value);
+
+    static ResultsStore *for_process(const std::string &flag_value);
+
+private:
+
+    std::string shard_path_;
+    std::string run_id_;
+
+};
+
+#endif //TONIC_RESULTS_STORE_H
@@ -0,0 +1,62 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_STREAM_GENERATOR_H
+#define TONIC_STREAM_GENERATOR_H
+
+#include <random>
+#include <string>
+
+/**
+ * Offline generator of synthetic graph streams. Edges follow a Chung-Lu model with power-law expected degrees, and a
+ * fraction of them is drawn inside small communities of consecutive node ids, which tunes the triangle density.
+ * Edges are generated in fixed-size chunks, each one with its own generator seeded by (seed, salt, chunk index), so
+ * the output only depends on the seed and not on the number of threads. Raw edges are then deduplicated and
+ * timestamped by the out-of-core preprocessing, so the output has the same layout of Utils::preprocess_data
+ */
+class StreamGenerator {
+
+public:
+
+    StreamGenerator(long num_nodes, double gamma, double triangle_prob, int community_size, unsigned int seed,
+                    int num_threads, size_t ram_budget_bytes, const std::string &tmp_dir);
+
+    void write_stream(const std::string &output_path, long num_edges, unsigned int salt = 0) const;
+
+    void write_fd_stream(const std::string &stream_path, const std::string &output_path,
+                         double deletion_prob) const;
+
+    void write_snapshots(const std::string &output_folder, int n_snapshots, long num_edges, double drift) const;
+
+private:
+
+    constexpr static long CHUNK_EDGES = 1 << 20;
+
+    long num_nodes_;
+    double gamma_;
+    double triangle_prob_;
+    int community_size_;
+    unsigned int seed_;
+    int num_threads_;
+    size_t ram_budget_bytes_;
+    std::string tmp_dir_;
+
+    // -- power-law sampler: inverse CDF of w(x) ~ x^(-1 / (gamma - 1)) on [1, n + 1]
+    double exponent_;
+    double cdf_scale_;
+    // -- node ids are permuted with x -> (x * multiplier_ + offset) mod n, so that hubs are spread over the id range
+    long multiplier_;
+    long offset_;
+
+    inline long sample_node(std::mt19937_64 &gen, std::uniform_real_distribution<double> &dis) const;
+
+    void generate_chunk(long chunk, long n_edges, unsigned int salt, std::string &buffer) const;
+
+    void write_raw_edges(const std::string &raw_path, long num_edges, unsigned int salt, bool append) const;
+
+    void preprocess(const std::string &raw_path, const std::string &output_path) const;
+
+};
+
+#endif //TONIC_STREAM_GENERATOR_H
@@ -0,0 +1,179 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_SUBGRAPH_H
+#define TONIC_SUBGRAPH_H
+
+#include "hash_table5.hpp"
+#include <array>
+#include <climits>
+#include <cstdint>
+#include <memory>
+#include <vector>
+
+/**
+ * Sampled subgraph of Tonic and Tonic_FD: the neighbors of every node, each with the flag det (the edge is in WR or H)
+ * or not (the edge is light, in SL). The neighbors of a node are an open-addressing table with linear probing whose
+ * capacity is a power of two (a size class). Tables are not allocated one by one: they are carved from large chunks
+ * and recycled through one free list per size class, so once the chunks cover the peak size of the subgraph, adding
+ * and removing edges (and nodes) performs no malloc or free. A node is removed as soon as it has no neighbors
+ */
+class Subgraph {
+
+public:
+
+    // -- a neighbor w of a node, with the det flag of the edge
+    struct Neighbor {
+        int node;
+        bool det;
+    };
+
+    /**
+     * Read-only view of the neighbors of a node, valid until the subgraph is modified
+     */
+    class Neighbors {
+
+    public:
+
+        class iterator {
+
+        public:
+
+            iterator(const Neighbor *slot, const Neighbor *end) : slot_(slot), end_(end) { skip_empty(); }
+
+            const Neighbor &operator*() const { return *slot_; }
+
+            const Neighbor *operator->() const { return slot_; }
+
+            iterator &operator++() {
+                slot_++;
+                skip_empty();
+                return *this;
+            }
+
+            bool operator!=(const iterator &other) const { return slot_ != other.slot_; }
+
+        private:
+
+            const Neighbor *slot_;
+            const Neighbor *end_;
+
+            void skip_empty() {
+                while (slot_ != end_ and slot_->node == EMPTY) slot_++;
+            }
+
+        };
+
+        Neighbors() = default;
+
+        Neighbors(const Neighbor *slots, uint32_t capacity, uint32_t size) :
+                slots_(slots), capacity_(capacity), size_(size) {}
+
+        inline uint32_t size() const { return size_; }
+
+        inline bool empty() const { return size_ == 0; }
+
+        iterator begin() const { return {slots_, slots_ + capacity_}; }
+
+        iterator end() const { return {slots_ + capacity_, slots_ + capacity_}; }
+
+        /**
+         * Find a neighbor
+         * @param w
+         * @return the neighbor w, nullptr if w is not a neighbor
+         */
+        inline const Neighbor *find(const int w) const {
+            if (size_ == 0) return nullptr;
+            uint32_t mask = capacity_ - 1;
+            for (uint32_t i = slot_of(w, mask);; i = (i + 1) & mask) {
+                if (slots_[i].node == w) return &slots_[i];
+                if (slots_[i].node == EMPTY) return nullptr;
+            }
+        }
+
+    private:
+
+        const Neighbor *slots_ = nullptr;
+        uint32_t capacity_ = 0;
+        uint32_t size_ = 0;
+
+    };
+
+    explicit Subgraph(size_t expected_nodes = 0);
+
+    Subgraph(const Subgraph &) = delete;
+
+    Subgraph &operator=(const Subgraph &) = delete;
+
+    Subgraph(Subgraph &&) = default;
+
+    Subgraph &operator=(Subgraph &&) = default;
+
+    void insert(const int u, const int v, bool det);
+
+    int erase(const int u, const int v);
+
+    Neighbors neighbors(const int u) const;
+
+    inline size_t num_nodes() const { return tables_.size(); }
+
+    void get_nodes(std::vector<int> &nodes) const;
+
+    void clear();
+
+    // -- allocation counters of the chunks: the system allocations, and the bytes they hold
+    inline unsigned long long get_allocations() const { return allocations_; }
+
+    inline size_t get_reserved_bytes() const { return reserved_bytes_; }
+
+    size_t memory_bytes() const;
+
+private:
+
+    // -- node ids are never INT_MIN
+    constexpr static int EMPTY = INT_MIN;
+    // -- capacity of the tables of size class 0
+    constexpr static uint32_t MIN_CAPACITY = 4;
+    constexpr static int NUM_CLASSES = 28;
+    // -- slots of a chunk, larger tables get a chunk of their own
+    constexpr static size_t CHUNK_SLOTS = 1 << 16;
+
+    // -- neighbors table of a node
+    struct Table {
+        Neighbor *slots;
+        uint32_t size;
+        uint32_t size_class;
+    };
+
+    emhash5::HashMap<int, Table> tables_;
+
+    std::vector<std::unique_ptr<Neighbor[]>> chunks_;
+    // -- unused tail of the last chunk
+    Neighbor *bump_ = nullptr;
+    size_t bump_left_ = 0;
+    // -- free tables of every size class, linked through their first slot
+    std::array<Neighbor *, NUM_CLASSES> free_lists_{};
+
+    unsigned long long allocations_ = 0;
+    size_t reserved_bytes_ = 0;
+
+    static inline uint32_t capacity_of(uint32_t size_class) { return MIN_CAPACITY << size_class; }
+
+    static inline uint32_t slot_of(const int w, uint32_t mask) {
+        return (uint32_t) (((uint64_t) (uint32_t) w * 0x9E3779B97F4A7C15ULL) >> 32) & mask;
+    }
+
+    Neighbor *allocate(uint32_t size_class);
+
+    void release(Neighbor *slots, uint32_t size_class);
+
+    void resize(Table &table, uint32_t size_class);
+
+    void insert_one(const int u, const int v, bool det);
+
+    int erase_one(const int u, const int v);
+
+};
+
+#endif //TONIC_SUBGRAPH_H
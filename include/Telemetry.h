@@ -0,0 +1,107 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_TELEMETRY_H
+#define TONIC_TELEMETRY_H
+
+#include <chrono>
+#include <cstdio>
+#include <fstream>
+#include <string>
+
+/**
+ * Runtime telemetry of a Tonic run. Every N edges or T seconds (whichever comes first) a JSON line is appended to the
+ * telemetry file, with the throughput, the resident memory and the state of the sampler.
+ */
+class Telemetry {
+
+public:
+
+    Telemetry(const std::string &path, unsigned long long every_edges, double every_seconds);
+
+    ~Telemetry();
+
+    /**
+     * Check whether a record is due after n_edges processed edges. The clock is read only every CLOCK_STRIDE edges
+     * @param n_edges edges processed so far
+     * @return true if a record must be written
+     */
+    inline bool due(unsigned long long n_edges) {
+        if (every_edges_ > 0 and n_edges >= next_edges_) return true;
+        if (every_seconds_ > 0 and (n_edges & (CLOCK_STRIDE - 1)) == 0) {
+            return seconds_since(last_time_) >= every_seconds_;
+        }
+        return false;
+    }
+
+    /**
+     * Write a record with the current state of a Tonic or Tonic_FD instance
+     * @param n_edges edges processed so far
+     * @param algo the sampler
+     */
+    template<typename Algo>
+    void record(unsigned long long n_edges, const Algo &algo) {
+        auto now = std::chrono::steady_clock::now();
+        double elapsed = seconds_since(start_time_);
+        double interval = std::chrono::duration<double>(now - last_time_).count();
+        double edges_per_sec = interval > 0 ? (double) (n_edges - last_edges_) / interval : 0.0;
+        unsigned long long queries = algo.get_oracle_queries();
+        double hit_rate = queries > 0 ? (double) algo.get_oracle_hits() / (double) queries : 0.0;
+
+        fprintf(file_, "{\"edges\": %llu, \"elapsed_s\": %.6f, \"edges_per_sec\": %.1f, \"rss_bytes\": %ld, "
+                       "\"peak_rss_bytes\": %ld, "
+                       "\"wr_size\": %ld, \"h_size\": %ld, \"sl_size\": %ld, \"subgraph_nodes\": %ld, "
+                       "\"subgraph_edges\": %ld, \"subgraph_bytes\": %zu, \"subgraph_allocations\": %llu, "
+                       "\"heavy_replacements\": %llu, \"oracle_queries\": %llu, "
+                       "\"oracle_hits\": %llu, \"oracle_hit_rate\": %.6f, \"oracle_filtered\": %llu, "
+                       "\"global_estimate\": %.6f}\n",
+                n_edges, elapsed, edges_per_sec, current_rss_bytes(), peak_rss_bytes(),
+                algo.get_WR_cur(), algo.get_H_cur(), algo.get_SL_cur(), (long) algo.get_num_nodes(),
+                (long) algo.get_num_edges(), algo.get_subgraph_bytes(), algo.get_subgraph_allocations(),
+                algo.get_heavy_replacements(), queries, algo.get_oracle_hits(),
+                hit_rate, algo.get_oracle_filtered(), algo.get_global_triangles());
+        fflush(file_);
+
+        last_time_ = now;
+        last_edges_ = n_edges;
+        next_edges_ = n_edges + every_edges_;
+    }
+
+    /**
+     * Start the clock when the stream starts, after the oracle is loaded, from n_edges already processed edges (when a
+     * run is resumed from a checkpoint)
+     * @param n_edges
+     */
+    void start(unsigned long long n_edges = 0) {
+        start_time_ = std::chrono::steady_clock::now();
+        last_time_ = start_time_;
+        last_edges_ = n_edges;
+        next_edges_ = n_edges + every_edges_;
+    }
+
+    bool is_open() const { return file_ != nullptr; }
+
+    static long current_rss_bytes();
+
+    static long peak_rss_bytes();
+
+private:
+
+    constexpr static unsigned long long CLOCK_STRIDE = 1024;
+
+    std::FILE *file_;
+    unsigned long long every_edges_;
+    double every_seconds_;
+    unsigned long long next_edges_;
+    unsigned long long last_edges_ = 0;
+    std::chrono::steady_clock::time_point start_time_;
+    std::chrono::steady_clock::time_point last_time_;
+
+    static double seconds_since(std::chrono::steady_clock::time_point t) {
+        return std::chrono::duration<double>(std::chrono::steady_clock::now() - t).count();
+    }
+
+};
+
+#endif //TONIC_TELEMETRY_H
@@ -6,11 +6,18 @@
 #define TONIC_TONIC_H
 
 #include "hash_table5.hpp"
-#include "FixedSizePQ.h"
+#include "Oracle.h"
+#include "Heavy_Edge_Store.h"
+#include "Subgraph.h"
 #include <iostream>
 #include <string>
 #include <random>
 #include "Unbiased_Space_Saving.h"
+#include "Edge_Space_Saving.h"
+#include "Phase_Profiler.h"
+#include "Checkpoint.h"
+#include "Random.h"
+#include "Color_Coding.h"
 #include <optional>
 
 using Edge = std::pair<int, int>;
@@ -21,27 +28,26 @@ class Tonic {
 
 private:
 
-    emhash5::HashMap<int , emhash5::HashMap<int, bool>> subgraph_;
-
-    // -- heavy edge comparator -> return lightest edge
-    struct heavy_edge_cmp {
-        bool operator()(const Heavy_edge &a, const Heavy_edge &b) const {
-            return a.second > b.second;
-        }
-    };
+    Subgraph subgraph_;
 
     // -- oracles
-    emhash5::HashMap<int, int> node_oracle_;
-    emhash5::HashMap<long, int> edge_id_oracle_;
+    // -- read-only oracle, shared with the other instances, an empty node oracle if not set
+    SharedOracle oracle_ = std::make_shared<const Oracle>(emhash5::HashMap<int, int>());
+
+    // -- dense node ids in [0, num_dense_nodes_): local counts indexed by node id, in dense_local_triangles_cnt_ or
+    // -- in a vector shared with the other shards of a worker thread of Tonic_Sharded
+    int num_dense_nodes_ = 0;
+    std::vector<double> dense_local_triangles_cnt_;
+    double *dense_local_cnt_ = nullptr;
 
     // -- sets for storing edges
     Edge* waiting_room_;
-    FixedSizePQ<Heavy_edge, heavy_edge_cmp> heavy_edges_;
+    HeavyEdgeStore heavy_edges_;
     Edge* light_edges_sample_;
 
-    std::mt19937 gen_;
-    std::uniform_real_distribution<double> dis_;
-    std::uniform_int_distribution<int> dis_int_;
+    Xoshiro256 gen_;
+    // -- position of the next light edge admitted in the full SL
+    ReservoirSkip sl_skip_;
 
     // -- member variables
     unsigned long long t_;
@@ -63,6 +69,25 @@ private:
 
     // -- USS
     std::optional<UnbiasedSpaceSaving> ss_heap_;
+
+    // -- heaviest edges by estimated number of triangles, for the streaming edge oracle
+    std::optional<EdgeSpaceSaving> edge_ss_;
+
+    // -- color-coding shard of Tonic_Sharded: only the triangles of the colors of the shard are counted
+    std::optional<ColorShard> color_shard_;
+
+    // -- runtime statistics
+    unsigned long long heavy_replacements_ = 0;
+    unsigned long long oracle_queries_ = 0;
+    unsigned long long oracle_hits_ = 0;
+    // -- misses answered by the prefilter of the oracle
+    unsigned long long oracle_filtered_ = 0;
+
+#ifdef TONIC_PROFILE
+    // -- per-phase latency of process_edge, the last phase is the whole edge
+    enum ProfilePhase { PHASE_USS, PHASE_COUNT_TRIANGLES, PHASE_SAMPLE_EDGE, PHASE_ADD_EDGE, PHASE_TOTAL };
+    PhaseProfiler profiler_{{"uss_update", "count_triangles", "sample_edge", "add_edge", "total"}};
+#endif
     
     int get_heaviness(const int u, const int v);
 
@@ -72,6 +97,8 @@ private:
 
     void count_triangles(const int u, const int v);
 
+    inline void add_local_triangles(const int u, const double cnt);
+
     bool sample_edge(const int u, const int v);
 
     inline double next_double();
@@ -97,13 +124,17 @@ public:
                static_cast<unsigned long long>(nv);
     }
 
-    Tonic(int random_seed, long k, double alpha, double beta);
+    Tonic(int random_seed, long k, double alpha, double beta, bool verbose = true);
 
     ~Tonic();
 
-    void set_edge_oracle(emhash5::HashMap<long, int> &edge_oracle);
+    void set_oracle(SharedOracle oracle);
+
+    void set_dense_nodes(int num_nodes);
+
+    void set_dense_nodes(int num_nodes, std::vector<double> &shared_local_counts);
 
-    void set_node_oracle(emhash5::HashMap<int, int> &node_oracle);
+    void set_color_shard(const ColorShard &color_shard);
 
     void process_edge(const int u, const int v);
 
@@ -121,10 +152,46 @@ public:
 
     inline unsigned long long get_edges_processed() const;
 
+    // -- runtime statistics
+    long get_WR_cur() const { return std::min(WR_cur_, WR_size_); }
+
+    long get_H_cur() const { return (long) heavy_edges_.size(); }
+
+    long get_SL_cur() const { return std::min(SL_cur_, SL_size_); }
+
+    unsigned long long get_heavy_replacements() const { return heavy_replacements_; }
+
+    unsigned long long get_oracle_queries() const { return oracle_queries_; }
+
+    unsigned long long get_oracle_hits() const { return oracle_hits_; }
+
+    unsigned long long get_oracle_filtered() const { return oracle_filtered_; }
+
+    // -- system allocations and reserved bytes of the tables of the subgraph
+    unsigned long long get_subgraph_allocations() const { return subgraph_.get_allocations(); }
+
+    size_t get_subgraph_bytes() const { return subgraph_.memory_bytes(); }
+
+#ifdef TONIC_PROFILE
+    const PhaseProfiler &get_profiler() const { return profiler_; }
+#endif
+
     // -- USS
     void setup_space_saving();
 
     const std::vector<UnbiasedSpaceSaving::HeapNode>& get_top_nodes(int n);
+
+    std::vector<UnbiasedSpaceSaving::HeapNode> get_sampled_top_nodes(int n) const;
+
+    // -- streaming edge oracle
+    void setup_edge_space_saving(int capacity);
+
+    std::vector<EdgeSpaceSaving::HeapEntry> get_top_edges(int n) const;
+
+    // -- checkpoints
+    void save_state(CheckpointWriter &writer) const;
+
+    bool load_state(CheckpointReader &reader);
 };
 
 
@@ -6,9 +6,14 @@
 #define TONIC_FD
 
 #include "hash_table5.hpp"
+#include "Oracle.h"
 #include "hash_set8.hpp"
-#include "FixedSizePQ.h"
+#include "Heavy_Edge_Store.h"
+#include "Subgraph.h"
 #include "Utils.h"
+#include "Random.h"
+#include "Phase_Profiler.h"
+#include "Checkpoint.h"
 #include <iostream>
 #include <string>
 #include <random>
@@ -61,34 +66,31 @@ private:
 
         Edge pop_oldest_edge();
 
-    };
+        void save_state(CheckpointWriter &writer) const;
 
-    emhash5::HashMap<int , emhash5::HashMap<int, bool>> subgraph_;
+        bool load_state(CheckpointReader &reader);
 
-    // -- heavy edge comparator -> return lightest edge
-    struct heavy_edge_cmp {
-        bool operator()(const Heavy_edge &a, const Heavy_edge &b) const {
-            return a.second > b.second;
-        }
     };
 
+    Subgraph subgraph_;
+
 
     // -- oracles
-    emhash5::HashMap<int, int> node_oracle_;
-    emhash5::HashMap<long, int> edge_id_oracle_;
+    // -- read-only oracle, shared with the other instances, an empty node oracle if not set
+    SharedOracle oracle_ = std::make_shared<const Oracle>(emhash5::HashMap<int, int>());
+
+    // -- dense node ids in [0, num_dense_nodes_)
+    int num_dense_nodes_ = 0;
 
     WaitingRoom* waiting_room_;
 
 
-    // -- priority queue for all heavy edges
-    FixedSizePQ<Heavy_edge, heavy_edge_cmp> heavy_edges_;
-    // -- heavy edges set
-    emhash8::HashSet<unsigned long long> heavy_edges_set_;
+    // -- heavy edges, indexed for the deletions
+    HeavyEdgeStore heavy_edges_;
 
     Edge* light_edges_sample_;
 
-    std::mt19937 gen_;
-    std::uniform_real_distribution<double> dis_;
+    Xoshiro256 gen_;
 
 
     // -- member variables
@@ -113,6 +115,19 @@ private:
     // -- edge to index
     emhash5::HashMap<long, int> edge_id_to_index_;
 
+    // -- runtime statistics
+    unsigned long long heavy_replacements_ = 0;
+    unsigned long long oracle_queries_ = 0;
+    unsigned long long oracle_hits_ = 0;
+    // -- misses answered by the prefilter of the oracle
+    unsigned long long oracle_filtered_ = 0;
+
+#ifdef TONIC_PROFILE
+    // -- per-phase latency of process_edge, the last phase is the whole edge
+    enum ProfilePhase { PHASE_COUNT_TRIANGLES, PHASE_SAMPLE_EDGE, PHASE_ADD_EDGE, PHASE_EDGE_DELETION, PHASE_TOTAL };
+    PhaseProfiler profiler_{{"count_triangles", "sample_edge", "add_edge", "edge_deletion", "total"}};
+#endif
+
     int get_heaviness(const int u, const int v);
 
     void add_edge(const int u, const int v, bool det);
@@ -123,6 +138,8 @@ private:
 
     void count_triangles(const int u, const int v, const int sign);
 
+    inline void add_local_triangles(const int u, const double cnt);
+
     void sample_edge(const int u, const int v);
 
     inline double next_double();
@@ -138,14 +155,15 @@ public:
     long k_;
     double alpha_, beta_;
     bool edge_oracle_flag_ = false;
+    int random_seed_;
 
     Tonic_FD(int random_seed, long k, double alpha, double beta);
 
     ~Tonic_FD();
 
-    void set_edge_oracle(emhash5::HashMap<long, int> &edge_oracle);
+    void set_oracle(SharedOracle oracle);
 
-    void set_node_oracle(emhash5::HashMap<int, int> &node_oracle);
+    void set_dense_nodes(int num_nodes);
 
     void process_edge(const int u, const int v, const int t, const int sign);
 
@@ -163,6 +181,34 @@ public:
 
     inline unsigned long long get_edges_processed() const;
 
+    // -- runtime statistics
+    long get_WR_cur() const { return waiting_room_->cur_size_; }
+
+    long get_H_cur() const { return (long) heavy_edges_.size(); }
+
+    long get_SL_cur() const { return SL_cur_; }
+
+    unsigned long long get_heavy_replacements() const { return heavy_replacements_; }
+
+    unsigned long long get_oracle_queries() const { return oracle_queries_; }
+
+    unsigned long long get_oracle_hits() const { return oracle_hits_; }
+
+    unsigned long long get_oracle_filtered() const { return oracle_filtered_; }
+
+    // -- system allocations and reserved bytes of the tables of the subgraph
+    unsigned long long get_subgraph_allocations() const { return subgraph_.get_allocations(); }
+
+    size_t get_subgraph_bytes() const { return subgraph_.memory_bytes(); }
+
+#ifdef TONIC_PROFILE
+    const PhaseProfiler &get_profiler() const { return profiler_; }
+#endif
+
+    // -- checkpoints
+    void save_state(CheckpointWriter &writer) const;
+
+    bool load_state(CheckpointReader &reader);
 
 };
 
@@ -0,0 +1,129 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_MULTIBUDGET_H
+#define TONIC_MULTIBUDGET_H
+
+#include "hash_table5.hpp"
+#include "Oracle.h"
+#include "FixedSizePQ.h"
+#include "Utils.h"
+#include "Random.h"
+#include <cstdint>
+#include <random>
+#include <vector>
+
+/**
+ * Tonic for insertion-only streams run with several memory budgets in a single pass. Every budget keeps its own
+ * waiting room, heavy edges and light sample, but:
+ * - the waiting rooms are suffixes of a single ring of the most recent edges
+ * - the heaviness of an edge is looked up once, when the edge arrives, and shared by all the heavy-edge rankings
+ * - the light samples are bottom-s samples on a random priority drawn once per edge, so a smaller light sample is a
+ *   subset of a larger one whenever the two budgets see the same light edges
+ * The samples are stored in a single subgraph whose edges carry the bitmask of the budgets sampling them, so the
+ * triangles closed by an edge are enumerated once for all the budgets
+ */
+class Tonic_MultiBudget {
+
+using Edge = Utils::Edge;
+
+public:
+
+    constexpr static int MAX_BUDGETS = 32;
+
+private:
+
+    // -- an edge of the stream with its heaviness and its random priority
+    struct StreamEdge {
+        Edge edge;
+        int heaviness;
+        double priority;
+    };
+
+    // -- heavy edge comparator -> return lightest edge
+    struct heavy_edge_cmp {
+        bool operator()(const StreamEdge &a, const StreamEdge &b) const {
+            return a.heaviness > b.heaviness;
+        }
+    };
+
+    // -- light edge comparator -> return the edge with the largest priority
+    struct light_edge_cmp {
+        bool operator()(const StreamEdge &a, const StreamEdge &b) const {
+            return a.priority < b.priority;
+        }
+    };
+
+    // -- budgets sampling an edge (in), and budgets where the edge is deterministic, in WR or H (det)
+    struct EdgeMask {
+        uint32_t in;
+        uint32_t det;
+    };
+
+    struct Budget {
+        long k;
+        long WR_size;
+        long H_size;
+        long SL_size;
+        // -- light edges seen so far
+        long ell = 0;
+        FixedSizePQ<StreamEdge, heavy_edge_cmp> heavy_edges;
+        FixedSizePQ<StreamEdge, light_edge_cmp> light_edges;
+        double global_triangles_cnt = 0.0;
+    };
+
+    std::vector<Budget> budgets_;
+    uint32_t all_budgets_;
+
+    emhash5::HashMap<int, emhash5::HashMap<int, EdgeMask>> subgraph_;
+
+    // -- ring of the last max WR_size edges, the waiting room of each budget is a suffix of the ring
+    std::vector<StreamEdge> waiting_room_;
+
+    // -- oracles
+    // -- read-only oracle, shared with the other instances, an empty node oracle if not set
+    SharedOracle oracle_ = std::make_shared<const Oracle>(emhash5::HashMap<int, int>());
+
+    Xoshiro256 gen_;
+
+    unsigned long long t_ = 0;
+    long num_edges_ = 0;
+
+    // -- triangles closed by the current edge, per budget and number of light edges
+    std::vector<long> n_triangles_;
+
+    inline double next_double();
+
+    void add_edge(const Edge &edge, uint32_t in, uint32_t det);
+
+    void clear_budgets(const Edge &edge, uint32_t in, uint32_t det);
+
+    void count_triangles(const int u, const int v);
+
+    void leave_waiting_room(int i, const StreamEdge &stream_edge);
+
+public:
+
+    double alpha_, beta_;
+    bool edge_oracle_flag_ = false;
+
+    Tonic_MultiBudget(int random_seed, std::vector<long> budgets, double alpha, double beta);
+
+    void set_oracle(SharedOracle oracle);
+
+    void process_edge(const int u, const int v);
+
+    int get_num_budgets() const { return (int) budgets_.size(); }
+
+    long get_budget(int i) const { return budgets_[i].k; }
+
+    double get_global_triangles(int i) const { return budgets_[i].global_triangles_cnt; }
+
+    long get_num_edges() const { return num_edges_; }
+
+    long get_num_nodes() const { return (long) subgraph_.size(); }
+
+};
+
+#endif //TONIC_MULTIBUDGET_H
@@ -0,0 +1,111 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_SHARDED_H
+#define TONIC_SHARDED_H
+
+#include "Tonic.h"
+#include "Oracle.h"
+#include "Color_Coding.h"
+#include <condition_variable>
+#include <deque>
+#include <memory>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+/**
+ * Tonic for insertion-only streams on several threads, by color-coding: the nodes are colored by hash with
+ * num_colors colors, and every color multiset {a <= b <= c} is a shard running its own Tonic sampler with an equal
+ * share of the memory budget and the shared oracle. An edge is routed to the num_colors shards containing the colors
+ * of its endpoints, and every shard counts only the triangles of its colors, so every triangle is counted by exactly
+ * one shard: the sums of the shard estimates are unbiased global and local counts. The shards are spread round-robin
+ * over num_threads worker threads, and every shard sees its edges in stream order, so the estimates depend on the
+ * seed and on num_colors but not on num_threads
+ */
+class Tonic_Sharded {
+
+public:
+
+    Tonic_Sharded(int random_seed, long k, double alpha, double beta, int num_colors, int num_threads);
+
+    ~Tonic_Sharded();
+
+    Tonic_Sharded(const Tonic_Sharded &) = delete;
+
+    Tonic_Sharded &operator=(const Tonic_Sharded &) = delete;
+
+    static int default_colors(int num_threads);
+
+    void set_oracle(const SharedOracle &oracle);
+
+    void set_dense_nodes(int num_nodes);
+
+    void process_edge(const int u, const int v);
+
+    void finish();
+
+    double get_global_triangles() const;
+
+    double get_local_triangles(const int u) const;
+
+    void get_local_nodes(std::vector<int> &nodes) const;
+
+    int get_num_edges() const;
+
+    int get_num_shards() const { return (int) shards_.size(); }
+
+    int get_num_colors() const { return coloring_.num_colors(); }
+
+    int get_num_threads() const { return num_threads_; }
+
+    unsigned long long get_oracle_queries() const;
+
+    unsigned long long get_oracle_hits() const;
+
+    unsigned long long get_oracle_filtered() const;
+
+private:
+
+    constexpr static size_t BATCH_SIZE = 4096;
+    // -- batches queued per worker before the reader waits
+    constexpr static size_t MAX_QUEUED_BATCHES = 16;
+
+    // -- an edge routed to a shard
+    struct RoutedEdge {
+        int shard;
+        int u;
+        int v;
+    };
+
+    // -- queue of batches of a worker thread
+    struct Worker {
+        std::vector<RoutedEdge> batch;
+        std::deque<std::vector<RoutedEdge>> queue;
+        std::mutex mutex;
+        std::condition_variable not_empty;
+        std::condition_variable not_full;
+        bool done = false;
+        std::thread thread;
+    };
+
+    NodeColoring coloring_;
+    int num_threads_;
+    std::vector<std::unique_ptr<Tonic>> shards_;
+    // -- with dense node ids, local counts of the shards of each worker thread (the shards of a worker run in turn)
+    std::vector<std::vector<double>> dense_local_counts_;
+    // -- shards of the edges with endpoint colors a <= b, at a * num_colors + b
+    std::vector<std::vector<int>> routes_;
+    std::vector<std::unique_ptr<Worker>> workers_;
+    bool started_ = false;
+
+    void start();
+
+    void flush(Worker &worker);
+
+    void run_worker(Worker &worker);
+
+};
+
+#endif //TONIC_SHARDED_H
@@ -0,0 +1,61 @@
+//
+// Created by X on 09/03/24.
+//
+
+#ifndef TONIC_TRAJECTORY_H
+#define TONIC_TRAJECTORY_H
+
+#include <cstdint>
+#include <cstdio>
+#include <string>
+#include <vector>
+
+/**
+ * Binary time series of the estimates of one or more samplers against the exact count of the same prefix of the
+ * stream. The file starts with a header (magic "TONICTRJ", uint32 version, uint32 number of estimators, int32 seed of
+ * every estimator) followed by fixed-size records: uint64 edges processed, int64 exact count, float64 estimate of every
+ * estimator. Values are written in the native byte order. A record is written every every_edges edges, with the gaps
+ * multiplied by growth after every record (growth = 1 for evenly spaced records, growth > 1 for log-spaced ones)
+ */
+class TrajectoryWriter {
+
+public:
+
+    constexpr static uint64_t MAGIC = 0x4A525443494E4F54ULL;
+    constexpr static uint32_t VERSION = 1;
+
+    TrajectoryWriter(const std::string &path, const std::vector<int> &seeds, unsigned long long every_edges,
+                     double growth);
+
+    ~TrajectoryWriter();
+
+    TrajectoryWriter(const TrajectoryWriter &) = delete;
+
+    TrajectoryWriter &operator=(const TrajectoryWriter &) = delete;
+
+    bool is_open() const { return file_ != nullptr; }
+
+    /**
+     * Check whether a record is due after n_edges processed edges
+     * @param n_edges edges processed so far
+     * @return true if a record must be written
+     */
+    inline bool due(unsigned long long n_edges) const { return n_edges >= next_edges_; }
+
+    void record(unsigned long long n_edges, long exact_count, const std::vector<double> &estimates);
+
+    unsigned long long get_num_records() const { return num_records_; }
+
+private:
+
+    std::FILE *file_;
+    size_t num_estimators_;
+    double gap_;
+    double growth_;
+    unsigned long long next_edges_;
+    unsigned long long last_edges_ = 0;
+    unsigned long long num_records_ = 0;
+
+};
+
+#endif //TONIC_TRAJECTORY_H
@@ -6,6 +6,7 @@
 #include <unordered_map>
 #include <random>
 #include <utility>
+#include "Checkpoint.h"
 
 class UnbiasedSpaceSaving {
 public:
@@ -15,24 +16,33 @@ public:
         int freq;
     };
 
-    UnbiasedSpaceSaving(int k, int seed);
+    UnbiasedSpaceSaving(int k, int seed, int num_dense_nodes = 0);
 
     void update(int node);
 
     const std::vector<HeapNode>& top_n(int n);
 
+    void save_state(CheckpointWriter &writer) const;
+
+    bool load_state(CheckpointReader &reader);
+
 private:
 
     int capacity_;
     std::vector<HeapNode> heap_;
     std::unordered_map<int, int> node_to_index_;
-    std::mt19937 gen_;
-    std::uniform_real_distribution<double> dist_;
+    // -- node -> index for dense node ids in [0, num_dense_nodes), -1 if not tracked
+    std::vector<int> dense_node_to_index_;
+    bool dense_ = false;
+    Xoshiro256 gen_;
 
     int left(int i) const;
     int right(int i) const;
     void sift_down(int i);
     void swap_nodes(int i, int j);
+    int find_index(int node) const;
+    void set_index(int node, int i);
+    void erase_index(int node);
 };
 
 #endif
\ No newline at end of file
@@ -10,6 +10,7 @@
 #include <filesystem>
 #include <random>
 #include "Unbiased_Space_Saving.h"
+#include "Dataset_Cache.h"
 
 class Utils {
 
@@ -30,6 +31,17 @@ public:
         }
     };
 
+    /**
+     * Memory taken by an emhash5 oracle: every bucket stores a key, a value and the index of the next bucket
+     * @param oracle
+     * @return size of the buckets in bytes
+     */
+    template<typename Map>
+    inline static size_t oracle_memory_bytes(const Map &oracle) {
+        return (size_t) oracle.bucket_count() * sizeof(emhash5::entry<typename Map::key_type,
+                                                                      typename Map::mapped_type>);
+    }
+
     using Edge = std::pair<int, int>;
     using Heavy_edge = std::pair<Edge, int>;
     using EdgeTimestamped = std::pair<Edge, long>;
@@ -37,18 +49,34 @@ public:
     using EdgeStream = std::unordered_map<Edge, long, hash_edge>;
 
 
-    static long run_exact_algorithm(std::string &dataset_filepath,  std::string &output_path);
+    static long run_exact_algorithm(std::string &dataset_filepath,  std::string &output_path,
+                                    const DatasetCache *cache = nullptr);
 
-    static long run_exact_algorithm_FD(std::string &dataset_filepath, std::string &output_path);
+    static long run_exact_algorithm_FD(std::string &dataset_filepath, std::string &output_path,
+                                       const DatasetCache *cache = nullptr);
 
     static bool read_node_oracle(std::string &oracle_filename, char delimiter, int skip,
                                  emhash5::HashMap<int, int> &node_oracle);
 
     static bool read_edge_oracle(std::string &oracle_filename, char delimiter, int skip,
-                                 emhash5::HashMap<long, int> &edge_id_oracle);
+                                 emhash5::HashMap<long, int> &edge_id_oracle,
+                                 const std::vector<int> &node_mapping = {});
+
+    static std::string mapping_path(const std::string &dataset_path);
+
+    static bool is_snapshot_file(const std::filesystem::path &path);
+
+    static bool read_node_mapping(const std::string &mapping_filename, std::vector<int> &node_mapping);
 
-    static void preprocess_data(const std::string &dataset_path, std::string &delimiter,
-                                int skip, std::string &output_path);
+    static size_t relabel_node_oracle(const emhash5::HashMap<int, int> &node_oracle,
+                                      const std::vector<int> &node_mapping, std::vector<int> &dense_node_oracle);
+
+    static bool preprocess_data(const std::string &dataset_path, std::string &delimiter,
+                                int skip, std::string &output_path, bool relabel = false);
+
+    static bool preprocess_data_external(const std::string &dataset_path, std::string &delimiter, int skip,
+                                         std::string &output_path, bool relabel, size_t ram_budget_bytes,
+                                         const std::string &tmp_dir);
 
     static std::pair<EdgeStream, long> preprocess_data_FD(const std::string &dataset_path, std::string &delimiter,
                                                        int skip);
@@ -56,16 +84,29 @@ public:
     static void merge_snapshots_FD(std::string &filepath, int n_snapshots, std::string &delimiter, int line_to_skip,
                                    std::string &output_path);
 
-    static void build_edge_exact_oracle(std::string &filepath, double percentage_retain,
-                                  std::string &output_path);
+    static long sort_snapshot_edges(const std::string &dataset_path, int skip, const std::string &sorted_path,
+                                    size_t ram_budget_bytes, const std::string &tmp_dir);
+
+    static void merge_snapshots_FD_streaming(std::string &filepath, int n_snapshots, int line_to_skip,
+                                             std::string &output_path, size_t ram_budget_bytes,
+                                             const std::string &tmp_dir, int num_threads, unsigned int seed);
+
+    static bool build_edge_exact_oracle(std::string &filepath, double percentage_retain,
+                                  std::string &output_path, const std::vector<int> &node_mapping = {});
+
+    static bool build_edge_exact_nowr_oracle(std::string &filepath, double percentage_retain,
+                                        std::string &output_path, int wr_size,
+                                        const std::vector<int> &node_mapping = {});
 
-    static void build_edge_exact_nowr_oracle(std::string &filepath, double percentage_retain,
-                                        std::string &output_path, int wr_size);
+    static bool build_edge_stream_oracle(std::string &filepath, double percentage_retain,
+                                         std::string &output_path, long memory_budget, int capacity,
+                                         int random_seed, const std::vector<int> &node_mapping = {});
 
-    static void build_node_oracle(std::string &filepath, double percentage_retain,
-                                        std::string &output_path);
+    static bool build_node_oracle(std::string &filepath, double percentage_retain,
+                                        std::string &output_path, const std::vector<int> &node_mapping = {});
 
-    static void write_top_nodes(const std::string& output_path, const std::vector<UnbiasedSpaceSaving::HeapNode>& top_nodes);
+    static void write_top_nodes(const std::string& output_path, const std::vector<UnbiasedSpaceSaving::HeapNode>& top_nodes,
+                                const std::vector<int> &node_mapping = {});
 
     static void write_map_capacity(const std::string& output_path, int map_capacity, int next_oracle_size);
 };
@@ -1,7 +1,11 @@
 import os
+import sys
 import argparse
 from itertools import combinations
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+from compressed_input import open_input
+
 def parse_args():
     """
     Parses command-line arguments for computing n_bar values from graph snapshots.
@@ -20,13 +24,13 @@ def load_degrees(degrees_file):
     Loads node degrees from a file.
 
     Args:
-        degrees_file (str): Path to the file containing node degrees. Each line should be: <node_id> <degree>
+        degrees_file (str): Path to the file containing node degrees, possibly gzip or zstd-compressed. Each line should be: <node_id> <degree>
 
     Returns:
         dict: Mapping from node ID (int) to degree (int).
     """
     degrees = {}
-    with open(degrees_file, 'r') as df:
+    with open_input(degrees_file) as df:
         for line in df:
             parts = line.strip().split()
             if len(parts) == 2:
@@ -39,13 +43,13 @@ def load_edges(edges_file):
     Loads edges from a file, ignoring timestamps.
 
     Args:
-        edges_file (str): Path to the file containing edges. Each line should be: <node1> <node2> <timestamp>
+        edges_file (str): Path to the file containing edges, possibly gzip or zstd-compressed. Each line should be: <node1> <node2> <timestamp>
 
     Returns:
         set: A set of edges represented as tuples (node1, node2).
     """
     edges = set()
-    with open(edges_file, 'r') as ef:
+    with open_input(edges_file) as ef:
         for line in ef:
             parts = line.strip().split()
             if len(parts) == 3:
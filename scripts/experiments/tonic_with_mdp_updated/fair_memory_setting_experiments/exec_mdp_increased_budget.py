@@ -1,7 +1,7 @@
 import os
 import argparse
 import subprocess
-from utils import run_exact_algorithm
+from utils import run_exact_algorithm, enable_results_store, write_results_summary
 
 def parse_args():
     """
@@ -19,6 +19,8 @@ def parse_args():
     parser.add_argument('-c', '--c_multiplier', type=int, required=True, help='Multiplier for the additional memory budget')
     parser.add_argument('-t', '--n_trials', type=int, required=True, help='Number of trials per snapshot')
     parser.add_argument('-n', '--name', required=True, help='Output name')
+    parser.add_argument('--output_folder', help='Output folder (default: output/SnapshotExperiments/<name>)')
+    parser.add_argument('--results_db', help='Results store folder: the binaries append their rows to it and the per-configuration statistics are written to <output_folder>/results_summary_<name>.csv')
     return parser.parse_args()
 
 def main():
@@ -33,6 +35,7 @@ def main():
     - Runs TONIC for each trial using the same oracle and varying memory budgets.
     """
     args = parse_args()
+    enable_results_store(args.results_db)
 
     FILE_TONIC = "../../../code/Tonic-build/Tonic"
     FILE_EXACT = "../../../code/Tonic-build/RunExactAlgo"
@@ -40,7 +43,7 @@ def main():
     RANDOM_SEED = 4177
     END = RANDOM_SEED + args.n_trials - 1
 
-    OUTPUT_FOLDER = f"output/SnapshotExperiments/{args.name}"
+    OUTPUT_FOLDER = args.output_folder or f"output/SnapshotExperiments/{args.name}"
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
     # Clean previous outputs
@@ -91,5 +94,8 @@ def main():
                 dataset_path, args.oracle_min_degree_path, "nodes", OUTPUT_PATH_TONIC
             ], check=True)
 
+    write_results_summary(args.results_db, [os.path.join(args.dataset_folder, f) for f in dataset_files],
+                          f"{OUTPUT_FOLDER}/results_summary_{args.name}.csv")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -2,7 +2,7 @@ import os
 import argparse
 import subprocess
 import csv
-from utils import run_exact_algorithm, clean_auxiliary_files
+from utils import run_exact_algorithm, clean_auxiliary_files, enable_results_store, write_results_summary
 import shutil
 
 def parse_args():
@@ -19,12 +19,18 @@ def parse_args():
     parser.add_argument("-c", "--multiplier", type=int, required=True, help="Multiplier for oracle sizes to set the USS capacity")
     parser.add_argument("-t", "--n_trials", type=int, required=True, help="Number of trials per snapshot")
     parser.add_argument("-n", "--name", required=True, help="Output name")
+    parser.add_argument("--output_folder", help="Output folder (default: output/SnapshotExperiments/<name>)")
+    parser.add_argument("--results_db", help="Results store folder: the binaries append their rows to it and the per-configuration statistics are written to <output_folder>/results_summary_<name>.csv")
+    parser.add_argument("--strategy", choices=["uss", "sampler"], default="uss",
+                        help="How the next MinDegreePredictor is built: from USS (default), or from the degrees "
+                             "estimated on the sample of TONIC (no USS map, the multiplier is ignored)")
 
     return parser.parse_args()
 
-def run_tonic(file_tonic, r, memory_budget, dataset_path, oracle_path, output_path_tonic, update_map_capacity, next_oracle_size):
+def run_tonic(file_tonic, r, memory_budget, dataset_path, oracle_path, output_path_tonic, update_map_capacity, next_oracle_size,
+              strategy="uss"):
     """
-    Executes TONIC algorithm with given parameters, optionally enabling USS if next_oracle_size > 0
+    Executes TONIC algorithm with given parameters, optionally writing the top nodes for the next oracle if next_oracle_size > 0
 
     Args:
         file_tonic (str): Path to the compiled TONIC binary
@@ -35,6 +41,7 @@ def run_tonic(file_tonic, r, memory_budget, dataset_path, oracle_path, output_pa
         output_path_tonic (str): Output path for TONIC
         update_map_capacity (int): USS update map capacity based on multiplier and oracle size
         next_oracle_size (int): Number of top nodes to retain in the next oracle (0 disables USS)
+        strategy (str): "uss" to estimate the top nodes with USS, "sampler" to estimate them from the sample of TONIC
     """
     base_args = [
         file_tonic, "0", str(r), str(memory_budget), "0.05", "0.2",
@@ -42,7 +49,8 @@ def run_tonic(file_tonic, r, memory_budget, dataset_path, oracle_path, output_pa
     ]
 
     if next_oracle_size > 0:
-        base_args += ["1", str(update_map_capacity), str(next_oracle_size)]
+        use_uss = "2" if strategy == "sampler" else "1"
+        base_args += [use_uss, str(update_map_capacity), str(next_oracle_size)]
     subprocess.run(base_args, check=True)
 
 def update_node_oracle(updated_oracle_path, node_degree_file):
@@ -84,6 +92,7 @@ def main():
 
     """
     args = parse_args()
+    enable_results_store(args.results_db)
 
     FILE_TONIC = "../../../code/Tonic-build/Tonic"
     FILE_EXACT = "../../../code/Tonic-build/RunExactAlgo"
@@ -91,7 +100,7 @@ def main():
     RANDOM_SEED = 4177
     END = RANDOM_SEED + args.n_trials - 1
 
-    OUTPUT_FOLDER = f"output/SnapshotExperiments/{args.name}"
+    OUTPUT_FOLDER = args.output_folder or f"output/SnapshotExperiments/{args.name}"
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
    
     # Clean previous outputs
@@ -145,7 +154,7 @@ def main():
                 shutil.copy(args.oracle_min_degree_path, UPDATED_ORACLE_PATH)
 
             run_tonic(FILE_TONIC, r, memory_budget, dataset_path, UPDATED_ORACLE_PATH,
-                      OUTPUT_PATH_TONIC, update_map_capacity, next_nbar)
+                      OUTPUT_PATH_TONIC, update_map_capacity, next_nbar, args.strategy)
 
             if os.path.exists(TEMP_NODE_FILE):
                 shutil.move(TEMP_NODE_FILE, NODE_DEGREE_FILE)
@@ -161,5 +170,8 @@ def main():
     # Delete temporary files used throughout the algorithm execution
     clean_auxiliary_files(OUTPUT_FOLDER)
 
+    write_results_summary(args.results_db, [os.path.join(args.dataset_folder, f) for f in dataset_files],
+                          f"{OUTPUT_FOLDER}/results_summary_{args.name}.csv")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
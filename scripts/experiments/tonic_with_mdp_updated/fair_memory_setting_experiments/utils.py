@@ -1,5 +1,7 @@
+import csv
 import subprocess
 import os
+import sys
 
 def get_total_edges(exact_output_path):
     """
@@ -46,4 +48,42 @@ def clean_auxiliary_files(output_folder):
     for filename in os.listdir(output_folder):
         if 'seed' in filename:
             filepath = os.path.join(output_folder, filename)
-            os.remove(filepath)
\ No newline at end of file
+            os.remove(filepath)
+
+def enable_results_store(results_db):
+    """
+    Makes every binary launched by the script append its results to the results store, through the
+    TONIC_RESULTS_DB environment variable inherited by the subprocesses.
+
+    Args:
+        results_db (str | None): Folder of the results store, None to leave the store disabled
+    """
+    if results_db:
+        os.environ["TONIC_RESULTS_DB"] = os.path.abspath(results_db)
+
+def write_results_summary(results_db, dataset_paths, output_path):
+    """
+    Aggregates the trials of the given snapshots through scripts/tools/results_store.py and writes
+    one row of error and runtime statistics per configuration.
+
+    Args:
+        results_db (str | None): Folder of the results store, None if the store is disabled
+        dataset_paths (list[str]): Snapshots of the experiment
+        output_path (str): Path of the CSV file with the statistics
+    """
+    if not results_db:
+        return
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "tools"))
+    from results_store import ResultsStore
+
+    store = ResultsStore(os.path.abspath(results_db))
+    stats = store.aggregate(snapshot=[os.path.basename(p) for p in dataset_paths])
+    store.close()
+    if not stats:
+        print(f"No trials found in the results store {results_db}")
+        return
+    with open(output_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(stats[0].keys()))
+        writer.writeheader()
+        writer.writerows(stats)
+    print(f"Statistics of {len(stats)} configurations written to {output_path}")
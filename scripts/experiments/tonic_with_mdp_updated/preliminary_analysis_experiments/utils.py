@@ -1,4 +1,8 @@
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "tools"))
+from compressed_input import open_input
 
 def load_node_frequencies_txt(filename):
     """
@@ -13,7 +17,7 @@ def load_node_frequencies_txt(filename):
         list[tuple[int, int]]: List of (node_id, frequency) tuples sorted by descending frequency.
     """
     results = []
-    with open(filename, 'r') as f:
+    with open_input(filename) as f:
         for line in f:
             parts = line.strip().split()
             if len(parts) >= 2:
@@ -36,7 +40,7 @@ def load_node_frequencies_csv(filename):
         list[tuple[int, int]]: List of (node_id, frequency) tuples sorted by descending frequency.
     """
     results = []
-    with open(filename, 'r') as f:
+    with open_input(filename) as f:
         next(f)  # skip header
         for line in f:
             parts = line.strip().split(',')
@@ -51,7 +55,7 @@ def load_node_frequencies(filename):
     Automatically loads node frequency data based on file extension.
 
     Args:
-        filename (str): Path to the file (.csv or .txt).
+        filename (str): Path to the file (.csv or .txt), possibly compressed (.csv.gz, .txt.zst, ...).
 
     Returns:
         list[tuple[int, int]]: Sorted (node_id, frequency) list.
@@ -59,7 +63,10 @@ def load_node_frequencies(filename):
     Raises:
         ValueError: If the file extension is not .csv or .txt.
     """
-    ext = os.path.splitext(filename)[1].lower()
+    base, ext = os.path.splitext(filename)
+    ext = ext.lower()
+    if ext in (".gz", ".zst"):
+        ext = os.path.splitext(base)[1].lower()
     if ext == ".csv":
         return load_node_frequencies_csv(filename)
     elif ext == ".txt":
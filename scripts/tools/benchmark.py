@@ -0,0 +1,406 @@
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+DEFAULT_DATASET = os.path.join(ROOT, "datasets", "as-caida20071105_preprocessed.txt")
+DEFAULT_EDGE_ORACLE = os.path.join(ROOT, "oracles", "oracle_exact_caida20071105_top10.txt")
+
+ORACLE_TIME_RE = re.compile(r"Oracle successfully read in time ([0-9.]+)")
+
+
+def default_matrix(dataset, edge_oracle, budgets):
+    """
+    Builds the default benchmark matrix over one insertion-only stream.
+
+    The fully-dynamic stream and the node oracle are derived from the insertion-only stream
+    in the preparation step, so the matrix only needs the files shipped with the repository.
+
+    Args:
+        dataset (str): Preprocessed insertion-only stream.
+        edge_oracle (str): Edge oracle of the stream.
+        budgets (list[int]): Memory budgets for Tonic.
+
+    Returns:
+        dict: Benchmark configuration with "streams", "oracles" and "cases".
+    """
+    cases = [
+        {"name": "BuildOracle-Exact", "binary": "BuildOracle",
+         "args": ["{stream:ins}", "Exact", "0.1", "{work}/bench_oracle_exact.txt"]},
+        {"name": "BuildOracle-Node", "binary": "BuildOracle",
+         "args": ["{stream:ins}", "Node", "0.1", "{work}/bench_oracle_node.txt"]},
+        {"name": "RunExactAlgo-INS", "binary": "RunExactAlgo", "args": ["0", "{stream:ins}", "{work}/exact_ins"]},
+        {"name": "RunExactAlgo-FD", "binary": "RunExactAlgo", "args": ["1", "{stream:fd}", "{work}/exact_fd"]},
+        {"name": "RunUSS", "binary": "RunUSS", "args": ["{stream:ins}", "{work}/uss", "1000", "{seed}", "100"]},
+    ]
+    for k in budgets:
+        for fd, stream in ((0, "ins"), (1, "fd")):
+            label = "INS" if fd == 0 else "FD"
+            for oracle_type in ("edges", "nodes"):
+                cases.append({
+                    "name": f"Tonic-{label}-{oracle_type}-k{k}", "binary": "Tonic", "edges_stream": stream,
+                    "args": [str(fd), "{seed}", str(k), "0.05", "0.2", "{stream:" + stream + "}",
+                             "{oracle:" + oracle_type + "}", oracle_type, "{work}/tonic"]})
+        cases.append({
+            "name": f"Tonic-INS-nodes-USS-k{k}", "binary": "Tonic", "edges_stream": "ins",
+            "args": ["0", "{seed}", str(k), "0.05", "0.2", "{stream:ins}", "{oracle:nodes}", "nodes",
+                     "{work}/tonic_uss", "1", "1000", "100"]})
+    return {
+        "streams": {"ins": dataset, "fd": "{work}/bench_fd_stream.txt"},
+        "oracles": {"edges": edge_oracle, "nodes": "{work}/bench_oracle_node.txt"},
+        "cases": cases,
+    }
+
+
+def derive_fd_stream(ins_path, output_path, deletion_prob, seed):
+    """
+    Writes a fully-dynamic stream from an insertion-only one, deleting each inserted edge
+    with probability deletion_prob at a later random position of the stream.
+
+    Args:
+        ins_path (str): Preprocessed insertion-only stream (u v t per row).
+        output_path (str): Path of the fully-dynamic stream (u v t sign per row).
+        deletion_prob (float): Probability that an edge is later deleted.
+        seed (int): Seed of the random generator, so that the stream is reproducible.
+    """
+    rng = random.Random(seed)
+    edges = []
+    with open(ins_path, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2:
+                edges.append((parts[0], parts[1]))
+    n = len(edges)
+    deletions = {}
+    for i, edge in enumerate(edges):
+        if rng.random() < deletion_prob and i + 1 < n:
+            deletions.setdefault(rng.randint(i + 1, n - 1), []).append(edge)
+    t = 0
+    with open(output_path, 'w') as f:
+        for i, (u, v) in enumerate(edges):
+            for du, dv in deletions.get(i, []):
+                t += 1
+                f.write(f"{du} {dv} {t} -\n")
+            t += 1
+            f.write(f"{u} {v} {t} +\n")
+
+
+def count_lines(path):
+    """
+    Counts the edges of a stream.
+
+    Args:
+        path (str): Stream file.
+
+    Returns:
+        int: Number of rows.
+    """
+    with open(path, 'rb') as f:
+        return sum(1 for _ in f)
+
+
+def read_vm_hwm(pid):
+    """
+    Reads the peak resident set size of a running process.
+
+    Args:
+        pid (int): Process id.
+
+    Returns:
+        int: VmHWM in KB, 0 if not available.
+    """
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (FileNotFoundError, ProcessLookupError, ValueError):
+        pass
+    return 0
+
+
+def run_case(cmd, stdout_path, stderr_path, rss_floor_kb=0, poll_interval=0.01):
+    """
+    Runs a benchmark command, measuring wall time and peak RSS of the child only.
+
+    The child is reaped with os.wait4, so its rusage does not include the harness or the other
+    cases. On Linux ru_maxrss also keeps the RSS the forked harness had before exec, so when it
+    does not exceed rss_floor_kb the peak is taken from VmHWM, polled while the child runs,
+    which is only a lower bound for commands shorter than a few poll intervals.
+
+    Args:
+        cmd (list[str]): Command line.
+        stdout_path (str): File where the stdout of the command is written.
+        stderr_path (str): File where the stderr of the command is written.
+        rss_floor_kb (int): ru_maxrss of a trivial command, i.e. the RSS inherited from the harness.
+        poll_interval (float): Seconds between two VmHWM reads.
+
+    Returns:
+        tuple[float, int, bool, str]: Wall time in seconds, peak RSS in KB, whether the peak RSS
+        comes from ru_maxrss (exact) and stdout.
+    """
+    with open(stdout_path, 'w') as out, open(stderr_path, 'w') as err:
+        start = time.perf_counter()
+        pid = os.posix_spawn(cmd[0], cmd, os.environ,
+                             file_actions=[(os.POSIX_SPAWN_DUP2, out.fileno(), 1),
+                                           (os.POSIX_SPAWN_DUP2, err.fileno(), 2)])
+        # -- reap the child in a thread, so that the wall time is not quantized by the polling
+        reaped = {}
+
+        def reap():
+            reaped["wait"] = os.wait4(pid, 0)
+            reaped["wall"] = time.perf_counter() - start
+
+        waiter = threading.Thread(target=reap)
+        waiter.start()
+        hwm = 0
+        while waiter.is_alive():
+            hwm = max(hwm, read_vm_hwm(pid))
+            waiter.join(poll_interval)
+        _, status, rusage = reaped["wait"]
+        wall = reaped["wall"]
+    code = os.waitstatus_to_exitcode(status)
+    if code != 0:
+        raise RuntimeError(f"{' '.join(cmd)} failed with code {code}, see {stderr_path}")
+    exact = rusage.ru_maxrss > rss_floor_kb
+    peak = rusage.ru_maxrss if exact else max(hwm, 1)
+    with open(stdout_path, 'r') as f:
+        return wall, peak, exact, f.read()
+
+
+def measure_rss_floor():
+    """
+    Measures the ru_maxrss that every child inherits from the harness.
+
+    Returns:
+        int: ru_maxrss in KB of /bin/true spawned by the harness.
+    """
+    pid = os.posix_spawn("/bin/true", ["/bin/true"], os.environ)
+    _, _, rusage = os.wait4(pid, 0)
+    return rusage.ru_maxrss
+
+
+def resolve(arg, config, work_dir, seed):
+    """
+    Replaces the {work}, {seed}, {stream:name} and {oracle:name} placeholders of an argument.
+
+    Args:
+        arg (str): Argument of a case.
+        config (dict): Benchmark configuration.
+        work_dir (str): Folder for the outputs of the cases.
+        seed (int): Random seed of the current repetition.
+
+    Returns:
+        str: The resolved argument.
+    """
+    def substitute(match):
+        kind, _, name = match.group(1).partition(":")
+        if kind == "work":
+            return work_dir
+        if kind == "seed":
+            return str(seed)
+        if kind == "stream":
+            return resolve(config["streams"][name], config, work_dir, seed)
+        if kind == "oracle":
+            return resolve(config["oracles"][name], config, work_dir, seed)
+        raise KeyError(f"Unknown placeholder {{{match.group(1)}}}")
+    return re.sub(r"\{([a-z]+(?::[A-Za-z0-9_]+)?)\}", substitute, arg)
+
+
+def prepare(config, bin_dir, work_dir, seed):
+    """
+    Creates the derived inputs of the matrix: the synthetic streams listed under "generate"
+    (name -> GenerateStream arguments after the output path), the fully-dynamic stream and the
+    node oracle.
+
+    Args:
+        config (dict): Benchmark configuration.
+        bin_dir (str): Folder with the compiled binaries.
+        work_dir (str): Folder for the outputs of the cases.
+        seed (int): Seed for the derived fully-dynamic stream.
+    """
+    for name, generate_args in config.get("generate", {}).items():
+        stream = resolve(config["streams"][name], config, work_dir, seed)
+        if not os.path.exists(stream):
+            print(f"Generating synthetic stream {stream}")
+            run_case([os.path.join(bin_dir, "GenerateStream"), stream] +
+                     [resolve(a, config, work_dir, seed) for a in generate_args],
+                     os.path.join(work_dir, "prepare.out"), os.path.join(work_dir, "prepare.err"))
+    ins = resolve(config["streams"]["ins"], config, work_dir, seed)
+    fd = resolve(config["streams"].get("fd", ""), config, work_dir, seed)
+    if fd and not os.path.exists(fd):
+        print(f"Deriving fully-dynamic stream {fd}")
+        derive_fd_stream(ins, fd, 0.2, seed)
+    nodes = resolve(config["oracles"].get("nodes", ""), config, work_dir, seed)
+    if nodes and not os.path.exists(nodes):
+        print(f"Building node oracle {nodes}")
+        run_case([os.path.join(bin_dir, "BuildOracle"), ins, "Node", "0.1", nodes],
+                 os.path.join(work_dir, "prepare.out"), os.path.join(work_dir, "prepare.err"))
+
+
+def run_matrix(config, bin_dir, work_dir, repetitions, seed, case_filter=None):
+    """
+    Runs every case of the matrix several times.
+
+    Args:
+        config (dict): Benchmark configuration.
+        bin_dir (str): Folder with the compiled binaries.
+        work_dir (str): Folder for the outputs of the cases.
+        repetitions (int): Number of runs of each case.
+        seed (int): Base random seed, repetition r uses seed + r.
+        case_filter (str | None): Regular expression on the case names.
+
+    Returns:
+        dict: Per-case median edges/sec, peak RSS, oracle load time and raw wall times.
+    """
+    n_edges = {}
+    results = {}
+    rss_floor_kb = measure_rss_floor()
+    for case in config["cases"]:
+        if case_filter and not re.search(case_filter, case["name"]):
+            continue
+        binary = os.path.join(bin_dir, case["binary"])
+        stream = resolve(config["streams"][case.get("edges_stream", "ins")], config, work_dir, seed)
+        if stream not in n_edges:
+            n_edges[stream] = count_lines(stream)
+
+        walls, rss, rss_exact, oracle_times = [], [], [], []
+        for r in range(repetitions):
+            cmd = [binary] + [resolve(a, config, work_dir, seed + r) for a in case["args"]]
+            wall, max_rss, exact, stdout = run_case(cmd, os.path.join(work_dir, case["name"] + ".out"),
+                                             os.path.join(work_dir, case["name"] + ".err"), rss_floor_kb)
+            walls.append(wall)
+            rss.append(max_rss)
+            rss_exact.append(exact)
+            match = ORACLE_TIME_RE.search(stdout)
+            if match:
+                oracle_times.append(float(match.group(1)))
+
+        wall = statistics.median(walls)
+        results[case["name"]] = {
+            "edges": n_edges[stream],
+            "wall_s": wall,
+            "wall_s_min": min(walls),
+            "wall_s_stdev": statistics.stdev(walls) if len(walls) > 1 else 0.0,
+            "edges_per_sec": n_edges[stream] / wall if wall > 0 else 0.0,
+            "peak_rss_kb": max(rss),
+            "peak_rss_exact": all(rss_exact),
+            "oracle_load_s": statistics.median(oracle_times) if oracle_times else None,
+        }
+        res = results[case["name"]]
+        print(f"{case['name']:<32} {res['edges_per_sec']:>14.0f} edges/s  {res['peak_rss_kb'] / 1024:>8.1f} MB"
+              f"  wall = {wall:.4f} s (+/- {res['wall_s_stdev']:.4f})")
+    return results
+
+
+def compare(baseline, results, threshold, rss_threshold):
+    """
+    Compares the results with a baseline.
+
+    Args:
+        baseline (dict): Baseline as written by --save-baseline.
+        results (dict): Per-case results of the current run.
+        threshold (float): Maximum allowed relative drop of edges/sec.
+        rss_threshold (float): Maximum allowed relative increase of peak RSS.
+
+    Returns:
+        list[str]: One message per regression, empty if none.
+    """
+    regressions = []
+    for name, res in results.items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            print(f"{name:<32} not in baseline, skipped")
+            continue
+        speed = res["edges_per_sec"] / base["edges_per_sec"] - 1 if base["edges_per_sec"] > 0 else 0.0
+        memory = res["peak_rss_kb"] / base["peak_rss_kb"] - 1 if base["peak_rss_kb"] > 0 else 0.0
+        # -- polled peaks of short runs are lower bounds, compare memory only when both are exact
+        memory_comparable = res["peak_rss_exact"] and base.get("peak_rss_exact", False)
+        print(f"{name:<32} throughput {speed:+8.1%}  peak RSS {memory:+8.1%}"
+              f"{'' if memory_comparable else ' (polled, not checked)'}")
+        if speed < -threshold:
+            regressions.append(f"{name}: throughput {speed:+.1%} (threshold -{threshold:.0%})")
+        if memory_comparable and memory > rss_threshold:
+            regressions.append(f"{name}: peak RSS {memory:+.1%} (threshold +{rss_threshold:.0%})")
+    return regressions
+
+
+def parse_args():
+    """
+    Parses command-line arguments for the benchmark suite.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Tonic binaries and check for performance regressions")
+    parser.add_argument("--bin-dir", default=os.path.join(ROOT, "build"), help="Folder with the compiled binaries")
+    parser.add_argument("--work-dir", default=os.path.join(ROOT, "build", "bench"),
+                        help="Folder for the derived inputs and the outputs of the cases")
+    parser.add_argument("--config", help="JSON file with the benchmark matrix (streams, oracles, cases)")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET, help="Insertion-only stream of the default matrix")
+    parser.add_argument("--edge-oracle", default=DEFAULT_EDGE_ORACLE, help="Edge oracle of the default matrix")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[5000, 20000], help="Tonic memory budgets")
+    parser.add_argument("-r", "--repetitions", type=int, default=5, help="Runs of each case")
+    parser.add_argument("--seed", type=int, default=42, help="Base random seed")
+    parser.add_argument("--filter", help="Only run the cases whose name matches this regular expression")
+    parser.add_argument("--save-baseline", help="Write the results to this JSON baseline")
+    parser.add_argument("--baseline", help="Compare the results with this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Maximum allowed relative throughput drop w.r.t. the baseline")
+    parser.add_argument("--rss-threshold", type=float, default=0.10,
+                        help="Maximum allowed relative peak RSS increase w.r.t. the baseline")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    os.makedirs(args.work_dir, exist_ok=True)
+    work_dir = os.path.abspath(args.work_dir)
+
+    if args.config:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+    else:
+        config = default_matrix(os.path.abspath(args.dataset), os.path.abspath(args.edge_oracle), args.budgets)
+
+    prepare(config, args.bin_dir, work_dir, args.seed)
+    results = run_matrix(config, args.bin_dir, work_dir, args.repetitions, args.seed, args.filter)
+
+    if args.save_baseline:
+        baseline = {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "host": platform.node(),
+            "machine": platform.machine(),
+            "repetitions": args.repetitions,
+            "seed": args.seed,
+            "cases": results,
+        }
+        with open(args.save_baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold, args.rss_threshold)
+        if regressions:
+            print("\nPerformance regressions:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print("\nNo performance regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import gzip
+import io
+import os
+import stat
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+# Skippable frames start with 0x184D2A50 to 0x184D2A5F (little endian), pzstd files start with one
+SKIPPABLE_MAGIC = b'\x2a\x4d\x18'
+
+
+def detect_format(magic):
+    """
+    Detects the compression of a file from its first bytes, as the Tonic binaries do.
+
+    Args:
+        magic (bytes): First (up to 4) bytes of the file.
+
+    Returns:
+        str: 'gzip', 'zstd' (a zstd or a skippable frame) or 'plain'.
+    """
+    if magic[:2] == GZIP_MAGIC:
+        return 'gzip'
+    if len(magic) < 4:
+        return 'plain'
+    if magic == ZSTD_MAGIC or (magic[0] & 0xF0 == 0x50 and magic[1:] == SKIPPABLE_MAGIC):
+        return 'zstd'
+    return 'plain'
+
+
+def open_input(filename):
+    """
+    Opens a text file for reading, decompressing it on the fly if it is gzip or zstd-compressed.
+
+    The compression is detected from the first bytes of the file, not from its extension, on the
+    same handle that reads it, so pipes and FIFOs work too. All the members of a gzip file and all
+    the frames of a zstd file (as written by pigz and pzstd) are read. Reading zstd files requires
+    Python >= 3.14 or the zstandard package.
+
+    Args:
+        filename (str): Path to the file.
+
+    Returns:
+        io.TextIOBase: File object over the decompressed text.
+    """
+    source = open(filename, 'rb')
+    fmt = detect_format(source.peek(4)[:4])
+    if stat.S_ISREG(os.fstat(source.fileno()).st_mode):
+        # A regular file is opened again by name, so that the readers below own (and close) it;
+        # a pipe or a FIFO is read on from the handle that peeked at its first bytes
+        source.close()
+        source = filename
+    if fmt == 'gzip':
+        return gzip.open(source, 'rt')
+    if fmt == 'zstd':
+        try:
+            # Python >= 3.14
+            from compression import zstd
+            return zstd.open(source, 'rt')
+        except ImportError:
+            pass
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(f"Reading the zstd-compressed file {filename} requires the zstandard package")
+        if isinstance(source, str):
+            source = open(source, 'rb')
+        reader = zstandard.ZstdDecompressor().stream_reader(source, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(reader)
+    return open(source, 'r') if isinstance(source, str) else io.TextIOWrapper(source)
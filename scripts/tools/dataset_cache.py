@@ -0,0 +1,180 @@
+import argparse
+import fcntl
+import glob
+import os
+import struct
+import sys
+
+import numpy as np
+
+# -- layout of the cache files written by the binaries with --dataset-cache (include/Dataset_Cache.h)
+MAGIC = 0x435344434943544E
+VERSION = 1
+HEADER_SIZE = 64
+HEADER = struct.Struct("<QIIQQq")
+EDGE_DTYPE = np.dtype([("u", "<i4"), ("v", "<i4"), ("t", "<i4"), ("sign", "<i4")])
+
+DEFAULT_DIR = "/dev/shm"
+
+
+def cache_dir(folder=None):
+    """
+    Args:
+        folder (str): Folder given with --dataset-cache=<folder>, None to use TONIC_DATASET_CACHE.
+
+    Returns:
+        str: The folder of the caches, /dev/shm if neither is given.
+    """
+    return folder or os.environ.get("TONIC_DATASET_CACHE") or DEFAULT_DIR
+
+
+def _fnv1a(data):
+    h = 0xCBF29CE484222325
+    for c in data:
+        h = ((h ^ c) * 0x100000001B3) & 0xFFFFFFFFFFFFFFFF
+    return h
+
+
+def cache_path(dataset_path, folder=None):
+    """
+    Path of the cache of a stream, the same as the one used by the binaries.
+
+    Args:
+        dataset_path (str): Preprocessed stream.
+        folder (str): Folder of the caches.
+
+    Returns:
+        str: <folder>/tonic-<file name>-<key>.edges, where the key hashes the real path, size and mtime of the stream.
+    """
+    st = os.stat(dataset_path)
+    key = _fnv1a(b"\0".join([os.fsencode(os.path.realpath(dataset_path)),
+                             str(st.st_size).encode(), str(st.st_mtime_ns).encode()]))
+    name = f"tonic-{os.path.basename(dataset_path)}-{key:016x}.edges"
+    return os.path.join(cache_dir(folder), name)
+
+
+def _map(path, source_size, source_mtime):
+    """
+    Returns:
+        np.memmap: The edges of a valid cache file, None if the file does not exist or does not match the stream.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        file_size = os.path.getsize(path)
+    except FileNotFoundError:
+        return None
+    if len(header) < HEADER_SIZE:
+        return None
+    magic, version, record_size, n_edges, size, mtime = HEADER.unpack_from(header)
+    if (magic != MAGIC or version != VERSION or record_size != EDGE_DTYPE.itemsize or size != source_size or
+            mtime != source_mtime or HEADER_SIZE + n_edges * record_size != file_size):
+        return None
+    if n_edges == 0:
+        return np.zeros(0, dtype=EDGE_DTYPE)
+    return np.memmap(path, dtype=EDGE_DTYPE, mode="r", offset=HEADER_SIZE, shape=(n_edges,))
+
+
+def _build(dataset_path, path, source_size, source_mtime):
+    """
+    Decode a stream "u v t [sign]" into a cache file, written to a temporary file and renamed.
+    """
+    u, v, t, sign = [], [], [], []
+    with open(dataset_path) as f:
+        for line in f:
+            fields = line.split()
+            if not fields:
+                continue
+            u.append(int(fields[0]))
+            v.append(int(fields[1]))
+            t.append(int(fields[2]))
+            sign.append(-1 if len(fields) > 3 and fields[3].startswith("-") else 1)
+    edges = np.empty(len(u), dtype=EDGE_DTYPE)
+    edges["u"], edges["v"], edges["t"], edges["sign"] = u, v, t, sign
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        header = HEADER.pack(MAGIC, VERSION, EDGE_DTYPE.itemsize, len(edges), source_size, source_mtime)
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(edges.tobytes())
+    os.replace(tmp_path, path)
+    print(f"Dataset cache written to {path}: {len(edges)} edges")
+
+
+def attach(dataset_path, folder=None):
+    """
+    Attach to the cache of a stream, decoding the stream first if no binary or script did it. Uses the same lock as the
+    binaries, so concurrent runs decode a stream only once.
+
+    Args:
+        dataset_path (str): Preprocessed stream.
+        folder (str): Folder of the caches, see cache_dir().
+
+    Returns:
+        np.ndarray: Read-only structured array of the edges, with fields u, v, t and sign (+1 or -1).
+    """
+    st = os.stat(dataset_path)
+    path = cache_path(dataset_path, folder)
+    edges = _map(path, st.st_size, st.st_mtime_ns)
+    if edges is not None:
+        return edges
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            # -- another run may have written the cache while this one was waiting for the lock
+            edges = _map(path, st.st_size, st.st_mtime_ns)
+            if edges is None:
+                _build(dataset_path, path, st.st_size, st.st_mtime_ns)
+                edges = _map(path, st.st_size, st.st_mtime_ns)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return edges
+
+
+def parse_args():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Build, list and clear the decoded stream caches")
+    parser.add_argument("--dir", help="Folder of the caches (default: TONIC_DATASET_CACHE or /dev/shm)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Decode streams into the cache")
+    build.add_argument("datasets", nargs="+", help="Preprocessed streams")
+    subparsers.add_parser("list", help="List the cached streams")
+    subparsers.add_parser("clear", help="Remove the cached streams")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    folder = cache_dir(args.dir)
+    if args.command == "build":
+        for dataset_path in args.datasets:
+            edges = attach(dataset_path, folder)
+            print(f"{dataset_path}: {len(edges)} edges")
+        return 0
+
+    paths = sorted(glob.glob(os.path.join(folder, "tonic-*.edges")))
+    for path in paths:
+        if args.command == "list":
+            with open(path, "rb") as f:
+                n_edges = HEADER.unpack_from(f.read(HEADER_SIZE))[3]
+            print(f"{path}\t{n_edges} edges\t{os.path.getsize(path) / 2 ** 20:.1f} MiB")
+        else:
+            # -- runs that already mapped the file keep reading it until they unmap it
+            os.remove(path)
+            if os.path.exists(path + ".lock"):
+                os.remove(path + ".lock")
+            print(f"Removed {path}")
+    if not paths:
+        print(f"No cached streams in {folder}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,437 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import yaml
+
+# -- {name} or {name|first}: first entry (sorted) of the folder bound to name
+TEMPLATE_RE = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)(\|first)?\}")
+
+# -- an artifact folder holds the output of the command in DATA, next to its manifest and log
+DATA = "data"
+MANIFEST = "manifest.json"
+LOG = "pipeline.log"
+
+
+class Node:
+    """
+    One instance of a pipeline step: a command with its variables, and the upstream nodes it reads.
+
+    The key of a node is the hash of its command template, its variables, the content of the
+    files and folders it reads, and the keys of its upstream nodes, so it changes whenever
+    anything the artifact depends on changes. The artifact is the folder <store>/<step>-<key>, the command
+    writes its output in <store>/<step>-<key>/data.
+    """
+
+    def __init__(self, step, index, spec, variables, upstream, base_dir, store):
+        self.step = step
+        self.index = index
+        self.cmd = [str(token) for token in spec["cmd"]]
+        self.cwd_spec = str(spec.get("cwd", "."))
+        self.cwd = os.path.normpath(os.path.join(base_dir, self.cwd_spec))
+        self.variables = variables
+        self.upstream = upstream
+        self.files = [str(path) for path in spec.get("files", [])]
+        self.label_template = str(spec.get("label", index))
+        self.store = store
+        self.key = None
+        self.path = None
+
+    @property
+    def deps(self):
+        return list(self.upstream.values())
+
+    @property
+    def name(self):
+        return f"{self.step}[{self.label()}]"
+
+    def values(self, out=None):
+        """
+        Values of the template variables: upstream variables are bound to the data folders of their artifacts.
+
+        Args:
+            out (str): Folder written by the command, bound to {out}.
+
+        Returns:
+            dict: Variable name to string value.
+        """
+        values = {name: str(value) for name, value in self.variables.items()}
+        values.update({name: os.path.join(node.path, DATA) for name, node in self.upstream.items()})
+        if out is not None:
+            values["out"] = out
+        return values
+
+    def render(self, template, values):
+        """
+        Fills a template with the variables.
+
+        Args:
+            template (str): Template with {name} and {name|first} fields.
+            values (dict): Variable values.
+
+        Returns:
+            str: The filled template.
+        """
+        def substitute(match):
+            name, first = match.group(1), match.group(2)
+            if name not in values:
+                raise KeyError(f"Unknown variable '{name}' in step '{self.step}'")
+            value = values[name]
+            if first:
+                entries = sorted(os.listdir(os.path.join(self.cwd, value))) if os.path.isdir(
+                    os.path.join(self.cwd, value)) else []
+                if not entries:
+                    raise FileNotFoundError(f"Folder {value} of step '{self.step}' is empty or missing")
+                value = os.path.join(value, entries[0])
+            return value
+
+        return TEMPLATE_RE.sub(substitute, template)
+
+    def label(self):
+        return TEMPLATE_RE.sub(lambda m: str(self.variables.get(m.group(1), m.group(0))), self.label_template)
+
+    def compute_key(self, hasher):
+        """
+        Computes the key and the artifact folder of the node. Upstream nodes must have their key.
+
+        Args:
+            hasher (FileHasher): Content hashes of the files read by the command.
+        """
+        # -- whole arguments (and the extra files) naming existing files or folders outside the store are inputs
+        inputs = {}
+        values = {name: str(value) for name, value in self.variables.items()}
+        for template in self.cmd + self.files:
+            if any(m.group(1) in self.upstream or m.group(1) == "out" for m in TEMPLATE_RE.finditer(template)):
+                continue
+            path = os.path.join(self.cwd, self.render(template, values))
+            if os.path.exists(path) and not os.path.abspath(path).startswith(os.path.abspath(self.store) + os.sep):
+                inputs[template] = hasher.digest(path)
+        # -- only the variables used by the command, so unrelated configuration changes keep the artifact
+        used = {m.group(1) for template in self.cmd + self.files for m in TEMPLATE_RE.finditer(template)}
+        description = {
+            "step": self.step,
+            "cmd": self.cmd,
+            # -- relative to the configuration, so a moved checkout keeps its artifacts
+            "cwd": self.cwd_spec,
+            "variables": {name: str(value) for name, value in sorted(self.variables.items()) if name in used},
+            "upstream": {name: node.key for name, node in sorted(self.upstream.items())},
+            "inputs": inputs,
+        }
+        self.key = hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+        self.path = os.path.join(os.path.abspath(self.store), f"{self.step}-{self.key[:16]}")
+
+    def done(self):
+        return os.path.isfile(os.path.join(self.path, MANIFEST))
+
+
+class FileHasher:
+    """
+    SHA-256 of files and folders, cached in <store>/hash_cache.json by path, size and modification time.
+    """
+
+    def __init__(self, store):
+        self.path = os.path.join(store, "hash_cache.json")
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, "r") as f:
+                self.cache = json.load(f)
+        except (OSError, ValueError):
+            self.cache = {}
+
+    def digest(self, path):
+        """
+        Args:
+            path (str): File or folder.
+
+        Returns:
+            str: Hex digest of the content (of the relative paths and contents of the files of a folder).
+        """
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            h = hashlib.sha256()
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    h.update(os.path.relpath(file_path, path).encode() + b"\0")
+                    h.update(self.digest(file_path).encode())
+            return h.hexdigest()
+        stat = os.stat(path)
+        with self.lock:
+            cached = self.cache.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        with self.lock:
+            self.cache[path] = [stat.st_size, stat.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+    def save(self):
+        tmp = f"{self.path}.tmp-{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(self.cache, f)
+        os.replace(tmp, self.path)
+
+
+def load_config(path):
+    """
+    Reads a pipeline configuration. The keys of the configurations listed in "extends" (e.g. the
+    configurations of the meta scripts) are loaded first, so they can be used as variables.
+
+    Args:
+        path (str): YAML configuration.
+
+    Returns:
+        dict: Merged configuration.
+    """
+    with open(path, "r") as f:
+        config = yaml.safe_load(f) or {}
+    base_dir = os.path.dirname(os.path.abspath(path))
+    extends = config.pop("extends", [])
+    merged = {}
+    for parent in [extends] if isinstance(extends, str) else extends:
+        merged.update(load_config(os.path.join(base_dir, parent)))
+    merged.update(config)
+    return merged
+
+
+def expand(config, base_dir, store):
+    """
+    Expands the steps of the configuration into nodes.
+
+    A step runs once per combination of its "foreach" variables (zipped, like the lists of the
+    meta scripts) and of its "product" variables (cartesian product). A variable iterates over a
+    list, a configuration key holding a list, or the instances of an earlier step (bound to their
+    artifact folders).
+
+    Args:
+        config (dict): Merged configuration.
+        base_dir (str): Folder of the configuration, commands run there unless "cwd" is set.
+        store (str): Folder of the artifacts.
+
+    Returns:
+        list[Node]: Nodes in topological order.
+    """
+    scalars = {name: value for name, value in config.items() if not isinstance(value, (list, dict))}
+    nodes_of = {}
+    nodes = []
+
+    def resolve(step, source):
+        if isinstance(source, list):
+            return source
+        if source in nodes_of:
+            return nodes_of[source]
+        if isinstance(config.get(source), list):
+            return config[source]
+        raise ValueError(f"Step '{step}': '{source}' is neither a list, a list of the configuration nor an earlier step")
+
+    for step, spec in (config.get("steps") or {}).items():
+        foreach = {name: resolve(step, source) for name, source in (spec.get("foreach") or {}).items()}
+        product = {name: resolve(step, source) for name, source in (spec.get("product") or {}).items()}
+        lengths = {len(values) for values in foreach.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Step '{step}': the foreach lists have different lengths")
+        zipped = [dict(zip(foreach, values)) for values in zip(*foreach.values())] if foreach else [{}]
+        combinations = [dict(zip(product, values)) for values in itertools.product(*product.values())]
+
+        nodes_of[step] = []
+        for assignment in ({**z, **p} for z in zipped for p in combinations):
+            variables = dict(scalars)
+            variables.update(spec.get("params") or {})
+            upstream = {}
+            for name, value in assignment.items():
+                if isinstance(value, Node):
+                    upstream[name] = value
+                else:
+                    variables[name] = value
+            node = Node(step, len(nodes_of[step]), spec, variables, upstream, base_dir, store)
+            nodes_of[step].append(node)
+            nodes.append(node)
+    return nodes
+
+
+def select(nodes, targets):
+    """
+    Args:
+        nodes (list[Node]): All the nodes.
+        targets (list[str]): Steps to run, None for all.
+
+    Returns:
+        list[Node]: The nodes of the target steps and their upstream nodes, in topological order.
+    """
+    if not targets:
+        return nodes
+    unknown = set(targets) - {node.step for node in nodes}
+    if unknown:
+        raise ValueError(f"Unknown steps: {', '.join(sorted(unknown))}")
+    needed = set()
+    stack = [node for node in nodes if node.step in targets]
+    while stack:
+        node = stack.pop()
+        if id(node) not in needed:
+            needed.add(id(node))
+            stack.extend(node.deps)
+    return [node for node in nodes if id(node) in needed]
+
+
+def run_node(node):
+    """
+    Runs the command of a node in a temporary folder, published as the artifact folder only on
+    success: an existing artifact is never removed or overwritten.
+
+    Args:
+        node (Node): The node, its upstream artifacts must exist.
+
+    Returns:
+        bool: True if the artifact exists after the run.
+    """
+    tmp = f"{node.path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(tmp)
+    os.makedirs(os.path.join(tmp, DATA))
+    values = node.values(out=os.path.join(tmp, DATA))
+    start = time.time()
+    try:
+        cmd = [node.render(token, values) for token in node.cmd]
+        with open(os.path.join(tmp, LOG), "w") as log:
+            retcode = subprocess.run(cmd, cwd=node.cwd, stdout=log, stderr=subprocess.STDOUT).returncode
+    except (OSError, KeyError) as e:
+        with open(os.path.join(tmp, LOG), "a") as log:
+            log.write(f"{e}\n")
+        cmd, retcode = node.cmd, -1
+
+    if retcode != 0:
+        failed = f"{node.path}.failed"
+        shutil.rmtree(failed, ignore_errors=True)
+        os.rename(tmp, failed)
+        print(f"FAILED {node.name} (exit code {retcode}), log in {os.path.join(failed, LOG)}")
+        return False
+
+    with open(os.path.join(tmp, MANIFEST), "w") as f:
+        json.dump({"step": node.step, "label": node.label(), "key": node.key, "cmd": cmd, "cwd": node.cwd,
+                   "upstream": {name: os.path.join(dep.path, DATA) for name, dep in node.upstream.items()},
+                   "time_s": round(time.time() - start, 3), "created_unix": int(time.time())}, f, indent=2)
+    try:
+        os.rename(tmp, node.path)
+    except OSError:
+        # -- published meanwhile by a concurrent run of the same node
+        shutil.rmtree(tmp, ignore_errors=True)
+    return node.done()
+
+
+def link_label(node, store):
+    """
+    Points <store>/by-step/<step>/<label> to the artifact of a node, to find it by name.
+
+    Args:
+        node (Node): A node with an artifact.
+        store (str): Folder of the artifacts.
+    """
+    folder = os.path.join(store, "by-step", node.step)
+    os.makedirs(folder, exist_ok=True)
+    link = os.path.join(folder, node.label().replace(os.sep, "_"))
+    tmp = f"{link}.tmp-{os.getpid()}"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    os.symlink(node.path, tmp)
+    os.replace(tmp, link)
+
+
+def run(nodes, store, jobs, dry_run=False):
+    """
+    Runs the nodes whose artifacts are missing, in parallel as soon as their upstream nodes are done.
+
+    Args:
+        nodes (list[Node]): Nodes in topological order, with their key.
+        store (str): Folder of the artifacts.
+        jobs (int): Maximum number of concurrent commands.
+        dry_run (bool): Only print what would run.
+
+    Returns:
+        bool: True if all the artifacts exist at the end.
+    """
+    status = {id(node): "cached" if node.done() else "pending" for node in nodes}
+    for node in nodes:
+        print(f"{status[id(node)]:>8} {node.name} -> {os.path.relpath(node.path)}")
+        if status[id(node)] == "cached":
+            link_label(node, store)
+    if dry_run:
+        return True
+
+    pending = [node for node in nodes if status[id(node)] == "pending"]
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            for node in list(pending):
+                dep_status = [status[id(dep)] for dep in node.deps]
+                if any(s in ("failed", "skipped") for s in dep_status):
+                    status[id(node)] = "skipped"
+                    pending.remove(node)
+                    print(f"SKIPPED {node.name} (upstream failed)")
+                elif all(s in ("cached", "done") for s in dep_status) and len(running) < max(1, jobs):
+                    pending.remove(node)
+                    status[id(node)] = "running"
+                    print(f"RUNNING {node.name}")
+                    running[pool.submit(run_node, node)] = node
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                node = running.pop(future)
+                ok = future.result()
+                status[id(node)] = "done" if ok else "failed"
+                if ok:
+                    link_label(node, store)
+                    print(f"DONE {node.name}")
+
+    counts = {s: sum(1 for node in nodes if status[id(node)] == s) for s in ("cached", "done", "failed", "skipped")}
+    print(", ".join(f"{n} {s}" for s, n in counts.items()))
+    return counts["failed"] == 0 and counts["skipped"] == 0
+
+
+def parse_args():
+    """
+    Parses command-line arguments for running a pipeline.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Run a pipeline of steps with content-addressed artifacts")
+    parser.add_argument("config", help="YAML configuration with the steps")
+    parser.add_argument("--store", help="Folder of the artifacts (default: 'store' of the configuration, or artifacts "
+                                        "next to the configuration)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Maximum concurrent commands")
+    parser.add_argument("--steps", nargs="+", help="Only run these steps (and the steps they read)")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the nodes and whether they are cached")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = load_config(args.config)
+    base_dir = os.path.dirname(os.path.abspath(args.config))
+    store = os.path.abspath(args.store or os.path.join(base_dir, str(config.get("store", "artifacts"))))
+    os.makedirs(store, exist_ok=True)
+
+    nodes = select(expand(config, base_dir, store), args.steps)
+    hasher = FileHasher(store)
+    for node in nodes:
+        node.compute_key(hasher)
+    hasher.save()
+
+    sys.exit(0 if run(nodes, store, args.jobs, args.dry_run) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import json
+import sys
+
+COLUMNS = ["edges", "elapsed_s", "edges_per_sec", "rss_bytes", "wr_size", "h_size", "sl_size",
+           "heavy_replacements", "oracle_hit_rate", "global_estimate"]
+
+
+def load_telemetry(filename, as_dataframe=False):
+    """
+    Loads a telemetry file written by Tonic with --telemetry=<path>.
+
+    Each line of the file is a JSON record with the throughput, the resident memory and the
+    state of the sampler after a given number of edges.
+
+    Args:
+        filename (str): Path to the .jsonl telemetry file.
+        as_dataframe (bool): If True, return a pandas DataFrame (requires pandas).
+
+    Returns:
+        list[dict] | pandas.DataFrame: One record per telemetry line, in stream order.
+    """
+    records = []
+    with open(filename, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    if as_dataframe:
+        import pandas as pd
+        return pd.DataFrame.from_records(records)
+    return records
+
+
+def find_throughput_drops(records, ratio=0.5):
+    """
+    Finds the records whose throughput falls below a fraction of the running median.
+
+    Args:
+        records (list[dict]): Telemetry records as returned by load_telemetry.
+        ratio (float): A record is flagged if edges_per_sec < ratio * median of the previous records.
+
+    Returns:
+        list[dict]: The flagged records.
+    """
+    drops = []
+    history = []
+    for record in records:
+        if history:
+            median = sorted(history)[len(history) // 2]
+            if median > 0 and record["edges_per_sec"] < ratio * median:
+                drops.append(record)
+        history.append(record["edges_per_sec"])
+    return drops
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a Tonic telemetry file")
+    parser.add_argument("telemetry_path", help="Path to the .jsonl file written with --telemetry")
+    parser.add_argument("--drop-ratio", type=float, default=0.5,
+                        help="Flag intervals whose throughput is below this fraction of the running median")
+    args = parser.parse_args()
+
+    records = load_telemetry(args.telemetry_path)
+    if not records:
+        print(f"No telemetry records in {args.telemetry_path}")
+        return 1
+
+    print(" ".join(f"{c:>18}" for c in COLUMNS))
+    for record in records:
+        print(" ".join(f"{record.get(c, ''):>18.6g}" if isinstance(record.get(c), float)
+                       else f"{record.get(c, ''):>18}" for c in COLUMNS))
+
+    last = records[-1]
+    # Older files have no peak_rss_bytes (VmHWM): fall back to the largest sampled RSS
+    if "peak_rss_bytes" in last:
+        rss_label, rss = "peak RSS", last["peak_rss_bytes"]
+    else:
+        rss_label, rss = "max sampled RSS", max(r["rss_bytes"] for r in records)
+    print(f"\nProcessed {last['edges']} edges in {last['elapsed_s']:.3f} s "
+          f"| {rss_label} = {rss / 2 ** 20:.1f} MB "
+          f"| oracle hit rate = {last['oracle_hit_rate']:.4f} "
+          f"({last.get('oracle_filtered', 0)} misses answered by the prefilter)")
+
+    drops = find_throughput_drops(records, args.drop_ratio)
+    for record in drops:
+        print(f"Throughput drop at {record['edges']} edges: {record['edges_per_sec']:.0f} edges/s "
+              f"(H = {record['h_size']}, replacements = {record['heavy_replacements']}, "
+              f"RSS = {record['rss_bytes'] / 2 ** 20:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
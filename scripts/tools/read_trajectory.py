@@ -0,0 +1,73 @@
+import argparse
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"TONICTRJ"
+
+
+def load_trajectory(filename):
+    """
+    Loads a trajectory file written by Tonic with --trajectory=<path>.
+
+    The file holds one record per checkpoint of the stream, with the number of edges processed,
+    the exact triangle count of that prefix and the estimate of every seed on the same prefix.
+
+    Args:
+        filename (str): Path to the binary trajectory file.
+
+    Returns:
+        tuple[list[int], numpy.ndarray]: The seeds of the estimators, and a structured array with
+        fields edges (uint64), exact (int64) and estimates (float64, one column per seed).
+    """
+    with open(filename, "rb") as f:
+        if f.read(8) != MAGIC:
+            raise ValueError(f"{filename} is not a Tonic trajectory file")
+        version, num_estimators = struct.unpack("=II", f.read(8))
+        if version != 1:
+            raise ValueError(f"Unsupported trajectory version {version} in {filename}")
+        seeds = list(struct.unpack(f"={num_estimators}i", f.read(4 * num_estimators)))
+        dtype = np.dtype([("edges", "=u8"), ("exact", "=i8"), ("estimates", "=f8", (num_estimators,))])
+        records = np.frombuffer(f.read(), dtype=dtype)
+    return seeds, records
+
+
+def relative_errors(records):
+    """
+    Relative errors of the estimates w.r.t. the exact count of the same prefix.
+
+    Args:
+        records (numpy.ndarray): Records as returned by load_trajectory.
+
+    Returns:
+        numpy.ndarray: One row per record and one column per seed, NaN where the exact count is 0.
+    """
+    exact = records["exact"].astype(np.float64)[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(exact != 0, np.abs(records["estimates"] - exact) / np.abs(exact), np.nan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a Tonic trajectory file")
+    parser.add_argument("trajectory_path", help="Path to the binary file written with --trajectory")
+    args = parser.parse_args()
+
+    seeds, records = load_trajectory(args.trajectory_path)
+    if len(records) == 0:
+        print(f"No trajectory records in {args.trajectory_path}")
+        return 1
+
+    errors = relative_errors(records)
+    print(f"{'edges':>14} {'exact':>14} {'mean_estimate':>16} {'mean_rel_err':>14} {'max_rel_err':>14}")
+    for record, error in zip(records, errors):
+        has_error = not np.all(np.isnan(error))
+        print(f"{record['edges']:>14} {record['exact']:>14} {record['estimates'].mean():>16.3f} "
+              f"{np.nanmean(error) if has_error else float('nan'):>14.6f} "
+              f"{np.nanmax(error) if has_error else float('nan'):>14.6f}")
+    print(f"\n{len(records)} records of {len(seeds)} seeds ({', '.join(map(str, seeds))})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import sys
+
+COLUMNS = ["run_id", "created_unix", "algo", "dataset", "snapshot", "seed", "alpha", "beta", "memory_budget",
+           "oracle_type", "oracle_path", "oracle_size", "oracle_time", "estimate", "time_s", "oracle_bytes"]
+
+# -- shards written before oracle_bytes was added have one column less
+LEGACY_COLUMNS = COLUMNS[:-1]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT, created_unix INTEGER, algo TEXT, dataset TEXT, snapshot TEXT, seed INTEGER,
+    alpha REAL, beta REAL, memory_budget INTEGER, oracle_type TEXT, oracle_path TEXT,
+    oracle_size INTEGER, oracle_time REAL, estimate REAL, time_s REAL,
+    shard TEXT, oracle_bytes INTEGER, UNIQUE (run_id, algo, dataset, seed, memory_budget)
+);
+CREATE TABLE IF NOT EXISTS shards (name TEXT PRIMARY KEY, offset INTEGER);
+CREATE INDEX IF NOT EXISTS idx_results_dataset ON results (dataset, seed);
+CREATE INDEX IF NOT EXISTS idx_results_snapshot ON results (snapshot, algo);
+CREATE INDEX IF NOT EXISTS idx_results_params ON results (algo, memory_budget, alpha, beta, oracle_type);
+"""
+
+EXACT_ALGOS = ("ExactINS", "ExactFD")
+
+# -- rows of RunUSS and BuildOracle, timed but without a triangle estimate
+BUILD_ALGOS = ("USS", "OracleExact", "OraclenoWR", "OracleStream", "OracleNode")
+
+DEFAULT_GROUP_BY = ("algo", "snapshot", "memory_budget", "alpha", "beta", "oracle_type")
+
+
+class ResultsStore:
+    """
+    Results written by the binaries with --results-db=<folder> (or TONIC_RESULTS_DB=<folder>).
+
+    Each process appends to its own shard <folder>/shard-<host>-<pid>.csv. The shards are merged
+    on read into <folder>/results.db, a SQLite database in WAL mode, so that concurrent readers
+    and ingesting processes do not block each other. Ingestion is incremental: only the bytes
+    appended to a shard since the previous ingestion are parsed.
+    """
+
+    def __init__(self, folder):
+        """
+        Args:
+            folder (str): Folder of the shards and of the database.
+        """
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(folder, "results.db"), timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        if "oracle_bytes" not in [row[1] for row in self.conn.execute("PRAGMA table_info(results)")]:
+            with self.conn:
+                self.conn.execute("ALTER TABLE results ADD COLUMN oracle_bytes INTEGER")
+        self._migrate_unique_key()
+
+    def _migrate_unique_key(self):
+        """
+        Rebuilds a results table created when the run id was unique per row. A process now writes all its
+        rows with the same run id, so the rows of one run are told apart by seed and memory budget.
+        """
+        sql = self.conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'results'").fetchone()[0]
+        if "UNIQUE (run_id, algo, dataset)" not in sql:
+            return
+        columns = ", ".join(COLUMNS + ["shard"])
+        with self.conn:
+            self.conn.execute("ALTER TABLE results RENAME TO results_old")
+            for statement in ("DROP INDEX IF EXISTS idx_results_dataset", "DROP INDEX IF EXISTS idx_results_snapshot",
+                              "DROP INDEX IF EXISTS idx_results_params"):
+                self.conn.execute(statement)
+        self.conn.executescript(SCHEMA)
+        with self.conn:
+            self.conn.execute(f"INSERT OR IGNORE INTO results ({columns}) SELECT {columns} FROM results_old")
+            self.conn.execute("DROP TABLE results_old")
+
+    def close(self):
+        self.conn.close()
+
+    def ingest(self):
+        """
+        Merges the rows appended to the shards since the last call into the database.
+
+        Returns:
+            int: Number of new rows.
+        """
+        added = 0
+        shards = sorted(f for f in os.listdir(self.folder) if f.startswith("shard-") and f.endswith(".csv"))
+        with self.conn:
+            offsets = dict(self.conn.execute("SELECT name, offset FROM shards"))
+            for name in shards:
+                offset = offsets.get(name, 0)
+                with open(os.path.join(self.folder, name), 'rb') as f:
+                    f.seek(offset)
+                    data = f.read()
+                # -- only complete rows, a row still being written is parsed at the next call
+                end = data.rfind(b"\n") + 1
+                if end == 0:
+                    continue
+                reader = csv.reader(io.StringIO(data[:end].decode()))
+                rows = [row + [name] if len(row) == len(COLUMNS) else row + [None, name]
+                        for row in reader if row and row[0] != "run_id"
+                        and len(row) in (len(COLUMNS), len(LEGACY_COLUMNS))]
+                cursor = self.conn.executemany(
+                    f"INSERT OR IGNORE INTO results ({', '.join(COLUMNS)}, shard) "
+                    f"VALUES ({', '.join('?' * (len(COLUMNS) + 1))})", rows)
+                added += cursor.rowcount
+                self.conn.execute("INSERT OR REPLACE INTO shards (name, offset) VALUES (?, ?)", (name, offset + end))
+        return added
+
+    @staticmethod
+    def _where(filters):
+        """
+        Builds a WHERE clause from equality filters; list or tuple values are matched with IN.
+
+        Args:
+            filters (dict): Column -> value or list of values.
+
+        Returns:
+            tuple[str, list]: The clause (empty if no filters) and its parameters.
+        """
+        clauses, params = [], []
+        for column, value in filters.items():
+            if column not in COLUMNS:
+                raise ValueError(f"Unknown column {column}")
+            if isinstance(value, (list, tuple, set)):
+                clauses.append(f"r.{column} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"r.{column} = ?")
+                params.append(value)
+        return (" AND ".join(clauses), params) if clauses else ("", [])
+
+    def query(self, **filters):
+        """
+        Returns the rows matching the filters, after ingesting the new shard rows.
+
+        Args:
+            **filters: Column -> value or list of values, e.g. snapshot="snap0.txt", seed=[1, 2].
+
+        Returns:
+            list[dict]: Matching rows.
+        """
+        self.ingest()
+        where, params = self._where(filters)
+        cursor = self.conn.execute(f"SELECT {', '.join(COLUMNS)} FROM results r"
+                                   f"{' WHERE ' + where if where else ''}", params)
+        return [dict(zip(COLUMNS, row)) for row in cursor]
+
+    def aggregate(self, group_by=DEFAULT_GROUP_BY, **filters):
+        """
+        Computes, in a single SQL query, the error and runtime statistics of every group of trials.
+
+        The ground truth of a dataset is the exact count stored by RunExactAlgo for the same dataset
+        path; trials of datasets without an exact count, and the USS and oracle construction rows,
+        get no error statistics.
+
+        Args:
+            group_by (tuple[str]): Columns identifying a configuration.
+            **filters: Column -> value or list of values restricting the trials.
+
+        Returns:
+            list[dict]: One dict per group with n_trials, mean_rel_error, std_rel_error, max_rel_error,
+            mean_estimate, mean_time_s, std_time_s, min_time_s, max_time_s and mean_oracle_time.
+        """
+        self.ingest()
+        for column in group_by:
+            if column not in COLUMNS:
+                raise ValueError(f"Unknown column {column}")
+        where, params = self._where(filters)
+        exact = ", ".join(f"'{a}'" for a in EXACT_ALGOS)
+        build = ", ".join(f"'{a}'" for a in BUILD_ALGOS)
+        keys = ", ".join(f"r.{c}" for c in group_by)
+        sql = f"""
+            WITH truth AS (
+                SELECT dataset, AVG(estimate) AS exact FROM results WHERE algo IN ({exact}) GROUP BY dataset
+            ), trials AS (
+                SELECT r.*, CASE WHEN r.algo IN ({build}) THEN NULL
+                                 ELSE ABS(r.estimate - t.exact) / NULLIF(t.exact, 0) END AS rel_error
+                FROM results r LEFT JOIN truth t ON r.dataset = t.dataset
+                WHERE r.algo NOT IN ({exact}){' AND ' + where if where else ''}
+            )
+            SELECT {keys}, COUNT(*), AVG(rel_error), AVG(rel_error * rel_error), MAX(rel_error), AVG(estimate),
+                   AVG(time_s), AVG(time_s * time_s), MIN(time_s), MAX(time_s), AVG(oracle_time)
+            FROM trials r GROUP BY {keys} ORDER BY {keys}
+        """
+        out = []
+        for row in self.conn.execute(sql, params):
+            group = dict(zip(group_by, row[:len(group_by)]))
+            n, err, err2, max_err, est, t, t2, t_min, t_max, t_oracle = row[len(group_by):]
+            group.update({
+                "n_trials": n,
+                "mean_rel_error": err,
+                "std_rel_error": _std(err, err2, n),
+                "max_rel_error": max_err,
+                "mean_estimate": est,
+                "mean_time_s": t,
+                "std_time_s": _std(t, t2, n),
+                "min_time_s": t_min,
+                "max_time_s": t_max,
+                "mean_oracle_time": t_oracle,
+            })
+            out.append(group)
+        return out
+
+
+def _std(mean, mean_sq, n):
+    """
+    Sample standard deviation from the mean and the mean of squares.
+
+    Args:
+        mean (float | None): Mean of the values.
+        mean_sq (float | None): Mean of the squared values.
+        n (int): Number of values.
+
+    Returns:
+        float | None: The standard deviation, None if not defined.
+    """
+    if mean is None or mean_sq is None or n < 2:
+        return None
+    return (max(mean_sq - mean * mean, 0.0) * n / (n - 1)) ** 0.5
+
+
+def parse_args():
+    """
+    Parses command-line arguments for the results store.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Merge result shards and aggregate trials")
+    parser.add_argument("folder", help="Folder given to --results-db / TONIC_RESULTS_DB")
+    parser.add_argument("--group-by", nargs="+", default=list(DEFAULT_GROUP_BY), help="Columns of a configuration")
+    parser.add_argument("--filter", nargs="*", default=[], metavar="COLUMN=VALUE",
+                        help="Restrict to rows with COLUMN=VALUE (repeat a column to match several values)")
+    parser.add_argument("-o", "--output", help="Write the aggregated statistics to this CSV file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    filters = {}
+    for item in args.filter:
+        column, _, value = item.partition("=")
+        filters.setdefault(column, []).append(value)
+
+    store = ResultsStore(args.folder)
+    print(f"Ingested {store.ingest()} new rows")
+    stats = store.aggregate(tuple(args.group_by), **filters)
+    store.close()
+    if not stats:
+        print("No trials found")
+        return 1
+
+    fields = list(stats[0].keys())
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(stats)
+        print(f"Statistics written to {args.output}")
+    else:
+        writer = csv.DictWriter(sys.stdout, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
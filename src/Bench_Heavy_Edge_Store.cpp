@@ -0,0 +1,135 @@
+//
+// Created by X on 09/03/24.
+//
+
+// -- Micro-benchmark of the heavy edge set of Tonic: HeavyEdgeStore against the binary heap FixedSizePQ, on the
+// -- access pattern of the sampler (fill H, then compare every edge with the lightest heavy edge and replace it)
+// -- Usage: BenchHeavyEdgeStore [num_edges] [max_heaviness]
+
+#include "FixedSizePQ.h"
+#include "hash_set8.hpp"
+#include "Heavy_Edge_Store.h"
+#include "Random.h"
+#include <chrono>
+#include <cmath>
+#include <cstdio>
+#include <cstdlib>
+#include <vector>
+
+// -- heavy edge comparator -> return lightest edge
+struct heavy_edge_cmp {
+    bool operator()(const Heavy_edge &a, const Heavy_edge &b) const {
+        return a.second > b.second;
+    }
+};
+
+/**
+ * Run the sampler pattern on a FixedSizePQ
+ * @param stream edges and heaviness
+ * @param H_size
+ * @param gen
+ * @return number of replacements
+ */
+long run_heap(const std::vector<Heavy_edge> &stream, long H_size, Xoshiro256 &gen) {
+    FixedSizePQ<Heavy_edge, heavy_edge_cmp> heavy_edges(H_size);
+    long replacements = 0;
+    for (const auto &edge: stream) {
+        if ((long) heavy_edges.size() < H_size) {
+            heavy_edges.push(edge);
+        } else if (edge.second > heavy_edges.top().second ||
+                   (edge.second == heavy_edges.top().second && gen.next_double() < 0.5)) {
+            heavy_edges.pop();
+            heavy_edges.push(edge);
+            replacements++;
+        }
+    }
+    return replacements;
+}
+
+/**
+ * Run the sampler pattern on a FixedSizePQ with a set of the edges in H, as needed by the deletions of fully-dynamic
+ * streams
+ * @param stream edges and heaviness
+ * @param H_size
+ * @param gen
+ * @return number of replacements
+ */
+long run_heap_set(const std::vector<Heavy_edge> &stream, long H_size, Xoshiro256 &gen) {
+    FixedSizePQ<Heavy_edge, heavy_edge_cmp> heavy_edges(H_size);
+    emhash8::HashSet<unsigned long long> heavy_edges_set(H_size);
+    long replacements = 0;
+    for (const auto &edge: stream) {
+        if ((long) heavy_edges.size() < H_size) {
+            heavy_edges.push(edge);
+            heavy_edges_set.insert(Utils::edge_to_id(edge.first.first, edge.first.second));
+        } else if (edge.second > heavy_edges.top().second ||
+                   (edge.second == heavy_edges.top().second && gen.next_double() < 0.5)) {
+            const Edge &lightest = heavy_edges.top().first;
+            heavy_edges_set.erase(Utils::edge_to_id(lightest.first, lightest.second));
+            heavy_edges.pop();
+            heavy_edges.push(edge);
+            heavy_edges_set.insert(Utils::edge_to_id(edge.first.first, edge.first.second));
+            replacements++;
+        }
+    }
+    return replacements;
+}
+
+/**
+ * Run the sampler pattern on a HeavyEdgeStore
+ * @param stream edges and heaviness
+ * @param H_size
+ * @param index_edges
+ * @param gen
+ * @return number of replacements
+ */
+long run_store(const std::vector<Heavy_edge> &stream, long H_size, bool index_edges, Xoshiro256 &gen) {
+    HeavyEdgeStore heavy_edges(H_size, index_edges);
+    long replacements = 0;
+    for (const auto &edge: stream) {
+        if ((long) heavy_edges.size() < H_size) {
+            heavy_edges.push(edge.first, edge.second);
+        } else if (edge.second > heavy_edges.min_heaviness() ||
+                   (edge.second == heavy_edges.min_heaviness() && gen.next_double() < 0.5)) {
+            heavy_edges.replace_min(edge.first, edge.second, gen);
+            replacements++;
+        }
+    }
+    return replacements;
+}
+
+int main(int argc, char **argv) {
+    long num_edges = argc > 1 ? atol(argv[1]) : 10000000;
+    int max_heaviness = argc > 2 ? atoi(argv[2]) : 10000;
+
+    // -- heavy-tailed heaviness, as the triangle counts of the oracles: most edges are light, few are very heavy
+    Xoshiro256 gen(42);
+    std::vector<Heavy_edge> stream((size_t) num_edges);
+    for (long i = 0; i < num_edges; i++) {
+        double heaviness = std::floor(1.0 / std::pow(gen.next_double_open(), 1.2)) - 1;
+        stream[i].second = (int) std::min((double) max_heaviness, heaviness);
+        stream[i].first = {(int) gen.next_int(1000000), 1000000 + (int) gen.next_int(1000000)};
+    }
+
+    printf("%10s %10s %10s %14s %14s %12s\n", "H size", "heap (ms)", "store (ms)", "heap+set (ms)",
+           "indexed (ms)", "replaced");
+    for (long H_size: {1000L, 10000L, 100000L, 1000000L}) {
+        Xoshiro256 gen_heap(1), gen_store(1), gen_heap_set(1), gen_indexed(1);
+        auto t0 = std::chrono::steady_clock::now();
+        long heap_replacements = run_heap(stream, H_size, gen_heap);
+        auto t1 = std::chrono::steady_clock::now();
+        long store_replacements = run_store(stream, H_size, false, gen_store);
+        auto t2 = std::chrono::steady_clock::now();
+        run_heap_set(stream, H_size, gen_heap_set);
+        auto t3 = std::chrono::steady_clock::now();
+        run_store(stream, H_size, true, gen_indexed);
+        auto t4 = std::chrono::steady_clock::now();
+        printf("%10ld %10.1f %10.1f %14.1f %14.1f %ld / %ld\n", H_size,
+               std::chrono::duration<double, std::milli>(t1 - t0).count(),
+               std::chrono::duration<double, std::milli>(t2 - t1).count(),
+               std::chrono::duration<double, std::milli>(t3 - t2).count(),
+               std::chrono::duration<double, std::milli>(t4 - t3).count(),
+               heap_replacements, store_replacements);
+    }
+    return 0;
+}
@@ -0,0 +1,97 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Checkpoint.h"
+#include <cstdio>
+#include <iostream>
+#include <sstream>
+
+/**
+ * Constructor for CheckpointWriter, opens <path>.tmp and writes the magic number and the version
+ * @param path of the checkpoint
+ */
+CheckpointWriter::CheckpointWriter(const std::string &path) : path_(path), tmp_path_(path + ".tmp") {
+    out_.open(tmp_path_, std::ios::binary | std::ios::trunc);
+    if (!out_.is_open()) {
+        std::cerr << "Error! Unable to open checkpoint file " << tmp_path_ << "\n";
+        return;
+    }
+    write(MAGIC);
+    write(VERSION);
+}
+
+/**
+ * Write a length-prefixed string
+ * @param s
+ */
+void CheckpointWriter::write_string(const std::string &s) {
+    write_array(s.data(), s.size());
+}
+
+/**
+ * Write the full state of a generator
+ * @param gen
+ */
+void CheckpointWriter::write_rng(const Xoshiro256 &gen) {
+    for (int i = 0; i < 4; i++) write(gen.state()[i]);
+}
+
+/**
+ * Flush the temporary file and atomically replace the checkpoint with it
+ * @return true if the checkpoint was written
+ */
+bool CheckpointWriter::commit() {
+    if (!out_.is_open()) return false;
+    out_.close();
+    if (out_.fail()) {
+        std::cerr << "Error! Unable to write checkpoint file " << tmp_path_ << "\n";
+        return false;
+    }
+    if (std::rename(tmp_path_.c_str(), path_.c_str()) != 0) {
+        std::cerr << "Error! Unable to rename " << tmp_path_ << " to " << path_ << "\n";
+        return false;
+    }
+    return true;
+}
+
+/**
+ * Constructor for CheckpointReader, opens the checkpoint and checks the magic number and the version
+ * @param path of the checkpoint
+ */
+CheckpointReader::CheckpointReader(const std::string &path) {
+    in_.open(path, std::ios::binary);
+    if (!in_.is_open()) {
+        std::cerr << "Error! Unable to open checkpoint file " << path << "\n";
+        ok_ = false;
+        return;
+    }
+    uint64_t magic = read<uint64_t>();
+    uint32_t version = read<uint32_t>();
+    if (!ok_ or magic != CheckpointWriter::MAGIC) {
+        std::cerr << "Error! " << path << " is not a Tonic checkpoint\n";
+        ok_ = false;
+    } else if (version != CheckpointWriter::VERSION) {
+        std::cerr << "Error! Checkpoint version " << version << " is not supported (expected "
+                  << CheckpointWriter::VERSION << ")\n";
+        ok_ = false;
+    }
+}
+
+/**
+ * Read a length-prefixed string
+ * @return the string, empty on error
+ */
+std::string CheckpointReader::read_string() {
+    std::vector<char> data;
+    read_array(data);
+    return ok_ ? std::string(data.begin(), data.end()) : std::string();
+}
+
+/**
+ * Restore the full state of a generator
+ * @param gen
+ */
+void CheckpointReader::read_rng(Xoshiro256 &gen) {
+    for (int i = 0; i < 4; i++) gen.state()[i] = read<uint64_t>();
+}
@@ -0,0 +1,462 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Compressed_Input.h"
+#include <algorithm>
+#include <cstring>
+#include <iostream>
+#include <sys/stat.h>
+
+#ifdef TONIC_ZLIB
+#include <zlib.h>
+#endif
+#ifdef TONIC_ZSTD
+#include <zstd.h>
+#endif
+
+/**
+ * Detect the compression of a file from its first bytes
+ * @param bytes first (up to 4) bytes of the file
+ * @return GZIP, ZSTD (a zstd or a skippable frame), or PLAIN
+ */
+DecompressBuffer::Format DecompressBuffer::detect(const std::string &bytes) {
+    auto magic = reinterpret_cast<const unsigned char *>(bytes.data());
+    size_t n = bytes.size();
+    if (n >= 2 and magic[0] == 0x1F and magic[1] == 0x8B) return GZIP;
+    if (n < 4) return PLAIN;
+    // -- 0xFD2FB528 (little endian) starts a zstd frame, 0x184D2A5? a skippable frame
+    if (magic[0] == 0x28 and magic[1] == 0xB5 and magic[2] == 0x2F and magic[3] == 0xFD) return ZSTD;
+    if ((magic[0] & 0xF0) == 0x50 and magic[1] == 0x2A and magic[2] == 0x4D and magic[3] == 0x18) return ZSTD;
+    return PLAIN;
+}
+
+/**
+ * Constructor for DecompressBuffer: start the reader thread (and the workers for zstd) on an open file
+ * @param file open file, closed by the buffer
+ * @param path of the file, for the error messages
+ * @param format GZIP, ZSTD, or PLAIN to read the file as is
+ * @param prefix bytes already read from the file, read again before the rest of the file
+ * @param num_threads workers decompressing the zstd frames
+ */
+DecompressBuffer::DecompressBuffer(std::FILE *file, const std::string &path, Format format, std::string prefix,
+                                   int num_threads) :
+        path_(path), format_(format), prefix_(std::move(prefix)) {
+
+#ifndef TONIC_ZLIB
+    if (format_ == GZIP) {
+        std::cerr << "Error! " << path << " is gzip-compressed, but Tonic was built without zlib\n";
+        std::fclose(file);
+        return;
+    }
+#endif
+#ifndef TONIC_ZSTD
+    if (format_ == ZSTD) {
+        std::cerr << "Error! " << path << " is zstd-compressed, but Tonic was built without zstd\n";
+        std::fclose(file);
+        return;
+    }
+#endif
+    file_ = file;
+
+    int num_workers = format_ == ZSTD ? std::max(1, num_threads) : 0;
+    max_in_flight_ = MAX_IN_FLIGHT * (size_t) std::max(1, num_workers);
+    for (int i = 0; i < num_workers; i++) workers_.emplace_back(&DecompressBuffer::run_worker, this);
+    if (format_ == GZIP) reader_ = std::thread(&DecompressBuffer::read_gzip, this);
+    else if (format_ == ZSTD) reader_ = std::thread(&DecompressBuffer::read_zstd, this);
+    else reader_ = std::thread(&DecompressBuffer::read_plain, this);
+}
+
+DecompressBuffer::~DecompressBuffer() {
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        stop_ = true;
+    }
+    ready_cv_.notify_all();
+    space_cv_.notify_all();
+    jobs_cv_.notify_all();
+    if (reader_.joinable()) reader_.join();
+    for (auto &worker: workers_) worker.join();
+    if (file_ != nullptr) std::fclose(file_);
+}
+
+/**
+ * Read the next bytes of the file, starting with the prefix read by the caller
+ * @param data
+ * @param n maximum number of bytes
+ * @return number of bytes read, 0 at the end of the file
+ */
+size_t DecompressBuffer::read_bytes(char *data, size_t n) {
+    size_t from_prefix = std::min(n, prefix_.size());
+    std::memcpy(data, prefix_.data(), from_prefix);
+    prefix_.erase(0, from_prefix);
+    return from_prefix + std::fread(data + from_prefix, 1, n - from_prefix, file_);
+}
+
+/**
+ * Append the next compressed bytes of the file to a buffer
+ * @param buffer
+ * @return false at the end of the file
+ */
+bool DecompressBuffer::read_more(std::string &buffer) {
+    size_t old_size = buffer.size();
+    buffer.resize(old_size + READ_BYTES);
+    size_t n = read_bytes(buffer.data() + old_size, READ_BYTES);
+    buffer.resize(old_size + n);
+    return n > 0;
+}
+
+/**
+ * Take the number of the next block, waiting while MAX_IN_FLIGHT blocks are ahead of the consumer
+ * @return the number of the block, UINT64_MAX if the buffer is being destroyed or decompression failed
+ */
+uint64_t DecompressBuffer::reserve_block() {
+    std::unique_lock<std::mutex> lock(mutex_);
+    space_cv_.wait(lock, [&] { return stop_ or failed_ or issued_ - consumed_ < max_in_flight_; });
+    if (stop_ or failed_) return UINT64_MAX;
+    return issued_++;
+}
+
+/**
+ * Hand a decompressed block to the consumer
+ * @param seq number of the block
+ * @param block
+ */
+void DecompressBuffer::publish(uint64_t seq, std::string block) {
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        done_.emplace(seq, std::move(block));
+    }
+    ready_cv_.notify_all();
+}
+
+/**
+ * Mark the end of the decompressed stream
+ * @param failed true if the file is corrupted or truncated, the consumer then stops at the first missing block
+ * @param message error to report
+ */
+void DecompressBuffer::finish(bool failed, const std::string &message) {
+    if (!message.empty()) std::cerr << "Error! " << message << " in " << path_ << "\n";
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        eof_ = true;
+        failed_ = failed_ or failed;
+    }
+    ready_cv_.notify_all();
+    space_cv_.notify_all();
+    jobs_cv_.notify_all();
+}
+
+/**
+ * Whether the file is corrupted or truncated, or could not be read
+ * @return
+ */
+bool DecompressBuffer::failed() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return failed_;
+}
+
+/**
+ * Reader thread of a plain file: hand out its bytes in blocks of BLOCK_BYTES
+ */
+void DecompressBuffer::read_plain() {
+    while (true) {
+        std::string block(BLOCK_BYTES, '\0');
+        block.resize(read_bytes(block.data(), block.size()));
+        if (block.empty()) break;
+        uint64_t seq = reserve_block();
+        if (seq == UINT64_MAX) break;
+        publish(seq, std::move(block));
+    }
+    if (std::ferror(file_)) finish(true, "read error");
+    else finish(false);
+}
+
+/**
+ * Reader thread of a gzip file: inflate the members of the file one after the other, in blocks of BLOCK_BYTES
+ */
+void DecompressBuffer::read_gzip() {
+#ifdef TONIC_ZLIB
+    z_stream zs{};
+    // -- 15 + 32: largest window, gzip or zlib header detected automatically
+    if (inflateInit2(&zs, 15 + 32) != Z_OK) {
+        finish(true, "unable to initialize zlib");
+        return;
+    }
+    std::string input(READ_BYTES, '\0');
+    bool member_end = true;
+    bool at_eof = false;
+    while (!at_eof) {
+        std::string block(BLOCK_BYTES, '\0');
+        size_t filled = 0;
+        while (filled < BLOCK_BYTES) {
+            if (zs.avail_in == 0) {
+                size_t n = read_bytes(input.data(), input.size());
+                if (n == 0) {
+                    at_eof = true;
+                    break;
+                }
+                zs.next_in = reinterpret_cast<Bytef *>(input.data());
+                zs.avail_in = (uInt) n;
+            }
+            zs.next_out = reinterpret_cast<Bytef *>(block.data() + filled);
+            zs.avail_out = (uInt) (BLOCK_BYTES - filled);
+            int ret = inflate(&zs, Z_NO_FLUSH);
+            filled = BLOCK_BYTES - zs.avail_out;
+            if (ret == Z_STREAM_END) {
+                // -- concatenated gzip members (pigz, cat a.gz b.gz) form a single stream
+                inflateReset(&zs);
+                member_end = true;
+            } else if (ret == Z_OK) {
+                member_end = false;
+            } else if (ret != Z_BUF_ERROR) {
+                inflateEnd(&zs);
+                finish(true, std::string("corrupted gzip data (") + (zs.msg ? zs.msg : "unknown error") + ")");
+                return;
+            }
+        }
+        block.resize(filled);
+        if (!block.empty()) {
+            uint64_t seq = reserve_block();
+            if (seq == UINT64_MAX) break;
+            publish(seq, std::move(block));
+        }
+    }
+    inflateEnd(&zs);
+    if (std::ferror(file_)) finish(true, "read error");
+    else if (at_eof and !member_end) finish(true, "truncated gzip data");
+    else finish(false);
+#endif
+}
+
+/**
+ * Reader thread of a zstd file: split the file into frames and hand them to the workers. A frame without a known
+ * decompressed size, or larger than MAX_FRAME_BYTES, is decompressed by the reader thread itself as a stream
+ */
+void DecompressBuffer::read_zstd() {
+#ifdef TONIC_ZSTD
+    ZSTD_DCtx *dctx = ZSTD_createDCtx();
+    std::string buffer;
+    size_t start = 0;
+    std::string error;
+    bool ok = true;
+    while (ok) {
+        // -- drop the frames already handed out
+        if (start > 0 and start >= buffer.size() / 2) {
+            buffer.erase(0, start);
+            start = 0;
+        }
+        size_t available = buffer.size() - start;
+        if (available == 0) {
+            if (!read_more(buffer)) break;
+            continue;
+        }
+
+        const char *frame = buffer.data() + start;
+        size_t frame_size = ZSTD_findFrameCompressedSize(frame, available);
+        if (ZSTD_isError(frame_size) and available < MAX_FRAME_BYTES and read_more(buffer)) continue;
+        unsigned long long content_size = ZSTD_isError(frame_size) ? ZSTD_CONTENTSIZE_UNKNOWN :
+                                          ZSTD_getFrameContentSize(frame, frame_size);
+
+        if (content_size == ZSTD_CONTENTSIZE_UNKNOWN or content_size == ZSTD_CONTENTSIZE_ERROR or
+            content_size > MAX_FRAME_BYTES) {
+            // -- decompress the frame as a stream, ZSTD_decompressStream stops at the end of the frame
+            ZSTD_DCtx_reset(dctx, ZSTD_reset_session_only);
+            size_t ret = 1;
+            while (ok and ret != 0) {
+                std::string block(BLOCK_BYTES, '\0');
+                ZSTD_outBuffer out{block.data(), block.size(), 0};
+                while (out.pos < out.size and ret != 0) {
+                    if (start == buffer.size()) {
+                        buffer.clear();
+                        start = 0;
+                        if (!read_more(buffer)) {
+                            error = std::ferror(file_) ? "read error" : "truncated zstd data";
+                            break;
+                        }
+                    }
+                    ZSTD_inBuffer in{buffer.data() + start, buffer.size() - start, 0};
+                    ret = ZSTD_decompressStream(dctx, &out, &in);
+                    start += in.pos;
+                    if (ZSTD_isError(ret)) {
+                        error = std::string("corrupted zstd data (") + ZSTD_getErrorName(ret) + ")";
+                        out.pos = 0;
+                        break;
+                    }
+                }
+                // -- the bytes decompressed before an error are still handed out
+                block.resize(out.pos);
+                if (!block.empty()) {
+                    uint64_t seq = reserve_block();
+                    if (seq == UINT64_MAX) ok = false;
+                    else publish(seq, std::move(block));
+                }
+                if (!error.empty()) ok = false;
+            }
+            continue;
+        }
+
+        uint64_t seq = reserve_block();
+        if (seq == UINT64_MAX) break;
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            jobs_.push({seq, std::string(frame, frame_size), (size_t) content_size});
+        }
+        jobs_cv_.notify_one();
+        start += frame_size;
+    }
+    ZSTD_freeDCtx(dctx);
+    if (!error.empty()) finish(true, error);
+    else if (std::ferror(file_)) finish(true, "read error");
+    else finish(false);
+#endif
+}
+
+/**
+ * Worker thread: decompress the zstd frames queued by the reader thread
+ */
+void DecompressBuffer::run_worker() {
+#ifdef TONIC_ZSTD
+    ZSTD_DCtx *dctx = ZSTD_createDCtx();
+    while (true) {
+        Job job;
+        {
+            std::unique_lock<std::mutex> lock(mutex_);
+            jobs_cv_.wait(lock, [&] { return stop_ or eof_ or !jobs_.empty(); });
+            if (stop_ or failed_ or jobs_.empty()) break;
+            job = std::move(jobs_.front());
+            jobs_.pop();
+        }
+        std::string block(job.content_size, '\0');
+        size_t n = ZSTD_decompressDCtx(dctx, block.data(), block.size(), job.frame.data(), job.frame.size());
+        if (ZSTD_isError(n) or n != job.content_size) {
+            finish(true, std::string("corrupted zstd data (") +
+                         (ZSTD_isError(n) ? ZSTD_getErrorName(n) : "wrong frame size") + ")");
+            break;
+        }
+        publish(job.seq, std::move(block));
+    }
+    ZSTD_freeDCtx(dctx);
+#endif
+}
+
+/**
+ * Move to the next decompressed block, waiting for it if it is not ready yet
+ * @return the next character, or eof at the end of the stream (or after a decompression error)
+ */
+DecompressBuffer::int_type DecompressBuffer::underflow() {
+    if (gptr() < egptr()) return traits_type::to_int_type(*gptr());
+    position_ += current_.size();
+    current_.clear();
+    setg(nullptr, nullptr, nullptr);
+
+    std::unique_lock<std::mutex> lock(mutex_);
+    while (current_.empty()) {
+        ready_cv_.wait(lock, [&] {
+            return stop_ or failed_ or done_.count(consumed_) > 0 or (eof_ and consumed_ == issued_);
+        });
+        auto it = done_.find(consumed_);
+        if (it == done_.end()) return traits_type::eof();
+        current_ = std::move(it->second);
+        done_.erase(it);
+        consumed_++;
+        space_cv_.notify_all();
+    }
+    setg(current_.data(), current_.data(), current_.data() + current_.size());
+    return traits_type::to_int_type(*gptr());
+}
+
+/**
+ * Seek relative to the current position (forward only) or to the beginning
+ * @param off
+ * @param dir beg or cur, end is not supported
+ * @param which
+ * @return the new position, -1 on failure
+ */
+DecompressBuffer::pos_type DecompressBuffer::seekoff(off_type off, std::ios_base::seekdir dir,
+                                                     std::ios_base::openmode which) {
+    off_type current = (off_type) position_ + (gptr() - eback());
+    if (dir == std::ios_base::cur) {
+        if (off == 0) return current;
+        return seekpos(current + off, which);
+    }
+    if (dir == std::ios_base::beg) return seekpos(off, which);
+    return pos_type(off_type(-1));
+}
+
+/**
+ * Seek to a position of the decompressed stream, at or after the beginning of the current block: the blocks before
+ * the position are decompressed and skipped
+ * @param pos
+ * @param which
+ * @return the new position, -1 on failure
+ */
+DecompressBuffer::pos_type DecompressBuffer::seekpos(pos_type pos, std::ios_base::openmode which) {
+    if (!(which & std::ios_base::in) or (off_type) pos < (off_type) position_) return pos_type(off_type(-1));
+    auto target = (uint64_t) (off_type) pos;
+    while (target >= position_ + current_.size()) {
+        setg(eback(), egptr(), egptr());
+        if (traits_type::eq_int_type(underflow(), traits_type::eof())) {
+            return target == position_ ? pos : pos_type(off_type(-1));
+        }
+    }
+    setg(eback(), eback() + (target - position_), egptr());
+    return pos;
+}
+
+/**
+ * Constructor for InputFile
+ * @param path
+ * @param num_threads workers decompressing the zstd frames, 0 for default_threads()
+ */
+InputFile::InputFile(const std::string &path, int num_threads) : std::istream(nullptr) {
+    open(path, num_threads);
+}
+
+/**
+ * Open a file, decompressed in the background if it is gzip or zstd-compressed. The format is detected on the handle
+ * that reads the file, so pipes and FIFOs (e.g. <(zcat file.gz)) are read only once
+ * @param path
+ * @param num_threads workers decompressing the zstd frames, 0 for default_threads()
+ */
+void InputFile::open(const std::string &path, int num_threads) {
+    std::FILE *file = std::fopen(path.c_str(), "rb");
+    if (file == nullptr) {
+        rdbuf(&plain_);
+        setstate(std::ios_base::failbit);
+        return;
+    }
+    std::string magic(4, '\0');
+    magic.resize(std::fread(magic.data(), 1, magic.size(), file));
+    DecompressBuffer::Format format = DecompressBuffer::detect(magic);
+
+    struct stat info{};
+    if (format == DecompressBuffer::PLAIN and fstat(fileno(file), &info) == 0 and S_ISREG(info.st_mode)) {
+        // -- a regular plain file is opened again from the start, and keeps the seekable filebuf
+        std::fclose(file);
+        plain_.open(path, std::ios_base::in);
+        rdbuf(&plain_);
+    } else {
+        compressed_ = std::make_unique<DecompressBuffer>(file, path, format, std::move(magic),
+                                                         num_threads > 0 ? num_threads : default_threads());
+        rdbuf(compressed_.get());
+    }
+    if (!is_open()) setstate(std::ios_base::failbit);
+}
+
+/**
+ * Close the file, and stop the decompression threads
+ */
+void InputFile::close() {
+    rdbuf(&plain_);
+    compressed_.reset();
+    if (plain_.is_open()) plain_.close();
+}
+
+/**
+ * Default number of workers decompressing the zstd frames: one per core, at most 8
+ * @return
+ */
+int InputFile::default_threads() {
+    return (int) std::clamp(std::thread::hardware_concurrency(), 1u, 8u);
+}
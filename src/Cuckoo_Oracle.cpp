@@ -0,0 +1,222 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Cuckoo_Oracle.h"
+#include <algorithm>
+#include <cmath>
+#include <fstream>
+#include <iostream>
+
+namespace {
+    // -- "TONICCKO"
+    constexpr uint64_t CUCKOO_MAGIC = 0x4F4B43434943544EULL;
+    constexpr uint32_t CUCKOO_VERSION = 1;
+}
+
+/**
+ * Constructor for CuckooEdgeOracle
+ * @param num_entries number of edges to be inserted
+ * @param fingerprint_bits bits of the fingerprint, in [4, 32]
+ * @param value_bits bits of the quantized heaviness, in [0, 16]
+ * @param max_heaviness largest heaviness to be inserted, mapped to the last quantization level
+ * @param load_factor target fraction of occupied slots
+ */
+CuckooEdgeOracle::CuckooEdgeOracle(size_t num_entries, int fingerprint_bits, int value_bits, int max_heaviness,
+                                   double load_factor) :
+        fingerprint_bits_(fingerprint_bits), value_bits_(value_bits), slot_bits_(fingerprint_bits + value_bits) {
+
+    if (fingerprint_bits < 4 or value_bits < 0 or value_bits > 16 or slot_bits_ > 32) {
+        std::cerr << "CuckooEdgeOracle - Error! Fingerprint bits must be >= 4, value bits in [0, 16], and their sum "
+                     "<= 32\n";
+        exit(1);
+    }
+    num_buckets_ = std::max<uint64_t>(1, (uint64_t) std::ceil((double) num_entries / (BUCKET_SIZE * load_factor)));
+    // -- one padding word, so that a slot can always be read from two consecutive words
+    table_.assign((num_buckets_ * BUCKET_SIZE * slot_bits_ + 63) / 64 + 1, 0);
+    int max_level = (1 << value_bits_) - 1;
+    scale_ = max_level > 0 and max_heaviness > 0 ? max_level / std::log2(1.0 + max_heaviness) : 1.0;
+    compute_levels();
+}
+
+/**
+ * Compute the heaviness of each quantization level
+ */
+void CuckooEdgeOracle::compute_levels() {
+    levels_.resize(1 << value_bits_);
+    for (int q = 0; q < (int) levels_.size(); q++) {
+        levels_[q] = (int) std::lround(std::exp2((double) q / scale_) - 1.0);
+    }
+}
+
+/**
+ * Quantize a heaviness on a log scale
+ * @param heaviness
+ * @return the quantization level
+ */
+int CuckooEdgeOracle::quantize(int heaviness) const {
+    int max_level = (1 << value_bits_) - 1;
+    int q = (int) std::lround(std::log2(1.0 + std::max(heaviness, 0)) * scale_);
+    return std::min(q, max_level);
+}
+
+/**
+ * Write a packed slot
+ * @param slot index of the slot
+ * @param value
+ */
+void CuckooEdgeOracle::set_slot(uint64_t slot, uint32_t value) {
+    uint64_t bit = slot * slot_bits_;
+    uint64_t word = bit >> 6, offset = bit & 63;
+    uint64_t mask = (1ULL << slot_bits_) - 1;
+    table_[word] = (table_[word] & ~(mask << offset)) | ((uint64_t) value << offset);
+    if (offset + slot_bits_ > 64) {
+        uint64_t shift = 64 - offset;
+        table_[word + 1] = (table_[word + 1] & ~(mask >> shift)) | ((uint64_t) value >> shift);
+    }
+}
+
+/**
+ * Insert a slot value in the first empty slot of a bucket
+ * @param bucket
+ * @param slot_value
+ * @return true if the bucket had an empty slot
+ */
+bool CuckooEdgeOracle::insert_in_bucket(uint64_t bucket, uint32_t slot_value) {
+    for (int j = 0; j < BUCKET_SIZE; j++) {
+        if (get_slot(bucket * BUCKET_SIZE + j) == 0) {
+            set_slot(bucket * BUCKET_SIZE + j, slot_value);
+            return true;
+        }
+    }
+    return false;
+}
+
+/**
+ * Insert an edge with its heaviness, evicting fingerprints to their alternate bucket when both buckets are full
+ * @param edge_id
+ * @param heaviness
+ * @return false if the filter is too full: the last evicted entry is lost and the filter must be rebuilt larger
+ */
+bool CuckooEdgeOracle::insert(unsigned long long edge_id, int heaviness) {
+    uint64_t h = mix(edge_id);
+    uint32_t fingerprint = fingerprint_of(h);
+    uint32_t slot_value = (fingerprint << value_bits_) | (uint32_t) quantize(heaviness);
+    uint64_t bucket = bucket_of(h);
+    if (insert_in_bucket(bucket, slot_value) or insert_in_bucket(alt_bucket(bucket, fingerprint), slot_value)) {
+        size_++;
+        return true;
+    }
+
+    for (int kick = 0; kick < MAX_KICKS; kick++) {
+        // -- swap with a random slot of the bucket, and move the evicted entry to its alternate bucket
+        kick_state_ = mix(kick_state_);
+        uint64_t slot = bucket * BUCKET_SIZE + kick_state_ % BUCKET_SIZE;
+        uint32_t evicted = get_slot(slot);
+        set_slot(slot, slot_value);
+        slot_value = evicted;
+        bucket = alt_bucket(bucket, slot_value >> value_bits_);
+        if (insert_in_bucket(bucket, slot_value)) {
+            size_++;
+            return true;
+        }
+    }
+    return false;
+}
+
+/**
+ * Build the compact oracle of an exact edge oracle. The filter is rebuilt with a lower load factor until all the
+ * edges fit
+ * @param edge_oracle edge id -> heaviness
+ * @param fingerprint_bits
+ * @param value_bits
+ * @param oracle the built oracle
+ * @return false if the edges could not be inserted
+ */
+bool CuckooEdgeOracle::build(const emhash5::HashMap<long, int> &edge_oracle, int fingerprint_bits, int value_bits,
+                             CuckooEdgeOracle &oracle) {
+    int max_heaviness = 0;
+    for (const auto &it: edge_oracle) max_heaviness = std::max(max_heaviness, it.second);
+
+    for (double load_factor = 0.95; load_factor > 0.5; load_factor -= 0.05) {
+        oracle = CuckooEdgeOracle(edge_oracle.size(), fingerprint_bits, value_bits, max_heaviness, load_factor);
+        bool full = false;
+        for (const auto &it: edge_oracle) {
+            if (!oracle.insert(it.first, it.second)) {
+                full = true;
+                break;
+            }
+        }
+        if (!full) return true;
+    }
+    std::cerr << "CuckooEdgeOracle - Error! Unable to insert " << edge_oracle.size() << " edges\n";
+    return false;
+}
+
+/**
+ * Write the oracle to a binary file
+ * @param path
+ * @param num_dense_nodes number of nodes if the edge ids are dense ids of a relabeled stream, 0 otherwise
+ * @return true if the file was written
+ */
+bool CuckooEdgeOracle::save(const std::string &path, int num_dense_nodes) const {
+    std::ofstream out(path, std::ios::binary | std::ios::trunc);
+    if (!out.is_open()) {
+        std::cerr << "Error! Unable to open file " << path << "\n";
+        return false;
+    }
+    uint64_t size = size_, n_words = table_.size();
+    out.write(reinterpret_cast<const char *>(&CUCKOO_MAGIC), sizeof(CUCKOO_MAGIC));
+    out.write(reinterpret_cast<const char *>(&CUCKOO_VERSION), sizeof(CUCKOO_VERSION));
+    out.write(reinterpret_cast<const char *>(&fingerprint_bits_), sizeof(fingerprint_bits_));
+    out.write(reinterpret_cast<const char *>(&value_bits_), sizeof(value_bits_));
+    out.write(reinterpret_cast<const char *>(&num_dense_nodes), sizeof(num_dense_nodes));
+    out.write(reinterpret_cast<const char *>(&scale_), sizeof(scale_));
+    out.write(reinterpret_cast<const char *>(&num_buckets_), sizeof(num_buckets_));
+    out.write(reinterpret_cast<const char *>(&size), sizeof(size));
+    out.write(reinterpret_cast<const char *>(&n_words), sizeof(n_words));
+    out.write(reinterpret_cast<const char *>(table_.data()), (std::streamsize) (n_words * sizeof(uint64_t)));
+    return (bool) out;
+}
+
+/**
+ * Read the oracle from a binary file written by save
+ * @param path
+ * @return true if the oracle was read
+ */
+bool CuckooEdgeOracle::load(const std::string &path) {
+    std::ifstream in(path, std::ios::binary);
+    if (!in.is_open()) {
+        std::cerr << "Error! Unable to open file " << path << "\n";
+        return false;
+    }
+    uint64_t magic = 0, size = 0, n_words = 0;
+    uint32_t version = 0;
+    in.read(reinterpret_cast<char *>(&magic), sizeof(magic));
+    in.read(reinterpret_cast<char *>(&version), sizeof(version));
+    if (!in or magic != CUCKOO_MAGIC or version != CUCKOO_VERSION) {
+        std::cerr << "Error! " << path << " is not a cuckoo edge oracle\n";
+        return false;
+    }
+    in.read(reinterpret_cast<char *>(&fingerprint_bits_), sizeof(fingerprint_bits_));
+    in.read(reinterpret_cast<char *>(&value_bits_), sizeof(value_bits_));
+    in.read(reinterpret_cast<char *>(&num_dense_nodes_), sizeof(num_dense_nodes_));
+    in.read(reinterpret_cast<char *>(&scale_), sizeof(scale_));
+    in.read(reinterpret_cast<char *>(&num_buckets_), sizeof(num_buckets_));
+    in.read(reinterpret_cast<char *>(&size), sizeof(size));
+    in.read(reinterpret_cast<char *>(&n_words), sizeof(n_words));
+    slot_bits_ = fingerprint_bits_ + value_bits_;
+    if (!in or slot_bits_ > 32 or n_words != (num_buckets_ * BUCKET_SIZE * slot_bits_ + 63) / 64 + 1) {
+        std::cerr << "Error! Corrupted cuckoo edge oracle " << path << "\n";
+        return false;
+    }
+    table_.resize(n_words);
+    in.read(reinterpret_cast<char *>(table_.data()), (std::streamsize) (n_words * sizeof(uint64_t)));
+    if (!in) {
+        std::cerr << "Error! Corrupted cuckoo edge oracle " << path << "\n";
+        return false;
+    }
+    size_ = size;
+    compute_levels();
+    return true;
+}
@@ -0,0 +1,298 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Dataset_Cache.h"
+#include <climits>
+#include <cstdlib>
+#include <cstring>
+#include <filesystem>
+#include <iostream>
+#include <vector>
+#include <fcntl.h>
+#include <sys/file.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+namespace {
+
+    // -- header of a cache file, padded to DatasetCache::HEADER_SIZE bytes
+    struct CacheHeader {
+        uint64_t magic;
+        uint32_t version;
+        uint32_t record_size;
+        uint64_t n_edges;
+        uint64_t source_size;
+        int64_t source_mtime;
+    };
+
+    /**
+     * FNV-1a hash of a string
+     * @param data
+     * @return 64-bit hash
+     */
+    uint64_t fnv1a(const std::string &data) {
+        uint64_t hash = 0xCBF29CE484222325ULL;
+        for (unsigned char c: data) {
+            hash ^= c;
+            hash *= 0x100000001B3ULL;
+        }
+        return hash;
+    }
+
+    /**
+     * Size and modification time (ns since epoch) of a file
+     * @param path
+     * @param size
+     * @param mtime
+     * @return false if the file does not exist
+     */
+    bool file_identity(const std::string &path, uint64_t &size, int64_t &mtime) {
+        struct stat st{};
+        if (stat(path.c_str(), &st) != 0) return false;
+        size = (uint64_t) st.st_size;
+        mtime = (int64_t) st.st_mtim.tv_sec * 1000000000LL + (int64_t) st.st_mtim.tv_nsec;
+        return true;
+    }
+
+}
+
+/**
+ * Folder of the dataset caches: the value of --dataset-cache=<dir>, /dev/shm for --dataset-cache without value, or
+ * the environment variable TONIC_DATASET_CACHE
+ * @param flag_value value of the flag, empty if not given
+ * @return the folder, empty if the cache is disabled
+ */
+std::string DatasetCache::cache_dir(const std::string &flag_value) {
+    if (flag_value == "1") return "/dev/shm";
+    if (!flag_value.empty()) return flag_value;
+    const char *env = std::getenv("TONIC_DATASET_CACHE");
+    return env != nullptr ? std::string(env) : std::string();
+}
+
+/**
+ * Path of the cache file of a stream
+ * @param dataset_path
+ * @param dir folder of the caches
+ * @return <dir>/tonic-<file name>-<key>.edges, empty if the stream does not exist
+ */
+std::string DatasetCache::cache_path(const std::string &dataset_path, const std::string &dir) {
+    uint64_t size;
+    int64_t mtime;
+    if (!file_identity(dataset_path, size, mtime)) return "";
+    std::string real_path = std::filesystem::weakly_canonical(dataset_path).string();
+    char key[17];
+    snprintf(key, sizeof(key), "%016llx", (unsigned long long) fnv1a(
+            real_path + '\0' + std::to_string(size) + '\0' + std::to_string(mtime)));
+    return (std::filesystem::path(dir) /
+            ("tonic-" + std::filesystem::path(dataset_path).filename().string() + "-" + key + ".edges")).string();
+}
+
+/**
+ * Attach to the cache of a stream, decoding the stream first if no other run did it. Concurrent runs decode a stream
+ * only once: the first one holds an exclusive lock on <cache>.lock while writing the cache
+ * @param dataset_path
+ * @param dir folder of the caches
+ * @return the mapped cache, nullptr on error
+ */
+std::unique_ptr<DatasetCache> DatasetCache::attach(const std::string &dataset_path, const std::string &dir) {
+    uint64_t size;
+    int64_t mtime;
+    if (!file_identity(dataset_path, size, mtime)) {
+        std::cerr << "Error! Unable to open file " << dataset_path << "\n";
+        return nullptr;
+    }
+    std::string path = cache_path(dataset_path, dir);
+    std::unique_ptr<DatasetCache> cache(new DatasetCache());
+    if (cache->map(path, size, mtime)) return cache;
+
+    std::filesystem::create_directories(dir);
+    std::string lock_path = path + ".lock";
+    int lock_fd = ::open(lock_path.c_str(), O_RDWR | O_CREAT, 0644);
+    if (lock_fd < 0 or flock(lock_fd, LOCK_EX) != 0) {
+        std::cerr << "Error! Unable to lock " << lock_path << "\n";
+        if (lock_fd >= 0) ::close(lock_fd);
+        return nullptr;
+    }
+    // -- another run may have written the cache while this one was waiting for the lock
+    bool ok = cache->map(path, size, mtime) or (build(dataset_path, path, size, mtime) and
+                                                 cache->map(path, size, mtime));
+    flock(lock_fd, LOCK_UN);
+    ::close(lock_fd);
+    if (!ok) {
+        std::cerr << "Error! Unable to create the dataset cache " << path << "\n";
+        return nullptr;
+    }
+    return cache;
+}
+
+/**
+ * Decode a stream into a cache file, written to a temporary file and renamed, so that a cache file is always
+ * complete
+ * @param dataset_path
+ * @param path of the cache file
+ * @param source_size size of the stream
+ * @param source_mtime modification time of the stream
+ * @return true if the cache was written
+ */
+bool DatasetCache::build(const std::string &dataset_path, const std::string &path, uint64_t source_size,
+                         int64_t source_mtime) {
+    InputFile file(dataset_path);
+    std::string tmp_path = path + ".tmp" + std::to_string(getpid());
+    std::ofstream out(tmp_path, std::ios::binary | std::ios::trunc);
+    if (!file.is_open() or !out.is_open()) return false;
+
+    char header[HEADER_SIZE] = {};
+    out.write(header, HEADER_SIZE);
+
+    // -- records are written in blocks
+    std::vector<CachedEdge> block;
+    block.reserve(1 << 16);
+    std::string line;
+    uint64_t n_edges = 0;
+    long n_line = 0;
+    while (std::getline(file, line)) {
+        n_line++;
+        if (line.empty()) continue;
+        CachedEdge edge{};
+        if (!EdgeReader::parse(line, edge.u, edge.v, edge.t, edge.sign)) {
+            std::cerr << "Error! Malformed edge at line " << n_line << " of " << dataset_path << ": \"" << line
+                      << "\", expected \"u v t [sign]\"\n";
+            out.close();
+            std::remove(tmp_path.c_str());
+            return false;
+        }
+        block.push_back(edge);
+        if (block.size() == block.capacity()) {
+            out.write(reinterpret_cast<const char *>(block.data()), (std::streamsize) (block.size() * sizeof(CachedEdge)));
+            n_edges += block.size();
+            block.clear();
+        }
+    }
+    if (file.failed()) {
+        std::cerr << "Error! Unable to read file " << dataset_path << " to the end\n";
+        out.close();
+        std::remove(tmp_path.c_str());
+        return false;
+    }
+    out.write(reinterpret_cast<const char *>(block.data()), (std::streamsize) (block.size() * sizeof(CachedEdge)));
+    n_edges += block.size();
+
+    CacheHeader cache_header = {MAGIC, VERSION, (uint32_t) sizeof(CachedEdge), n_edges, source_size, source_mtime};
+    std::memcpy(header, &cache_header, sizeof(cache_header));
+    out.seekp(0);
+    out.write(header, HEADER_SIZE);
+    out.close();
+    if (!out or std::rename(tmp_path.c_str(), path.c_str()) != 0) {
+        std::remove(tmp_path.c_str());
+        return false;
+    }
+    printf("Dataset cache written to %s: %lu edges\n", path.c_str(), (unsigned long) n_edges);
+    return true;
+}
+
+/**
+ * Map a cache file, checking that it is the cache of the current version of the stream
+ * @param path of the cache file
+ * @param source_size size of the stream
+ * @param source_mtime modification time of the stream
+ * @return false if the file does not exist or does not match the stream
+ */
+bool DatasetCache::map(const std::string &path, uint64_t source_size, int64_t source_mtime) {
+    int fd = ::open(path.c_str(), O_RDONLY);
+    if (fd < 0) return false;
+    struct stat st{};
+    if (fstat(fd, &st) != 0 or (size_t) st.st_size < HEADER_SIZE) {
+        ::close(fd);
+        return false;
+    }
+    void *data = mmap(nullptr, (size_t) st.st_size, PROT_READ, MAP_SHARED, fd, 0);
+    ::close(fd);
+    if (data == MAP_FAILED) return false;
+
+    CacheHeader header{};
+    std::memcpy(&header, data, sizeof(header));
+    if (header.magic != MAGIC or header.version != VERSION or header.record_size != sizeof(CachedEdge) or
+        header.source_size != source_size or header.source_mtime != source_mtime or
+        HEADER_SIZE + header.n_edges * sizeof(CachedEdge) != (size_t) st.st_size) {
+        munmap(data, (size_t) st.st_size);
+        return false;
+    }
+    path_ = path;
+    data_ = data;
+    data_size_ = (size_t) st.st_size;
+    edges_ = reinterpret_cast<const CachedEdge *>(static_cast<const char *>(data) + HEADER_SIZE);
+    n_edges_ = header.n_edges;
+    return true;
+}
+
+/**
+ * Destructor for DatasetCache, unmaps the cache file (which stays available for the other runs)
+ */
+DatasetCache::~DatasetCache() {
+    if (data_ != nullptr) munmap(data_, data_size_);
+}
+
+/**
+ * Constructor for EdgeReader
+ * @param dataset_path path of the text stream, read if cache is nullptr
+ * @param cache decoded stream, nullptr to parse the text stream
+ */
+EdgeReader::EdgeReader(const std::string &dataset_path, const DatasetCache *cache) :
+        cache_(cache), dataset_path_(dataset_path) {
+    if (cache_ == nullptr) file_.open(dataset_path);
+}
+
+/**
+ * Report the malformed line just read, the stream then ends there and failed() is true
+ */
+void EdgeReader::report_malformed() {
+    malformed_ = true;
+    std::cerr << "Error! Malformed edge " << line_ << " of " << dataset_path_ << ": \"" << line_buffer_
+              << "\", expected \"u v t [sign]\"\n";
+}
+
+/**
+ * Move the reader to a position of the stream, given by a byte offset of the text stream or by a number of edges
+ * @param offset byte offset of the next edge, UNKNOWN_OFFSET to skip line edges
+ * @param line number of edges before the position
+ */
+void EdgeReader::seek(unsigned long long offset, long line) {
+    if (cache_ != nullptr) {
+        line_ = line;
+        return;
+    }
+    if (offset != UNKNOWN_OFFSET) {
+        file_.seekg((std::streamoff) offset);
+        offset_ = offset;
+        line_ = line;
+        return;
+    }
+    int u, v, t, sign;
+    while (line_ < line and next(u, v, t, sign));
+}
+
+/**
+ * Parse a line "u v t [sign]" of a stream, sign is + (default) or -
+ * @param line
+ * @param u
+ * @param v
+ * @param t
+ * @param sign +1 or -1
+ * @return false if u, v or t is missing or is not an int
+ */
+bool EdgeReader::parse(const std::string &line, int &u, int &v, int &t, int &sign) {
+    const char *p = line.c_str();
+    char *end;
+    int *fields[3] = {&u, &v, &t};
+    for (int *field: fields) {
+        long value = std::strtol(p, &end, 10);
+        if (end == p or value < INT_MIN or value > INT_MAX) return false;
+        *field = (int) value;
+        p = end;
+    }
+    while (*end == ' ' or *end == '\t') end++;
+    sign = *end == '-' ? -1 : 1;
+    return true;
+}
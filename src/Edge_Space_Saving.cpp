@@ -0,0 +1,98 @@
+#include "Edge_Space_Saving.h"
+#include <algorithm>
+
+/**
+ * Constructor for EdgeSpaceSaving
+ * @param capacity maximum number of tracked edges
+ * @param seed random seed used for probabilistic replacement
+ */
+EdgeSpaceSaving::EdgeSpaceSaving(int capacity, int seed)
+    : capacity_(capacity), gen_(seed) {
+    heap_.reserve(capacity);
+    edge_to_index_.reserve(capacity);
+}
+
+/**
+ * Add a weight to the total of an edge.
+ * If the edge is not tracked and the heap is full, the weight goes to the lightest edge, which may be replaced.
+ * @param edge edge id
+ * @param weight
+ */
+void EdgeSpaceSaving::update(long edge, double weight) {
+    auto it = edge_to_index_.find(edge);
+    if (it != edge_to_index_.end()) {
+        int i = it->second;
+        heap_[i].weight += weight;
+        sift_down(i);
+    } else if (size_ < capacity_) {
+        heap_.push_back({edge, weight});
+        edge_to_index_.insert_unique(edge, size_);
+        sift_up(size_++);
+    } else {
+        HeapEntry &lightest = heap_[0];
+        lightest.weight += weight;
+        if (gen_.next_double() < weight / lightest.weight) {
+            edge_to_index_.erase(lightest.edge);
+            lightest.edge = edge;
+            edge_to_index_.insert_unique(edge, 0);
+        }
+        sift_down(0);
+    }
+}
+
+/**
+ * Return the top-n edges with the largest estimated weight
+ * @param n number of edges to return
+ * @return the edges sorted by decreasing weight
+ */
+std::vector<EdgeSpaceSaving::HeapEntry> EdgeSpaceSaving::top_n(int n) const {
+    std::vector<HeapEntry> top(heap_);
+    n = std::min(n, size_);
+    std::partial_sort(
+        top.begin(), top.begin() + n, top.end(),
+        [](const HeapEntry &a, const HeapEntry &b) {
+            return a.weight > b.weight;
+        });
+    top.resize(n);
+    return top;
+}
+
+/**
+ * Swap two entries of the heap and update their indices
+ * @param i
+ * @param j
+ */
+void EdgeSpaceSaving::swap_entries(int i, int j) {
+    std::swap(heap_[i], heap_[j]);
+    edge_to_index_[heap_[i].edge] = i;
+    edge_to_index_[heap_[j].edge] = j;
+}
+
+/**
+ * Move an entry up until its parent is lighter
+ * @param i index of the entry
+ */
+void EdgeSpaceSaving::sift_up(int i) {
+    while (i > 0) {
+        int parent = (i - 1) / 2;
+        if (heap_[parent].weight <= heap_[i].weight) break;
+        swap_entries(i, parent);
+        i = parent;
+    }
+}
+
+/**
+ * Move an entry down until its children are heavier
+ * @param i index of the entry
+ */
+void EdgeSpaceSaving::sift_down(int i) {
+    while (true) {
+        int smallest = i;
+        int l = 2 * i + 1, r = 2 * i + 2;
+        if (l < size_ and heap_[l].weight < heap_[smallest].weight) smallest = l;
+        if (r < size_ and heap_[r].weight < heap_[smallest].weight) smallest = r;
+        if (smallest == i) break;
+        swap_entries(i, smallest);
+        i = smallest;
+    }
+}
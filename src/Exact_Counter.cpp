@@ -0,0 +1,71 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Exact_Counter.h"
+
+/**
+ * Number of common neighbors of u and v, scanning the smaller neighborhood
+ * @param u
+ * @param v
+ * @return the number of triangles closed by the edge (u, v)
+ */
+long ExactCounter::count_common_neighbors(const int u, const int v) const {
+    auto it_u = graph_.find(u);
+    auto it_v = graph_.find(v);
+    if (it_u == graph_.end() or it_v == graph_.end()) return 0;
+    const emhash8::HashSet<int> &n_min = it_u->second.size() < it_v->second.size() ? it_u->second : it_v->second;
+    const emhash8::HashSet<int> &n_max = it_u->second.size() < it_v->second.size() ? it_v->second : it_u->second;
+    long common = 0;
+    for (const int neigh: n_min) {
+        if (n_max.contains(neigh)) common++;
+    }
+    return common;
+}
+
+/**
+ * Insert the edge (u, v) of an insertion-only stream: self-loops and edges already in the graph are skipped
+ * @param u
+ * @param v
+ */
+void ExactCounter::process_edge(const int u, const int v) {
+    if (u == v) return;
+    emhash8::HashSet<int> &neighbors_u = graph_[u];
+    if (neighbors_u.contains(v)) return;
+    total_T_ += count_common_neighbors(u, v);
+    neighbors_u.insert(v);
+    graph_[v].insert(u);
+    num_edges_++;
+}
+
+/**
+ * Insert or delete the edge (u, v) of a fully-dynamic stream. As in Utils::run_exact_algorithm_FD, the triangles
+ * closed by the edge are added (sign > 0) or removed (sign < 0) in any case, and the graph changes only if the edge is
+ * missing (insertion) or present (deletion)
+ * @param u
+ * @param v
+ * @param sign +1 for an insertion, -1 for a deletion
+ */
+void ExactCounter::process_edge(const int u, const int v, const int sign) {
+    long common = count_common_neighbors(u, v);
+    auto it_u = graph_.find(u);
+    bool present = it_u != graph_.end() and it_u->second.contains(v);
+    if (sign < 0) {
+        total_T_ -= common;
+        if (present) {
+            num_edges_--;
+            it_u->second.erase(v);
+            if (it_u->second.empty()) graph_.erase(u);
+            auto it_v = graph_.find(v);
+            it_v->second.erase(u);
+            if (it_v->second.empty()) graph_.erase(v);
+        }
+    } else {
+        total_T_ += common;
+        if (!present) {
+            num_edges_++;
+            graph_[u].insert(v);
+            graph_[v].insert(u);
+        }
+    }
+}
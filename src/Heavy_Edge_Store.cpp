@@ -0,0 +1,159 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Heavy_Edge_Store.h"
+
+/**
+ * Constructor for HeavyEdgeStore
+ * @param capacity maximum number of edges, reserved for the edge index
+ * @param index_edges true to allow erase() and contains()
+ */
+HeavyEdgeStore::HeavyEdgeStore(size_t capacity, bool index_edges) : index_edges_(index_edges) {
+    if (index_edges_) slots_.reserve(capacity);
+}
+
+/**
+ * Make room for the bucket key, key < DIRECT_KEYS
+ * @param key
+ */
+void HeavyEdgeStore::grow(size_t key) {
+    size_t n = std::min(DIRECT_KEYS, std::max(key + 1, 2 * buckets_.size()));
+    buckets_.resize(n);
+    non_empty_.resize((n + 63) / 64, 0);
+}
+
+/**
+ * Bucket of a key, the bucket must exist
+ * @param key
+ * @return the bucket
+ */
+std::vector<Edge> &HeavyEdgeStore::bucket_at(size_t key) {
+    return key < DIRECT_KEYS ? buckets_[key] : overflow_.find(key)->second;
+}
+
+/**
+ * Add an edge
+ * @param edge
+ * @param heaviness
+ */
+void HeavyEdgeStore::push(const Edge &edge, int heaviness) {
+    size_t key = key_of(heaviness);
+    if (key < DIRECT_KEYS and key >= buckets_.size()) grow(key);
+    std::vector<Edge> &bucket = key < DIRECT_KEYS ? buckets_[key] : overflow_[key];
+    if (index_edges_) {
+        slots_.insert_unique((long) Utils::edge_to_id(edge.first, edge.second),
+                             Slot{(uint32_t) key, (uint32_t) bucket.size()});
+    }
+    bucket.push_back(edge);
+    if (key < DIRECT_KEYS) non_empty_[key >> 6] |= 1ULL << (key & 63);
+    if (size_ == 0 or key < min_key_) min_key_ = key;
+    size_++;
+}
+
+/**
+ * Replace one of the lightest edges, drawn uniformly at random among the ties, with a new edge
+ * @param edge the new edge
+ * @param heaviness of the new edge
+ * @param gen
+ * @return the evicted edge
+ */
+Edge HeavyEdgeStore::replace_min(const Edge &edge, int heaviness, Xoshiro256 &gen) {
+    std::vector<Edge> &bucket = bucket_at(min_key_);
+    size_t pos = bucket.size() == 1 ? 0 : (size_t) gen.next_int(bucket.size());
+    Edge evicted = bucket[pos];
+    if (index_edges_) slots_.erase((long) Utils::edge_to_id(evicted.first, evicted.second));
+    remove_at(min_key_, pos);
+    push(edge, heaviness);
+    return evicted;
+}
+
+/**
+ * Remove an edge, the store must index the edges
+ * @param edge
+ * @return false if the edge is not in the store
+ */
+bool HeavyEdgeStore::erase(const Edge &edge) {
+    auto it = slots_.find((long) Utils::edge_to_id(edge.first, edge.second));
+    if (it == slots_.end()) return false;
+    Slot slot = it->second;
+    slots_.erase(it);
+    remove_at(slot.key, slot.pos);
+    return true;
+}
+
+/**
+ * Check if an edge is in the store, the store must index the edges
+ * @param edge
+ * @return true if the edge is in the store
+ */
+bool HeavyEdgeStore::contains(const Edge &edge) const {
+    return slots_.find((long) Utils::edge_to_id(edge.first, edge.second)) != slots_.end();
+}
+
+/**
+ * Remove the edge at a position of a bucket, moving the last edge of the bucket in its place
+ * @param key bucket
+ * @param pos position in the bucket
+ */
+void HeavyEdgeStore::remove_at(size_t key, size_t pos) {
+    std::vector<Edge> &bucket = bucket_at(key);
+    if (pos + 1 != bucket.size()) {
+        bucket[pos] = bucket.back();
+        if (index_edges_) {
+            slots_[(long) Utils::edge_to_id(bucket[pos].first, bucket[pos].second)].pos = (uint32_t) pos;
+        }
+    }
+    bucket.pop_back();
+    size_--;
+    if (bucket.empty()) {
+        if (key < DIRECT_KEYS) non_empty_[key >> 6] &= ~(1ULL << (key & 63));
+        else overflow_.erase(key);
+        if (key == min_key_ and size_ > 0) min_key_ = next_non_empty(key);
+    }
+}
+
+/**
+ * Find the first non-empty bucket after key, the store must not be empty
+ * @param key
+ * @return the bucket
+ */
+size_t HeavyEdgeStore::next_non_empty(size_t key) const {
+    size_t word = key >> 6;
+    if (word < non_empty_.size()) {
+        uint64_t bits = non_empty_[word] & (~0ULL << (key & 63));
+        while (bits == 0 and ++word < non_empty_.size()) bits = non_empty_[word];
+        if (bits != 0) return (word << 6) + __builtin_ctzll(bits);
+    }
+    // -- the overflow buckets hold no empty bucket and no key below DIRECT_KEYS
+    return overflow_.lower_bound(key)->first;
+}
+
+/**
+ * Copy the edges and their heaviness
+ * @param edges
+ */
+void HeavyEdgeStore::get_edges(std::vector<Heavy_edge> &edges) const {
+    edges.clear();
+    edges.reserve(size_);
+    for (size_t key = 0; key < buckets_.size(); key++) {
+        for (const Edge &edge: buckets_[key]) edges.push_back({edge, (int) (key - 1)});
+    }
+    for (const auto &bucket: overflow_) {
+        for (const Edge &edge: bucket.second) edges.push_back({edge, (int) (bucket.first - 1)});
+    }
+}
+
+/**
+ * Memory taken by the store
+ * @return size of the buckets, the bitmap and the edge index in bytes
+ */
+size_t HeavyEdgeStore::memory_bytes() const {
+    size_t bytes = buckets_.size() * sizeof(std::vector<Edge>) + non_empty_.size() * sizeof(uint64_t);
+    for (const auto &bucket: buckets_) bytes += bucket.capacity() * sizeof(Edge);
+    // -- red-black tree node: three pointers and the color, then the key and the bucket
+    for (const auto &bucket: overflow_) {
+        bytes += 4 * sizeof(void *) + sizeof(bucket) + bucket.second.capacity() * sizeof(Edge);
+    }
+    return bytes + (index_edges_ ? Utils::oracle_memory_bytes(slots_) : 0);
+}
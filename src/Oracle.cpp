@@ -0,0 +1,91 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Oracle.h"
+
+/**
+ * Constructor for BlockedBloomFilter
+ * @param num_keys expected number of keys, the filter takes ~BITS_PER_KEY bits per key (at least two words)
+ */
+BlockedBloomFilter::BlockedBloomFilter(size_t num_keys) {
+    size_t num_words = 2;
+    while (num_words * 64 < num_keys * BITS_PER_KEY) num_words <<= 1;
+    words_.assign(num_words, 0);
+    word_mask_ = num_words - 1;
+}
+
+/**
+ * Add a key to the filter
+ * @param key
+ */
+void BlockedBloomFilter::insert(uint64_t key) {
+    uint64_t h = mix(key);
+    words_[(h >> 32) & word_mask_] |= mask_of(h);
+}
+
+/**
+ * Node oracle keyed by original node ids
+ * @param node_oracle node -> heaviness, moved into the oracle
+ */
+Oracle::Oracle(emhash5::HashMap<int, int> node_oracle) : type_(Type::NODES), node_oracle_(std::move(node_oracle)),
+                                                         filter_(node_oracle_.size()) {
+    for (const auto &it: node_oracle_) filter_.insert((uint64_t) (uint32_t) it.first);
+}
+
+/**
+ * Node oracle indexed by dense node ids (-1 for nodes not in the oracle)
+ * @param dense_node_oracle moved into the oracle
+ */
+Oracle::Oracle(std::vector<int> dense_node_oracle) : type_(Type::DENSE_NODES),
+                                                     dense_node_oracle_(std::move(dense_node_oracle)) {}
+
+/**
+ * Edge oracle keyed by edge ids
+ * @param edge_oracle edge id -> heaviness, moved into the oracle
+ */
+Oracle::Oracle(emhash5::HashMap<long, int> edge_oracle) : type_(Type::EDGES), edge_oracle_(std::move(edge_oracle)),
+                                                          filter_(edge_oracle_.size()) {
+    for (const auto &it: edge_oracle_) filter_.insert((uint64_t) it.first);
+}
+
+/**
+ * Compact cuckoo edge oracle
+ * @param cuckoo_oracle moved into the oracle
+ */
+Oracle::Oracle(CuckooEdgeOracle cuckoo_oracle) : type_(Type::CUCKOO), cuckoo_oracle_(std::move(cuckoo_oracle)) {}
+
+/**
+ * Number of entries of the oracle
+ * @return nodes or edges with a heaviness
+ */
+size_t Oracle::size() const {
+    switch (type_) {
+        case Type::CUCKOO:
+            return cuckoo_oracle_.size();
+        case Type::EDGES:
+            return edge_oracle_.size();
+        case Type::DENSE_NODES:
+            return (size_t) std::count_if(dense_node_oracle_.begin(), dense_node_oracle_.end(),
+                                          [](int heaviness) { return heaviness > -1; });
+        default:
+            return node_oracle_.size();
+    }
+}
+
+/**
+ * Memory taken by the oracle
+ * @return size of the lookup structure and of its prefilter in bytes
+ */
+size_t Oracle::memory_bytes() const {
+    switch (type_) {
+        case Type::CUCKOO:
+            return cuckoo_oracle_.memory_bytes();
+        case Type::EDGES:
+            return Utils::oracle_memory_bytes(edge_oracle_) + filter_.memory_bytes();
+        case Type::DENSE_NODES:
+            return dense_node_oracle_.size() * sizeof(int);
+        default:
+            return Utils::oracle_memory_bytes(node_oracle_) + filter_.memory_bytes();
+    }
+}
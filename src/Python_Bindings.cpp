@@ -0,0 +1,295 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Tonic.h"
+#include "Tonic_FD.h"
+#include "Utils.h"
+#include <pybind11/pybind11.h>
+#include <pybind11/numpy.h>
+#include <pybind11/stl.h>
+#include <climits>
+#include <optional>
+#include <string>
+#include <vector>
+
+namespace py = pybind11;
+using namespace pybind11::literals;
+
+// -- 1-D int32 arrays, converted (copied) by int_array if the integer dtype or the strides differ
+using IntArray = py::array_t<int, py::array::c_style | py::array::forcecast>;
+
+namespace {
+
+    /**
+     * Tonic or Tonic_FD instance driven from Python, with the state needed to validate and timestamp the batches
+     */
+    template<typename Algo>
+    struct Instance : Algo {
+        using Algo::Algo;
+        // -- node ids of the batches must be in [0, num_dense_nodes) if > 0
+        int num_dense_nodes = 0;
+        // -- default timestamp of the next edge
+        long t = 0;
+    };
+
+    /**
+     * Convert an array of integers to int32, copying it if needed. Arrays of floats, booleans or objects are rejected
+     * rather than truncated, and so are values that do not fit in an int
+     * @param object array or sequence
+     * @param name of the argument, for the error messages
+     * @return the int32 array
+     */
+    IntArray int_array(const py::object &object, const char *name) {
+        py::array array = py::array::ensure(object);
+        if (!array) throw py::error_already_set();
+        if (array.size() > 0) {
+            char kind = array.dtype().kind();
+            if (kind != 'i' and kind != 'u') {
+                throw py::type_error(std::string(name) + " must be an array of integers, not " +
+                                     std::string(py::str(array.dtype())));
+            }
+            if (kind == 'u' and array.itemsize() >= 4) {
+                auto wide = py::array_t<unsigned long long, py::array::c_style | py::array::forcecast>::ensure(array);
+                for (py::ssize_t i = 0; i < wide.size(); i++) {
+                    if (wide.data()[i] > INT_MAX) throw py::value_error(std::string(name) + " has values out of int range");
+                }
+            } else if (array.itemsize() > 4) {
+                auto wide = py::array_t<long long, py::array::c_style | py::array::forcecast>::ensure(array);
+                for (py::ssize_t i = 0; i < wide.size(); i++) {
+                    if (wide.data()[i] < INT_MIN or wide.data()[i] > INT_MAX) {
+                        throw py::value_error(std::string(name) + " has values out of int range");
+                    }
+                }
+            }
+        }
+        IntArray converted = IntArray::ensure(array);
+        if (!converted) throw py::error_already_set();
+        return converted;
+    }
+
+    /**
+     * Check that the arrays of a batch are 1-D and have the same length
+     * @param arrays
+     * @return the length of the arrays
+     */
+    py::ssize_t batch_size(std::initializer_list<const IntArray *> arrays) {
+        py::ssize_t n = -1;
+        for (const IntArray *array: arrays) {
+            if (array->ndim() != 1) throw py::value_error("Arrays must be 1-D");
+            if (n >= 0 and array->shape(0) != n) throw py::value_error("Arrays must have the same length");
+            n = array->shape(0);
+        }
+        return n;
+    }
+
+    /**
+     * Check that the node ids of a batch are in [0, num_dense_nodes) when the instance uses dense node ids
+     * @param nodes
+     * @param n
+     * @param num_dense_nodes
+     */
+    void check_dense_ids(const int *nodes, py::ssize_t n, int num_dense_nodes) {
+        if (num_dense_nodes == 0) return;
+        for (py::ssize_t i = 0; i < n; i++) {
+            if (nodes[i] < 0 or nodes[i] >= num_dense_nodes) {
+                throw py::value_error("Node id " + std::to_string(nodes[i]) + " is not in [0, " +
+                                      std::to_string(num_dense_nodes) + ")");
+            }
+        }
+    }
+
+    /**
+     * Build a node oracle from two arrays
+     * @param nodes
+     * @param heaviness
+     * @return oracle node -> heaviness
+     */
+    std::shared_ptr<Oracle> node_oracle_from(const py::object &node_array, const py::object &heaviness_array) {
+        IntArray nodes = int_array(node_array, "nodes"), heaviness = int_array(heaviness_array, "heaviness");
+        py::ssize_t n = batch_size({&nodes, &heaviness});
+        emhash5::HashMap<int, int> node_oracle;
+        node_oracle.reserve(n);
+        const int *node = nodes.data(), *h = heaviness.data();
+        for (py::ssize_t i = 0; i < n; i++) node_oracle[node[i]] = h[i];
+        return std::make_shared<Oracle>(std::move(node_oracle));
+    }
+
+    /**
+     * Build a node oracle indexed by dense node ids from an array
+     * @param heaviness
+     * @return oracle dense node id -> heaviness
+     */
+    std::shared_ptr<Oracle> dense_node_oracle_from(const py::object &heaviness_array) {
+        IntArray heaviness = int_array(heaviness_array, "heaviness");
+        if (heaviness.ndim() != 1 or heaviness.shape(0) == 0)
+            throw py::value_error("The dense node oracle must be a non-empty 1-D array");
+        return std::make_shared<Oracle>(std::vector<int>(heaviness.data(), heaviness.data() + heaviness.shape(0)));
+    }
+
+    /**
+     * Build an edge oracle from three arrays
+     * @param us
+     * @param vs
+     * @param heaviness
+     * @return oracle edge id -> heaviness
+     */
+    std::shared_ptr<Oracle> edge_oracle_from(const py::object &u_array, const py::object &v_array,
+                                             const py::object &heaviness_array) {
+        IntArray us = int_array(u_array, "u"), vs = int_array(v_array, "v");
+        IntArray heaviness = int_array(heaviness_array, "heaviness");
+        py::ssize_t n = batch_size({&us, &vs, &heaviness});
+        emhash5::HashMap<long, int> edge_oracle;
+        edge_oracle.reserve(n);
+        const int *u = us.data(), *v = vs.data(), *h = heaviness.data();
+        for (py::ssize_t i = 0; i < n; i++) edge_oracle[(long) Utils::edge_to_id(u[i], v[i])] = h[i];
+        return std::make_shared<Oracle>(std::move(edge_oracle));
+    }
+
+    /**
+     * Set the oracle of an instance, switching it to dense node ids for a node oracle indexed by dense node ids
+     * @param algo Tonic or Tonic_FD
+     * @param oracle shared with the other instances
+     */
+    template<typename Algo>
+    void set_oracle(Instance<Algo> &algo, std::shared_ptr<Oracle> oracle) {
+        if (oracle->num_dense_nodes() > 0) {
+            algo.set_dense_nodes(oracle->num_dense_nodes());
+            algo.num_dense_nodes = oracle->num_dense_nodes();
+        }
+        algo.set_oracle(std::move(oracle));
+    }
+
+    /**
+     * Local triangle estimates of the nodes with at least one triangle
+     * @param algo Tonic or Tonic_FD
+     * @return (nodes, estimates) arrays
+     */
+    template<typename Algo>
+    py::tuple local_triangles(const Algo &algo) {
+        std::vector<int> nodes;
+        algo.get_local_nodes(nodes);
+        IntArray node_array((py::ssize_t) nodes.size());
+        py::array_t<double> count_array((py::ssize_t) nodes.size());
+        int *node = node_array.mutable_data();
+        double *count = count_array.mutable_data();
+        for (size_t i = 0; i < nodes.size(); i++) {
+            node[i] = nodes[i];
+            count[i] = algo.get_local_triangles(nodes[i]);
+        }
+        return py::make_tuple(node_array, count_array);
+    }
+
+    /**
+     * Bind the methods shared by Tonic and Tonic_FD
+     * @param cls
+     */
+    template<typename Algo>
+    void bind_common(py::class_<Instance<Algo>> &cls) {
+        cls.def("set_oracle", &set_oracle<Algo>, "oracle"_a,
+                "Set an Oracle, shared (not copied) with the other instances using it. An oracle built by "
+                "Oracle.dense_nodes switches the instance to dense node ids, so it must be set before processing edges")
+           .def("set_node_oracle", [](Instance<Algo> &algo, const py::object &nodes, const py::object &heaviness) {
+                    set_oracle(algo, node_oracle_from(nodes, heaviness));
+                }, "nodes"_a, "heaviness"_a,
+                "Set the node oracle from two arrays: node ids and their heaviness")
+           .def("set_dense_node_oracle", [](Instance<Algo> &algo, const py::object &heaviness) {
+                    set_oracle(algo, dense_node_oracle_from(heaviness));
+                }, "heaviness"_a,
+                "Switch to dense node ids in [0, len(heaviness)) and set the node oracle indexed by node id "
+                "(-1 for nodes not in the oracle). Must be called before processing edges")
+           .def("set_edge_oracle", [](Instance<Algo> &algo, const py::object &us, const py::object &vs,
+                                      const py::object &heaviness) {
+                    set_oracle(algo, edge_oracle_from(us, vs, heaviness));
+                }, "u"_a, "v"_a, "heaviness"_a,
+                "Set the edge oracle from three arrays: endpoints of the edges and their heaviness")
+           .def_property_readonly("global_triangles", [](const Instance<Algo> &algo) { return algo.get_global_triangles(); },
+                                  "Estimate of the global triangle count")
+           .def("local_triangles", [](const Instance<Algo> &algo, int u) { return algo.get_local_triangles(u); }, "u"_a,
+                "Estimate of the local triangle count of node u")
+           .def("local_triangles", [](const Instance<Algo> &algo) { return local_triangles(algo); },
+                "Nodes with a non-zero local estimate and their estimates, as two arrays")
+           .def_property_readonly("num_nodes", [](const Instance<Algo> &algo) { return (long) algo.get_num_nodes(); },
+                                  "Nodes in the sampled subgraph")
+           .def_property_readonly("num_edges", [](const Instance<Algo> &algo) { return (long) algo.get_num_edges(); },
+                                  "Edges in the sampled subgraph")
+           .def_property_readonly("oracle_hits", [](const Instance<Algo> &algo) { return algo.get_oracle_hits(); })
+           .def_property_readonly("oracle_queries", [](const Instance<Algo> &algo) { return algo.get_oracle_queries(); })
+           .def_property_readonly("k", [](const Instance<Algo> &algo) { return algo.k_; })
+           .def_property_readonly("alpha", [](const Instance<Algo> &algo) { return algo.alpha_; })
+           .def_property_readonly("beta", [](const Instance<Algo> &algo) { return algo.beta_; })
+           .def_property_readonly("seed", [](const Instance<Algo> &algo) { return algo.random_seed_; });
+    }
+
+}
+
+PYBIND11_MODULE(pytonic, m) {
+    m.doc() = "Tonic triangle counting for insertion-only (Tonic) and fully-dynamic (TonicFD) streams";
+
+    py::class_<Oracle, std::shared_ptr<Oracle>>(m, "Oracle",
+            "Read-only node or edge oracle, built once and shared by any number of Tonic and TonicFD instances "
+            "(also from different threads) without copies")
+            .def_static("nodes", &node_oracle_from, "nodes"_a, "heaviness"_a,
+                        "Node oracle from two arrays: node ids and their heaviness")
+            .def_static("dense_nodes", &dense_node_oracle_from, "heaviness"_a,
+                        "Node oracle indexed by dense node ids in [0, len(heaviness)), -1 for nodes not in the oracle")
+            .def_static("edges", &edge_oracle_from, "u"_a, "v"_a, "heaviness"_a,
+                        "Edge oracle from three arrays: endpoints of the edges and their heaviness")
+            .def_static("cuckoo", [](const std::string &path) {
+                            CuckooEdgeOracle cuckoo_oracle;
+                            if (!cuckoo_oracle.load(path)) throw py::value_error("Unable to read " + path);
+                            return std::make_shared<Oracle>(std::move(cuckoo_oracle));
+                        }, "path"_a, "Compact edge oracle written by BuildOracle --cuckoo")
+            .def("lookup", &Oracle::lookup, "u"_a, "v"_a,
+                 "Heaviness of the edge (u, v), -1 if the edge (or one of the nodes) is not in the oracle")
+            .def_property_readonly("is_edge_oracle", &Oracle::is_edge_oracle)
+            .def("__len__", &Oracle::size)
+            .def_property_readonly("memory_bytes", &Oracle::memory_bytes);
+
+    py::class_<Instance<Tonic>> tonic(m, "Tonic");
+    tonic.def(py::init<int, long, double, double>(), "seed"_a, "k"_a, "alpha"_a, "beta"_a)
+         .def("process_edges", [](Instance<Tonic> &algo, const py::object &u_array, const py::object &v_array) {
+                  IntArray us = int_array(u_array, "u"), vs = int_array(v_array, "v");
+                  py::ssize_t n = batch_size({&us, &vs});
+                  const int *u = us.data(), *v = vs.data();
+                  check_dense_ids(u, n, algo.num_dense_nodes);
+                  check_dense_ids(v, n, algo.num_dense_nodes);
+                  // -- the arrays are owned by the caller, and stay alive for the whole call
+                  py::gil_scoped_release release;
+                  for (py::ssize_t i = 0; i < n; i++) {
+                      if (u[i] != v[i]) algo.process_edge(u[i], v[i]);
+                  }
+              }, "u"_a, "v"_a,
+              "Process a batch of insertions (u[i], v[i]), in order. Self loops are skipped. The GIL is released, "
+              "so different instances can process batches from different threads");
+    bind_common(tonic);
+
+    py::class_<Instance<Tonic_FD>> tonic_fd(m, "TonicFD");
+    tonic_fd.def(py::init<int, long, double, double>(), "seed"_a, "k"_a, "alpha"_a, "beta"_a)
+            .def("process_edges", [](Instance<Tonic_FD> &algo, const py::object &u_array, const py::object &v_array,
+                                     const std::optional<py::object> &sign_array,
+                                     const std::optional<py::object> &time_array) {
+                     IntArray us = int_array(u_array, "u"), vs = int_array(v_array, "v");
+                     std::optional<IntArray> signs, times;
+                     if (sign_array) signs = int_array(*sign_array, "sign");
+                     if (time_array) times = int_array(*time_array, "t");
+                     py::ssize_t n = batch_size({&us, &vs});
+                     if (signs) batch_size({&us, &*signs});
+                     if (times) batch_size({&us, &*times});
+                     const int *u = us.data(), *v = vs.data();
+                     const int *sign = signs ? signs->data() : nullptr, *t = times ? times->data() : nullptr;
+                     check_dense_ids(u, n, algo.num_dense_nodes);
+                     check_dense_ids(v, n, algo.num_dense_nodes);
+                     py::gil_scoped_release release;
+                     for (py::ssize_t i = 0; i < n; i++) {
+                         if (u[i] == v[i]) continue;
+                         algo.process_edge(u[i], v[i], t ? t[i] : (int) (algo.t + i),
+                                           sign == nullptr or sign[i] >= 0 ? 1 : -1);
+                     }
+                     algo.t += (long) n;
+                 }, "u"_a, "v"_a, "sign"_a = py::none(), "t"_a = py::none(),
+                 "Process a batch of insertions (sign[i] >= 0, default) and deletions (sign[i] < 0) of the edges "
+                 "(u[i], v[i]) with timestamps t[i] (default: position in the stream). Self loops are skipped. The "
+                 "GIL is released, so different instances can process batches from different threads");
+    bind_common(tonic_fd);
+}
@@ -0,0 +1,130 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Results_Store.h"
+#include <chrono>
+#include <cstdlib>
+#include <fcntl.h>
+#include <filesystem>
+#include <iostream>
+#include <memory>
+#include <sstream>
+#include <sys/file.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+namespace {
+
+    const char *SHARD_HEADER = "run_id,created_unix,algo,dataset,snapshot,seed,alpha,beta,memory_budget,"
+                               "oracle_type,oracle_path,oracle_size,oracle_time,estimate,time_s,oracle_bytes\n";
+
+    // -- quote a CSV field if needed
+    std::string csv_field(const std::string &value) {
+        if (value.find_first_of(",\"\n") == std::string::npos) return value;
+        std::string quoted = "\"";
+        for (char c: value) {
+            if (c == '"') quoted += '"';
+            quoted += c;
+        }
+        return quoted + "\"";
+    }
+
+    bool write_all(int fd, const std::string &data) {
+        size_t written = 0;
+        while (written < data.size()) {
+            ssize_t n = ::write(fd, data.data() + written, data.size() - written);
+            if (n < 0) return false;
+            written += (size_t) n;
+        }
+        return true;
+    }
+
+}
+
+/**
+ * Constructor for ResultsStore
+ * @param dir folder of the shards, created if missing
+ */
+ResultsStore::ResultsStore(const std::string &dir) {
+    std::filesystem::create_directories(dir);
+    char host[256] = "localhost";
+    gethostname(host, sizeof(host) - 1);
+    run_id_ = std::string(host) + "-" + std::to_string(getpid()) + "-" + std::to_string(
+            std::chrono::duration_cast<std::chrono::nanoseconds>(
+                    std::chrono::system_clock::now().time_since_epoch()).count());
+    shard_path_ = (std::filesystem::path(dir) /
+                   ("shard-" + std::string(host) + "-" + std::to_string(getpid()) + ".csv")).string();
+}
+
+/**
+ * Append a row to the shard of this process
+ * @param record
+ * @return true if the row is written
+ */
+bool ResultsStore::append(const ResultRecord &record) {
+    std::ostringstream row;
+    row.precision(15);
+    row << run_id_ << "," << std::chrono::duration_cast<std::chrono::seconds>(
+            std::chrono::system_clock::now().time_since_epoch()).count() << ","
+        << csv_field(record.algo) << "," << csv_field(record.dataset) << ","
+        << csv_field(std::filesystem::path(record.dataset).filename().string()) << ","
+        << record.seed << "," << record.alpha << "," << record.beta << "," << record.memory_budget << ","
+        << csv_field(record.oracle_type) << "," << csv_field(record.oracle_path) << "," << record.oracle_size << ","
+        << record.oracle_time << "," << record.estimate << "," << record.time << "," << record.oracle_bytes << "\n";
+    // -- a pid can be reused by a later run, so the shard is still appended under the lock
+    return append_locked(shard_path_, SHARD_HEADER, row.str());
+}
+
+/**
+ * Append a row to a CSV file shared by concurrent processes. The header is written only by the process that finds
+ * the file empty while holding an exclusive lock, and each row is written with a single append
+ * @param csv_path
+ * @param header written if the file is empty
+ * @param row
+ * @return true if the row is written
+ */
+bool ResultsStore::append_locked(const std::string &csv_path, const std::string &header, const std::string &row) {
+    int fd = ::open(csv_path.c_str(), O_WRONLY | O_APPEND | O_CREAT, 0644);
+    if (fd < 0) {
+        std::cerr << "Error! Could not open file " << csv_path << " for writing.\n";
+        return false;
+    }
+    flock(fd, LOCK_EX);
+    struct stat st{};
+    bool ok = fstat(fd, &st) == 0;
+    if (ok and st.st_size == 0) ok = write_all(fd, header);
+    ok = ok and write_all(fd, row);
+    flock(fd, LOCK_UN);
+    ::close(fd);
+    if (!ok) std::cerr << "Error! Could not write to file " << csv_path << "\n";
+    return ok;
+}
+
+/**
+ * Return the folder of the results store: the value of --results-db if given, otherwise the TONIC_RESULTS_DB
+ * environment variable, so that the exec scripts enable the store for all the binaries they launch
+ * @param flag_value value of --results-db, empty if not given
+ * @return the folder, empty if the store is disabled
+ */
+std::string ResultsStore::results_dir(const std::string &flag_value) {
+    if (!flag_value.empty()) return flag_value;
+    const char *env = std::getenv("TONIC_RESULTS_DB");
+    return env != nullptr ? std::string(env) : std::string();
+}
+
+/**
+ * Return the results store of this process, created at the first call, so that all the rows of a run share the same
+ * shard and run id
+ * @param flag_value value of --results-db, empty if not given
+ * @return the store, nullptr if the store is disabled
+ */
+ResultsStore *ResultsStore::for_process(const std::string &flag_value) {
+    static std::unique_ptr<ResultsStore> store;
+    if (!store) {
+        std::string dir = results_dir(flag_value);
+        if (dir.empty()) return nullptr;
+        store = std::make_unique<ResultsStore>(dir);
+    }
+    return store.get();
+}
@@ -0,0 +1,315 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Stream_Generator.h"
+#include "Compressed_Input.h"
+#include "External_Sort.h"
+#include "Utils.h"
+#include <charconv>
+#include <cmath>
+#include <cstdio>
+#include <filesystem>
+#include <fstream>
+#include <iostream>
+#include <numeric>
+#include <sstream>
+#include <thread>
+#include <unistd.h>
+#include <vector>
+
+namespace {
+
+    // -- event of a fully-dynamic stream, deletions come before the addition at the same position
+    struct StreamEvent {
+        long pos;
+        int sign;
+        int u, v;
+    };
+
+    struct stream_event_cmp {
+        bool operator()(const StreamEvent &a, const StreamEvent &b) const {
+            if (a.pos != b.pos) return a.pos < b.pos;
+            if (a.sign != b.sign) return a.sign < b.sign;
+            if (a.u != b.u) return a.u < b.u;
+            return a.v < b.v;
+        }
+    };
+
+    inline void append_edge(std::string &buffer, long u, long v) {
+        // -- node ids are below MAX_ID_NODE, at most 20 digits each
+        char digits[48];
+        char *end = std::to_chars(digits, digits + 20, u).ptr;
+        *end++ = ' ';
+        end = std::to_chars(end, end + 20, v).ptr;
+        *end++ = '\n';
+        buffer.append(digits, end);
+    }
+
+}
+
+/**
+ * Constructor for StreamGenerator
+ * @param num_nodes number of nodes n, node ids are in [0, n)
+ * @param gamma exponent of the power-law degree distribution, must be > 2
+ * @param triangle_prob probability that an edge is drawn inside the community of its first endpoint
+ * @param community_size number of consecutive node ids in a community
+ * @param seed of the random generators
+ * @param num_threads number of threads generating chunks of edges
+ * @param ram_budget_bytes RAM budget of the out-of-core preprocessing
+ * @param tmp_dir folder for the raw edges and the sorted runs
+ */
+StreamGenerator::StreamGenerator(long num_nodes, double gamma, double triangle_prob, int community_size,
+                                 unsigned int seed, int num_threads, size_t ram_budget_bytes,
+                                 const std::string &tmp_dir) :
+        num_nodes_(num_nodes), gamma_(gamma), triangle_prob_(triangle_prob),
+        community_size_(std::max(community_size, 2)), seed_(seed), num_threads_(std::max(num_threads, 1)),
+        ram_budget_bytes_(ram_budget_bytes), tmp_dir_(tmp_dir) {
+
+    if (num_nodes_ < 2 or (unsigned long long) num_nodes_ > Utils::MAX_ID_NODE) {
+        std::cerr << "StreamGenerator - Error! Number of nodes must be in [2, " << Utils::MAX_ID_NODE << "]\n";
+        exit(1);
+    }
+    if (gamma_ <= 2.0) {
+        std::cerr << "StreamGenerator - Error! Power-law exponent gamma must be > 2\n";
+        exit(1);
+    }
+
+    exponent_ = 1.0 - 1.0 / (gamma_ - 1.0);
+    cdf_scale_ = std::pow((double) num_nodes_ + 1.0, exponent_) - 1.0;
+
+    multiplier_ = 1000003;
+    while (std::gcd(multiplier_, num_nodes_) != 1) multiplier_ += 2;
+    offset_ = (long) (seed_ % (unsigned long) num_nodes_);
+}
+
+/**
+ * Sample a node with probability proportional to its power-law weight
+ * @param gen
+ * @param dis uniform in [0, 1)
+ * @return node id
+ */
+inline long StreamGenerator::sample_node(std::mt19937_64 &gen, std::uniform_real_distribution<double> &dis) const {
+    double x = std::pow(1.0 + dis(gen) * cdf_scale_, 1.0 / exponent_);
+    long rank = std::min((long) x - 1, num_nodes_ - 1);
+    return (rank * multiplier_ + offset_) % num_nodes_;
+}
+
+/**
+ * Generate a chunk of raw edges, one "u v" per row
+ * @param chunk index of the chunk, seeds its generator
+ * @param n_edges number of edges of the chunk
+ * @param salt distinguishes independent streams generated with the same seed
+ * @param buffer filled with the edges
+ */
+void StreamGenerator::generate_chunk(long chunk, long n_edges, unsigned int salt, std::string &buffer) const {
+
+    std::seed_seq seq{seed_, salt, (unsigned int) chunk, (unsigned int) (chunk >> 32)};
+    std::mt19937_64 gen(seq);
+    std::uniform_real_distribution<double> dis(0.0, 1.0);
+    std::uniform_int_distribution<int> dis_community(0, community_size_ - 1);
+
+    buffer.clear();
+    buffer.reserve(n_edges * 18);
+    for (long i = 0; i < n_edges; i++) {
+        long u = sample_node(gen, dis);
+        long v;
+        // -- community of u, the last one is cut at num_nodes_
+        long base = (u / community_size_) * community_size_;
+        long size = std::min<long>(community_size_, num_nodes_ - base);
+        if (size > 1 and dis(gen) < triangle_prob_) {
+            // -- edge inside the community of u: dense communities close many triangles
+            std::uniform_int_distribution<int>::param_type range(0, (int) size - 1);
+            do {
+                v = base + dis_community(gen, range);
+            } while (v == u);
+        } else {
+            do {
+                v = sample_node(gen, dis);
+            } while (v == u);
+        }
+        append_edge(buffer, u, v);
+    }
+}
+
+/**
+ * Write raw edges in parallel. Chunks are generated in waves of num_threads_ chunks and written in chunk order
+ * @param raw_path
+ * @param num_edges number of raw edges
+ * @param salt
+ * @param append whether to append to raw_path instead of truncating it
+ */
+void StreamGenerator::write_raw_edges(const std::string &raw_path, long num_edges, unsigned int salt,
+                                      bool append) const {
+
+    std::FILE *raw = std::fopen(raw_path.c_str(), append ? "a" : "w");
+    if (raw == nullptr) {
+        std::cerr << "StreamGenerator - Error! Unable to open " << raw_path << "\n";
+        exit(1);
+    }
+
+    long n_chunks = (num_edges + CHUNK_EDGES - 1) / CHUNK_EDGES;
+    std::vector<std::string> buffers(num_threads_);
+    for (long first = 0; first < n_chunks; first += num_threads_) {
+        long wave = std::min<long>(num_threads_, n_chunks - first);
+        std::vector<std::thread> workers;
+        for (long w = 0; w < wave; w++) {
+            long chunk = first + w;
+            long n_edges = std::min(CHUNK_EDGES, num_edges - chunk * CHUNK_EDGES);
+            workers.emplace_back([this, chunk, n_edges, salt, &buffers, w]() {
+                generate_chunk(chunk, n_edges, salt, buffers[w]);
+            });
+        }
+        for (auto &worker: workers) worker.join();
+        for (long w = 0; w < wave; w++) {
+            std::fwrite(buffers[w].data(), 1, buffers[w].size(), raw);
+        }
+        if ((first + wave) % 64 < wave) {
+            printf("Generated %ld raw edges...\n", std::min((first + wave) * CHUNK_EDGES, num_edges));
+        }
+    }
+    std::fclose(raw);
+}
+
+/**
+ * Remove self-loops and multiple edges and assign timestamps, as in Utils::preprocess_data
+ * @param raw_path
+ * @param output_path
+ */
+void StreamGenerator::preprocess(const std::string &raw_path, const std::string &output_path) const {
+    std::string delimiter = " ";
+    std::string output = output_path;
+    if (!Utils::preprocess_data_external(raw_path, delimiter, 0, output, false, ram_budget_bytes_, tmp_dir_)) exit(1);
+}
+
+/**
+ * Write an insertion-only stream in the preprocessed layout "u v t"
+ * @param output_path
+ * @param num_edges number of raw edges, the stream keeps the distinct ones
+ * @param salt distinguishes independent streams generated with the same seed
+ */
+void StreamGenerator::write_stream(const std::string &output_path, long num_edges, unsigned int salt) const {
+    std::string raw_path = (std::filesystem::path(tmp_dir_) /
+                            ("gen_" + std::to_string(getpid()) + "_" + std::to_string(salt) + "_raw.txt")).string();
+    write_raw_edges(raw_path, num_edges, salt, false);
+    preprocess(raw_path, output_path);
+    std::filesystem::remove(raw_path);
+}
+
+/**
+ * Write a fully-dynamic stream "u v t sign" from an insertion-only stream: each edge is deleted with probability
+ * deletion_prob at a uniform position after its insertion
+ * @param stream_path preprocessed insertion-only stream
+ * @param output_path
+ * @param deletion_prob
+ */
+void StreamGenerator::write_fd_stream(const std::string &stream_path, const std::string &output_path,
+                                      double deletion_prob) const {
+
+    long num_edges = 0;
+    {
+        InputFile count_file(stream_path);
+        std::string line;
+        while (std::getline(count_file, line)) num_edges++;
+        if (count_file.failed()) {
+            std::cerr << "StreamGenerator - Error! Unable to read " << stream_path << " to the end\n";
+            exit(1);
+        }
+    }
+
+    InputFile file(stream_path);
+    if (!file.is_open()) {
+        std::cerr << "StreamGenerator - Error! Unable to open " << stream_path << "\n";
+        exit(1);
+    }
+
+    std::seed_seq seq{seed_, 0xFDu};
+    std::mt19937_64 gen(seq);
+    std::uniform_real_distribution<double> dis(0.0, 1.0);
+    ExternalSorter<StreamEvent, stream_event_cmp> events(ram_budget_bytes_ / sizeof(StreamEvent), tmp_dir_,
+                                                         "gen_" + std::to_string(getpid()) + "_fd");
+
+    std::string line;
+    long pos = 0;
+    int u, v;
+    while (std::getline(file, line)) {
+        std::istringstream iss(line);
+        iss >> u >> v;
+        events.push({pos, 1, u, v});
+        if (pos + 1 < num_edges and dis(gen) < deletion_prob) {
+            std::uniform_int_distribution<long> dis_pos(pos + 1, num_edges - 1);
+            events.push({dis_pos(gen), -1, u, v});
+        }
+        pos++;
+    }
+    if (file.failed()) {
+        std::cerr << "StreamGenerator - Error! Unable to read " << stream_path << " to the end\n";
+        exit(1);
+    }
+
+    std::ofstream out_file(output_path);
+    long t = 0, n_deletions = 0;
+    events.merge([&](const StreamEvent &event) {
+        out_file << event.u << " " << event.v << " " << t++ << " " << (event.sign == 1 ? '+' : '-') << "\n";
+        if (event.sign == -1) n_deletions++;
+    });
+    printf("Fully-dynamic stream with %ld additions and %ld deletions\n", num_edges, n_deletions);
+}
+
+/**
+ * Write a sequence of snapshots "u v t" with controlled drift: snapshot i + 1 keeps each edge of snapshot i with
+ * probability 1 - drift, and replaces the removed ones with new edges of the same model
+ * @param output_folder snapshots are written as preprocessed_snapshotXXXXX.txt
+ * @param n_snapshots
+ * @param num_edges number of raw edges of the first snapshot
+ * @param drift fraction of edges replaced between two consecutive snapshots
+ */
+void StreamGenerator::write_snapshots(const std::string &output_folder, int n_snapshots, long num_edges,
+                                      double drift) const {
+
+    std::filesystem::create_directories(output_folder);
+    auto snapshot_path = [&](int i) {
+        char name[64];
+        snprintf(name, sizeof(name), "preprocessed_snapshot%05d.txt", i);
+        return (std::filesystem::path(output_folder) / name).string();
+    };
+
+    write_stream(snapshot_path(0), num_edges, 0);
+
+    std::string raw_path = (std::filesystem::path(tmp_dir_) /
+                            ("gen_" + std::to_string(getpid()) + "_snap_raw.txt")).string();
+    for (int i = 1; i < n_snapshots; i++) {
+        std::seed_seq seq{seed_, 0x5Au, (unsigned int) i};
+        std::mt19937_64 gen(seq);
+        std::uniform_real_distribution<double> dis(0.0, 1.0);
+
+        // -- surviving edges keep their relative order
+        std::ifstream prev(snapshot_path(i - 1));
+        std::FILE *raw = std::fopen(raw_path.c_str(), "w");
+        std::string line, buffer;
+        long removed = 0;
+        int u, v;
+        while (std::getline(prev, line)) {
+            if (dis(gen) < drift) {
+                removed++;
+                continue;
+            }
+            std::istringstream iss(line);
+            iss >> u >> v;
+            append_edge(buffer, u, v);
+            if (buffer.size() > (1 << 20)) {
+                std::fwrite(buffer.data(), 1, buffer.size(), raw);
+                buffer.clear();
+            }
+        }
+        std::fwrite(buffer.data(), 1, buffer.size(), raw);
+        std::fclose(raw);
+        prev.close();
+
+        // -- new edges arrive after the surviving ones
+        write_raw_edges(raw_path, removed, (unsigned int) i, true);
+        preprocess(raw_path, snapshot_path(i));
+        printf("Snapshot %d: replaced %ld edges\n", i, removed);
+    }
+    std::filesystem::remove(raw_path);
+}
@@ -0,0 +1,205 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Subgraph.h"
+#include <algorithm>
+#include <cstring>
+
+/**
+ * Constructor for Subgraph
+ * @param expected_nodes number of nodes to reserve the index for
+ */
+Subgraph::Subgraph(size_t expected_nodes) : tables_(std::max((size_t) 8, expected_nodes)) {}
+
+/**
+ * Take a table of a size class from its free list, or carve it from the current chunk
+ * @param size_class
+ * @return the slots of the table, all empty
+ */
+Subgraph::Neighbor *Subgraph::allocate(uint32_t size_class) {
+    size_t capacity = capacity_of(size_class);
+    Neighbor *slots = free_lists_[size_class];
+    if (slots != nullptr) {
+        std::memcpy(&free_lists_[size_class], slots, sizeof(Neighbor *));
+    } else {
+        if (bump_left_ < capacity) {
+            // -- the tail of the chunk goes to the free lists, as the largest tables that fit
+            for (uint32_t c = NUM_CLASSES; c-- > 0;) {
+                while (bump_left_ >= capacity_of(c)) {
+                    release(bump_, c);
+                    bump_ += capacity_of(c);
+                    bump_left_ -= capacity_of(c);
+                }
+            }
+            size_t chunk_slots = std::max(CHUNK_SLOTS, capacity);
+            chunks_.push_back(std::make_unique<Neighbor[]>(chunk_slots));
+            allocations_++;
+            reserved_bytes_ += chunk_slots * sizeof(Neighbor);
+            bump_ = chunks_.back().get();
+            bump_left_ = chunk_slots;
+        }
+        slots = bump_;
+        bump_ += capacity;
+        bump_left_ -= capacity;
+    }
+    for (size_t i = 0; i < capacity; i++) slots[i].node = EMPTY;
+    return slots;
+}
+
+/**
+ * Give a table back to the free list of its size class
+ * @param slots
+ * @param size_class
+ */
+void Subgraph::release(Neighbor *slots, uint32_t size_class) {
+    std::memcpy(slots, &free_lists_[size_class], sizeof(Neighbor *));
+    free_lists_[size_class] = slots;
+}
+
+/**
+ * Move the neighbors of a table to a new table of another size class
+ * @param table
+ * @param size_class
+ */
+void Subgraph::resize(Table &table, uint32_t size_class) {
+    Neighbor *slots = allocate(size_class);
+    uint32_t mask = capacity_of(size_class) - 1;
+    for (uint32_t i = 0; i < capacity_of(table.size_class); i++) {
+        if (table.slots[i].node == EMPTY) continue;
+        uint32_t j = slot_of(table.slots[i].node, mask);
+        while (slots[j].node != EMPTY) j = (j + 1) & mask;
+        slots[j] = table.slots[i];
+    }
+    release(table.slots, table.size_class);
+    table.slots = slots;
+    table.size_class = size_class;
+}
+
+/**
+ * Add v to the neighbors of u, or set the det flag of v if it is already a neighbor
+ * @param u
+ * @param v
+ * @param det
+ */
+void Subgraph::insert_one(const int u, const int v, bool det) {
+    auto it = tables_.find(u);
+    if (it == tables_.end()) {
+        tables_.insert_unique(u, Table{allocate(0), 0, 0});
+        it = tables_.find(u);
+    }
+    Table &table = it->second;
+    uint32_t mask = capacity_of(table.size_class) - 1;
+    uint32_t i = slot_of(v, mask);
+    for (; table.slots[i].node != EMPTY; i = (i + 1) & mask) {
+        if (table.slots[i].node == v) {
+            table.slots[i].det = det;
+            return;
+        }
+    }
+    // -- load factor at most 3/4
+    if (4 * (table.size + 1) > 3 * capacity_of(table.size_class)) {
+        resize(table, table.size_class + 1);
+        mask = capacity_of(table.size_class) - 1;
+        i = slot_of(v, mask);
+        while (table.slots[i].node != EMPTY) i = (i + 1) & mask;
+    }
+    table.slots[i] = {v, det};
+    table.size++;
+}
+
+/**
+ * Remove v from the neighbors of u, with backward shift deletion (no tombstones). The table shrinks when it is at most
+ * 1/8 full, and is released with the node when it is empty
+ * @param u
+ * @param v
+ * @return -1 if v is not a neighbor of u, otherwise the det flag of the removed edge
+ */
+int Subgraph::erase_one(const int u, const int v) {
+    auto it = tables_.find(u);
+    if (it == tables_.end()) return -1;
+    Table &table = it->second;
+    uint32_t mask = capacity_of(table.size_class) - 1;
+    uint32_t i = slot_of(v, mask);
+    for (; table.slots[i].node != v; i = (i + 1) & mask) {
+        if (table.slots[i].node == EMPTY) return -1;
+    }
+    int det = table.slots[i].det ? 1 : 0;
+
+    // -- shift back the following entries of the cluster that are not at or after their home slot
+    for (uint32_t j = (i + 1) & mask; table.slots[j].node != EMPTY; j = (j + 1) & mask) {
+        uint32_t home = slot_of(table.slots[j].node, mask);
+        if (((j - home) & mask) >= ((j - i) & mask)) {
+            table.slots[i] = table.slots[j];
+            i = j;
+        }
+    }
+    table.slots[i].node = EMPTY;
+
+    if (--table.size == 0) {
+        release(table.slots, table.size_class);
+        tables_.erase(it);
+    } else if (table.size_class > 0 and 8 * table.size <= capacity_of(table.size_class)) {
+        resize(table, table.size_class - 1);
+    }
+    return det;
+}
+
+/**
+ * Add the edge (u, v) with flag det, or set the flag of the edge if it is already in the subgraph
+ * @param u
+ * @param v
+ * @param det true if the edge is deterministic (heavy or WR), false otherwise (light, in SL)
+ */
+void Subgraph::insert(const int u, const int v, bool det) {
+    insert_one(u, v, det);
+    if (u != v) insert_one(v, u, det);
+}
+
+/**
+ * Remove the edge (u, v)
+ * @param u
+ * @param v
+ * @return -1 if the edge is not in the subgraph, 0 if the removed edge is light (SL), 1 if it is det (WR or H)
+ */
+int Subgraph::erase(const int u, const int v) {
+    int det = erase_one(u, v);
+    if (det >= 0 and u != v) erase_one(v, u);
+    return det;
+}
+
+/**
+ * Return the neighbors of a node
+ * @param u
+ * @return the neighbors of u, empty if u is not in the subgraph
+ */
+Subgraph::Neighbors Subgraph::neighbors(const int u) const {
+    auto it = tables_.find(u);
+    if (it == tables_.end()) return {};
+    return {it->second.slots, capacity_of(it->second.size_class), it->second.size};
+}
+
+/**
+ * Return the nodes of the subgraph
+ * @param nodes to fill
+ */
+void Subgraph::get_nodes(std::vector<int> &nodes) const {
+    nodes.clear();
+    for (const auto &it: tables_) nodes.push_back(it.first);
+}
+
+/**
+ * Remove all the nodes and edges. The chunks are kept for the next edges
+ */
+void Subgraph::clear() {
+    for (const auto &it: tables_) release(it.second.slots, it.second.size_class);
+    tables_.clear();
+}
+
+/**
+ * Memory taken by the subgraph: the node index and the chunks of the tables
+ * @return size in bytes
+ */
+size_t Subgraph::memory_bytes() const {
+    return (size_t) tables_.bucket_count() * sizeof(emhash5::entry<int, Table>) + reserved_bytes_;
+}
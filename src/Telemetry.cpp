@@ -0,0 +1,59 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Telemetry.h"
+#include <iostream>
+#include <limits>
+#include <unistd.h>
+
+/**
+ * Constructor for Telemetry
+ * @param path of the JSON lines file, truncated if it exists
+ * @param every_edges write a record every every_edges edges (0 to disable)
+ * @param every_seconds write a record every every_seconds seconds (0 to disable)
+ */
+Telemetry::Telemetry(const std::string &path, unsigned long long every_edges, double every_seconds) :
+        file_(std::fopen(path.c_str(), "w")), every_edges_(every_edges), every_seconds_(every_seconds),
+        next_edges_(every_edges) {
+    if (file_ == nullptr) {
+        std::cerr << "Error! Unable to open telemetry file " << path << "\n";
+    }
+    start_time_ = std::chrono::steady_clock::now();
+    last_time_ = start_time_;
+}
+
+/**
+ * Destructor for Telemetry
+ */
+Telemetry::~Telemetry() {
+    if (file_ != nullptr) std::fclose(file_);
+}
+
+/**
+ * Return the resident set size of the current process
+ * @return RSS in bytes, -1 if not available
+ */
+long Telemetry::current_rss_bytes() {
+    std::ifstream statm("/proc/self/statm");
+    long size, resident;
+    if (statm >> size >> resident) {
+        return resident * sysconf(_SC_PAGESIZE);
+    }
+    return -1;
+}
+
+/**
+ * Return the peak resident set size of the current process (VmHWM)
+ * @return peak RSS in bytes, -1 if not available
+ */
+long Telemetry::peak_rss_bytes() {
+    std::ifstream status("/proc/self/status");
+    std::string key;
+    long kb;
+    while (status >> key) {
+        if (key == "VmHWM:" and status >> kb) return kb * 1024;
+        status.ignore(std::numeric_limits<std::streamsize>::max(), '\n');
+    }
+    return -1;
+}
@@ -3,6 +3,8 @@
 //
 
 #include "Tonic.h"
+#include <algorithm>
+#include <cmath>
 #include <fstream>
 
 /**
@@ -11,23 +13,21 @@
  * @param k memory budget
  * @param alpha
  * @param beta
+ * @param verbose false to skip the banner with the sizes of the samples (e.g. for the shards of Tonic_Sharded)
  */
-Tonic::Tonic(int random_seed, long k, double alpha, double beta) : t_(0), k_(k), alpha_(alpha),
-                                                                   beta_(beta), random_seed_(random_seed)  {
+Tonic::Tonic(int random_seed, long k, double alpha, double beta, bool verbose) : t_(0), k_(k), alpha_(alpha),
+                                                                                 beta_(beta), random_seed_(random_seed) {
 
-    printf("Starting Tonic Algo - alpha %.3f, beta = %.3f | Memory Budget = %ld\n", alpha, beta, k);
+    if (verbose) printf("Starting Tonic Algo - alpha %.3f, beta = %.3f | Memory Budget = %ld\n", alpha, beta, k);
     WR_size_ = (long) (k_ * alpha);
     H_size_ = (long) ((k_ - WR_size_) * beta);
     SL_size_ = k_ - WR_size_ - H_size_;
     waiting_room_ = new Edge[WR_size_];
-    heavy_edges_ = FixedSizePQ<Heavy_edge, heavy_edge_cmp>(H_size_);
+    heavy_edges_ = HeavyEdgeStore(H_size_, false);
     light_edges_sample_ = new Edge[SL_size_];
     num_edges_ = 0;
-    printf("WR size = %ld, H size = %ld, SL size = %ld\n", WR_size_, H_size_, SL_size_);
-    subgraph_ = emhash5::HashMap<int, emhash5::HashMap<int, bool>>();
-    gen_ = std::mt19937(random_seed);
-    dis_ = std::uniform_real_distribution<double>(0.0, 1.0);
-    dis_int_ = std::uniform_int_distribution<int>(0, (int)SL_size_ - 1);
+    if (verbose) printf("WR size = %ld, H size = %ld, SL size = %ld\n", WR_size_, H_size_, SL_size_);
+    gen_ = Xoshiro256(random_seed);
 }
 
 
@@ -41,46 +41,64 @@ Tonic::~Tonic() {
 }
 
 /**
- * Set the edge oracle for Tonic
- * @param edge_oracle
+ * Set the oracle for Tonic, shared with the other instances: the oracle is not copied
+ * @param oracle
  */
-void Tonic::set_edge_oracle(emhash5::HashMap<long, int> &edge_oracle) {
-    edge_id_oracle_ = edge_oracle;
-    edge_oracle_flag_ = true;
+void Tonic::set_oracle(SharedOracle oracle) {
+    oracle_ = std::move(oracle);
+    edge_oracle_flag_ = oracle_->is_edge_oracle();
 }
 
 /**
- * Set the node oracle for Tonic
- * @param node_oracle
+ * Switch Tonic to dense node ids in [0, num_nodes): local counts are stored in a vector indexed by node id instead
+ * of a hash map. A node oracle of a relabeled stream is built from a vector indexed by dense node ids
+ * @param num_nodes number of nodes of the relabeled stream
  */
-void Tonic::set_node_oracle(emhash5::HashMap<int, int> &node_oracle) {
-    node_oracle_ = node_oracle;
+void Tonic::set_dense_nodes(int num_nodes) {
+    num_dense_nodes_ = num_nodes;
+    dense_local_triangles_cnt_.assign(num_nodes, 0.0);
+    dense_local_cnt_ = dense_local_triangles_cnt_.data();
 }
 
 /**
-* Return heaviness prediction from the node or edge oracle given the current edge (u, v)
+ * Switch Tonic to dense node ids in [0, num_nodes), adding the local counts to a vector shared with other instances
+ * run on the same thread (the shards of a worker of Tonic_Sharded), so that they do not allocate one vector each.
+ * get_local_triangles and get_local_nodes then return the counts of all the instances sharing the vector
+ * @param num_nodes number of nodes of the relabeled stream
+ * @param shared_local_counts vector of num_nodes counts, not resized while in use
+ */
+void Tonic::set_dense_nodes(int num_nodes, std::vector<double> &shared_local_counts) {
+    num_dense_nodes_ = num_nodes;
+    dense_local_triangles_cnt_.clear();
+    dense_local_triangles_cnt_.shrink_to_fit();
+    dense_local_cnt_ = shared_local_counts.data();
+}
+
+/**
+ * Restrict Tonic to the triangles of a color multiset, when it runs as a shard of Tonic_Sharded: the triangles closed
+ * by an edge are counted only if their third node has the missing color of the shard
+ * @param color_shard
+ */
+void Tonic::set_color_shard(const ColorShard &color_shard) {
+    color_shard_ = color_shard;
+}
+
+/**
+ * Return heaviness prediction from the node or edge oracle given the current edge (u, v), counting oracle hits
  * @param u
  * @param v
  * @return heaviness if the edge or both nodes are found in the predictor, -1 otherwise
  */
 int Tonic::get_heaviness(const int u, const int v) {
-    if (edge_oracle_flag_) {
-        auto id_it = edge_id_oracle_.find(edge_to_id(u, v));
-        if (id_it != edge_id_oracle_.end()) {
-            return id_it->second;
-        } else {
-            return -1;
-        }
-    } else {
-        auto u_it = node_oracle_.find(u);
-        if (u_it != node_oracle_.end()) {
-            auto v_it = node_oracle_.find(v);
-            if (v_it != node_oracle_.end()) {
-                return std::min(u_it->second, v_it->second);
-            }
-        }
+    oracle_queries_++;
+    // -- most edges are not in the oracle: the prefilter answers them without probing the oracle
+    if (!oracle_->may_contain(u, v)) {
+        oracle_filtered_++;
         return -1;
     }
+    int heaviness = oracle_->find(u, v);
+    if (heaviness > -1) oracle_hits_++;
+    return heaviness;
 }
 
 /**
@@ -88,7 +106,7 @@ int Tonic::get_heaviness(const int u, const int v) {
  * @return random double
  */
 inline double Tonic::next_double() {
-    return dis_(gen_);
+    return gen_.next_double();
 }
 
 /**
@@ -96,7 +114,7 @@ inline double Tonic::next_double() {
  * @return number of nodes
  */
 int Tonic::get_num_nodes() const {
-    return (int) subgraph_.size();
+    return (int) subgraph_.num_nodes();
 }
 
 /**
@@ -112,10 +130,7 @@ int Tonic::get_num_edges() const {
  * @param nodes to fill
  */
 void Tonic::get_nodes(std::vector<int> &nodes) const {
-    nodes.clear();
-    for (const auto &it: subgraph_) {
-        nodes.push_back(it.first);
-    }
+    subgraph_.get_nodes(nodes);
 }
 
 /**
@@ -124,6 +139,12 @@ void Tonic::get_nodes(std::vector<int> &nodes) const {
  */
 void Tonic::get_local_nodes(std::vector<int> &nodes) const {
     nodes.clear();
+    if (num_dense_nodes_ > 0) {
+        for (int u = 0; u < num_dense_nodes_; u++) {
+            if (dense_local_cnt_[u] > 0) nodes.push_back(u);
+        }
+        return;
+    }
     for (const auto &it: local_triangles_cnt_) {
         nodes.push_back(it.first);
     }
@@ -137,8 +158,7 @@ void Tonic::get_local_nodes(std::vector<int> &nodes) const {
  */
 void Tonic::add_edge(const int u, const int v, bool det) {
     num_edges_++;
-    subgraph_[u].emplace_unique(v, det);
-    subgraph_[v].emplace_unique(u, det);
+    subgraph_.insert(u, v, det);
 
 }
 
@@ -149,8 +169,7 @@ void Tonic::add_edge(const int u, const int v, bool det) {
  */
 void Tonic::remove_edge(const int u, const int v) {
     num_edges_--;
-    subgraph_[u].erase(v);
-    subgraph_[v].erase(u);
+    subgraph_.erase(u, v);
 }
 
 /**
@@ -175,6 +194,9 @@ double Tonic::get_global_triangles() const {
  * @return the local triangle count for node u
  */
 double Tonic::get_local_triangles(const int u) const {
+    if (num_dense_nodes_ > 0) {
+        return dense_local_cnt_[u];
+    }
     auto u_it = local_triangles_cnt_.find(u);
     if (u_it != local_triangles_cnt_.end()) {
         return u_it->second;
@@ -188,7 +210,46 @@ double Tonic::get_local_triangles(const int u) const {
  * `update_map_capacity` and `random_seed_`. It is called automatically if the USS flag is enabled.
  */
 void Tonic::setup_space_saving() {
-    ss_heap_ = UnbiasedSpaceSaving(update_map_capacity, random_seed_);
+    ss_heap_ = UnbiasedSpaceSaving(update_map_capacity, random_seed_, num_dense_nodes_);
+}
+
+/**
+ * Function that instantiates the heavy-hitter structure of the edges (`edge_ss_`), updated with the estimated number
+ * of triangles of each edge discovered in count_triangles
+ * @param capacity maximum number of tracked edges
+ */
+void Tonic::setup_edge_space_saving(int capacity) {
+    edge_ss_ = EdgeSpaceSaving(capacity, random_seed_);
+}
+
+/**
+ * Return the edges with the largest estimated number of triangles
+ * @param n number of edges to return
+ * @return the edges sorted by decreasing estimate
+ */
+std::vector<EdgeSpaceSaving::HeapEntry> Tonic::get_top_edges(int n) const {
+    if (!edge_ss_) {
+        throw std::runtime_error("Edge space saving not initialized — cannot get top edges.");
+    }
+    return edge_ss_->top_n(n);
+}
+
+/**
+ * Add cnt triangles to the local count of node u
+ * @param u
+ * @param cnt
+ */
+inline void Tonic::add_local_triangles(const int u, const double cnt) {
+    if (num_dense_nodes_ > 0) {
+        dense_local_cnt_[u] += cnt;
+        return;
+    }
+    auto u_it = local_triangles_cnt_.find(u);
+    if (u_it != local_triangles_cnt_.end()) {
+        u_it->second += cnt;
+    } else {
+        local_triangles_cnt_.insert_unique(u, cnt);
+    }
 }
 
 /**
@@ -199,76 +260,63 @@ void Tonic::setup_space_saving() {
  */
 void Tonic::count_triangles(const int src, const int dst) {
    
-    emhash5::HashMap<int, bool> *u_neighs, *v_neighs;
-    auto u_it = subgraph_.find(src);
-    if (u_it == subgraph_.end()) {
+    Subgraph::Neighbors u_neighs = subgraph_.neighbors(src);
+    if (u_neighs.empty()) {
         return;
     }
-    u_neighs = &u_it->second;
-    int du = (int) u_neighs->size();
-
-    auto v_it = subgraph_.find(dst);
-    if (v_it == subgraph_.end()) {
+    Subgraph::Neighbors v_neighs = subgraph_.neighbors(dst);
+    if (v_neighs.empty()) {
         return;
     }
-    v_neighs = &v_it->second;
-    int dv = (int) v_neighs->size();
     int u = src;
     int v = dst;
 
-    if (du > dv) {
+    if (u_neighs.size() > v_neighs.size()) {
         v = src;
         u = dst;
-        emhash5::HashMap<int, bool> *u_neighs_tmp = u_neighs;
-        u_neighs = v_neighs;
-        v_neighs = u_neighs_tmp;
+        std::swap(u_neighs, v_neighs);
     }
 
-    double cum_cnt = 0.0;
+    // -- weights of the triangles with zero, one or two light edges
+    double increment_one_light = 1.0, increment_two_light = 1.0;
+    if (SL_cur_ > SL_size_) {
+        increment_one_light = ((double) (SL_cur_) / SL_size_);
+        increment_two_light = ((double) (SL_cur_) / SL_size_) * ((double) ((SL_cur_ - 1.0))) / (SL_size_ - 1.0);
+    }
+    // -- triangles are counted by number of light edges, so that the estimate does not depend on the iteration
+    // -- order of the neighborhoods (which is not preserved by a checkpoint)
+    long n_triangles[3] = {0, 0, 0};
+
+    // -- color of the third node of the triangles of the shard, if any
+    int w_color = color_shard_ ? color_shard_->third_color(color_shard_->color(u), color_shard_->color(v)) : -1;
 
     // -- iterate over the neighbors of u
-    for (const auto &it: *u_neighs) {
-        int w = it.first;
-        auto vw_it = v_neighs->find(w);
-        if (vw_it != v_neighs->end()) {
+    for (const auto &uw: u_neighs) {
+        int w = uw.node;
+        const Subgraph::Neighbor *vw = v_neighs.find(w);
+        if (vw != nullptr) {
+            if (color_shard_ and color_shard_->color(w) != w_color) continue;
             // -- triangle {u, v, w} discovered
-            double increment_T = 1.0;
-            if (SL_cur_ > SL_size_) {
-                bool vw_light = !vw_it->second;
-                bool wu_light = !it.second;
-                if (vw_light && wu_light) {
-                    increment_T = ((double) (SL_cur_) / SL_size_) * ((double) ((SL_cur_ - 1.0))) / (SL_size_ - 1.0);
-                } else if (vw_light || wu_light) {
-                    increment_T = ((double) (SL_cur_) / SL_size_);
-                }
+            int n_light = (vw->det ? 0 : 1) + (uw.det ? 0 : 1);
+            n_triangles[n_light]++;
+            double increment_T = n_light == 0 ? 1.0 : (n_light == 1 ? increment_one_light : increment_two_light);
+            add_local_triangles(w, increment_T);
+            if (edge_ss_) {
+                edge_ss_->update((long) edge_to_id(u, w), increment_T);
+                edge_ss_->update((long) edge_to_id(v, w), increment_T);
             }
-
-            cum_cnt += increment_T;
-            auto w_it = local_triangles_cnt_.find(w);
-            if (w_it != local_triangles_cnt_.end()) {
-                w_it->second += increment_T;
-            } else {
-                local_triangles_cnt_.insert_unique(w, increment_T);
-            }
-
         }
     } // end for
 
+    double cum_cnt = (double) n_triangles[0] + (double) n_triangles[1] * increment_one_light +
+                     (double) n_triangles[2] * increment_two_light;
+
     // -- update counters
     if (cum_cnt > 0) {
         global_triangles_cnt_ += cum_cnt;
-        auto u_local_it = local_triangles_cnt_.find(u);
-        if (u_local_it != local_triangles_cnt_.end()) {
-            u_local_it->second += cum_cnt;
-        } else {
-            local_triangles_cnt_.insert_unique(u, cum_cnt);
-        }
-        auto v_local_it = local_triangles_cnt_.find(v);
-        if (v_local_it != local_triangles_cnt_.end()) {
-            v_local_it->second += cum_cnt;
-        } else {
-            local_triangles_cnt_.insert_unique(v, cum_cnt);
-        }
+        add_local_triangles(u, cum_cnt);
+        add_local_triangles(v, cum_cnt);
+        if (edge_ss_) edge_ss_->update((long) edge_to_id(u, v), cum_cnt);
     }
 }
 
@@ -291,7 +339,7 @@ bool Tonic::sample_edge(const int src, const int dst) {
         // -- insert current edge into H
         H_cur_++;
         int current_heaviness = get_heaviness(u, v);
-        heavy_edges_.push({{u, v}, current_heaviness});
+        heavy_edges_.push({u, v}, current_heaviness);
         return true;
     } else {
         // -- H is full -> retrieve the lightest heavy edge between current and lightest in H
@@ -300,21 +348,20 @@ bool Tonic::sample_edge(const int src, const int dst) {
             int current_heaviness = get_heaviness(u, v);
             bool is_det = false;
             if (current_heaviness > -1) {
-                auto lightest_heavy_edge = heavy_edges_.top();
-                int lightest_heaviness = lightest_heavy_edge.second;
+                int lightest_heaviness = heavy_edges_.min_heaviness();
                 if (current_heaviness > lightest_heaviness ||
                     (current_heaviness == lightest_heaviness && next_double() < 0.5)) {
-                    // -- replace the lightest heavy edge with current edge
-                    heavy_edges_.pop();
-                    heavy_edges_.push({{u, v}, current_heaviness});
+                    // -- replace a lightest heavy edge (uniformly at random among ties) with current edge
+                    heavy_replacements_++;
+                    Edge lightest_heavy_edge = heavy_edges_.replace_min({u, v}, current_heaviness, gen_);
                     is_det = true;
-                    subgraph_[lightest_heavy_edge.first.first][lightest_heavy_edge.first.second] = false;
-                    subgraph_[lightest_heavy_edge.first.second][lightest_heavy_edge.first.first] = false;
-                    uv_sample = lightest_heavy_edge.first;
+                    subgraph_.insert(lightest_heavy_edge.first, lightest_heavy_edge.second, false);
+                    uv_sample = lightest_heavy_edge;
                 }
             }
 
             light_edges_sample_[SL_cur_++] = uv_sample;
+            if (SL_cur_ == SL_size_) sl_skip_.start(SL_size_, gen_);
             return is_det;
         } else if (WR_cur_ < WR_size_) {
             waiting_room_[WR_cur_++] = {u, v};
@@ -331,26 +378,24 @@ bool Tonic::sample_edge(const int src, const int dst) {
             Edge uv_sample = oldest_edge;
             int current_heaviness = get_heaviness(uv_sample.first, uv_sample.second);
             if (current_heaviness > -1) {
-                auto lightest_heavy_edge = heavy_edges_.top();
-                int lightest_heaviness = lightest_heavy_edge.second;
+                int lightest_heaviness = heavy_edges_.min_heaviness();
                 if (current_heaviness > lightest_heaviness ||
                     (current_heaviness == lightest_heaviness && next_double() < 0.5)) {
-                    // -- replace the lightest heavy edge with current edge
-                    heavy_edges_.pop();
-                    heavy_edges_.push({{uv_sample.first, uv_sample.second}, current_heaviness});
-                    // subgraph_[lightest_heavy_edge.first.first][lightest_heavy_edge.first.second] = false;
-                    // subgraph_[lightest_heavy_edge.first.second][lightest_heavy_edge.first.first] = false;
-                    uv_sample = lightest_heavy_edge.first;
+                    // -- replace a lightest heavy edge (uniformly at random among ties) with current edge
+                    heavy_replacements_++;
+                    Edge lightest_heavy_edge = heavy_edges_.replace_min(uv_sample, current_heaviness, gen_);
+                    // subgraph_.insert(lightest_heavy_edge.first, lightest_heavy_edge.second, false);
+                    uv_sample = lightest_heavy_edge;
                 }
             }
 
-            double p = (double) (SL_size_) / (double) SL_cur_;
-            if (next_double() < p) {
+            // -- the edge is sampled with probability SL_size / SL_cur: the skip counter draws directly the next
+            // -- sampled edge, instead of flipping a coin for every edge
+            if (sl_skip_.admit(SL_cur_, gen_)) {
                 // -- edge is sampled
-                subgraph_[uv_sample.first][uv_sample.second] = false;
-                subgraph_[uv_sample.second][uv_sample.first] = false;
+                subgraph_.insert(uv_sample.first, uv_sample.second, false);
                 // -- evict edge uniformly at random
-                int replace_idx = (int) (rand() % SL_size_);
+                int replace_idx = (int) gen_.next_int(SL_size_);
                 Edge uv_replace = light_edges_sample_[replace_idx];
                 remove_edge(uv_replace.first, uv_replace.second);
                 light_edges_sample_[replace_idx] = uv_sample;
@@ -372,6 +417,51 @@ const std::vector<UnbiasedSpaceSaving::HeapNode>& Tonic::get_top_nodes(int n) {
     return ss_heap_->top_n(n);
 }
 
+/**
+ * Estimate the top nodes by degree from the current sample, without USS. The degree of a node is the number of its
+ * deterministic edges (WR and H, kept with probability 1) plus the number of its light edges rescaled by the inverse
+ * of their sampling probability SL_size / SL_cur. Ties are broken by the local triangle estimate of the node
+ * @param n number of nodes to return
+ * @return the nodes sorted by decreasing estimated degree, with the estimate rounded to the nearest integer
+ */
+std::vector<UnbiasedSpaceSaving::HeapNode> Tonic::get_sampled_top_nodes(int n) const {
+    // -- every edge that left WR without entering H is a candidate for SL, and SL_cur_ counts the candidates
+    double light_weight = SL_cur_ > SL_size_ ? (double) SL_cur_ / (double) SL_size_ : 1.0;
+
+    struct Candidate {
+        int node;
+        double degree;
+        double triangles;
+    };
+    std::vector<int> nodes;
+    subgraph_.get_nodes(nodes);
+    std::vector<Candidate> candidates;
+    candidates.reserve(nodes.size());
+    for (int u: nodes) {
+        long det_edges = 0;
+        long light_edges = 0;
+        for (const auto &w: subgraph_.neighbors(u)) {
+            if (w.det) det_edges++;
+            else light_edges++;
+        }
+        candidates.push_back({u, (double) det_edges + (double) light_edges * light_weight, get_local_triangles(u)});
+    }
+
+    size_t top = std::min(candidates.size(), (size_t) std::max(n, 0));
+    std::partial_sort(candidates.begin(), candidates.begin() + (long) top, candidates.end(),
+                      [](const Candidate &a, const Candidate &b) {
+                          if (a.degree != b.degree) return a.degree > b.degree;
+                          if (a.triangles != b.triangles) return a.triangles > b.triangles;
+                          return a.node < b.node;
+                      });
+
+    std::vector<UnbiasedSpaceSaving::HeapNode> top_nodes(top);
+    for (size_t i = 0; i < top; i++) {
+        top_nodes[i] = {candidates[i].node, (int) std::lround(candidates[i].degree)};
+    }
+    return top_nodes;
+}
+
 /**
  * Function that processes an edge (src, dst). It performs the count of triangles, and then samples the edge accordingly.
  * If USS is enabled, it also updates the node degree estimates.
@@ -380,15 +470,164 @@ const std::vector<UnbiasedSpaceSaving::HeapNode>& Tonic::get_top_nodes(int n) {
  */
 void Tonic::process_edge(const int u, const int v) {
 
-     if (ss_heap_) {
+    PROFILE_EDGE_BEGIN(profiler_);
+
+    if (ss_heap_) {
+        PROFILE_PHASE(profiler_, PHASE_USS);
         ss_heap_->update(u);
         ss_heap_->update(v);
     }
 
-    count_triangles(u, v);
-    bool is_det = sample_edge(u, v);
-    add_edge(u, v, is_det);
+    {
+        PROFILE_PHASE(profiler_, PHASE_COUNT_TRIANGLES);
+        count_triangles(u, v);
+    }
+    bool is_det;
+    {
+        PROFILE_PHASE(profiler_, PHASE_SAMPLE_EDGE);
+        is_det = sample_edge(u, v);
+    }
+    {
+        PROFILE_PHASE(profiler_, PHASE_ADD_EDGE);
+        add_edge(u, v, is_det);
+    }
     t_++;
 
-    assert(heavy_edges_.size() <= H_size_);
+    PROFILE_EDGE_END(profiler_);
+
+    assert((long) heavy_edges_.size() <= H_size_);
+}
+
+/**
+ * Write the full state of the sampler to a checkpoint: counters, waiting room, heavy edges, light sample, subgraph,
+ * local counts, random generator and USS. Oracles are not written, they are read again on resume
+ * @param writer
+ */
+void Tonic::save_state(CheckpointWriter &writer) const {
+    // -- parameters, checked on resume
+    writer.write(k_);
+    writer.write(alpha_);
+    writer.write(beta_);
+    writer.write(random_seed_);
+    writer.write(edge_oracle_flag_);
+    writer.write(num_dense_nodes_);
+    writer.write(ss_heap_.has_value());
+
+    // -- counters
+    writer.write(t_);
+    writer.write(WR_cur_);
+    writer.write(H_cur_);
+    writer.write(SL_cur_);
+    writer.write(num_edges_);
+    writer.write(global_triangles_cnt_);
+    writer.write(heavy_replacements_);
+    writer.write(oracle_queries_);
+    writer.write(oracle_hits_);
+    writer.write(oracle_filtered_);
+
+    // -- edge sets, the heavy edges in bucket order
+    writer.write_array(waiting_room_, std::min(WR_cur_, WR_size_));
+    std::vector<Heavy_edge> heavy_edges;
+    heavy_edges_.get_edges(heavy_edges);
+    writer.write_array(heavy_edges.data(), heavy_edges.size());
+    writer.write_array(light_edges_sample_, std::min(SL_cur_, SL_size_));
+
+    // -- subgraph as adjacency lists (v, det)
+    std::vector<int> nodes;
+    subgraph_.get_nodes(nodes);
+    writer.write((uint64_t) nodes.size());
+    std::vector<std::pair<int, bool>> neighs;
+    for (int u: nodes) {
+        neighs.clear();
+        for (const auto &uw: subgraph_.neighbors(u)) neighs.emplace_back(uw.node, uw.det);
+        writer.write(u);
+        writer.write_array(neighs.data(), neighs.size());
+    }
+
+    // -- local counts
+    if (num_dense_nodes_ > 0) {
+        writer.write_array(dense_local_cnt_, (size_t) num_dense_nodes_);
+    } else {
+        std::vector<std::pair<int, double>> local_counts;
+        for (const auto &it: local_triangles_cnt_) local_counts.emplace_back(it.first, it.second);
+        writer.write_array(local_counts.data(), local_counts.size());
+    }
+
+    writer.write_rng(gen_);
+    writer.write(sl_skip_);
+    if (ss_heap_) ss_heap_->save_state(writer);
+}
+
+/**
+ * Restore the state of the sampler from a checkpoint written by save_state. The instance must be configured (memory
+ * budget, seed, oracle, dense nodes, USS) as the one that wrote the checkpoint
+ * @param reader
+ * @return true if the state was restored
+ */
+bool Tonic::load_state(CheckpointReader &reader) {
+    long k = reader.read<long>();
+    double alpha = reader.read<double>();
+    double beta = reader.read<double>();
+    int random_seed = reader.read<int>();
+    bool edge_oracle_flag = reader.read<bool>();
+    int num_dense_nodes = reader.read<int>();
+    bool uss = reader.read<bool>();
+    if (!reader.ok() or k != k_ or alpha != alpha_ or beta != beta_ or random_seed != random_seed_ or
+        edge_oracle_flag != edge_oracle_flag_ or num_dense_nodes != num_dense_nodes_ or uss != ss_heap_.has_value()) {
+        std::cerr << "Error! Checkpoint was written with different parameters (memory budget, alpha, beta, seed, "
+                     "oracle type, node mapping or USS)\n";
+        return false;
+    }
+
+    t_ = reader.read<unsigned long long>();
+    WR_cur_ = reader.read<long>();
+    H_cur_ = reader.read<long>();
+    SL_cur_ = reader.read<long>();
+    num_edges_ = reader.read<int>();
+    global_triangles_cnt_ = reader.read<double>();
+    heavy_replacements_ = reader.read<unsigned long long>();
+    oracle_queries_ = reader.read<unsigned long long>();
+    oracle_hits_ = reader.read<unsigned long long>();
+    oracle_filtered_ = reader.read<unsigned long long>();
+
+    std::vector<Edge> edges;
+    reader.read_array(edges);
+    if (!reader.ok() or (long) edges.size() != std::min(WR_cur_, WR_size_)) return false;
+    std::copy(edges.begin(), edges.end(), waiting_room_);
+
+    // -- pushing the heavy edges back in bucket order leaves every edge at its position in its bucket
+    std::vector<Heavy_edge> heavy_edges;
+    reader.read_array(heavy_edges);
+    if (!reader.ok() or (long) heavy_edges.size() > H_size_) return false;
+    heavy_edges_ = HeavyEdgeStore(H_size_, false);
+    for (const auto &edge: heavy_edges) heavy_edges_.push(edge.first, edge.second);
+
+    reader.read_array(edges);
+    if (!reader.ok() or (long) edges.size() != std::min(SL_cur_, SL_size_)) return false;
+    std::copy(edges.begin(), edges.end(), light_edges_sample_);
+
+    uint64_t n_nodes = reader.read<uint64_t>();
+    subgraph_.clear();
+    std::vector<std::pair<int, bool>> neighs;
+    for (uint64_t i = 0; i < n_nodes and reader.ok(); i++) {
+        int u = reader.read<int>();
+        reader.read_array(neighs);
+        for (const auto &it: neighs) subgraph_.insert(u, it.first, it.second);
+    }
+
+    if (num_dense_nodes_ > 0) {
+        reader.read_array(dense_local_triangles_cnt_);
+        if (reader.ok() and (int) dense_local_triangles_cnt_.size() != num_dense_nodes_) return false;
+        dense_local_cnt_ = dense_local_triangles_cnt_.data();
+    } else {
+        std::vector<std::pair<int, double>> local_counts;
+        reader.read_array(local_counts);
+        local_triangles_cnt_.clear();
+        for (const auto &it: local_counts) local_triangles_cnt_.insert_unique(it.first, it.second);
+    }
+
+    reader.read_rng(gen_);
+    sl_skip_ = reader.read<ReservoirSkip>();
+    if (ss_heap_ and !ss_heap_->load_state(reader)) return false;
+    return reader.ok();
 }
@@ -63,6 +63,34 @@ bool Tonic_FD::WaitingRoom::remove_edge(int u, int v) {
 
 }
 
+/**
+ * Write the waiting room to a checkpoint. The ids are written in iteration order: the oldest edge is the first one
+ * in iteration order, and inserting the ids in the same order in an empty set restores it
+ * @param writer
+ */
+void Tonic_FD::WaitingRoom::save_state(CheckpointWriter &writer) const {
+    writer.write(cur_size_);
+    writer.write(oldest_edge_idx_);
+    std::vector<unsigned long long> ids(waiting_room_.begin(), waiting_room_.end());
+    writer.write_array(ids.data(), ids.size());
+}
+
+/**
+ * Restore the waiting room from a checkpoint
+ * @param reader
+ * @return true if the state was restored
+ */
+bool Tonic_FD::WaitingRoom::load_state(CheckpointReader &reader) {
+    cur_size_ = reader.read<long>();
+    oldest_edge_idx_ = reader.read<long>();
+    std::vector<unsigned long long> ids;
+    reader.read_array(ids);
+    if (!reader.ok() or (long) ids.size() > max_size_) return false;
+    waiting_room_.clear();
+    for (auto id: ids) waiting_room_.emplace_unique(id);
+    return true;
+}
+
 
 /**
  * Constructor for the Tonic_FD class.
@@ -72,7 +100,8 @@ bool Tonic_FD::WaitingRoom::remove_edge(int u, int v) {
  * @param beta
  */
 Tonic_FD::Tonic_FD(int random_seed, long k, double alpha, double beta) : t_(0), k_(k), alpha_(alpha),
-                                                                                       beta_(beta) {
+                                                                                       beta_(beta),
+                                                                                       random_seed_(random_seed) {
 
     printf("Starting Tonic Algo - alpha %.3f, beta = %.3f | Memory Budget = %ld || Random Seed = %d\n",
            alpha, beta, k, random_seed);
@@ -80,14 +109,12 @@ Tonic_FD::Tonic_FD(int random_seed, long k, double alpha, double beta) : t_(0),
     H_size_ = (long) ((k_ - WR_size_) * beta);
     SL_size_ = k_ - WR_size_ - H_size_;
     waiting_room_ = new WaitingRoom(WR_size_);
-    heavy_edges_ = FixedSizePQ<Heavy_edge, heavy_edge_cmp>(H_size_);
-    heavy_edges_set_ = emhash8::HashSet<unsigned long long>(H_size_);
+    heavy_edges_ = HeavyEdgeStore(H_size_, true);
     light_edges_sample_ = new Edge[SL_size_];
     num_edges_ = 0;
     printf("WR size = %ld, H size = %ld, SL size = %ld\n", WR_size_, H_size_, SL_size_);
-    subgraph_ = emhash5::HashMap<int, emhash5::HashMap<int, bool>>(k);
-    gen_ = std::mt19937(random_seed);
-    dis_ = std::uniform_real_distribution<double>(0.0, 1.0);
+    subgraph_ = Subgraph(k);
+    gen_ = Xoshiro256(random_seed);
     edge_id_to_index_ = emhash5::HashMap<long, int>(SL_size_);
 
 }
@@ -101,47 +128,40 @@ Tonic_FD::~Tonic_FD() {
 }
 
 /**
- * Set the edge oracle for the Tonic_FD class
- * @param edge_oracle
+ * Set the oracle for Tonic_FD, shared with the other instances: the oracle is not copied
+ * @param oracle
  */
-void Tonic_FD::set_edge_oracle(emhash5::HashMap<long, int> &edge_oracle) {
-    edge_id_oracle_ = edge_oracle;
-    edge_oracle_flag_ = true;
+void Tonic_FD::set_oracle(SharedOracle oracle) {
+    oracle_ = std::move(oracle);
+    edge_oracle_flag_ = oracle_->is_edge_oracle();
 }
 
 /**
- * Set the node oracle for the Tonic_FD class
- * @param node_oracle
+ * Switch Tonic_FD to dense node ids in [0, num_nodes), checked when resuming from a checkpoint. A node oracle of a
+ * relabeled stream is built from a vector indexed by dense node ids
+ * @param num_nodes number of nodes of the relabeled stream
  */
-void Tonic_FD::set_node_oracle(emhash5::HashMap<int, int> &node_oracle) {
-    node_oracle_ = node_oracle;
+void Tonic_FD::set_dense_nodes(int num_nodes) {
+    num_dense_nodes_ = num_nodes;
 }
 
+
 /**
- * Return heaviness prediction from the node or edge oracle given the current edge (u, v)
+ * Return heaviness prediction from the node or edge oracle given the current edge (u, v), counting oracle hits
  * @param u
  * @param v
  * @return heaviness if the edge or both nodes are found in the predictor, -1 otherwise
  */
 int Tonic_FD::get_heaviness(const int u, const int v) {
-    if (edge_oracle_flag_) {
-        auto id_it = edge_id_oracle_.find(edge_to_id(u, v));
-        if (id_it != edge_id_oracle_.end()) {
-            return id_it->second;
-        } else {
-            return -1;
-        }
-    } else {
-        // -- print node u
-        auto u_it = node_oracle_.find(u);
-        if (u_it != node_oracle_.end()) {
-            auto v_it = node_oracle_.find(v);
-            if (v_it != node_oracle_.end()) {
-                return std::min(u_it->second, v_it->second);
-            }
-        }
+    oracle_queries_++;
+    // -- most edges are not in the oracle: the prefilter answers them without probing the oracle
+    if (!oracle_->may_contain(u, v)) {
+        oracle_filtered_++;
         return -1;
     }
+    int heaviness = oracle_->find(u, v);
+    if (heaviness > -1) oracle_hits_++;
+    return heaviness;
 }
 
 /**
@@ -149,7 +169,7 @@ int Tonic_FD::get_heaviness(const int u, const int v) {
  * @return random double
  */
 inline double Tonic_FD::next_double() {
-    return dis_(gen_);
+    return gen_.next_double();
 }
 
 /**
@@ -157,7 +177,7 @@ inline double Tonic_FD::next_double() {
  * @return number of nodes
  */
 long Tonic_FD::get_num_nodes() const {
-    return (long) subgraph_.size();
+    return (long) subgraph_.num_nodes();
 }
 
 /**
@@ -173,10 +193,7 @@ long Tonic_FD::get_num_edges() const {
  * @param nodes to fill
  */
 void Tonic_FD::get_nodes(std::vector<int> &nodes) const {
-    nodes.clear();
-    for (const auto &it: subgraph_) {
-        nodes.push_back(it.first);
-    }
+    subgraph_.get_nodes(nodes);
 }
 
 /**
@@ -198,8 +215,7 @@ void Tonic_FD::get_local_nodes(std::vector<int> &nodes) const {
  */
 void Tonic_FD::add_edge(const int u, const int v, bool det) {
 
-    subgraph_[u][v] = det;
-    subgraph_[v][u] = det;
+    subgraph_.insert(u, v, det);
     num_edges_++;
 
 }
@@ -212,38 +228,9 @@ void Tonic_FD::add_edge(const int u, const int v, bool det) {
  * 1 if the deleted edge is det (W or H). If present, remove directly the edge from the subgraph
  */
 int Tonic_FD::edge_deletion(const int u, const int v) {
-    auto u_it = subgraph_.find(u);
-    if (u_it != subgraph_.end()) {
-        if (u_it->second.find(v) != u_it->second.end()) {
-            // -- edge uv found
-            bool u_det = u_it->second[v];
-            num_edges_--;
-            u_it->second.erase(v);
-            if (u_it->second.empty()) {
-                subgraph_.erase(u);
-            }
-
-            auto v_it = subgraph_.find(v);
-            if (v_it != subgraph_.end()) {
-                if (v_it->second.find(u) != v_it->second.end()) {
-                    // -- edge vu found
-                    bool v_det = v_it->second[u];
-                    v_it->second.erase(u);
-                    if (v_it->second.empty()) {
-                        subgraph_.erase(v);
-                    }
-
-                    // -- return 1 if edge is det, 0 if edge is not det
-                    assert(u_det == v_det);
-                    return (u_det ? 1 : 0);
-
-                }
-            }
-        }
-    }
-
-    // -- return -1: edge not found
-    return -1;
+    int deletion_status = subgraph_.erase(u, v);
+    if (deletion_status >= 0) num_edges_--;
+    return deletion_status;
 }
 
 /**
@@ -253,34 +240,9 @@ int Tonic_FD::edge_deletion(const int u, const int v) {
  * @return true if the edge was found and removed, false otherwise
  */
 bool Tonic_FD::remove_edge(const int u, const int v) {
-    auto u_it = subgraph_.find(u);
-    if (u_it != subgraph_.end()) {
-        if (u_it->second.find(v) != u_it->second.end()) {
-            // -- edge uv found
-            num_edges_--;
-            u_it->second.erase(v);
-            if (u_it->second.empty()) {
-                subgraph_.erase(u);
-            }
-
-            auto v_it = subgraph_.find(v);
-            if (v_it != subgraph_.end()) {
-                if (v_it->second.find(u) != v_it->second.end()) {
-                    // -- edge vu found
-                    v_it->second.erase(u);
-                    if (v_it->second.empty()) {
-                        subgraph_.erase(v);
-                    }
-
-                    return true;
-
-                }
-            }
-        }
-
-    }
-
-    return false;
+    if (subgraph_.erase(u, v) < 0) return false;
+    num_edges_--;
+    return true;
 }
 
 /**
@@ -314,6 +276,20 @@ double Tonic_FD::get_local_triangles(const int u) const {
     }
 }
 
+/**
+ * Add cnt triangles to the local count of node u
+ * @param u
+ * @param cnt
+ */
+inline void Tonic_FD::add_local_triangles(const int u, const double cnt) {
+    auto u_it = local_triangles_cnt_.find(u);
+    if (u_it != local_triangles_cnt_.end()) {
+        u_it->second += cnt;
+    } else {
+        local_triangles_cnt_.insert_unique(u, cnt);
+    }
+}
+
 /**
  * Function that counts the triangles closed by the current edge (src, dst). Increments the counters if sign is +,
  * or decrements the counters if sign is -. The function is called before the edge is sampled.
@@ -323,68 +299,57 @@ double Tonic_FD::get_local_triangles(const int u) const {
  */
 void Tonic_FD::count_triangles(const int src, const int dst, const int sign) {
 
-    emhash5::HashMap<int, bool> *u_neighs, *v_neighs;
-    auto u_it = subgraph_.find(src);
-    if (u_it == subgraph_.end() or u_it->second.empty()) {
+    Subgraph::Neighbors u_neighs = subgraph_.neighbors(src);
+    if (u_neighs.empty()) {
         return;
     }
-    u_neighs = &u_it->second;
-    int du = (int) u_neighs->size();
-
-    auto v_it = subgraph_.find(dst);
-    if (v_it == subgraph_.end() or v_it->second.empty()) {
+    Subgraph::Neighbors v_neighs = subgraph_.neighbors(dst);
+    if (v_neighs.empty()) {
         return;
     }
-    v_neighs = &v_it->second;
-
-    int dv = (int) v_neighs->size();
     int u = src;
     int v = dst;
 
-    if (du == 0 or dv == 0) {
-        return;
-    }
-
-    if (du > dv) {
+    if (u_neighs.size() > v_neighs.size()) {
         v = src;
         u = dst;
-        emhash5::HashMap<int, bool> *u_neighs_tmp = u_neighs;
-        u_neighs = v_neighs;
-        v_neighs = u_neighs_tmp;
+        std::swap(u_neighs, v_neighs);
+    }
+
+    // -- weights of the triangles with zero, one or two light edges, negative for deletions
+    double increments[3] = {1.0, 1.0, 1.0};
+    if ((ell_ + d_g + d_b) > SL_size_) {
+        // -- one edge is light
+        increments[1] = ((double) (ell_ + d_g + d_b) / (double) SL_size_);
+        // -- both edges are light
+        increments[2] = ((double) (ell_ + d_g + d_b) / SL_size_) * ((double) ((ell_ + d_g + d_b - 1.0))) /
+                        (SL_size_ - 1.0);
     }
+    double sign_T = sign < 0 ? -1.0 : 1.0;
 
-    double cum_cnt = 0.0;
+    // -- triangles are counted by number of light edges, so that the estimate does not depend on the iteration
+    // -- order of the neighborhoods (which is not preserved by a checkpoint)
+    long n_triangles[3] = {0, 0, 0};
 
-    for (const auto &it: *u_neighs) {
-        int w = it.first;
+    for (const auto &uw: u_neighs) {
+        int w = uw.node;
 
         if (w == v) {
             continue;
         }
 
-        auto vw_it = v_neighs->find(w);
-        if (vw_it != v_neighs->end()) {
+        const Subgraph::Neighbor *vw = v_neighs.find(w);
+        if (vw != nullptr) {
             // -- triangle {u, v, w} discovered
-            double increment_T = 1.0;
-            if ((ell_ + d_g + d_b) > SL_size_) {
-                bool vw_light = !vw_it->second;
-                bool wu_light = !it.second;
-                if (vw_light && wu_light) {
-                    // -- both edges are light
-                    increment_T =
-                            ((double) (ell_ + d_g + d_b) / SL_size_) * ((double) ((ell_ + d_g + d_b - 1.0))) /
-                            (SL_size_ - 1.0);
-                } else if (vw_light || wu_light) {
-                    // -- one edge is light
-                    increment_T = ((double) (ell_ + d_g + d_b) / (double) SL_size_);
-                }
-            }
-
-            cum_cnt += increment_T;
-
+            int n_light = (vw->det ? 0 : 1) + (uw.det ? 0 : 1);
+            n_triangles[n_light]++;
+            add_local_triangles(w, sign_T * increments[n_light]);
         }
     }
 
+    double cum_cnt = (double) n_triangles[0] + (double) n_triangles[1] * increments[1] +
+                     (double) n_triangles[2] * increments[2];
+
     // -- update counters
     if (cum_cnt > 0) {
         // -- subtract counter
@@ -392,7 +357,8 @@ void Tonic_FD::count_triangles(const int src, const int dst, const int sign) {
             cum_cnt = -cum_cnt;
         }
         global_triangles_cnt_ += cum_cnt;
-
+        add_local_triangles(u, cum_cnt);
+        add_local_triangles(v, cum_cnt);
 
     }
 
@@ -409,8 +375,7 @@ void Tonic_FD::sample_edge(const int u, const int v) {
         // -- insert current edge into H
         H_cur_++;
         int current_heaviness = get_heaviness(u, v);
-        heavy_edges_.push({{u, v}, current_heaviness});
-        heavy_edges_set_.insert(edge_to_id(u, v));
+        heavy_edges_.push({u, v}, current_heaviness);
         return;
 
     } else if (waiting_room_->cur_size_ < WR_size_) {
@@ -433,37 +398,16 @@ void Tonic_FD::sample_edge(const int u, const int v) {
 
         int current_heaviness = get_heaviness(uv_sample.first, uv_sample.second);
 
-        Heavy_edge lightest_heavy_edge;
-        int lightest_heaviness;
-
         if (current_heaviness > -1) {
 
-            lightest_heavy_edge = heavy_edges_.top();
-            lightest_heaviness = lightest_heavy_edge.second;
-            bool found_in_H = heavy_edges_set_.find(
-                    edge_to_id(lightest_heavy_edge.first.first, lightest_heavy_edge.first.second)) !=
-                              heavy_edges_set_.end();
-
-            while (!found_in_H) {
-                heavy_edges_.pop();
-                lightest_heavy_edge = heavy_edges_.top();
-                lightest_heaviness = lightest_heavy_edge.second;
-                found_in_H = heavy_edges_set_.find(
-                        edge_to_id(lightest_heavy_edge.first.first, lightest_heavy_edge.first.second)) !=
-                             heavy_edges_set_.end();
-            }
+            // -- deleted heavy edges are removed from H right away, so the lightest edge is always in H
+            int lightest_heaviness = heavy_edges_.min_heaviness();
 
             if (current_heaviness > lightest_heaviness ||
                 (current_heaviness == lightest_heaviness && next_double() < 0.5)) {
-                // -- replace the lightest heavy edge with current edge
-                heavy_edges_.pop();
-                heavy_edges_set_.erase(edge_to_id(lightest_heavy_edge.first.first, lightest_heavy_edge.first.second));
-
-                heavy_edges_.push({{uv_sample.first, uv_sample.second}, current_heaviness});
-                heavy_edges_set_.insert(edge_to_id(uv_sample.first, uv_sample.second));
-
-                uv_sample = lightest_heavy_edge.first;
-
+                // -- replace a lightest heavy edge (uniformly at random among ties) with current edge
+                heavy_replacements_++;
+                uv_sample = heavy_edges_.replace_min(uv_sample, current_heaviness, gen_);
             }
         }
 
@@ -476,23 +420,19 @@ void Tonic_FD::sample_edge(const int u, const int v) {
                 // assert(edge_id_to_index_.size() <= SL_size_);
                 light_edges_sample_[SL_cur_++] = uv_sample;
                 // -- change the edge in the subgraph
-                subgraph_[uv_sample.first][uv_sample.second] = false;
-                subgraph_[uv_sample.second][uv_sample.first] = false;
+                subgraph_.insert(uv_sample.first, uv_sample.second, false);
                 return;
 
             } else {
                 // -- all sets are full -> resort to sampling
                 double p = (double) (SL_size_) / (double) ell_;
                 // assert(uv_sample.first < uv_sample.second);
-                if (dis_(gen_) < p) {
+                if (next_double() < p) {
                     // -- edge is sampled
-                    subgraph_[uv_sample.first][uv_sample.second] = false;
-                    subgraph_[uv_sample.second][uv_sample.first] = false;
+                    subgraph_.insert(uv_sample.first, uv_sample.second, false);
                     // -- evict edge uniformly at random
                     // assert(SL_cur_ == SL_size_);
-                    std::uniform_int_distribution<int> dis_int = std::uniform_int_distribution<int>(0,
-                                                                                                    (int) SL_cur_ - 1);
-                    int replace_idx = dis_int(gen_);
+                    int replace_idx = (int) gen_.next_int(SL_cur_);
                     Edge uv_replace = light_edges_sample_[replace_idx];
 
                     if (!remove_edge(uv_replace.first, uv_replace.second)) {
@@ -527,8 +467,7 @@ void Tonic_FD::sample_edge(const int u, const int v) {
                 edge_id_to_index_.emplace(edge_to_id(uv_sample.first, uv_sample.second), SL_cur_);
                 light_edges_sample_[SL_cur_++] = uv_sample;
                 // -- change the edge in the subgraph
-                subgraph_[uv_sample.first][uv_sample.second] = false;
-                subgraph_[uv_sample.second][uv_sample.first] = false;
+                subgraph_.insert(uv_sample.first, uv_sample.second, false);
                 d_b--;
             } else {
                 remove_edge(uv_sample.first, uv_sample.second);
@@ -564,12 +503,22 @@ void Tonic_FD::process_edge(const int src, const int dst, const int t, const int
     current_timestamp_ = t;
     t_++;
 
-    count_triangles(u, v, sign);
+    PROFILE_EDGE_BEGIN(profiler_);
+
+    {
+        PROFILE_PHASE(profiler_, PHASE_COUNT_TRIANGLES);
+        count_triangles(u, v, sign);
+    }
     if (sign >= 0) {
         // -- edge addition
-        sample_edge(u, v);
+        {
+            PROFILE_PHASE(profiler_, PHASE_SAMPLE_EDGE);
+            sample_edge(u, v);
+        }
+        PROFILE_PHASE(profiler_, PHASE_ADD_EDGE);
         add_edge(u, v, true);
     } else {
+        PROFILE_PHASE(profiler_, PHASE_EDGE_DELETION);
         // -- edge removal
         // -- check if the edge is det or not
         int deletion_status = edge_deletion(u, v);
@@ -593,7 +542,7 @@ void Tonic_FD::process_edge(const int src, const int dst, const int t, const int
                 bool is_in_WR = waiting_room_->remove_edge(u, v);
 
                 if (!is_in_WR) {
-                    heavy_edges_set_.erase(edge_to_id(u, v));
+                    heavy_edges_.erase({u, v});
                     H_cur_--;
                 }
 
@@ -616,6 +565,137 @@ void Tonic_FD::process_edge(const int src, const int dst, const int t, const int
 
     }
 
+    PROFILE_EDGE_END(profiler_);
+
 }
 
 
+
+/**
+ * Write the full state of the sampler to a checkpoint: counters, waiting room, heavy edges, light sample, subgraph,
+ * local counts and random generator. Oracles are not written, they are read again on resume
+ * @param writer
+ */
+void Tonic_FD::save_state(CheckpointWriter &writer) const {
+    // -- parameters, checked on resume
+    writer.write(k_);
+    writer.write(alpha_);
+    writer.write(beta_);
+    writer.write(random_seed_);
+    writer.write(edge_oracle_flag_);
+    writer.write(num_dense_nodes_);
+
+    // -- counters
+    writer.write(t_);
+    writer.write(H_cur_);
+    writer.write(ell_);
+    writer.write(SL_cur_);
+    writer.write(d_g);
+    writer.write(d_b);
+    writer.write(current_timestamp_);
+    writer.write(num_edges_);
+    writer.write(global_triangles_cnt_);
+    writer.write(heavy_replacements_);
+    writer.write(oracle_queries_);
+    writer.write(oracle_hits_);
+    writer.write(oracle_filtered_);
+
+    // -- edge sets, the heavy edges in bucket order
+    waiting_room_->save_state(writer);
+    std::vector<Heavy_edge> heavy_edges;
+    heavy_edges_.get_edges(heavy_edges);
+    writer.write_array(heavy_edges.data(), heavy_edges.size());
+    writer.write_array(light_edges_sample_, SL_cur_);
+    std::vector<std::pair<long, int>> edge_index;
+    for (const auto &it: edge_id_to_index_) edge_index.emplace_back(it.first, it.second);
+    writer.write_array(edge_index.data(), edge_index.size());
+
+    // -- subgraph as adjacency lists (v, det)
+    std::vector<int> nodes;
+    subgraph_.get_nodes(nodes);
+    writer.write((uint64_t) nodes.size());
+    std::vector<std::pair<int, bool>> neighs;
+    for (int u: nodes) {
+        neighs.clear();
+        for (const auto &uw: subgraph_.neighbors(u)) neighs.emplace_back(uw.node, uw.det);
+        writer.write(u);
+        writer.write_array(neighs.data(), neighs.size());
+    }
+
+    std::vector<std::pair<int, double>> local_counts;
+    for (const auto &it: local_triangles_cnt_) local_counts.emplace_back(it.first, it.second);
+    writer.write_array(local_counts.data(), local_counts.size());
+
+    writer.write_rng(gen_);
+}
+
+/**
+ * Restore the state of the sampler from a checkpoint written by save_state. The instance must be configured (memory
+ * budget, seed, oracle, dense nodes) as the one that wrote the checkpoint
+ * @param reader
+ * @return true if the state was restored
+ */
+bool Tonic_FD::load_state(CheckpointReader &reader) {
+    long k = reader.read<long>();
+    double alpha = reader.read<double>();
+    double beta = reader.read<double>();
+    int random_seed = reader.read<int>();
+    bool edge_oracle_flag = reader.read<bool>();
+    int num_dense_nodes = reader.read<int>();
+    if (!reader.ok() or k != k_ or alpha != alpha_ or beta != beta_ or random_seed != random_seed_ or
+        edge_oracle_flag != edge_oracle_flag_ or num_dense_nodes != num_dense_nodes_) {
+        std::cerr << "Error! Checkpoint was written with different parameters (memory budget, alpha, beta, seed, "
+                     "oracle type or node mapping)\n";
+        return false;
+    }
+
+    t_ = reader.read<unsigned long long>();
+    H_cur_ = reader.read<long>();
+    ell_ = reader.read<long>();
+    SL_cur_ = reader.read<long>();
+    d_g = reader.read<int>();
+    d_b = reader.read<int>();
+    current_timestamp_ = reader.read<long>();
+    num_edges_ = reader.read<long>();
+    global_triangles_cnt_ = reader.read<double>();
+    heavy_replacements_ = reader.read<unsigned long long>();
+    oracle_queries_ = reader.read<unsigned long long>();
+    oracle_hits_ = reader.read<unsigned long long>();
+    oracle_filtered_ = reader.read<unsigned long long>();
+
+    if (!reader.ok() or !waiting_room_->load_state(reader)) return false;
+
+    // -- pushing the heavy edges back in bucket order leaves every edge at its position in its bucket
+    std::vector<Heavy_edge> heavy_edges;
+    reader.read_array(heavy_edges);
+    if (!reader.ok() or (long) heavy_edges.size() != H_cur_ or H_cur_ > H_size_) return false;
+    heavy_edges_ = HeavyEdgeStore(H_size_, true);
+    for (const auto &edge: heavy_edges) heavy_edges_.push(edge.first, edge.second);
+
+    std::vector<Edge> light_edges;
+    reader.read_array(light_edges);
+    if (!reader.ok() or (long) light_edges.size() != SL_cur_ or SL_cur_ > SL_size_) return false;
+    std::copy(light_edges.begin(), light_edges.end(), light_edges_sample_);
+
+    std::vector<std::pair<long, int>> edge_index;
+    reader.read_array(edge_index);
+    edge_id_to_index_.clear();
+    for (const auto &it: edge_index) edge_id_to_index_.insert_unique(it.first, it.second);
+
+    uint64_t n_nodes = reader.read<uint64_t>();
+    subgraph_.clear();
+    std::vector<std::pair<int, bool>> neighs;
+    for (uint64_t i = 0; i < n_nodes and reader.ok(); i++) {
+        int u = reader.read<int>();
+        reader.read_array(neighs);
+        for (const auto &it: neighs) subgraph_.insert(u, it.first, it.second);
+    }
+
+    std::vector<std::pair<int, double>> local_counts;
+    reader.read_array(local_counts);
+    local_triangles_cnt_.clear();
+    for (const auto &it: local_counts) local_triangles_cnt_.insert_unique(it.first, it.second);
+
+    reader.read_rng(gen_);
+    return reader.ok();
+}
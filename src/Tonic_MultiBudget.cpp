@@ -0,0 +1,236 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Tonic_MultiBudget.h"
+#include <algorithm>
+#include <iostream>
+
+/**
+ * Constructor for Tonic_MultiBudget - insertion only algorithm with several memory budgets
+ * @param random_seed
+ * @param budgets memory budgets, at most MAX_BUDGETS
+ * @param alpha
+ * @param beta
+ */
+Tonic_MultiBudget::Tonic_MultiBudget(int random_seed, std::vector<long> budgets, double alpha, double beta) :
+        alpha_(alpha), beta_(beta) {
+
+    std::sort(budgets.begin(), budgets.end());
+    budgets.erase(std::unique(budgets.begin(), budgets.end()), budgets.end());
+    if (budgets.empty() or budgets.size() > MAX_BUDGETS) {
+        std::cerr << "Tonic_MultiBudget - Error! Number of budgets must be in [1, " << MAX_BUDGETS << "]\n";
+        exit(1);
+    }
+
+    long max_WR_size = 0;
+    for (long k: budgets) {
+        Budget budget;
+        budget.k = k;
+        budget.WR_size = (long) (k * alpha);
+        budget.H_size = (long) ((k - budget.WR_size) * beta);
+        budget.SL_size = k - budget.WR_size - budget.H_size;
+        if (budget.WR_size < 1 or budget.SL_size < 2) {
+            std::cerr << "Tonic_MultiBudget - Error! Memory budget " << k << " is too small for alpha " << alpha
+                      << " and beta " << beta << "\n";
+            exit(1);
+        }
+        budget.heavy_edges = FixedSizePQ<StreamEdge, heavy_edge_cmp>(budget.H_size);
+        budget.light_edges = FixedSizePQ<StreamEdge, light_edge_cmp>(budget.SL_size);
+        printf("Budget %ld: WR size = %ld, H size = %ld, SL size = %ld\n", k, budget.WR_size, budget.H_size,
+               budget.SL_size);
+        max_WR_size = std::max(max_WR_size, budget.WR_size);
+        budgets_.push_back(budget);
+    }
+    all_budgets_ = budgets_.size() == 32 ? ~0u : (1u << budgets_.size()) - 1;
+
+    printf("Starting Tonic Multi Budget Algo - alpha %.3f, beta = %.3f | %zu Memory Budgets\n", alpha, beta,
+           budgets_.size());
+    waiting_room_.resize(max_WR_size);
+    n_triangles_.assign(3 * budgets_.size(), 0);
+    gen_ = Xoshiro256(random_seed);
+}
+
+/**
+ * Set the oracle for Tonic_MultiBudget, shared with the other instances: the oracle is not copied
+ * @param oracle
+ */
+void Tonic_MultiBudget::set_oracle(SharedOracle oracle) {
+    oracle_ = std::move(oracle);
+    edge_oracle_flag_ = oracle_->is_edge_oracle();
+}
+
+
+/**
+ * Generate a random double between 0 and 1
+ * @return random double
+ */
+inline double Tonic_MultiBudget::next_double() {
+    return gen_.next_double();
+}
+
+/**
+ * Function that adds an edge to the subgraph
+ * @param edge
+ * @param in budgets sampling the edge
+ * @param det budgets where the edge is deterministic
+ */
+void Tonic_MultiBudget::add_edge(const Edge &edge, uint32_t in, uint32_t det) {
+    num_edges_++;
+    EdgeMask mask = {in, det};
+    subgraph_[edge.first].insert_unique(edge.second, mask);
+    subgraph_[edge.second].insert_unique(edge.first, mask);
+}
+
+/**
+ * Function that removes budgets from the masks of an edge, the edge is removed from the subgraph when no budget
+ * samples it anymore
+ * @param edge
+ * @param in budgets not sampling the edge anymore
+ * @param det budgets where the edge is not deterministic anymore
+ */
+void Tonic_MultiBudget::clear_budgets(const Edge &edge, uint32_t in, uint32_t det) {
+    auto u_it = subgraph_.find(edge.first);
+    auto v_it = subgraph_.find(edge.second);
+    EdgeMask &uv = u_it->second[edge.second];
+    EdgeMask &vu = v_it->second[edge.first];
+    uv.in &= ~in;
+    uv.det &= ~det;
+    vu = uv;
+    if (uv.in == 0) {
+        num_edges_--;
+        u_it->second.erase(edge.second);
+        v_it->second.erase(edge.first);
+        bool u_empty = u_it->second.empty(), v_empty = v_it->second.empty();
+        if (u_empty) subgraph_.erase(edge.first);
+        if (v_empty) subgraph_.erase(edge.second);
+    }
+}
+
+/**
+ * Function that counts the triangles closed by the current edge (src, dst) in the sample of each budget. The
+ * function is called before the edge is sampled.
+ * @param src
+ * @param dst
+ */
+void Tonic_MultiBudget::count_triangles(const int src, const int dst) {
+
+    auto u_it = subgraph_.find(src);
+    if (u_it == subgraph_.end()) {
+        return;
+    }
+    auto v_it = subgraph_.find(dst);
+    if (v_it == subgraph_.end()) {
+        return;
+    }
+    emhash5::HashMap<int, EdgeMask> *u_neighs = &u_it->second, *v_neighs = &v_it->second;
+    if (u_neighs->size() > v_neighs->size()) {
+        std::swap(u_neighs, v_neighs);
+    }
+
+    std::fill(n_triangles_.begin(), n_triangles_.end(), 0);
+    bool found = false;
+
+    // -- iterate over the neighbors of u, once for all the budgets
+    for (const auto &it: *u_neighs) {
+        auto vw_it = v_neighs->find(it.first);
+        if (vw_it == v_neighs->end()) continue;
+        // -- triangle {u, v, w} discovered in the samples of the budgets in both masks
+        const EdgeMask &uw = it.second, &vw = vw_it->second;
+        uint32_t both = uw.in & vw.in;
+        uint32_t uw_light = uw.in & ~uw.det, vw_light = vw.in & ~vw.det;
+        for (uint32_t mask = both; mask != 0; mask &= mask - 1) {
+            int i = __builtin_ctz(mask);
+            int n_light = (int) ((uw_light >> i) & 1u) + (int) ((vw_light >> i) & 1u);
+            n_triangles_[3 * i + n_light]++;
+        }
+        found = found or both != 0;
+    }
+    if (!found) return;
+
+    // -- update counters
+    for (size_t i = 0; i < budgets_.size(); i++) {
+        Budget &budget = budgets_[i];
+        double increment_one_light = 1.0, increment_two_light = 1.0;
+        if (budget.ell > budget.SL_size) {
+            increment_one_light = ((double) budget.ell / budget.SL_size);
+            increment_two_light = ((double) budget.ell / budget.SL_size) * ((double) (budget.ell - 1.0)) /
+                                  (budget.SL_size - 1.0);
+        }
+        budget.global_triangles_cnt += (double) n_triangles_[3 * i] +
+                                       (double) n_triangles_[3 * i + 1] * increment_one_light +
+                                       (double) n_triangles_[3 * i + 2] * increment_two_light;
+    }
+}
+
+/**
+ * Function that moves the oldest edge of the waiting room of budget i into the heavy edges or the light sample
+ * @param i index of the budget
+ * @param stream_edge edge leaving the waiting room
+ */
+void Tonic_MultiBudget::leave_waiting_room(int i, const StreamEdge &stream_edge) {
+
+    Budget &budget = budgets_[i];
+    uint32_t bit = 1u << i;
+
+    if ((long) budget.heavy_edges.size() < budget.H_size) {
+        // -- H is not full: the edge stays deterministic
+        budget.heavy_edges.push(stream_edge);
+        return;
+    }
+
+    // -- retrieve the lightest between the current edge and the lightest heavy edge
+    StreamEdge light_edge = stream_edge;
+    if (stream_edge.heaviness > -1 and budget.H_size > 0) {
+        const StreamEdge &lightest_heavy_edge = budget.heavy_edges.top();
+        if (stream_edge.heaviness > lightest_heavy_edge.heaviness ||
+            (stream_edge.heaviness == lightest_heavy_edge.heaviness && next_double() < 0.5)) {
+            // -- replace the lightest heavy edge with current edge
+            light_edge = lightest_heavy_edge;
+            budget.heavy_edges.pop();
+            budget.heavy_edges.push(stream_edge);
+        }
+    }
+
+    // -- bottom-s sampling on the priorities: uniform sample of s light edges without replacement
+    budget.ell++;
+    if ((long) budget.light_edges.size() < budget.SL_size) {
+        budget.light_edges.push(light_edge);
+        clear_budgets(light_edge.edge, 0, bit);
+    } else if (light_edge.priority < budget.light_edges.top().priority) {
+        StreamEdge evicted = budget.light_edges.top();
+        budget.light_edges.pop();
+        budget.light_edges.push(light_edge);
+        clear_budgets(light_edge.edge, 0, bit);
+        clear_budgets(evicted.edge, bit, bit);
+    } else {
+        // -- edge is not sampled
+        clear_budgets(light_edge.edge, bit, bit);
+    }
+}
+
+/**
+ * Function that processes an edge (src, dst). It counts the triangles for all the budgets, moves the edges leaving
+ * the waiting rooms and inserts the edge in all the waiting rooms
+ * @param src
+ * @param dst
+ */
+void Tonic_MultiBudget::process_edge(const int src, const int dst) {
+
+    Edge edge = src < dst ? Edge(src, dst) : Edge(dst, src);
+    count_triangles(edge.first, edge.second);
+
+    // -- one oracle lookup and one priority per edge, shared by all the budgets
+    StreamEdge stream_edge = {edge, oracle_->lookup(edge.first, edge.second), next_double()};
+
+    long ring_size = (long) waiting_room_.size();
+    for (int i = 0; i < (int) budgets_.size(); i++) {
+        if (t_ >= (unsigned long long) budgets_[i].WR_size) {
+            leave_waiting_room(i, waiting_room_[(t_ - budgets_[i].WR_size) % ring_size]);
+        }
+    }
+
+    waiting_room_[t_ % ring_size] = stream_edge;
+    add_edge(edge, all_budgets_, all_budgets_);
+    t_++;
+}
@@ -0,0 +1,256 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Tonic_Sharded.h"
+#include <algorithm>
+
+/**
+ * Constructor for Tonic_Sharded - insertion only algorithm on several threads
+ * @param random_seed seed of the coloring and of the shards (the single shard of one color runs with random_seed)
+ * @param k memory budget, split evenly among the shards
+ * @param alpha
+ * @param beta
+ * @param num_colors number of node colors, num_colors * (num_colors + 1) * (num_colors + 2) / 6 shards
+ * @param num_threads number of worker threads
+ */
+Tonic_Sharded::Tonic_Sharded(int random_seed, long k, double alpha, double beta, int num_colors, int num_threads) :
+        num_threads_(std::max(1, num_threads)) {
+
+    Xoshiro256 seeder(random_seed);
+    coloring_ = NodeColoring(std::max(1, num_colors), seeder());
+    int C = coloring_.num_colors();
+    long shard_budget = k / NodeColoring::num_shards(C);
+    printf("Starting Tonic Sharded - alpha %.3f, beta = %.3f | %d colors, %d shards, %d threads | Memory Budget = %ld "
+           "(%ld per shard)\n", alpha, beta, C, NodeColoring::num_shards(C), num_threads_, k, shard_budget);
+
+    // -- one shard per color multiset {a <= b <= c}
+    std::vector<int> shard_of(C * C * C);
+    for (int a = 0; a < C; a++) {
+        for (int b = a; b < C; b++) {
+            for (int c = b; c < C; c++) {
+                int seed = shards_.empty() ? random_seed : (int) (seeder() >> 33);
+                shards_.push_back(std::make_unique<Tonic>(seed, shard_budget, alpha, beta, false));
+                shards_.back()->set_color_shard(ColorShard(coloring_, a, b, c));
+                shard_of[(a * C + b) * C + c] = (int) shards_.size() - 1;
+            }
+        }
+    }
+
+    // -- an edge of colors a <= b belongs to the shards {a, b, x} for every color x, all distinct
+    routes_.resize(C * C);
+    for (int a = 0; a < C; a++) {
+        for (int b = a; b < C; b++) {
+            for (int x = 0; x < C; x++) {
+                int colors[3] = {a, b, x};
+                std::sort(colors, colors + 3);
+                routes_[a * C + b].push_back(shard_of[(colors[0] * C + colors[1]) * C + colors[2]]);
+            }
+        }
+    }
+
+    for (int i = 0; i < num_threads_; i++) workers_.push_back(std::make_unique<Worker>());
+}
+
+/**
+ * Destructor for Tonic_Sharded, waits for the workers
+ */
+Tonic_Sharded::~Tonic_Sharded() {
+    finish();
+}
+
+/**
+ * Number of colors of a run on num_threads threads: the fewest colors with at least one shard per thread
+ * @param num_threads
+ * @return number of colors
+ */
+int Tonic_Sharded::default_colors(int num_threads) {
+    int num_colors = 1;
+    while (NodeColoring::num_shards(num_colors) < num_threads) num_colors++;
+    return num_colors;
+}
+
+/**
+ * Set the oracle of all the shards, shared and not copied
+ * @param oracle
+ */
+void Tonic_Sharded::set_oracle(const SharedOracle &oracle) {
+    for (auto &shard: shards_) shard->set_oracle(oracle);
+}
+
+/**
+ * Switch all the shards to dense node ids in [0, num_nodes). The shards of a worker thread add their local counts to
+ * the same vector, so there is one vector per thread and not one per shard
+ * @param num_nodes number of nodes of the relabeled stream
+ */
+void Tonic_Sharded::set_dense_nodes(int num_nodes) {
+    dense_local_counts_.assign(std::min((size_t) num_threads_, shards_.size()), std::vector<double>(num_nodes, 0.0));
+    for (size_t i = 0; i < shards_.size(); i++) {
+        shards_[i]->set_dense_nodes(num_nodes, dense_local_counts_[i % num_threads_]);
+    }
+}
+
+/**
+ * Start the worker threads
+ */
+void Tonic_Sharded::start() {
+    started_ = true;
+    for (auto &worker: workers_) {
+        worker->batch.reserve(BATCH_SIZE);
+        worker->done = false;
+        Worker *w = worker.get();
+        worker->thread = std::thread([this, w]() { run_worker(*w); });
+    }
+}
+
+/**
+ * Route the edge (u, v) to the shards of the colors of its endpoints
+ * @param u
+ * @param v
+ */
+void Tonic_Sharded::process_edge(const int u, const int v) {
+    if (!started_) start();
+    int cu = coloring_.color(u);
+    int cv = coloring_.color(v);
+    int C = coloring_.num_colors();
+    const std::vector<int> &route = routes_[cu < cv ? cu * C + cv : cv * C + cu];
+    for (int shard: route) {
+        Worker &worker = *workers_[shard % num_threads_];
+        worker.batch.push_back({shard, u, v});
+        if (worker.batch.size() == BATCH_SIZE) flush(worker);
+    }
+}
+
+/**
+ * Hand the current batch of a worker to its thread, waiting if the worker is too far behind
+ * @param worker
+ */
+void Tonic_Sharded::flush(Worker &worker) {
+    std::vector<RoutedEdge> batch;
+    batch.reserve(BATCH_SIZE);
+    batch.swap(worker.batch);
+    std::unique_lock<std::mutex> lock(worker.mutex);
+    worker.not_full.wait(lock, [&worker]() { return worker.queue.size() < MAX_QUEUED_BATCHES; });
+    worker.queue.push_back(std::move(batch));
+    worker.not_empty.notify_one();
+}
+
+/**
+ * Process the batches of a worker, in order, until finish()
+ * @param worker
+ */
+void Tonic_Sharded::run_worker(Worker &worker) {
+    std::vector<RoutedEdge> batch;
+    while (true) {
+        {
+            std::unique_lock<std::mutex> lock(worker.mutex);
+            worker.not_empty.wait(lock, [&worker]() { return !worker.queue.empty() or worker.done; });
+            if (worker.queue.empty()) return;
+            batch = std::move(worker.queue.front());
+            worker.queue.pop_front();
+            worker.not_full.notify_one();
+        }
+        for (const RoutedEdge &edge: batch) shards_[edge.shard]->process_edge(edge.u, edge.v);
+    }
+}
+
+/**
+ * Process the edges still queued and stop the worker threads. The estimates are complete after finish()
+ */
+void Tonic_Sharded::finish() {
+    if (!started_) return;
+    for (auto &worker: workers_) {
+        if (!worker->batch.empty()) flush(*worker);
+        std::lock_guard<std::mutex> lock(worker->mutex);
+        worker->done = true;
+        worker->not_empty.notify_one();
+    }
+    for (auto &worker: workers_) worker->thread.join();
+    started_ = false;
+}
+
+/**
+ * Sum of the global counts of the shards
+ * @return the global triangle count
+ */
+double Tonic_Sharded::get_global_triangles() const {
+    double global_triangles = 0.0;
+    for (const auto &shard: shards_) global_triangles += shard->get_global_triangles();
+    return global_triangles;
+}
+
+/**
+ * Sum of the local counts of a node in the shards
+ * @param u
+ * @return the local triangle count for node u
+ */
+double Tonic_Sharded::get_local_triangles(const int u) const {
+    double local_triangles = 0.0;
+    if (!dense_local_counts_.empty()) {
+        for (const auto &local_counts: dense_local_counts_) local_triangles += local_counts[u];
+        return local_triangles;
+    }
+    for (const auto &shard: shards_) local_triangles += shard->get_local_triangles(u);
+    return local_triangles;
+}
+
+/**
+ * Return the nodes with a local count in any shard
+ * @param nodes to fill
+ */
+void Tonic_Sharded::get_local_nodes(std::vector<int> &nodes) const {
+    nodes.clear();
+    if (!dense_local_counts_.empty()) {
+        for (int u = 0; u < (int) dense_local_counts_[0].size(); u++) {
+            if (get_local_triangles(u) > 0) nodes.push_back(u);
+        }
+        return;
+    }
+    std::vector<int> shard_nodes;
+    for (const auto &shard: shards_) {
+        shard->get_local_nodes(shard_nodes);
+        nodes.insert(nodes.end(), shard_nodes.begin(), shard_nodes.end());
+    }
+    std::sort(nodes.begin(), nodes.end());
+    nodes.erase(std::unique(nodes.begin(), nodes.end()), nodes.end());
+}
+
+/**
+ * Number of edges sampled by all the shards
+ * @return sampled edges
+ */
+int Tonic_Sharded::get_num_edges() const {
+    int num_edges = 0;
+    for (const auto &shard: shards_) num_edges += shard->get_num_edges();
+    return num_edges;
+}
+
+/**
+ * Oracle queries of all the shards
+ * @return queries
+ */
+unsigned long long Tonic_Sharded::get_oracle_queries() const {
+    unsigned long long queries = 0;
+    for (const auto &shard: shards_) queries += shard->get_oracle_queries();
+    return queries;
+}
+
+/**
+ * Oracle hits of all the shards
+ * @return hits
+ */
+unsigned long long Tonic_Sharded::get_oracle_hits() const {
+    unsigned long long hits = 0;
+    for (const auto &shard: shards_) hits += shard->get_oracle_hits();
+    return hits;
+}
+
+/**
+ * Oracle misses answered by the prefilter of all the shards
+ * @return filtered
+ */
+unsigned long long Tonic_Sharded::get_oracle_filtered() const {
+    unsigned long long filtered = 0;
+    for (const auto &shard: shards_) filtered += shard->get_oracle_filtered();
+    return filtered;
+}
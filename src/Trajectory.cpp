@@ -0,0 +1,61 @@
+//
+// Created by X on 09/03/24.
+//
+
+#include "Trajectory.h"
+#include <algorithm>
+#include <iostream>
+
+/**
+ * Constructor for TrajectoryWriter, writes the header
+ * @param path of the binary file, truncated if it exists
+ * @param seeds random seed of every estimator, in the order of the estimates of the records
+ * @param every_edges edges before the first record (and between two records if growth = 1)
+ * @param growth factor applied to the gap between two records after every record, >= 1
+ */
+TrajectoryWriter::TrajectoryWriter(const std::string &path, const std::vector<int> &seeds,
+                                   unsigned long long every_edges, double growth) :
+        file_(std::fopen(path.c_str(), "wb")), num_estimators_(seeds.size()),
+        gap_((double) std::max(1ULL, every_edges)), growth_(std::max(1.0, growth)),
+        next_edges_(std::max(1ULL, every_edges)) {
+    if (file_ == nullptr) {
+        std::cerr << "Error! Unable to open trajectory file " << path << "\n";
+        return;
+    }
+    auto num_estimators = (uint32_t) num_estimators_;
+    std::fwrite(&MAGIC, sizeof(MAGIC), 1, file_);
+    std::fwrite(&VERSION, sizeof(VERSION), 1, file_);
+    std::fwrite(&num_estimators, sizeof(num_estimators), 1, file_);
+    for (int seed: seeds) {
+        auto seed32 = (int32_t) seed;
+        std::fwrite(&seed32, sizeof(seed32), 1, file_);
+    }
+}
+
+/**
+ * Destructor for TrajectoryWriter
+ */
+TrajectoryWriter::~TrajectoryWriter() {
+    if (file_ != nullptr) std::fclose(file_);
+}
+
+/**
+ * Write a record and schedule the next one. A second record at the same number of edges (e.g. the final record of a
+ * stream whose length is a multiple of the gap) is not written
+ * @param n_edges edges processed so far
+ * @param exact_count exact number of triangles of the first n_edges edges
+ * @param estimates estimate of every estimator after n_edges edges
+ */
+void TrajectoryWriter::record(unsigned long long n_edges, long exact_count, const std::vector<double> &estimates) {
+    if (num_records_ > 0 and n_edges == last_edges_) return;
+    auto edges64 = (uint64_t) n_edges;
+    auto exact64 = (int64_t) exact_count;
+    std::fwrite(&edges64, sizeof(edges64), 1, file_);
+    std::fwrite(&exact64, sizeof(exact64), 1, file_);
+    std::fwrite(estimates.data(), sizeof(double), num_estimators_, file_);
+    num_records_++;
+    last_edges_ = n_edges;
+
+    gap_ *= growth_;
+    next_edges_ = n_edges + std::max(1ULL, (unsigned long long) gap_);
+}
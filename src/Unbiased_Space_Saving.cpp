@@ -1,14 +1,58 @@
 #include "Unbiased_Space_Saving.h"
 #include <algorithm>
+#include <iostream>
 
 /**
  * Constructor for UnbiasedSpaceSaving
  * @param k capacity of the heap (number of tracked nodes)
  * @param seed random seed used for probabilistic replacement
+ * @param num_dense_nodes if > 0, node ids are dense in [0, num_dense_nodes) and the node -> index table is a vector
  */
-UnbiasedSpaceSaving::UnbiasedSpaceSaving(int k, int seed)
-    : capacity_(k), gen_(seed), dist_(0.0, 1.0) {
+UnbiasedSpaceSaving::UnbiasedSpaceSaving(int k, int seed, int num_dense_nodes)
+    : capacity_(k), gen_(seed) {
     heap_.resize(k, {-1, 0});  // Dummy node: -1 means unused
+    if (num_dense_nodes > 0) {
+        dense_ = true;
+        dense_node_to_index_.assign(num_dense_nodes, -1);
+    }
+}
+
+/**
+ * Return the index of a node in the heap
+ * @param node
+ * @return the index of the node, -1 if the node is not tracked
+ */
+inline int UnbiasedSpaceSaving::find_index(int node) const {
+    if (dense_) {
+        return dense_node_to_index_[node];
+    }
+    auto it = node_to_index_.find(node);
+    return it != node_to_index_.end() ? it->second : -1;
+}
+
+/**
+ * Set the index of a node in the heap. Unused slots (node -1) are not indexed
+ * @param node
+ * @param i index in the heap
+ */
+inline void UnbiasedSpaceSaving::set_index(int node, int i) {
+    if (dense_) {
+        if (node >= 0) dense_node_to_index_[node] = i;
+    } else {
+        node_to_index_[node] = i;
+    }
+}
+
+/**
+ * Stop tracking the index of a node evicted from the heap
+ * @param node
+ */
+inline void UnbiasedSpaceSaving::erase_index(int node) {
+    if (dense_) {
+        dense_node_to_index_[node] = -1;
+    } else {
+        node_to_index_.erase(node);
+    }
 }
 
 /**
@@ -17,9 +61,8 @@ UnbiasedSpaceSaving::UnbiasedSpaceSaving(int k, int seed)
  * @param node node ID to be updated
  */
 void UnbiasedSpaceSaving::update(int node) {
-    auto it = node_to_index_.find(node);
-    if (it != node_to_index_.end()) {
-        int i = it->second;
+    int i = find_index(node);
+    if (i >= 0) {
         heap_[i].freq++;
         sift_down(i);
     } else {
@@ -27,16 +70,16 @@ void UnbiasedSpaceSaving::update(int node) {
         if (heap_[min_idx].node == -1) {
             // Place new node at root
             heap_[min_idx] = {node, 1};
-            node_to_index_[node] = min_idx;
+            set_index(node, min_idx);
             sift_down(min_idx);
         } else {
             int min_freq = heap_[min_idx].freq;
             double prob = 1.0 / (min_freq + 1);
-            if (dist_(gen_) < prob) {
+            if (gen_.next_double() < prob) {
                 int evicted = heap_[min_idx].node;
-                node_to_index_.erase(evicted);
+                erase_index(evicted);
                 heap_[min_idx] = {node, min_freq + 1};
-                node_to_index_[node] = min_idx;
+                set_index(node, min_idx);
                 sift_down(min_idx);
             }
         }
@@ -62,6 +105,38 @@ const std::vector<UnbiasedSpaceSaving::HeapNode>& UnbiasedSpaceSaving::top_n(int
     return heap_;
 }
 
+/**
+ * Write the heap and the random generator to a checkpoint
+ * @param writer
+ */
+void UnbiasedSpaceSaving::save_state(CheckpointWriter &writer) const {
+    writer.write(capacity_);
+    writer.write_array(heap_.data(), heap_.size());
+    writer.write_rng(gen_);
+}
+
+/**
+ * Restore the heap and the random generator from a checkpoint, the node -> index table is rebuilt from the heap
+ * @param reader
+ * @return true if the state was restored
+ */
+bool UnbiasedSpaceSaving::load_state(CheckpointReader &reader) {
+    int capacity = reader.read<int>();
+    std::vector<HeapNode> heap;
+    reader.read_array(heap);
+    reader.read_rng(gen_);
+    if (!reader.ok() or capacity != capacity_ or heap.size() != heap_.size()) {
+        std::cerr << "Error! USS checkpoint does not match capacity " << capacity_ << "\n";
+        return false;
+    }
+    heap_ = heap;
+    node_to_index_.clear();
+    for (int i = 0; i < (int) heap_.size(); i++) {
+        if (heap_[i].node >= 0) set_index(heap_[i].node, i);
+    }
+    return true;
+}
+
 /**
  * Return index of the left child in the heap
  * @param i parent index
@@ -104,6 +179,6 @@ void UnbiasedSpaceSaving::sift_down(int i) {
  */
 void UnbiasedSpaceSaving::swap_nodes(int i, int j) {
     std::swap(heap_[i], heap_[j]);
-    node_to_index_[heap_[i].node] = i;
-    node_to_index_[heap_[j].node] = j;
+    set_index(heap_[i].node, i);
+    set_index(heap_[j].node, j);
 }
\ No newline at end of file
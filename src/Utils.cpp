@@ -3,8 +3,14 @@
 //
 
 #include "../include/Utils.h"
+#include "../include/External_Sort.h"
+#include "../include/Compressed_Input.h"
+#include "../include/Tonic.h"
 #include <fstream>
 #include <filesystem>
+#include <unistd.h>
+#include <thread>
+#include <atomic>
 
 /**
  * Runs the exact algorithm for counting triangles in a insertion-only, undirected and static graph streams
@@ -12,12 +18,11 @@
  * @param output_path where to write outputs
  * @return the number of triangles in the graph
  */
-long Utils::run_exact_algorithm(std::string &dataset_filepath, std::string &output_path) {
+long Utils::run_exact_algorithm(std::string &dataset_filepath, std::string &output_path, const DatasetCache *cache) {
 
-    std::ifstream file(dataset_filepath);
-    std::string line, su, sv;
+    EdgeReader reader(dataset_filepath, cache);
 
-    if (!file.is_open()) {
+    if (!reader.is_open()) {
         std::cerr << "Error! Unable to open file " << dataset_filepath << "\n";
         return -1;
     }
@@ -29,17 +34,15 @@ long Utils::run_exact_algorithm(std::string &dataset_filepath, std::string &outp
     // -- local triangles
     emhash5::HashMap<int, int> local_triangles;
 
-    int u, v, du, dv, n_min, n_max, timestamp;
+    int u, v, du, dv, n_min, n_max, timestamp, sign;
     std::unordered_set<int> min_neighbors;
 
     long total_T = 0, nline = 0;
     // -- check self-loops
 
-    while (std::getline(file, line)) {
+    while (reader.next(u, v, timestamp, sign)) {
         nline++;
 
-        std::istringstream iss(line);
-        iss >> u >> v >> timestamp;
         if (u == v) continue;
         if (graph_stream[u].find(v) != graph_stream[u].end() and graph_stream[v].find(u) != graph_stream[v].end()) {
             continue;
@@ -70,6 +73,11 @@ long Utils::run_exact_algorithm(std::string &dataset_filepath, std::string &outp
 
     }
 
+    if (reader.failed()) {
+        std::cerr << "Error! Unable to read file " << dataset_filepath << " to the end\n";
+        return -1;
+    }
+
     long num_nodes = (long) graph_stream.size();
     printf("Processed dataset with n = %ld, m = %ld\n", num_nodes, nline);
     // -- write results
@@ -89,12 +97,12 @@ long Utils::run_exact_algorithm(std::string &dataset_filepath, std::string &outp
  * @param output_path where to write outputs
  * @return the number of triangles in the graph
  */
-long Utils::run_exact_algorithm_FD(std::string &dataset_filepath, std::string &output_path) {
+long Utils::run_exact_algorithm_FD(std::string &dataset_filepath, std::string &output_path,
+                                   const DatasetCache *cache) {
 
-    std::ifstream file(dataset_filepath);
-    std::string line, su, sv;
+    EdgeReader reader(dataset_filepath, cache);
 
-    if (!file.is_open()) {
+    if (!reader.is_open()) {
         std::cerr << "Error! Unable to open file " << dataset_filepath << "\n";
         return -1;
     }
@@ -104,8 +112,7 @@ long Utils::run_exact_algorithm_FD(std::string &dataset_filepath, std::string &o
     // - graph
     emhash5::HashMap<int, std::unordered_set<int>> graph_stream;
 
-    int u, v, du, dv, n_min, n_max, timestamp, src, dst;
-    char sign;
+    int u, v, du, dv, n_min, n_max, timestamp, src, dst, sign;
     std::unordered_set<int> min_neighbors;
 
     emhash5::HashMap<unsigned long long, std::pair<int, int>> unique_edges;
@@ -114,11 +121,8 @@ long Utils::run_exact_algorithm_FD(std::string &dataset_filepath, std::string &o
     long total_T = 0, nline = 0, cum_triangles = 0, num_edges = 0;
     long max_edges = 0, time_max_edges = 0;
 
-    while (std::getline(file, line)) {
-
+    while (reader.next(src, dst, timestamp, sign)) {
 
-        std::istringstream iss(line);
-        iss >> src >> dst >> timestamp >> sign;
         u = src;
         v = dst;
         if (u > v) {
@@ -146,7 +150,7 @@ long Utils::run_exact_algorithm_FD(std::string &dataset_filepath, std::string &o
         }
 
         // -- check if edge is addition or removal
-        if (sign == '-') {
+        if (sign < 0) {
             total_T -= cum_triangles;
             if (graph_stream[u].find(v) != graph_stream[u].end() and
                 graph_stream[v].find(u) != graph_stream[v].end()) {
@@ -175,12 +179,12 @@ long Utils::run_exact_algorithm_FD(std::string &dataset_filepath, std::string &o
 
         // -- update unique edges count
         if (unique_edges.find(edge_to_id(u, v)) == unique_edges.end()) {
-            if (sign == '+')
+            if (sign > 0)
                 unique_edges[edge_to_id(u, v)] = {1, 0};
             else
                 unique_edges[edge_to_id(u, v)] = {0, 1};
         } else {
-            if (sign == '+')
+            if (sign > 0)
                 unique_edges[edge_to_id(u, v)].first += 1;
             else
                 unique_edges[edge_to_id(u, v)].second += 1;
@@ -199,6 +203,11 @@ long Utils::run_exact_algorithm_FD(std::string &dataset_filepath, std::string &o
 
     }
 
+    if (reader.failed()) {
+        std::cerr << "Error! Unable to read file " << dataset_filepath << " to the end\n";
+        return -1;
+    }
+
     long num_nodes = (long) unique_nodes.size();
     printf("Processed dataset with n = %ld, m = %ld\n", num_nodes, nline);
     printf("Unique edges count: %ld\n", (long) unique_edges.size());
@@ -228,7 +237,7 @@ long Utils::run_exact_algorithm_FD(std::string &dataset_filepath, std::string &o
 bool Utils::read_node_oracle(std::string &oracle_filename, char delimiter, int skip,
                              emhash5::HashMap<int, int> &node_oracle) {
 
-    std::ifstream file(oracle_filename);
+    InputFile file(oracle_filename);
     std::string line;
     int i = 0;
     if (file.is_open()) {
@@ -244,6 +253,10 @@ bool Utils::read_node_oracle(std::string &oracle_filename, char delimiter, int s
             }
             i++;
         }
+        if (file.failed()) {
+            std::cerr << "Error! Unable to read file " << oracle_filename << " to the end\n";
+            return false;
+        }
         file.close();
         return true;
     } else {
@@ -259,15 +272,24 @@ bool Utils::read_node_oracle(std::string &oracle_filename, char delimiter, int s
  * @param delimiter for rows of oracle file
  * @param skip line to skip at the beginning of oracle file
  * @param edge_id_oracle the filled hashmap containing the edge oracle
+ * @param node_mapping dense id -> original id of the relabeled stream. If not empty, the edges of the oracle (stored
+ * with original ids) are translated to dense ids, and edges with nodes not appearing in the stream are skipped
  * @return true if the oracle file is read correctly, false otherwise
  */
 bool Utils::read_edge_oracle(std::string &oracle_filename, char delimiter, int skip,
-                             emhash5::HashMap<long, int> &edge_id_oracle) {
+                             emhash5::HashMap<long, int> &edge_id_oracle, const std::vector<int> &node_mapping) {
 
 
-    std::ifstream file(oracle_filename);
+    InputFile file(oracle_filename);
     std::string line;
     int i = 0;
+
+    // -- original id -> dense id, only needed while reading
+    emhash5::HashMap<int, int> dense_ids(node_mapping.size());
+    for (int dense_id = 0; dense_id < (int) node_mapping.size(); dense_id++) {
+        dense_ids.insert_unique(node_mapping[dense_id], dense_id);
+    }
+
     if (file.is_open()) {
         while (std::getline(file, line)) {
             if (i >= skip) {
@@ -279,10 +301,24 @@ bool Utils::read_edge_oracle(std::string &oracle_filename, char delimiter, int s
                 int v = std::stoi(token);
                 std::getline(iss, token, delimiter);
                 int label = std::stoi(token);
+                if (!node_mapping.empty()) {
+                    auto u_it = dense_ids.find(u);
+                    auto v_it = dense_ids.find(v);
+                    if (u_it == dense_ids.end() or v_it == dense_ids.end()) {
+                        i++;
+                        continue;
+                    }
+                    u = u_it->second;
+                    v = v_it->second;
+                }
                 edge_id_oracle.insert_unique(edge_to_id(u, v), label);
             }
             i++;
         }
+        if (file.failed()) {
+            std::cerr << "Error! Unable to read file " << oracle_filename << " to the end\n";
+            return false;
+        }
         file.close();
         return true;
     } else {
@@ -292,6 +328,80 @@ bool Utils::read_edge_oracle(std::string &oracle_filename, char delimiter, int s
 
 }
 
+/**
+ * Return the default path of the node mapping file written by DataPreprocessing for a relabeled dataset
+ * @param dataset_path path of the preprocessed dataset
+ * @return the path of the node mapping file
+ */
+std::string Utils::mapping_path(const std::string &dataset_path) {
+    return dataset_path + ".map";
+}
+
+/**
+ * Check whether a file of a snapshots folder is a snapshot: a .txt file, possibly compressed (.txt.gz or .txt.zst)
+ * @param path
+ * @return true if the file is a snapshot
+ */
+bool Utils::is_snapshot_file(const std::filesystem::path &path) {
+    std::filesystem::path extension = path.extension();
+    if (extension == ".gz" or extension == ".zst") extension = path.stem().extension();
+    return extension == ".txt";
+}
+
+/**
+ * Read the node mapping of a relabeled dataset. The i-th row of the mapping file contains the original id of the
+ * node relabeled with dense id i
+ * @param mapping_filename path for the mapping file
+ * @param node_mapping the filled vector dense id -> original id
+ * @return true if the mapping file is read correctly, false otherwise
+ */
+bool Utils::read_node_mapping(const std::string &mapping_filename, std::vector<int> &node_mapping) {
+
+    InputFile file(mapping_filename);
+    if (!file.is_open()) {
+        std::cerr << "Error! Unable to open file " << mapping_filename << "\n";
+        return false;
+    }
+
+    node_mapping.clear();
+    int node;
+    while (file >> node) {
+        node_mapping.push_back(node);
+    }
+    if (file.failed()) {
+        std::cerr << "Error! Unable to read file " << mapping_filename << " to the end\n";
+        return false;
+    }
+    file.close();
+
+    if (node_mapping.size() > MAX_ID_NODE) {
+        std::cerr << "Error! Number of nodes " << node_mapping.size() << " exceeds MAX_ID_NODE\n";
+        return false;
+    }
+    return true;
+}
+
+/**
+ * Convert a node oracle keyed by original ids into a vector indexed by dense ids
+ * @param node_oracle the node oracle with original ids
+ * @param node_mapping dense id -> original id
+ * @param dense_node_oracle the filled vector, -1 for nodes not in the oracle
+ * @return number of nodes of the oracle found in the mapping, the others are dropped
+ */
+size_t Utils::relabel_node_oracle(const emhash5::HashMap<int, int> &node_oracle, const std::vector<int> &node_mapping,
+                                  std::vector<int> &dense_node_oracle) {
+    dense_node_oracle.assign(node_mapping.size(), -1);
+    size_t found = 0;
+    for (int dense_id = 0; dense_id < (int) node_mapping.size(); dense_id++) {
+        auto it = node_oracle.find(node_mapping[dense_id]);
+        if (it != node_oracle.end()) {
+            dense_node_oracle[dense_id] = it->second;
+            found++;
+        }
+    }
+    return found;
+}
+
 /**
  * Function that preprocesses a graph and saves it in the correct format, i.e., (u v t) for each row, separated
  * by a space delimiter. Also, handles self-loops and multiple edges and sorts the edges by increasing time of arrival
@@ -300,12 +410,15 @@ bool Utils::read_edge_oracle(std::string &oracle_filename, char delimiter, int s
  * @param delimiter for rows of graph dataset file
  * @param skip line to skip at the beginning of graph dataset file
  * @param output_path where to store the preprocess graph dataset
+ * @param relabel if true, nodes are relabeled with dense ids in [0, n) by order of appearance in the preprocessed
+ * stream, and the original ids are written to the mapping file (see mapping_path)
+ * @return false if the graph dataset file could not be read, nothing is written then
  */
-void Utils::preprocess_data(const std::string &dataset_filepath, std::string &delimiter, int skip,
-                            std::string &output_path) {
+bool Utils::preprocess_data(const std::string &dataset_filepath, std::string &delimiter, int skip,
+                            std::string &output_path, bool relabel) {
 
     std::cout << "Preprocessing Dataset...\n";
-    std::ifstream file(dataset_filepath);
+    InputFile file(dataset_filepath);
     std::string line, su, sv;
 
     // -- edge stream
@@ -359,6 +472,10 @@ void Utils::preprocess_data(const std::string &dataset_filepath, std::string &de
             }
 
         }
+        if (file.failed()) {
+            std::cerr << "DataPreprocessing - Error! Graph filepath not read to the end.\n";
+            return false;
+        }
 
         // -- eof
         num_nodes = (int) graph_stream.size();
@@ -375,17 +492,179 @@ void Utils::preprocess_data(const std::string &dataset_filepath, std::string &de
         std::ofstream out_file(output_path);
 
         int cnt = 0;
-        for (auto elem: ordered_edge_stream) {
-            // -- also, rescale the time (not meant for Tonic)
-            out_file << elem.first.first << " " << elem.first.second << " " << ++cnt << "\n";
+        if (relabel) {
+            emhash5::HashMap<int, int> dense_ids(num_nodes);
+            std::vector<int> node_mapping;
+            node_mapping.reserve(num_nodes);
+            auto dense_id = [&](int node) {
+                auto it = dense_ids.find(node);
+                if (it != dense_ids.end()) return it->second;
+                dense_ids.insert_unique(node, (int) node_mapping.size());
+                node_mapping.push_back(node);
+                return (int) node_mapping.size() - 1;
+            };
+            for (auto elem: ordered_edge_stream) {
+                int du = dense_id(elem.first.first);
+                int dv = dense_id(elem.first.second);
+                out_file << du << " " << dv << " " << ++cnt << "\n";
+            }
+
+            std::ofstream mapping_file(mapping_path(output_path));
+            for (int node: node_mapping) {
+                mapping_file << node << "\n";
+            }
+            mapping_file.close();
+            std::cout << "Nodes relabeled, mapping written to " << mapping_path(output_path) << "\n";
+        } else {
+            for (auto elem: ordered_edge_stream) {
+                // -- also, rescale the time (not meant for Tonic)
+                out_file << elem.first.first << " " << elem.first.second << " " << ++cnt << "\n";
+            }
         }
 
         out_file.close();
 
     } else {
         std::cerr << "DataPreprocessing - Error! Graph filepath not opened.\n";
+        return false;
     }
 
+    return true;
+
+}
+
+/**
+ * Out-of-core version of preprocess_data for streams whose edge set does not fit in RAM. The raw stream is parsed in
+ * chunks, and (edge, time) records are spilled to disk as sorted runs. A first k-way merge by edge keeps the last time
+ * of arrival of each edge (deduplication), a second one by time re-timestamps the edges. The output, including the
+ * optional node mapping, is byte-identical to the one of preprocess_data.
+ * @param dataset_filepath path for the graph dataset file
+ * @param delimiter for rows of graph dataset file
+ * @param skip line to skip at the beginning of graph dataset file
+ * @param output_path where to store the preprocess graph dataset
+ * @param relabel if true, nodes are relabeled with dense ids in [0, n) (see preprocess_data)
+ * @param ram_budget_bytes memory budget for the in-memory buffers of the sorted runs
+ * @param tmp_dir folder where the sorted runs are spilled
+ * @return false if the graph dataset file could not be read, nothing is written then
+ */
+bool Utils::preprocess_data_external(const std::string &dataset_filepath, std::string &delimiter, int skip,
+                                     std::string &output_path, bool relabel, size_t ram_budget_bytes,
+                                     const std::string &tmp_dir) {
+
+    struct EdgeRecord {
+        int u, v;
+        long t;
+    };
+
+    // -- by edge, latest arrival first
+    struct edge_record_cmp {
+        bool operator()(const EdgeRecord &a, const EdgeRecord &b) const {
+            if (a.u != b.u) return a.u < b.u;
+            if (a.v != b.v) return a.v < b.v;
+            return a.t > b.t;
+        }
+    };
+
+    // -- by time of last arrival
+    struct time_record_cmp {
+        bool operator()(const EdgeRecord &a, const EdgeRecord &b) const {
+            return a.t < b.t;
+        }
+    };
+
+    std::cout << "Preprocessing Dataset out-of-core (RAM budget = " << ram_budget_bytes / (1024 * 1024) << " MB)...\n";
+    InputFile file(dataset_filepath);
+    if (!file.is_open()) {
+        std::cerr << "DataPreprocessing - Error! Graph filepath not opened.\n";
+        return false;
+    }
+
+    // -- the two phases never fill their buffers at the same time
+    size_t max_records = ram_budget_bytes / sizeof(EdgeRecord);
+    std::string run_prefix = "preprocess_" + std::to_string(getpid());
+    auto same_edge = [](const EdgeRecord &a, const EdgeRecord &b) { return a.u == b.u and a.v == b.v; };
+    ExternalSorter<EdgeRecord, edge_record_cmp> edge_sorter(max_records, tmp_dir, run_prefix + "_edges",
+                                                            edge_record_cmp(), same_edge);
+
+    // -- phase 1: chunked parse, spilling runs sorted by edge
+    std::string line, su, sv;
+    long nline = 0, t = 0;
+    while (std::getline(file, line)) {
+        nline++;
+        if (nline <= skip) continue;
+
+        std::istringstream iss(line);
+        std::getline(iss, su, delimiter[0]);
+        std::getline(iss, sv, delimiter[0]);
+        int u = stoi(su);
+        int v = stoi(sv);
+
+        // -- check self-loops
+        if (u == v) continue;
+        t++;
+        edge_sorter.push({std::min(u, v), std::max(u, v), t});
+
+        if (nline % 3000000 == 0) {
+            std::cout << "Processed " << nline << " edges...\n";
+        }
+    }
+    if (file.failed()) {
+        std::cerr << "DataPreprocessing - Error! Graph filepath not read to the end.\n";
+        return false;
+    }
+    file.close();
+    printf("Parsed %ld edges into %zu sorted runs\n", t, edge_sorter.num_runs());
+
+    // -- phase 2: merge by edge keeping the last arrival, spilling runs sorted by time
+    ExternalSorter<EdgeRecord, time_record_cmp> time_sorter(max_records, tmp_dir, run_prefix + "_times");
+    long num_edges = 0;
+    bool has_previous = false;
+    EdgeRecord previous{};
+    edge_sorter.merge([&](const EdgeRecord &record) {
+        if (has_previous and same_edge(record, previous)) return;
+        previous = record;
+        has_previous = true;
+        num_edges++;
+        time_sorter.push(record);
+    });
+    printf("Preprocessed dataset with m = %ld\n", num_edges);
+
+    // -- phase 3: merge by time and re-timestamp
+    std::cout << "Done!\nWriting results...\n";
+    std::ofstream out_file(output_path);
+    emhash5::HashMap<int, int> dense_ids;
+    std::vector<int> node_mapping;
+    auto dense_id = [&](int node) {
+        auto it = dense_ids.find(node);
+        if (it != dense_ids.end()) return it->second;
+        dense_ids.insert_unique(node, (int) node_mapping.size());
+        node_mapping.push_back(node);
+        return (int) node_mapping.size() - 1;
+    };
+
+    int cnt = 0;
+    time_sorter.merge([&](const EdgeRecord &record) {
+        if (relabel) {
+            int du = dense_id(record.u);
+            int dv = dense_id(record.v);
+            out_file << du << " " << dv << " " << ++cnt << "\n";
+        } else {
+            out_file << record.u << " " << record.v << " " << ++cnt << "\n";
+        }
+    });
+    out_file.close();
+
+    if (relabel) {
+        std::ofstream mapping_file(mapping_path(output_path));
+        for (int node: node_mapping) {
+            mapping_file << node << "\n";
+        }
+        mapping_file.close();
+        std::cout << "Nodes relabeled, mapping written to " << mapping_path(output_path) << "\n";
+    }
+
+    return true;
+
 }
 
 /**
@@ -402,7 +681,7 @@ std::pair<Utils::EdgeStream, long> Utils::preprocess_data_FD(const std::string &
                                                              std::string &delimiter, int skip) {
 
     std::cout << "Preprocessing Dataset...\n";
-    std::ifstream file(dataset_filepath);
+    InputFile file(dataset_filepath);
     std::string line, su, sv;
 
     // -- edge stream
@@ -454,6 +733,10 @@ std::pair<Utils::EdgeStream, long> Utils::preprocess_data_FD(const std::string &
             }
 
         }
+        if (file.failed()) {
+            std::cerr << "DataPreprocessing - Error! Graph filepath " << dataset_filepath << " not read to the end.\n";
+            exit(1);
+        }
 
         // -- eof
         num_nodes = (int) graph_stream.size();
@@ -483,10 +766,10 @@ void Utils::merge_snapshots_FD(std::string &folder, int n_snapshots, std::string
     std::vector<EdgeSigned> fd_edge_stream;
     EdgeStream edge_additions;
 
-    // -- loop through all .txt files in the folder
+    // -- loop through all .txt files in the folder, also compressed
     std::vector<std::string> files;
     for (const auto &entry : std::filesystem::directory_iterator(folder)) {
-        if (entry.path().extension() == ".txt") {
+        if (Utils::is_snapshot_file(entry.path())) {
             files.push_back(entry.path().string());
         }
     }
@@ -593,30 +876,315 @@ void Utils::merge_snapshots_FD(std::string &folder, int n_snapshots, std::string
 
 }
 
+namespace {
+
+    // -- edge of a snapshot with its timestamp, as assigned by Utils::preprocess_data_FD
+    struct SnapshotEdge {
+        int u, v;
+        long t;
+    };
+
+    struct snapshot_edge_cmp {
+        bool operator()(const SnapshotEdge &a, const SnapshotEdge &b) const {
+            if (a.u != b.u) return a.u < b.u;
+            if (a.v != b.v) return a.v < b.v;
+            return a.t < b.t;
+        }
+    };
+
+    struct snapshot_edge_time_cmp {
+        bool operator()(const SnapshotEdge &a, const SnapshotEdge &b) const {
+            return a.t < b.t;
+        }
+    };
+
+    struct long_cmp {
+        bool operator()(const long a, const long b) const { return a < b; }
+    };
+
+    // -- signed event of the fully dynamic stream
+    struct SignedEdge {
+        int u, v;
+        long t;
+        int sign;
+    };
+
+    struct signed_edge_cmp {
+        bool operator()(const SignedEdge &a, const SignedEdge &b) const {
+            if (a.t != b.t) return a.t < b.t;
+            if (a.sign != b.sign) return a.sign > b.sign;
+            if (a.u != b.u) return a.u < b.u;
+            return a.v < b.v;
+        }
+    };
+
+}
+
+/**
+ * Function that reads a graph snapshot and writes its edge set, sorted by edge, to a binary file of
+ * (u, v, t) records with u < v. The timestamps are the same assigned by preprocess_data_FD, i.e., each edge gets the
+ * number of distinct edges whose first occurrence precedes its last occurrence. Everything is computed with
+ * disk-backed sorts, so that memory is bounded by ram_budget_bytes.
+ * @param dataset_filepath path for the graph snapshot file
+ * @param skip line to skip at the beginning of graph snapshot file
+ * @param sorted_path where to write the sorted edge set
+ * @param ram_budget_bytes memory budget for the in-memory buffers of the sorted runs
+ * @param tmp_dir folder where the sorted runs are spilled
+ * @return the number of distinct edges of the snapshot (maximum timestamp)
+ */
+long Utils::sort_snapshot_edges(const std::string &dataset_filepath, int skip, const std::string &sorted_path,
+                                size_t ram_budget_bytes, const std::string &tmp_dir) {
+
+    InputFile file(dataset_filepath);
+    if (!file.is_open()) {
+        std::cerr << "CreateFDStream - Error! Snapshot filepath " << dataset_filepath << " not opened.\n";
+        exit(1);
+    }
+
+    size_t max_records = ram_budget_bytes / sizeof(SnapshotEdge);
+    std::string run_prefix = std::filesystem::path(sorted_path).filename().string();
+
+    // -- 1) occurrences (edge, position) sorted by edge
+    ExternalSorter<SnapshotEdge, snapshot_edge_cmp> occurrences(max_records, tmp_dir, run_prefix + "_occ");
+    std::string line;
+    long nline = 0, pos = 0;
+    int u, v;
+    while (std::getline(file, line)) {
+        nline++;
+        if (nline <= skip) continue;
+        std::istringstream iss(line);
+        iss >> u >> v;
+        // -- check self-loops
+        if (u == v) continue;
+        occurrences.push({std::min(u, v), std::max(u, v), pos++});
+    }
+    if (file.failed()) {
+        std::cerr << "CreateFDStream - Error! Snapshot filepath " << dataset_filepath << " not read to the end.\n";
+        exit(1);
+    }
+    file.close();
+
+    // -- 2) first and last occurrence of each edge
+    ExternalSorter<long, long_cmp> first_positions(max_records * 2, tmp_dir, run_prefix + "_first");
+    ExternalSorter<SnapshotEdge, snapshot_edge_time_cmp> last_positions(max_records, tmp_dir, run_prefix + "_last");
+    bool has_current = false;
+    SnapshotEdge current{};
+    auto close_edge = [&]() {
+        if (has_current) last_positions.push(current);
+    };
+    occurrences.merge([&](const SnapshotEdge &occ) {
+        if (!has_current or occ.u != current.u or occ.v != current.v) {
+            close_edge();
+            first_positions.push(occ.t);
+            has_current = true;
+        }
+        current = occ;
+    });
+    close_edge();
+
+    // -- 3) timestamp = rank of the last occurrence among the first occurrences
+    std::string first_path = sorted_path + ".first";
+    {
+        RecordWriter<long> writer(first_path);
+        first_positions.merge([&](const long first) { writer.write(first); });
+    }
+    ExternalSorter<SnapshotEdge, snapshot_edge_cmp> edges(max_records, tmp_dir, run_prefix + "_edges");
+    long num_edges = 0;
+    {
+        RecordReader<long> reader(first_path);
+        long rank = 0, first;
+        bool has_first = reader.next(first);
+        last_positions.merge([&](const SnapshotEdge &edge) {
+            while (has_first and first < edge.t) {
+                rank++;
+                has_first = reader.next(first);
+            }
+            edges.push({edge.u, edge.v, rank});
+            num_edges++;
+        });
+    }
+    std::filesystem::remove(first_path);
+
+    // -- 4) edge set sorted by edge
+    RecordWriter<SnapshotEdge> writer(sorted_path);
+    edges.merge([&](const SnapshotEdge &edge) { writer.write(edge); });
+
+    printf("Sorted snapshot %s with m = %ld\n", dataset_filepath.c_str(), num_edges);
+    return num_edges;
+}
+
+/**
+ * Streaming version of merge_snapshots_FD. Each snapshot is read once and its edge set is sorted (disk-backed) in
+ * parallel with the others. Insertions and deletions are then derived with a linear merge of consecutive sorted
+ * snapshots, so that memory is bounded by the sort buffers instead of the union of all the snapshots. The final
+ * stream has the same insertions and timestamps of merge_snapshots_FD, and deletions with random timestamps drawn
+ * from the same ranges.
+ * @param folder containing the graph sequences filepaths
+ * @param n_snapshots the number of graphs to merge
+ * @param line_to_skip at the beginning of snapshot dataset file
+ * @param output_path where to write the final FD stream
+ * @param ram_budget_bytes memory budget for the in-memory buffers, shared among the threads
+ * @param tmp_dir folder where sorted snapshots and runs are spilled
+ * @param num_threads number of snapshots processed in parallel
+ * @param seed random seed for the timestamps of the deletions
+ */
+void Utils::merge_snapshots_FD_streaming(std::string &folder, int n_snapshots, int line_to_skip,
+                                         std::string &output_path, size_t ram_budget_bytes,
+                                         const std::string &tmp_dir, int num_threads, unsigned int seed) {
+
+    // -- loop through all .txt files in the folder, also compressed
+    std::vector<std::string> files;
+    for (const auto &entry : std::filesystem::directory_iterator(folder)) {
+        if (Utils::is_snapshot_file(entry.path())) {
+            files.push_back(entry.path().string());
+        }
+    }
+
+    // -- sort files by name
+    std::sort(files.begin(), files.end());
+    if ((int) files.size() > n_snapshots) {
+        files.resize(n_snapshots);
+    }
+    int n_files = (int) files.size();
+    num_threads = std::max(1, std::min(num_threads, n_files));
+    size_t thread_budget = ram_budget_bytes / num_threads;
+
+    std::string run_prefix = (std::filesystem::path(tmp_dir) /
+                              ("fd_" + std::to_string(getpid()) + "_snap")).string();
+    std::vector<std::string> sorted_paths(n_files);
+    std::vector<std::string> event_paths(n_files);
+    for (int i = 0; i < n_files; i++) {
+        sorted_paths[i] = run_prefix + std::to_string(i) + ".bin";
+        event_paths[i] = run_prefix + std::to_string(i) + "_events.txt";
+    }
+
+    // -- run job(i) for i in [0, n_files) on num_threads threads
+    auto parallel_for = [&](const std::function<void(int)> &job) {
+        std::atomic<int> next_idx(0);
+        std::vector<std::thread> workers;
+        for (int w = 0; w < num_threads; w++) {
+            workers.emplace_back([&]() {
+                for (int i = next_idx++; i < n_files; i = next_idx++) {
+                    job(i);
+                }
+            });
+        }
+        for (auto &worker: workers) worker.join();
+    };
+
+    // -- 1) sort the edge set of each snapshot
+    std::vector<long> max_timestamps(n_files);
+    parallel_for([&](int i) {
+        max_timestamps[i] = sort_snapshot_edges(files[i], line_to_skip, sorted_paths[i], thread_budget, tmp_dir);
+    });
+
+    // -- offset of the timestamps of each snapshot
+    std::vector<long> offsets(n_files, 0);
+    for (int i = 1; i < n_files; i++) {
+        offsets[i] = offsets[i - 1] + max_timestamps[i - 1];
+    }
+
+    // -- 2) derive the events of each snapshot with a linear merge against the previous one. The events of snapshot i
+    // -- have timestamps in [offsets[i], offsets[i] + max_timestamps[i]], so each chunk is sorted independently
+    std::vector<long> n_added(n_files, 0), n_deleted(n_files, 0);
+    parallel_for([&](int i) {
+        std::mt19937 gen(seed + i);
+        std::uniform_int_distribution<long> dis(offsets[i] + 1, offsets[i] + std::max(max_timestamps[i], 1L));
+        size_t max_records = thread_budget / sizeof(SignedEdge);
+        ExternalSorter<SignedEdge, signed_edge_cmp> events(max_records, tmp_dir,
+                                                           std::filesystem::path(event_paths[i]).filename().string());
+
+        RecordReader<SnapshotEdge> cur_reader(sorted_paths[i]);
+        SnapshotEdge cur{}, prev{};
+        bool has_cur = cur_reader.next(cur);
+        if (i == 0) {
+            // -- first snap: let stream = G1
+            while (has_cur) {
+                events.push({cur.u, cur.v, cur.t, 1});
+                n_added[i]++;
+                has_cur = cur_reader.next(cur);
+            }
+        } else {
+            RecordReader<SnapshotEdge> prev_reader(sorted_paths[i - 1]);
+            bool has_prev = prev_reader.next(prev);
+            auto edge_less = [](const SnapshotEdge &a, const SnapshotEdge &b) {
+                return a.u < b.u or (a.u == b.u and a.v < b.v);
+            };
+            while (has_cur or has_prev) {
+                if (has_cur and (!has_prev or edge_less(cur, prev))) {
+                    // -- edge added in snapshot i
+                    events.push({cur.u, cur.v, offsets[i] + cur.t, 1});
+                    n_added[i]++;
+                    has_cur = cur_reader.next(cur);
+                } else if (has_prev and (!has_cur or edge_less(prev, cur))) {
+                    // -- edge deleted in snapshot i, at a random time
+                    events.push({prev.u, prev.v, dis(gen), -1});
+                    n_deleted[i]++;
+                    has_prev = prev_reader.next(prev);
+                } else {
+                    has_cur = cur_reader.next(cur);
+                    has_prev = prev_reader.next(prev);
+                }
+            }
+        }
+
+        std::ofstream out_events(event_paths[i]);
+        events.merge([&](const SignedEdge &edge) {
+            out_events << edge.u << " " << edge.v << " " << edge.t << " " << (edge.sign == 1 ? '+' : '-') << "\n";
+        });
+        out_events.close();
+    });
+
+    // -- 3) concatenate the chunks of events
+    std::cout << "Writing the final FD stream...\n";
+    std::ofstream out_file(output_path, std::ios::binary);
+    long fd_length = 0;
+    for (int i = 0; i < n_files; i++) {
+        printf("Snapshot #%d: |Edges added| = %ld, |Edges deleted| = %ld\n", i + 1, n_added[i], n_deleted[i]);
+        fd_length += n_added[i] + n_deleted[i];
+        std::ifstream in_events(event_paths[i], std::ios::binary);
+        out_file << in_events.rdbuf();
+        in_events.close();
+        std::filesystem::remove(event_paths[i]);
+        std::filesystem::remove(sorted_paths[i]);
+    }
+    out_file.close();
+    std::cout << "Length of FD stream = " << fd_length << "\n";
+    std::cout << "Done!\n";
+}
+
 /**
  * Function that builds OracleExact, given the graph filepath. Requires to solve the problem of counting exactly the
  * number of triangles in a graph stream.
  * @param filepath of the graph for which deriving OracleExact
  * @param percentage_retain of entries ((u,v); O_H((u, v))) to store sorted by O_H
  * @param output_path where to write OracleExact
+ * @param node_mapping dense id -> original id if the stream is relabeled (empty otherwise). In that case the
+ * adjacency is indexed by dense ids and the oracle is written with original ids
+ * @return false if the graph file could not be read, the oracle is not written then
  */
-void Utils::build_edge_exact_oracle(std::string &filepath, double percentage_retain, std::string &output_path) {
+bool Utils::build_edge_exact_oracle(std::string &filepath, double percentage_retain, std::string &output_path,
+                                    const std::vector<int> &node_mapping) {
 
     std::cout << "Building edge oracle...\n";
 
-    std::ifstream file(filepath);
+    InputFile file(filepath);
     std::string line;
 
     emhash5::HashMap<Edge, int, hash_edge> oracle_heaviness;
 
     // -- graph
-    emhash5::HashMap<int, std::unordered_set<int>> graph_stream;
+    emhash5::HashMap<int, std::unordered_set<int>> graph_stream_map;
+    std::vector<std::unordered_set<int>> graph_stream_dense(node_mapping.size());
     std::unordered_set<int> min_neighs;
 
     long total_T = 0.0;
     int u, v, t;
 
-    if (file.is_open()) {
+    auto original_id = [&](int node) { return node_mapping.empty() ? node : node_mapping[node]; };
+
+    // -- count the heaviness of each edge, with graph_stream either a hash map or a vector indexed by dense ids
+    auto count_heaviness = [&](auto &graph_stream) {
         long nline = 0;
         while (std::getline(file, line)) {
             nline++;
@@ -656,6 +1224,17 @@ void Utils::build_edge_exact_oracle(std::string &filepath, double percentage_ret
                 printf("Processed %ld edges | Counted %ld triangles\n", nline, total_T);
             }
         }
+    };
+
+    if (file.is_open()) {
+        if (node_mapping.empty())
+            count_heaviness(graph_stream_map);
+        else
+            count_heaviness(graph_stream_dense);
+        if (file.failed()) {
+            std::cerr << "Error! Unable to read oracle file " << filepath << " to the end\n";
+            return false;
+        }
 
         // -- eof: sort results
 
@@ -683,14 +1262,17 @@ void Utils::build_edge_exact_oracle(std::string &filepath, double percentage_ret
         int cnt = 0;
         for (auto elem: sorted_oracle) {
             if (cnt >= stop_idx) break;
-            out_file << elem.first.first << " " << elem.first.second << " " << elem.second << "\n";
+            out_file << original_id(elem.first.first) << " " << original_id(elem.first.second) << " "
+                     << elem.second << "\n";
             cnt++;
         }
 
 
     } else {
         std::cerr << "Error! Unable to open oracle file " << filepath << "\n";
+        return false;
     }
+    return true;
 }
 
 /**
@@ -701,13 +1283,16 @@ void Utils::build_edge_exact_oracle(std::string &filepath, double percentage_ret
  * @param output_path where to write Oracle-noWR
  * @param wr_size the dimension of the waiting room. Used to compute the triangles inside the waiting room to be
  * subtracted to the true heaviness to derive Oracle-noWR
+ * @param node_mapping dense id -> original id if the stream is relabeled (empty otherwise). In that case the
+ * adjacency is indexed by dense ids and the oracle is written with original ids
+ * @return false if the graph file could not be read, the oracle is not written then
  */
-void Utils::build_edge_exact_nowr_oracle(std::string &filepath, double percentage_retain, std::string &output_path,
-                                         int wr_size) {
+bool Utils::build_edge_exact_nowr_oracle(std::string &filepath, double percentage_retain, std::string &output_path,
+                                         int wr_size, const std::vector<int> &node_mapping) {
 
     std::cout << "Building edge oracle...\n";
 
-    std::ifstream file(filepath);
+    InputFile file(filepath);
     std::string line;
 
     emhash5::HashMap<Edge, int, hash_edge> oracle_heaviness;
@@ -715,13 +1300,17 @@ void Utils::build_edge_exact_nowr_oracle(std::string &filepath, double percentag
     emhash5::HashMap<Edge, int, hash_edge> edge_time_arrival;
 
     // -- graph
-    emhash5::HashMap<int, std::unordered_set<int>> graph_stream;
+    emhash5::HashMap<int, std::unordered_set<int>> graph_stream_map;
+    std::vector<std::unordered_set<int>> graph_stream_dense(node_mapping.size());
     std::unordered_set<int> min_neighs;
 
     long total_T = 0.0;
     int u, v, t, src, dst;
 
-    if (file.is_open()) {
+    auto original_id = [&](int node) { return node_mapping.empty() ? node : node_mapping[node]; };
+
+    // -- count the heaviness of each edge, with graph_stream either a hash map or a vector indexed by dense ids
+    auto count_heaviness = [&](auto &graph_stream) {
         long nline = 0;
         while (std::getline(file, line)) {
             nline++;
@@ -783,6 +1372,17 @@ void Utils::build_edge_exact_nowr_oracle(std::string &filepath, double percentag
                 printf("Processed %ld edges | Counted %ld triangles\n", nline, total_T);
             }
         }
+    };
+
+    if (file.is_open()) {
+        if (node_mapping.empty())
+            count_heaviness(graph_stream_map);
+        else
+            count_heaviness(graph_stream_dense);
+        if (file.failed()) {
+            std::cerr << "Error! Unable to read oracle file " << filepath << " to the end\n";
+            return false;
+        }
 
         // -- eof: sort results
 
@@ -809,14 +1409,87 @@ void Utils::build_edge_exact_nowr_oracle(std::string &filepath, double percentag
         int cnt = 0;
         for (auto elem: sorted_oracle) {
             if (cnt >= stop_idx) break;
-            out_file << elem.first.first << " " << elem.first.second << " " << elem.second << "\n";
+            out_file << original_id(elem.first.first) << " " << original_id(elem.first.second) << " "
+                     << elem.second << "\n";
             cnt++;
         }
 
 
     } else {
         std::cerr << "Error! Unable to open oracle file " << filepath << "\n";
+        return false;
+    }
+    return true;
+}
+
+/**
+ * Function that builds an approximate OracleExact in a single pass and bounded memory: the triangles are counted by
+ * Tonic (without oracle) on a sample of memory_budget edges, and the estimated triangles of every discovered triangle
+ * are added to its three edges in a weighted space saving of capacity edges
+ * @param filepath of the graph for which deriving the oracle
+ * @param percentage_retain of entries ((u,v); O_H((u, v))) to store sorted by O_H, at most capacity
+ * @param output_path where to write the oracle
+ * @param memory_budget edges sampled by Tonic
+ * @param capacity edges tracked by the space saving
+ * @param random_seed
+ * @param node_mapping dense id -> original id if the stream is relabeled (empty otherwise). In that case the oracle is
+ * written with original ids
+ * @return false if the graph file could not be read, the oracle is not written then
+ */
+bool Utils::build_edge_stream_oracle(std::string &filepath, double percentage_retain, std::string &output_path,
+                                     long memory_budget, int capacity, int random_seed,
+                                     const std::vector<int> &node_mapping) {
+
+    std::cout << "Building streaming edge oracle...\n";
+
+    InputFile file(filepath);
+    if (!file.is_open()) {
+        std::cerr << "Error! Unable to open oracle file " << filepath << "\n";
+        return false;
+    }
+    std::string line;
+    int u, v, t;
+
+    auto original_id = [&](int node) { return node_mapping.empty() ? node : node_mapping[node]; };
+
+    // -- no oracle and no heavy edges: the sample is a waiting room and a uniform sample of light edges
+    Tonic tonic_algo(random_seed, memory_budget, 0.05, 0.0);
+    if (!node_mapping.empty()) tonic_algo.set_dense_nodes((int) node_mapping.size());
+    tonic_algo.setup_edge_space_saving(capacity);
+
+    long nline = 0;
+    while (std::getline(file, line)) {
+        std::istringstream iss(line);
+        iss >> u >> v >> t;
+        if (u == v) continue;
+        tonic_algo.process_edge(u, v);
+        if (++nline % 3000000 == 0) {
+            printf("Processed %ld edges | Estimated %f triangles\n", nline, tonic_algo.get_global_triangles());
+        }
+    }
+    if (file.failed()) {
+        std::cerr << "Error! Unable to read oracle file " << filepath << " to the end\n";
+        return false;
     }
+
+    int stop_idx = (int) (percentage_retain * (double) nline);
+    if (stop_idx > capacity) {
+        std::cerr << "Warning! Writing " << capacity << " entries instead of " << stop_idx
+                  << ", increase the capacity of the oracle\n";
+        stop_idx = capacity;
+    }
+    std::vector<EdgeSpaceSaving::HeapEntry> top_edges = tonic_algo.get_top_edges(stop_idx);
+
+    std::cout << "Estimated Total Triangles -> " << tonic_algo.get_global_triangles() << "\n";
+    std::cout << "Writing top " << top_edges.size() << " entries...\n";
+
+    std::ofstream out_file(output_path);
+    for (const auto &elem: top_edges) {
+        int src = (int) (elem.edge / (long) MAX_ID_NODE);
+        int dst = (int) (elem.edge % (long) MAX_ID_NODE);
+        out_file << original_id(src) << " " << original_id(dst) << " " << std::lround(elem.weight) << "\n";
+    }
+    return true;
 }
 
 /**
@@ -825,16 +1498,22 @@ void Utils::build_edge_exact_nowr_oracle(std::string &filepath, double percentag
  * @param filepath of the graph for which deriving MinDegreePredictor
  * @param percentage_retain of entries (u; deg(u)) to store sorted by deg(u)
  * @param output_path where to write MinDegreePredictor
+ * @param node_mapping dense id -> original id if the stream is relabeled (empty otherwise). In that case the
+ * degree table is a vector indexed by dense ids and the oracle is written with original ids
+ * @return false if the graph file could not be read, the oracle is not written then
  */
-void Utils::build_node_oracle(std::string &filepath, double percentage_retain, std::string &output_path) {
+bool Utils::build_node_oracle(std::string &filepath, double percentage_retain, std::string &output_path,
+                              const std::vector<int> &node_mapping) {
 
     std::cout << "Building node oracle...\n";
 
-    std::ifstream file(filepath);
+    InputFile file(filepath);
     std::string line;
 
     emhash5::HashMap<int, int> node_map;
     // std::unordered_map<int, int> node_map;
+    std::vector<int> node_degrees(node_mapping.size(), 0);
+    bool dense = !node_mapping.empty();
 
     int u, v, t;
 
@@ -846,28 +1525,45 @@ void Utils::build_node_oracle(std::string &filepath, double percentage_retain, s
             iss >> u >> v >> t;
             if (u == v) continue;
 
-            if (node_map.find(u) != node_map.end())
-                node_map[u] += 1;
-            else
-                node_map[u] = 1;
-
-            if (node_map.find(v) != node_map.end())
-                node_map[v] += 1;
-            else
-                node_map[v] = 1;
+            if (dense) {
+                node_degrees[u]++;
+                node_degrees[v]++;
+            } else {
+                if (node_map.find(u) != node_map.end())
+                    node_map[u] += 1;
+                else
+                    node_map[u] = 1;
+
+                if (node_map.find(v) != node_map.end())
+                    node_map[v] += 1;
+                else
+                    node_map[v] = 1;
+            }
 
             if (nline % 3000000 == 0) {
                 printf("Processed %ld edges\n", nline);
             }
         }
+        if (file.failed()) {
+            std::cerr << "Error! Unable to read oracle file " << filepath << " to the end\n";
+            return false;
+        }
 
         // -- eof: sort results
         std::cout << "Sorting the oracle and retrieving the top " << percentage_retain << " values...\n";
         // convert node map to vector of pairs
         std::vector<std::pair<int, int>> sorted_oracle;
-        sorted_oracle.reserve(node_map.size());
-        for (auto &elem: node_map) {
-            sorted_oracle.emplace_back(elem.first, elem.second);
+        if (dense) {
+            sorted_oracle.reserve(node_degrees.size());
+            for (int node = 0; node < (int) node_degrees.size(); node++) {
+                if (node_degrees[node] > 0)
+                    sorted_oracle.emplace_back(node_mapping[node], node_degrees[node]);
+            }
+        } else {
+            sorted_oracle.reserve(node_map.size());
+            for (auto &elem: node_map) {
+                sorted_oracle.emplace_back(elem.first, elem.second);
+            }
         }
 
         // std::vector<std::pair<int, int>> sorted_oracle(node_map.begin(), node_map.end());
@@ -890,7 +1586,9 @@ void Utils::build_node_oracle(std::string &filepath, double percentage_retain, s
 
     } else {
         std::cerr << "Error! Unable to open oracle file " << filepath << "\n";
+        return false;
     }
+    return true;
 }
 
 /**
@@ -898,13 +1596,18 @@ void Utils::build_node_oracle(std::string &filepath, double percentage_retain, s
  *
  * @param output_path path prefix for the output file
  * @param top_nodes vector of nodes and their frequencies
+ * @param node_mapping dense id -> original id if the stream is relabeled (empty otherwise)
  */
-void Utils::write_top_nodes(const std::string& output_path, const std::vector<UnbiasedSpaceSaving::HeapNode>& top_nodes) {
+void Utils::write_top_nodes(const std::string& output_path, const std::vector<UnbiasedSpaceSaving::HeapNode>& top_nodes,
+                            const std::vector<int> &node_mapping) {
     std::ofstream out_file(output_path + "_top_nodes.csv");
     out_file << "Node,Degree\n";
 
     for (const auto& entry : top_nodes) {
-        out_file << entry.node << "," << entry.freq << "\n";
+        // -- skip unused slots of the heap, and map dense ids back to the original ones
+        if (entry.node < 0) continue;
+        int node = node_mapping.empty() ? entry.node : node_mapping[entry.node];
+        out_file << node << "," << entry.freq << "\n";
     }
 
     out_file.close();
@@ -2,48 +2,182 @@
 #include "hash_table5.hpp"
 #include "Tonic.h"
 #include "Tonic_FD.h"
+#include "Tonic_MultiBudget.h"
+#include "Tonic_Sharded.h"
 #include "Utils.h"
+#include "Telemetry.h"
+#include "Stream_Generator.h"
+#include "Results_Store.h"
+#include "Checkpoint.h"
+#include "Cuckoo_Oracle.h"
+#include "Dataset_Cache.h"
+#include "Exact_Counter.h"
+#include "Trajectory.h"
 #include <fstream>
+#include <sstream>
 #include <string>
 #include <chrono>
 #include <filesystem>
+#include <unordered_map>
+#include <thread>
+#include <memory>
+#include <csignal>
+
+// -- last of SIGINT, SIGTERM or SIGUSR1 received, handled when checkpoints are enabled
+volatile sig_atomic_t checkpoint_signal = 0;
+
+void on_checkpoint_signal(int signal) {
+    checkpoint_signal = signal;
+}
+
+/**
+ * Checkpoints of a Tonic run: a checkpoint is written every N edges, on SIGUSR1 (and the run continues), and on
+ * SIGINT or SIGTERM (and the run stops)
+ */
+struct CheckpointOptions {
+    // -- checkpoint file, empty to disable
+    std::string path;
+    // -- write a checkpoint every N edges, 0 to write only on signal
+    unsigned long long every = 0;
+    // -- position of a resumed run: byte offset in the stream and edges already processed
+    unsigned long long start_offset = 0;
+    long start_line = 0;
+};
+
+/**
+ * Write a checkpoint of a Tonic or Tonic_FD run
+ * @param path of the checkpoint
+ * @param name of the algorithm, checked on resume
+ * @param offset byte offset of the next edge in the stream
+ * @param n_line number of edges processed
+ * @param algo the sampler
+ * @return true if the checkpoint was written
+ */
+template<typename Algo>
+bool save_checkpoint(const std::string &path, const std::string &name, unsigned long long offset, long n_line,
+                     const Algo &algo) {
+    CheckpointWriter writer(path);
+    if (!writer.is_open()) return false;
+    writer.write_string(name);
+    writer.write(offset);
+    writer.write(n_line);
+    algo.save_state(writer);
+    if (!writer.commit()) return false;
+    printf("Checkpoint written to %s after %ld edges || Estimated count T = %f\n", path.c_str(), n_line,
+           algo.get_global_triangles());
+    return true;
+}
+
+/**
+ * Restore a Tonic or Tonic_FD run from a checkpoint
+ * @param path of the checkpoint
+ * @param name of the algorithm
+ * @param checkpoint filled with the position in the stream
+ * @param algo the sampler, configured as the one that wrote the checkpoint
+ * @return true if the run was restored
+ */
+template<typename Algo>
+bool load_checkpoint(const std::string &path, const std::string &name, CheckpointOptions &checkpoint, Algo &algo) {
+    CheckpointReader reader(path);
+    if (!reader.ok()) return false;
+    std::string checkpoint_name = reader.read_string();
+    if (checkpoint_name != name) {
+        std::cerr << "Error! Checkpoint " << path << " was written by " << checkpoint_name << ", not " << name << "\n";
+        return false;
+    }
+    checkpoint.start_offset = reader.read<unsigned long long>();
+    checkpoint.start_line = reader.read<long>();
+    if (!reader.ok() or !algo.load_state(reader)) {
+        std::cerr << "Error! Unable to restore checkpoint " << path << "\n";
+        return false;
+    }
+    printf("Resumed from %s after %ld edges || Estimated count T = %f\n", path.c_str(), checkpoint.start_line,
+           algo.get_global_triangles());
+    return true;
+}
+
+/**
+ * Write a checkpoint if one is due after n_line edges
+ * @param checkpoint options
+ * @param next_checkpoint number of edges of the next periodic checkpoint, advanced when it is written
+ * @param name of the algorithm
+ * @param offset byte offset of the next edge in the stream
+ * @param n_line number of edges processed
+ * @param algo the sampler
+ * @return false if the run must stop (interrupted by SIGINT or SIGTERM)
+ */
+template<typename Algo>
+inline bool checkpoint_if_due(const CheckpointOptions &checkpoint, unsigned long long &next_checkpoint,
+                              const std::string &name, unsigned long long offset, long n_line, const Algo &algo) {
+    bool periodic = checkpoint.every > 0 and (unsigned long long) n_line >= next_checkpoint;
+    if (!periodic and checkpoint_signal == 0) return true;
+    int signal = checkpoint_signal;
+    checkpoint_signal = 0;
+    if (periodic) next_checkpoint += checkpoint.every;
+    save_checkpoint(checkpoint.path, name, offset, n_line, algo);
+    if (signal == SIGINT or signal == SIGTERM) {
+        printf("Run interrupted after %ld edges, resume it with --resume=%s\n", n_line, checkpoint.path.c_str());
+        return false;
+    }
+    return true;
+}
+
+/**
+ * Check that a stream was read to the end: a truncated or corrupted compressed stream ends early like a complete one,
+ * and no result is written for it
+ * @param reader
+ * @param dataset_path
+ * @return false if the stream could not be read to the end
+ */
+inline bool read_to_end(const EdgeReader &reader, const std::string &dataset_path) {
+    if (!reader.failed()) return true;
+    std::cerr << "Error! Unable to read file " << dataset_path << " to the end, no results written\n";
+    return false;
+}
 
 /**
  * Read stream and perform the Tonic algorithm for insertion only streams
  * @param dataset_path
  * @param algo the instantiated Tonic algorithm class
+ * @param telemetry optional runtime telemetry, nullptr to disable
+ * @param checkpoint checkpoint options, and position in the stream of a resumed run
+ * @param cache optional decoded stream shared by concurrent runs, nullptr to parse the text stream
+ * @return exit status: 0 at the end of the stream, 1 if the stream could not be read, 2 if the run was interrupted
  */
-void run_tonic_algo(std::string &dataset_path, Tonic &algo) {
+int run_tonic_algo(std::string &dataset_path, Tonic &algo, Telemetry *telemetry = nullptr,
+                    const CheckpointOptions &checkpoint = {}, const DatasetCache *cache = nullptr) {
 
-    std::ifstream file(dataset_path);
-    std::string line;
-    long n_line = 0;
-    int u, v, t;
-
-    std::string oracle_type_str = algo.edge_oracle_flag_ ? "Edges" : "Nodes";
-
-    if (file.is_open()) {
-        while (true) {
-            if (!std::getline(file, line)) break;
-            std::istringstream iss(line);
-            std::string token;
-            std::getline(iss, token, ' ');
-            u = std::stoi(token);
-            std::getline(iss, token, ' ');
-            v = std::stoi(token);
-            std::getline(iss, token, ' ');
-            t = std::stoi(token);
+    EdgeReader reader(dataset_path, cache);
+    long n_line = checkpoint.start_line;
+    unsigned long long next_checkpoint = checkpoint.every > 0 ?
+            (n_line / checkpoint.every + 1) * checkpoint.every : 0;
+    int u, v, t, sign;
+
+    if (reader.is_open()) {
+        reader.seek(checkpoint.start_offset, n_line);
+        if (telemetry != nullptr) telemetry->start(n_line);
+        while (reader.next(u, v, t, sign)) {
             algo.process_edge(u, v);
             if (++n_line % 5000000 == 0) {
                 printf("Processed %ld edges || Estimated count T = %f\n", n_line, algo.get_global_triangles());
             }
+            if (telemetry != nullptr and telemetry->due(n_line)) {
+                telemetry->record(n_line, algo);
+            }
+            if (!checkpoint.path.empty() and
+                !checkpoint_if_due(checkpoint, next_checkpoint, "TonicINS", reader.offset(), n_line, algo)) {
+                return 2;
+            }
 
         }
-        file.close();
+        if (!read_to_end(reader, dataset_path)) return 1;
+        if (telemetry != nullptr) telemetry->record(n_line, algo);
     } else {
         std::cerr << "Error! Unable to open file " << dataset_path << "\n";
+        return 1;
     }
 
+    return 0;
 
 }
 
@@ -51,73 +185,237 @@ void run_tonic_algo(std::string &dataset_path, Tonic &algo) {
  * Read stream and perform the Tonic FD algorithm for fully dynamic streams
  * @param dataset_path
  * @param algo the instantiated Tonic FD algorithm class
+ * @param telemetry optional runtime telemetry, nullptr to disable
+ * @param checkpoint checkpoint options, and position in the stream of a resumed run
+ * @param cache optional decoded stream shared by concurrent runs, nullptr to parse the text stream
+ * @return exit status: 0 at the end of the stream, 1 if the stream could not be read, 2 if the run was interrupted
  */
-void run_tonic_algo_FD(std::string &dataset_path, Tonic_FD &algo) {
+int run_tonic_algo_FD(std::string &dataset_path, Tonic_FD &algo, Telemetry *telemetry = nullptr,
+                       const CheckpointOptions &checkpoint = {}, const DatasetCache *cache = nullptr) {
 
-    std::ifstream file(dataset_path);
-    std::string line;
-    long n_line = 0;
+    EdgeReader reader(dataset_path, cache);
+    long n_line = checkpoint.start_line;
+    unsigned long long next_checkpoint = checkpoint.every > 0 ?
+            (n_line / checkpoint.every + 1) * checkpoint.every : 0;
     int u, v, t, sign;
-    char sign_char;
-    std::string oracle_type_str = algo.edge_oracle_flag_ ? "Edges" : "Nodes";
-
-
-    if (file.is_open()) {
-        while (true) {
-            if (!std::getline(file, line)) break;
-            std::istringstream iss(line);
-            std::string token;
-            std::getline(iss, token, ' ');
-            u = std::stoi(token);
-            std::getline(iss, token, ' ');
-            v = std::stoi(token);
-            std::getline(iss, token, ' ');
-            t = std::stoi(token);
-            std::getline(iss, token, ' ');
-            sign_char = token[0];
-            // -- by default, assume additions
-            sign = sign_char == '-' ? -1 : 1;
 
+    if (reader.is_open()) {
+        reader.seek(checkpoint.start_offset, n_line);
+        if (telemetry != nullptr) telemetry->start(n_line);
+        while (reader.next(u, v, t, sign)) {
             algo.process_edge(u, v, t, sign);
             if (++n_line % 5000000 == 0) {
                 printf("Processed %ld edges || Estimated count T = %f\n", n_line, algo.get_global_triangles());
             }
+            if (telemetry != nullptr and telemetry->due(n_line)) {
+                telemetry->record(n_line, algo);
+            }
+            if (!checkpoint.path.empty() and
+                !checkpoint_if_due(checkpoint, next_checkpoint, "TonicFD", reader.offset(), n_line, algo)) {
+                return 2;
+            }
 
         }
+        if (!read_to_end(reader, dataset_path)) return 1;
+        if (telemetry != nullptr) telemetry->record(n_line, algo);
+
+    } else {
+        std::cerr << "Error! Unable to open file " << dataset_path << "\n";
+        return 1;
+    }
+
+    return 0;
+
+}
+
+/**
+ * Read stream and perform the Tonic algorithm for insertion only streams with several memory budgets in one pass
+ * @param dataset_path
+ * @param algo the instantiated Tonic multi budget algorithm class
+ * @param cache optional decoded stream shared by concurrent runs, nullptr to parse the text stream
+ * @return false if the stream could not be read
+ */
+bool run_tonic_algo_multi_budget(std::string &dataset_path, Tonic_MultiBudget &algo,
+                                 const DatasetCache *cache = nullptr) {
 
-        file.close();
+    EdgeReader reader(dataset_path, cache);
+    long n_line = 0;
+    int u, v, t, sign;
 
+    if (reader.is_open()) {
+        while (reader.next(u, v, t, sign)) {
+            algo.process_edge(u, v);
+            if (++n_line % 5000000 == 0) {
+                printf("Processed %ld edges || Sampled edges (all budgets) = %ld\n", n_line, algo.get_num_edges());
+            }
+        }
     } else {
         std::cerr << "Error! Unable to open file " << dataset_path << "\n";
+        return false;
     }
 
+    return read_to_end(reader, dataset_path);
+
 }
 
 /**
- * Read stream and perform the USS algorithm for graph snapshots
+ * Read stream and perform the sharded Tonic algorithm for insertion only streams: this thread reads and routes the
+ * edges, the shards run on the worker threads of the algorithm
  * @param dataset_path
- * @param uss Reference to an instantiated UnbiasedSpaceSaving object
+ * @param algo the instantiated Tonic sharded algorithm class
+ * @param cache optional decoded stream shared by concurrent runs, nullptr to parse the text stream
+ * @return false if the stream could not be read
  */
-void run_uss_algo(std::string &dataset_path, UnbiasedSpaceSaving &uss) {
+bool run_tonic_algo_sharded(std::string &dataset_path, Tonic_Sharded &algo, const DatasetCache *cache = nullptr) {
 
-    std::ifstream file(dataset_path);
-    std::string line;
+    EdgeReader reader(dataset_path, cache);
     long n_line = 0;
-    int u, v, t;
+    int u, v, t, sign;
 
-    if (file.is_open()) {
-        while (true) {
-            if (!std::getline(file, line)) break;
-            std::istringstream iss(line);
-            std::string token;
+    if (reader.is_open()) {
+        while (reader.next(u, v, t, sign)) {
+            algo.process_edge(u, v);
+            if (++n_line % 5000000 == 0) {
+                printf("Processed %ld edges\n", n_line);
+            }
+        }
+    } else {
+        std::cerr << "Error! Unable to open file " << dataset_path << "\n";
+        algo.finish();
+        return false;
+    }
+    algo.finish();
+
+    return read_to_end(reader, dataset_path);
+
+}
+
+/**
+ * Read stream and perform the exact algorithm and several Tonic (or Tonic FD) instances side by side, recording the
+ * exact count and the estimates of the same prefixes of the stream
+ * @param dataset_path
+ * @param algos the instantiated Tonic or Tonic FD algorithm classes, one per seed
+ * @param exact the exact counter, fed with the same edges
+ * @param trajectory writer of the records
+ * @param cache optional decoded stream shared by concurrent runs, nullptr to parse the text stream
+ * @return false if the stream could not be read
+ */
+template<typename Algo>
+bool run_tonic_algo_trajectory(std::string &dataset_path, std::vector<std::unique_ptr<Algo>> &algos,
+                               ExactCounter &exact, TrajectoryWriter &trajectory, const DatasetCache *cache = nullptr) {
+
+    EdgeReader reader(dataset_path, cache);
+    long n_line = 0;
+    int u, v, t, sign;
+    std::vector<double> estimates(algos.size());
+    auto record = [&]() {
+        for (size_t i = 0; i < algos.size(); i++) estimates[i] = algos[i]->get_global_triangles();
+        trajectory.record(n_line, exact.get_triangles(), estimates);
+    };
+
+    if (reader.is_open()) {
+        while (reader.next(u, v, t, sign)) {
+            if constexpr (std::is_same<Algo, Tonic_FD>::value) {
+                exact.process_edge(u, v, sign);
+                for (auto &algo: algos) algo->process_edge(u, v, t, sign);
+            } else {
+                exact.process_edge(u, v);
+                for (auto &algo: algos) algo->process_edge(u, v);
+            }
+            if (++n_line % 5000000 == 0) {
+                printf("Processed %ld edges || Exact count T = %ld\n", n_line, exact.get_triangles());
+            }
+            if (trajectory.due(n_line)) record();
+        }
+        if (!read_to_end(reader, dataset_path)) return false;
+        record();
+    } else {
+        std::cerr << "Error! Unable to open file " << dataset_path << "\n";
+        return false;
+    }
 
-            std::getline(iss, token, ' ');
-            u = std::stoi(token);
-            std::getline(iss, token, ' ');
-            v = std::stoi(token);
-            std::getline(iss, token, ' ');
-            t = std::stoi(token);  // still read it for consistency
+    return true;
+
+}
 
+/**
+ * Read an insertion-only stream and perform the Tonic FD algorithm over a sliding window: the edges that leave the
+ * window are processed as deletions, so the estimates are the ones of the graph of the edges in the window. The
+ * expired edges are read again from the stream by a second reader trailing the first one, so the window is not kept
+ * in memory
+ * @param dataset_path
+ * @param algo the instantiated Tonic FD algorithm class
+ * @param window size of the window, in edges or in time units
+ * @param time_window true if the window is on the timestamps t (non decreasing), false if it is on the last edges
+ * @param telemetry optional runtime telemetry, nullptr to disable
+ * @param cache optional decoded stream shared by concurrent runs, nullptr to parse the text stream
+ * @return false if the stream could not be read
+ */
+bool run_tonic_algo_window(std::string &dataset_path, Tonic_FD &algo, long window, bool time_window,
+                           Telemetry *telemetry = nullptr, const DatasetCache *cache = nullptr) {
+
+    EdgeReader reader(dataset_path, cache);
+    EdgeReader expired_reader(dataset_path, cache);
+    long n_line = 0, n_expired = 0;
+    int u, v, t, sign, expired_u, expired_v, expired_t, expired_sign;
+    // -- whether the oldest edge of the window was read and not expired yet
+    bool expired_read = false;
+
+    if (reader.is_open() and expired_reader.is_open()) {
+        if (telemetry != nullptr) telemetry->start();
+        while (reader.next(u, v, t, sign)) {
+
+            // -- expire the edges that leave the window before the current one enters it
+            while (n_expired < n_line) {
+                if (!time_window and n_line - n_expired < window) break;
+                if (!expired_read) {
+                    if (!expired_reader.next(expired_u, expired_v, expired_t, expired_sign)) break;
+                    expired_read = true;
+                }
+                // -- the oldest edge is still in the time window (t - window, t]
+                if (time_window and expired_t > (long) t - window) break;
+                algo.process_edge(expired_u, expired_v, t, -1);
+                expired_read = false;
+                n_expired++;
+            }
+
+            algo.process_edge(u, v, t, 1);
+            if (++n_line % 5000000 == 0) {
+                printf("Processed %ld edges, %ld in the window || Estimated count T = %f\n", n_line,
+                       n_line - n_expired, algo.get_global_triangles());
+            }
+            if (telemetry != nullptr and telemetry->due(n_line)) {
+                telemetry->record(n_line, algo);
+            }
+
+        }
+        if (!read_to_end(reader, dataset_path) or !read_to_end(expired_reader, dataset_path)) return false;
+        if (telemetry != nullptr) telemetry->record(n_line, algo);
+        printf("Window of %ld edges at the end of the stream\n", n_line - n_expired);
+    } else {
+        std::cerr << "Error! Unable to open file " << dataset_path << "\n";
+        return false;
+    }
+
+    return true;
+
+}
+
+/**
+ * Read stream and perform the USS algorithm for graph snapshots
+ * @param dataset_path
+ * @param uss Reference to an instantiated UnbiasedSpaceSaving object
+ * @param cache optional decoded stream shared by concurrent runs, nullptr to parse the text stream
+ * @return false if the stream could not be read
+ */
+bool run_uss_algo(std::string &dataset_path, UnbiasedSpaceSaving &uss, const DatasetCache *cache = nullptr) {
+
+    EdgeReader reader(dataset_path, cache);
+    long n_line = 0;
+    int u, v, t, sign;
+
+    if (reader.is_open()) {
+        while (reader.next(u, v, t, sign)) {
             uss.update(u);
             uss.update(v);
 
@@ -125,10 +423,12 @@ void run_uss_algo(std::string &dataset_path, UnbiasedSpaceSaving &uss) {
                 printf("Processed %ld edges.\n", n_line);
             }
         }
-        file.close();
     } else {
         std::cerr << "Error! Unable to open file " << dataset_path << "\n";
+        return false;
     }
+
+    return read_to_end(reader, dataset_path);
 }
 
 /**
@@ -150,28 +450,117 @@ void write_results(std::string name, double estimated_T, double time, std::strin
     printf("%s Algo successfully run in time %.3f! Estimated count T = %f\n", name.c_str(), time, estimated_T);
 
     std::string csv_path = output_path + "_global_count.csv";
+    std::string oracle_type_str = edge_oracle_flag ? "Edges" : "Nodes";
 
-    // Check if the file exists and is empty (write header only once)
-    bool write_header = !std::filesystem::exists(csv_path) || std::filesystem::file_size(csv_path) == 0;
+    std::ostringstream row;
+    row << name.c_str() << ",Alpha=" << alpha << "-Beta=" << beta << "," << oracle_type_str << "," << size_oracle
+        << "," << time_oracle << "," << memory_budget << "," << std::fixed << estimated_T << "," << time << "\n";
 
-    std::ofstream out_file(csv_path, std::ios::app);
-    
-    if (!out_file.is_open()) {
-        std::cerr << "Error! Could not open file " << csv_path << " for writing.\n";
-        return;
-    }
+    // -- concurrent runs append to the same file: header and row are written under an exclusive lock
+    ResultsStore::append_locked(csv_path, "Algo,Params,Oracle,SizeOracle,TimeOracle,MemEdges,GlobalTriangleCount,Time\n",
+                                row.str());
 
-    std::string oracle_type_str = edge_oracle_flag ? "Edges" : "Nodes";
+}
+
+/**
+ * Extract the optional flags of the form --name or --name=value from the command line arguments. Flags are removed
+ * from argv, so that the remaining positional arguments keep their order
+ * @param argc number of arguments
+ * @param argv arguments, compacted to the positional ones
+ * @param flags filled map name -> value ("1" for flags without value)
+ * @return the number of positional arguments (including the executable name)
+ */
+int extract_flags(int argc, char **argv, std::unordered_map<std::string, std::string> &flags) {
+    int n_positional = 0;
+    for (int i = 0; i < argc; i++) {
+        if (i > 0 and strncmp(argv[i], "--", 2) == 0) {
+            std::string flag(argv[i] + 2);
+            size_t eq = flag.find('=');
+            if (eq == std::string::npos)
+                flags[flag] = "1";
+            else
+                flags[flag.substr(0, eq)] = flag.substr(eq + 1);
+        } else {
+            argv[n_positional++] = argv[i];
+        }
+    }
+    return n_positional;
+}
 
-    if (write_header) {
-        out_file << "Algo,Params,Oracle,SizeOracle,TimeOracle,MemEdges,GlobalTriangleCount,Time\n";
+/**
+ * Load the node mapping of a relabeled dataset, if any. The mapping is read from --mapping=<path> if given,
+ * otherwise from the default mapping file written by DataPreprocessing next to the dataset
+ * @param flags optional flags of the command line
+ * @param dataset_path path of the preprocessed dataset
+ * @param node_mapping the filled vector dense id -> original id, empty if the dataset is not relabeled
+ * @return false if the mapping file was requested but could not be read
+ */
+bool load_node_mapping(std::unordered_map<std::string, std::string> &flags, const std::string &dataset_path,
+                       std::vector<int> &node_mapping) {
+    node_mapping.clear();
+    if (flags.count("mapping")) {
+        return Utils::read_node_mapping(flags["mapping"], node_mapping);
     }
+    std::string mapping_path = Utils::mapping_path(dataset_path);
+    if (std::filesystem::exists(mapping_path)) {
+        if (!Utils::read_node_mapping(mapping_path, node_mapping)) return false;
+        printf("Dense node ids detected: %zu nodes, mapping %s\n", node_mapping.size(), mapping_path.c_str());
+    }
+    return true;
+}
 
-    out_file << name.c_str() << ",Alpha=" << alpha << "-Beta=" << beta << "," << oracle_type_str << "," << size_oracle
-             << "," << time_oracle << "," << memory_budget << "," << std::fixed << estimated_T << "," << time << "\n";
+/**
+ * Print the oracle hits and misses of a Tonic or Tonic_FD run
+ * @param algo
+ */
+template<typename Algo>
+void print_oracle_stats(const Algo &algo) {
+    unsigned long long queries = algo.get_oracle_queries();
+    unsigned long long hits = algo.get_oracle_hits();
+    printf("Oracle queries = %llu, hits = %llu, misses = %llu (%llu answered by the prefilter)\n", queries, hits,
+           queries - hits, algo.get_oracle_filtered());
+}
 
-    out_file.close();
+/**
+ * Attach to the decoded copy of a stream shared by concurrent runs, if enabled by --dataset-cache[=<dir>] or by the
+ * environment variable TONIC_DATASET_CACHE=<dir>
+ * @param flags optional flags of the command line
+ * @param dataset_path path of the preprocessed dataset
+ * @param cache the attached cache, nullptr if the cache is disabled
+ * @return false if the cache is enabled but could not be attached
+ */
+bool attach_dataset_cache(std::unordered_map<std::string, std::string> &flags, const std::string &dataset_path,
+                          std::unique_ptr<DatasetCache> &cache) {
+    std::string cache_dir = DatasetCache::cache_dir(flags.count("dataset-cache") ? flags["dataset-cache"] : "");
+    if (cache_dir.empty()) return true;
+    cache = DatasetCache::attach(dataset_path, cache_dir);
+    if (cache == nullptr) return false;
+    printf("Dataset cache attached: %s (%zu edges)\n", cache->path().c_str(), cache->size());
+    return true;
+}
 
+/**
+ * Build the compact cuckoo oracle of the text edge oracle just written by BuildOracle, and write it to
+ * <oracle_path>.cuckoo
+ * @param oracle_path path of the text edge oracle
+ * @param fingerprint_bits bits of the fingerprint of each entry
+ * @param value_bits bits of the quantized heaviness of each entry
+ * @param node_mapping dense id -> original id, empty if the dataset is not relabeled
+ * @return false if the oracle could not be built or written
+ */
+bool build_cuckoo_oracle(std::string &oracle_path, int fingerprint_bits, int value_bits,
+                         const std::vector<int> &node_mapping) {
+    emhash5::HashMap<long, int> edge_oracle;
+    if (!Utils::read_edge_oracle(oracle_path, ' ', 0, edge_oracle, node_mapping)) return false;
+    CuckooEdgeOracle cuckoo_oracle;
+    if (!CuckooEdgeOracle::build(edge_oracle, fingerprint_bits, value_bits, cuckoo_oracle)) return false;
+    std::string cuckoo_path = oracle_path + ".cuckoo";
+    if (!cuckoo_oracle.save(cuckoo_path, (int) node_mapping.size())) return false;
+    printf("Cuckoo Edge Oracle written to %s: %zu entries, %zu bytes (%.2f bytes/entry, exact oracle %zu bytes)\n",
+           cuckoo_path.c_str(), cuckoo_oracle.size(), cuckoo_oracle.memory_bytes(),
+           (double) cuckoo_oracle.memory_bytes() / std::max<size_t>(1, cuckoo_oracle.size()),
+           Utils::oracle_memory_bytes(edge_oracle));
+    return true;
 }
 
 /**
@@ -203,19 +592,33 @@ int main(int argc, char **argv) {
 
     char* project = base_name(argv[0]);
 
+    // -- optional --name[=value] flags
+    std::unordered_map<std::string, std::string> flags;
+    argc = extract_flags(argc, argv, flags);
+
     // -- data preprocessing
     if (strcmp(project, "DataPreprocessing") == 0) {
         if (argc != 5) {
             std::cerr << "Usage: DataPreprocessing <dataset_path> <delimiter> <skip>"
-                         " <output_path>\n";
+                         " <output_path> [--relabel] [--ram-budget-mb=<MB>] [--tmp-dir=<folder>]\n";
             return 1;
         } else {
             std::string dataset_path(argv[1]);
             std::string delimiter (argv[2]);
             int skip = atoi(argv[3]);
             std::string output_path(argv[4]);
+            bool relabel = flags.count("relabel") > 0;
             auto start = std::chrono::high_resolution_clock::now();
-            Utils::preprocess_data(dataset_path, delimiter, skip, output_path);
+            if (flags.count("ram-budget-mb")) {
+                // -- out-of-core preprocessing, sorted runs spilled next to the output by default
+                size_t ram_budget_bytes = std::stoul(flags["ram-budget-mb"]) * 1024 * 1024;
+                std::string tmp_dir = flags.count("tmp-dir") ? flags["tmp-dir"] :
+                        std::filesystem::absolute(output_path).parent_path().string();
+                if (!Utils::preprocess_data_external(dataset_path, delimiter, skip, output_path, relabel,
+                                                     ram_budget_bytes, tmp_dir)) return 1;
+            } else {
+                if (!Utils::preprocess_data(dataset_path, delimiter, skip, output_path, relabel)) return 1;
+            }
             auto stop = std::chrono::high_resolution_clock::now();
             double time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(stop - start)).count()) / 1000;
             std::cout << "Dataset preprocessed in time: " << time << " s\n";
@@ -227,7 +630,8 @@ int main(int argc, char **argv) {
     if (strcmp(project, "RunExactAlgo") == 0) {
         if (argc != 4) {
             std::cerr << "Usage: RunExactAlgo <flag: 0: insertion-only stream, 1: fully-dynamic stream>"
-                         " <preprocessed_dataset_path> <output_path>\n";
+                         " <preprocessed_dataset_path> <output_path> [--results-db=<folder>]"
+                         " [--dataset-cache[=<folder>]]\n";
             return 1;
         } else {
             int flag_fd = atoi(argv[1]);
@@ -235,15 +639,28 @@ int main(int argc, char **argv) {
             std::string dataset_path(argv[2]);
             std::string output_path(argv[3]);
             auto start = std::chrono::high_resolution_clock::now();
+            std::unique_ptr<DatasetCache> cache;
+            if (!attach_dataset_cache(flags, dataset_path, cache)) return 1;
             long total_T;
             if (flag_fd == 1)
-                total_T = Utils::run_exact_algorithm_FD(dataset_path, output_path);
+                total_T = Utils::run_exact_algorithm_FD(dataset_path, output_path, cache.get());
             else
-                total_T = Utils::run_exact_algorithm(dataset_path, output_path);
+                total_T = Utils::run_exact_algorithm(dataset_path, output_path, cache.get());
+            if (total_T < 0) return 1;
 
             auto stop = std::chrono::high_resolution_clock::now();
             double time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(stop - start)).count()) / 1000;
             printf("Exact Algorithm successfully run in time %.3f! Total count T = %ld\n", time, total_T);
+
+            ResultsStore *results_store = ResultsStore::for_process(flags["results-db"]);
+            if (results_store != nullptr) {
+                ResultRecord record;
+                record.algo = flag_fd == 1 ? "ExactFD" : "ExactINS";
+                record.dataset = std::filesystem::absolute(dataset_path).string();
+                record.estimate = (double) total_T;
+                record.time = time;
+                results_store->append(record);
+            }
             return 0;
         }
     }
@@ -251,38 +668,85 @@ int main(int argc, char **argv) {
     // -- build oracle
     if (strcmp(project, "BuildOracle") == 0) {
         if (argc < 5 or argc > 6) {
-            std::cerr << "Usage: BuildOracle <preprocessed_dataset_path> <type = [Exact, noWR, Node]>, <percentage_retain>,"
-                         " <output_path>, [<wr_size>] \n";
+            std::cerr << "Usage: BuildOracle <preprocessed_dataset_path> <type = [Exact, noWR, Stream, Node]>,"
+                         " <percentage_retain>, <output_path>, [<wr_size> (noWR) | <memory_budget> (Stream)]"
+                         " [--mapping=<node_mapping_path>] [--capacity=<entries>] [--seed=<seed>]"
+                         " [--cuckoo=<fingerprint_bits>] [--value-bits=<bits>] [--results-db=<folder>]\n";
             return 1;
         } else {
             std::string dataset_path(argv[1]);
             std::string type_oracle(argv[2]);
             double percentage_retain = atof(argv[3]);
             std::string output_path(argv[4]);
+            std::vector<int> node_mapping;
+            if (!load_node_mapping(flags, dataset_path, node_mapping)) return 1;
+            // -- optional compact copy of the edge oracle, with tunable bits per entry
+            int fingerprint_bits = flags.count("cuckoo") ? std::stoi(flags["cuckoo"]) : 0;
+            int value_bits = flags.count("value-bits") ? std::stoi(flags["value-bits"]) : 8;
+            if (flags.count("cuckoo") and strcmp(type_oracle.c_str(), "Node") == 0) {
+                std::cerr << "Build Oracle - Error! The cuckoo oracle is only available for edge oracles.\n";
+                return 1;
+            }
             auto start = std::chrono::high_resolution_clock::now();
             if (strcmp(type_oracle.c_str(), "Exact") == 0) {
-                Utils::build_edge_exact_oracle(dataset_path, percentage_retain, output_path);
+                if (!Utils::build_edge_exact_oracle(dataset_path, percentage_retain, output_path, node_mapping))
+                    return 1;
                 auto stop = std::chrono::high_resolution_clock::now();
                 double time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(stop - start)).count()) / 1000;
                 printf("Exact Edge Oracle successfully run in time %.3f!\n", time);
 
             } else if(strcmp(type_oracle.c_str(), "noWR") == 0) {
                 int wr_size = atoi(argv[5]);
-                Utils::build_edge_exact_nowr_oracle(dataset_path, percentage_retain, output_path, wr_size);
+                if (!Utils::build_edge_exact_nowr_oracle(dataset_path, percentage_retain, output_path, wr_size,
+                                                         node_mapping)) return 1;
                 auto stop = std::chrono::high_resolution_clock::now();
                 double time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(stop - start)).count()) / 1000;
                 printf("Exact-noWR Edge Oracle successfully run in time %.3f!\n", time);
+            } else if (strcmp(type_oracle.c_str(), "Stream") == 0) {
+                if (argc != 6) {
+                    std::cerr << "Build Oracle - Error! The Stream oracle requires the memory budget.\n";
+                    return 1;
+                }
+                long memory_budget = atol(argv[5]);
+                int capacity = flags.count("capacity") ? std::stoi(flags["capacity"]) : (int) memory_budget;
+                int random_seed = flags.count("seed") ? std::stoi(flags["seed"]) : 0;
+                if (!Utils::build_edge_stream_oracle(dataset_path, percentage_retain, output_path, memory_budget,
+                                                     capacity, random_seed, node_mapping)) return 1;
+                auto stop = std::chrono::high_resolution_clock::now();
+                double time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(stop - start)).count()) / 1000;
+                printf("Stream Edge Oracle successfully run in time %.3f!\n", time);
             } else if (strcmp(type_oracle.c_str(), "Node") == 0) {
-                    Utils::build_node_oracle(dataset_path, percentage_retain, output_path);
+                    if (!Utils::build_node_oracle(dataset_path, percentage_retain, output_path, node_mapping))
+                        return 1;
                     auto stop = std::chrono::high_resolution_clock::now();
                     double time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(stop - start)).count()) / 1000;
                     printf("Node Map successfully run in time %.3f!\n", time);
 
                 } else {
-                std::cerr << "Build Oracle - Error! Type of Oracle must be Exact or Node.\n";
+                std::cerr << "Build Oracle - Error! Type of Oracle must be Exact, noWR, Stream or Node.\n";
                 return 1;
             }
 
+            ResultsStore *results_store = ResultsStore::for_process(flags["results-db"]);
+            if (results_store != nullptr) {
+                ResultRecord record;
+                record.algo = "Oracle" + type_oracle;
+                record.dataset = std::filesystem::absolute(dataset_path).string();
+                if (strcmp(type_oracle.c_str(), "Stream") == 0) {
+                    record.seed = flags.count("seed") ? std::stoi(flags["seed"]) : 0;
+                    record.memory_budget = atol(argv[5]);
+                }
+                record.oracle_type = type_oracle;
+                record.oracle_path = std::filesystem::absolute(output_path).string();
+                record.oracle_time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(
+                        std::chrono::high_resolution_clock::now() - start)).count()) / 1000;
+                record.time = record.oracle_time;
+                results_store->append(record);
+            }
+
+            if (fingerprint_bits > 0 and !build_cuckoo_oracle(output_path, fingerprint_bits, value_bits, node_mapping))
+                return 1;
+
             return 0;
         }
     }
@@ -291,7 +755,8 @@ int main(int argc, char **argv) {
     if (strcmp(project, "CreateFDStream") == 0) {
         if (argc != 6) {
             std::cerr << "Usage: CreateFDStream <snapshots_folder> <n_snapshots> <delimiter> <skip>"
-                         " <output_path>\n";
+                         " <output_path> [--ram-budget-mb=<MB>] [--tmp-dir=<folder>] [--threads=<n>] [--seed=<seed>]"
+                         " [--in-memory]\n";
             return 1;
         } else {
             std::string snapshots_folder(argv[1]);
@@ -300,7 +765,20 @@ int main(int argc, char **argv) {
             int skip = atoi(argv[4]);
             std::string output_path(argv[5]);
             auto start = std::chrono::high_resolution_clock::now();
-            Utils::merge_snapshots_FD(snapshots_folder, n_snapshots, delimiter, skip, output_path);
+            if (flags.count("in-memory")) {
+                Utils::merge_snapshots_FD(snapshots_folder, n_snapshots, delimiter, skip, output_path);
+            } else {
+                size_t ram_budget_bytes = (flags.count("ram-budget-mb") ? std::stoul(flags["ram-budget-mb"]) : 1024)
+                                          * 1024 * 1024;
+                std::string tmp_dir = flags.count("tmp-dir") ? flags["tmp-dir"] :
+                        std::filesystem::absolute(output_path).parent_path().string();
+                int num_threads = flags.count("threads") ? std::stoi(flags["threads"]) :
+                        (int) std::max(1u, std::thread::hardware_concurrency());
+                unsigned int seed = flags.count("seed") ? (unsigned int) std::stoul(flags["seed"]) :
+                        std::random_device()();
+                Utils::merge_snapshots_FD_streaming(snapshots_folder, n_snapshots, skip, output_path,
+                                                    ram_budget_bytes, tmp_dir, num_threads, seed);
+            }
             auto stop = std::chrono::high_resolution_clock::now();
             double time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(stop - start)).count()) / 1000;
             std::cout << "Snapshots folder " << snapshots_folder << " merged in time: " << time << " s\n";
@@ -308,10 +786,70 @@ int main(int argc, char **argv) {
         }
     }
 
+    // -- synthetic streams
+    if (strcmp(project, "GenerateStream") == 0) {
+        if (argc != 5) {
+            std::cerr << "Usage: GenerateStream <output_path> <num_nodes> <num_edges> <seed>"
+                         " [--gamma=<exponent>] [--triangle-prob=<p>] [--community-size=<c>] [--fd=<fd_output_path>]"
+                         " [--deletion-prob=<p>] [--snapshots=<n>] [--drift=<d>] [--threads=<n>]"
+                         " [--ram-budget-mb=<MB>] [--tmp-dir=<folder>]\n";
+            return 1;
+        } else {
+            std::string output_path(argv[1]);
+            long num_nodes = atol(argv[2]);
+            long num_edges = atol(argv[3]);
+            auto seed = (unsigned int) std::stoul(argv[4]);
+            double gamma = flags.count("gamma") ? std::stod(flags["gamma"]) : 2.5;
+            double triangle_prob = flags.count("triangle-prob") ? std::stod(flags["triangle-prob"]) : 0.2;
+            int community_size = flags.count("community-size") ? std::stoi(flags["community-size"]) : 16;
+            int num_threads = flags.count("threads") ? std::stoi(flags["threads"]) :
+                    (int) std::max(1u, std::thread::hardware_concurrency());
+            size_t ram_budget_bytes = (flags.count("ram-budget-mb") ? std::stoul(flags["ram-budget-mb"]) : 1024)
+                                      * 1024 * 1024;
+            int n_snapshots = flags.count("snapshots") ? std::stoi(flags["snapshots"]) : 0;
+            // -- the FD stream of a sequence of snapshots is built from the snapshots folder by CreateFDStream
+            if (n_snapshots > 0 and (flags.count("fd") or flags.count("deletion-prob"))) {
+                std::cerr << "Error! --fd and --deletion-prob are not supported with --snapshots, run CreateFDStream "
+                             "on the snapshots folder instead.\n";
+                return 1;
+            }
+            if (n_snapshots == 0 and flags.count("drift")) {
+                std::cerr << "Error! --drift requires --snapshots.\n";
+                return 1;
+            }
+            if (n_snapshots == 0 and flags.count("deletion-prob") and !flags.count("fd")) {
+                std::cerr << "Error! --deletion-prob requires --fd.\n";
+                return 1;
+            }
+            // -- with --snapshots the output path is a folder
+            std::string tmp_dir = flags.count("tmp-dir") ? flags["tmp-dir"] : n_snapshots > 0 ?
+                    std::filesystem::absolute(output_path).string() :
+                    std::filesystem::absolute(output_path).parent_path().string();
+            auto start = std::chrono::high_resolution_clock::now();
+            StreamGenerator generator(num_nodes, gamma, triangle_prob, community_size, seed, num_threads,
+                                      ram_budget_bytes, tmp_dir);
+            if (n_snapshots > 0) {
+                double drift = flags.count("drift") ? std::stod(flags["drift"]) : 0.1;
+                generator.write_snapshots(output_path, n_snapshots, num_edges, drift);
+            } else {
+                generator.write_stream(output_path, num_edges);
+                if (flags.count("fd")) {
+                    double deletion_prob = flags.count("deletion-prob") ? std::stod(flags["deletion-prob"]) : 0.2;
+                    generator.write_fd_stream(output_path, flags["fd"], deletion_prob);
+                }
+            }
+            auto stop = std::chrono::high_resolution_clock::now();
+            double time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(stop - start)).count()) / 1000;
+            std::cout << "Synthetic stream generated in time: " << time << " s\n";
+            return 0;
+        }
+    }
+
     // -- USS Algo
     if (strcmp(project, "RunUSS") == 0) {
         if (argc != 6) {
-            std::cerr << "Usage: RunUSS <dataset_path> <output_path_prefix> <k> <seed> <n_bar>\n";
+            std::cerr << "Usage: RunUSS <dataset_path> <output_path_prefix> <k> <seed> <n_bar>"
+                         " [--mapping=<node_mapping_path>] [--dataset-cache[=<folder>]] [--results-db=<folder>]\n";
             return 1;
         }
 
@@ -320,14 +858,36 @@ int main(int argc, char **argv) {
         int k = std::stoi(argv[3]);
         int seed = std::stoi(argv[4]);
         int n_bar = std::stoi(argv[5]);
+        std::vector<int> node_mapping;
+        if (!load_node_mapping(flags, dataset_path, node_mapping)) return 1;
+
+        std::unique_ptr<DatasetCache> cache;
+        if (!attach_dataset_cache(flags, dataset_path, cache)) return 1;
 
-        UnbiasedSpaceSaving uss(k, seed);
-        run_uss_algo(dataset_path, uss);
+        auto start = std::chrono::high_resolution_clock::now();
+        UnbiasedSpaceSaving uss(k, seed, (int) node_mapping.size());
+        if (!run_uss_algo(dataset_path, uss, cache.get())) return 1;
 
         const auto& top_nodes = uss.top_n(n_bar);
-        Utils::write_top_nodes(output_path, top_nodes);
+        auto stop = std::chrono::high_resolution_clock::now();
+        double time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(stop - start)).count()) / 1000;
+        Utils::write_top_nodes(output_path, top_nodes, node_mapping);
 
         std::cout << "USS run completed. Output written to " << output_path << "_top_nodes.csv\n";
+
+        ResultsStore *results_store = ResultsStore::for_process(flags["results-db"]);
+        if (results_store != nullptr) {
+            ResultRecord record;
+            record.algo = "USS";
+            record.dataset = std::filesystem::absolute(dataset_path).string();
+            record.seed = seed;
+            record.memory_budget = k;
+            record.oracle_type = "nodes";
+            record.oracle_path = std::filesystem::absolute(output_path + "_top_nodes.csv").string();
+            record.oracle_size = (long) top_nodes.size();
+            record.time = time;
+            results_store->append(record);
+        }
         return 0;
     }
 
@@ -337,8 +897,15 @@ int main(int argc, char **argv) {
         if (argc != 10 and argc!= 13) {
             std::cerr << "Usage: Tonic <flag: 0: insertion-only stream, 1: fully-dynamic stream>"
                      " <random_seed> <memory_budget> <alpha> <beta> "
-                     "<dataset_path> <oracle_path> <oracle_type = [nodes, edges]> <output_path>"
-                     " <use_uss: 0|1> <update_map_capacity> <next_oracle_size>\n";
+                     "<dataset_path> <oracle_path> <oracle_type = [nodes, edges, cuckoo]> <output_path>"
+                     " <use_uss: 0|1|2> <update_map_capacity> <next_oracle_size>"
+                     " [--mapping=<node_mapping_path>] [--telemetry=<jsonl_path>]"
+                     " [--telemetry-every=<edges>] [--telemetry-seconds=<s>] [--results-db=<folder>]"
+                     " [--checkpoint=<path>] [--checkpoint-every=<edges>] [--resume=<checkpoint_path>]"
+                     " [--window=<size>] [--window-by=<edges|time>] [--budgets=<k2,k3,...>]"
+                     " [--dataset-cache[=<folder>]] [--threads=<n>] [--colors=<c>] [--scaling]"
+                     " [--trajectory=<path>] [--trajectory-every=<edges>] [--trajectory-growth=<g>]"
+                     " [--trajectory-seeds=<n>]\n";
             return 1;
         }
         
@@ -366,98 +933,387 @@ int main(int argc, char **argv) {
         int next_oracle_size = 0;
 
         if(argc == 13){
+            // -- 1: top nodes from USS, 2: top nodes estimated from the sample of Tonic (no USS map)
             uss_flag = atoi(argv[10]);
-            assert(uss_flag == 0 or uss_flag == 1);
+            assert(uss_flag == 0 or uss_flag == 1 or uss_flag == 2);
 
             update_map_capacity = atoi(argv[11]);
             next_oracle_size = atoi(argv[12]);
 
             if (uss_flag == 0) {
-                std::cerr << "Error! use_uss must be 1 if USS arguments are provided.\n";
+                std::cerr << "Error! use_uss must be 1 or 2 if USS arguments are provided.\n";
                 return 1;
             }
         }
 
         // -- validate USS applicability
-        if (uss_flag == 1 and (flag_fd == 1 or oracle_type == "edges")) {
+        if (uss_flag > 0 and (flag_fd == 1 or oracle_type != "nodes")) {
             std::cerr << "Error! USS is only supported for insertion-only streams with a node oracle.\n";
             return 1;
         }
 
+        // -- dense node ids of a relabeled dataset
+        std::vector<int> node_mapping;
+        if (!load_node_mapping(flags, dataset_path, node_mapping)) return 1;
+        int num_dense_nodes = (int) node_mapping.size();
+
+        // -- optional decoded stream shared by concurrent runs
+        std::unique_ptr<DatasetCache> cache;
+        if (!attach_dataset_cache(flags, dataset_path, cache)) return 1;
+
+        // -- optional runtime telemetry, one JSON line every N edges or T seconds
+        std::unique_ptr<Telemetry> telemetry;
+        if (flags.count("telemetry")) {
+            unsigned long long every_edges = flags.count("telemetry-every") ?
+                    std::stoull(flags["telemetry-every"]) : 1000000;
+            double every_seconds = flags.count("telemetry-seconds") ? std::stod(flags["telemetry-seconds"]) : 0.0;
+            telemetry = std::make_unique<Telemetry>(flags["telemetry"], every_edges, every_seconds);
+            if (!telemetry->is_open()) return 1;
+        }
+
+        // -- optional sliding window over the last edges or the last time units of an insertion-only stream
+        long window = flags.count("window") ? std::stol(flags["window"]) : 0;
+        bool time_window = flags.count("window-by") and flags["window-by"] == "time";
+        if (flags.count("window")) {
+            if (window <= 0 or (flags.count("window-by") and flags["window-by"] != "time" and
+                                flags["window-by"] != "edges")) {
+                std::cerr << "Error! Window size must be > 0 and --window-by must be edges or time\n";
+                return 1;
+            }
+            if (flag_fd == 1 or uss_flag > 0 or flags.count("checkpoint") or flags.count("resume")) {
+                std::cerr << "Error! Window mode is only supported for insertion-only streams, without USS "
+                             "and checkpoints.\n";
+                return 1;
+            }
+        }
+
+        // -- optional additional memory budgets, estimated in the same pass of memory_budget
+        std::vector<long> budgets;
+        if (flags.count("budgets")) {
+            budgets.push_back(memory_budget);
+            std::istringstream budgets_list(flags["budgets"]);
+            std::string budget;
+            while (std::getline(budgets_list, budget, ',')) {
+                if (!budget.empty()) budgets.push_back(std::stol(budget));
+            }
+            if (flag_fd == 1 or uss_flag > 0 or window > 0 or flags.count("checkpoint") or flags.count("resume") or
+                flags.count("telemetry")) {
+                std::cerr << "Error! Multiple budgets are only supported for insertion-only streams, without USS, "
+                             "window, checkpoints and telemetry.\n";
+                return 1;
+            }
+        }
+
+        // -- optional color-coding shards on several threads, with the scaling from 1 to n threads
+        int num_threads = flags.count("threads") ? std::stoi(flags["threads"]) : 0;
+        int num_colors = flags.count("colors") ? std::stoi(flags["colors"]) : 0;
+        if (flags.count("threads") or flags.count("colors")) {
+            if (num_threads < 0 or num_colors < 0) {
+                std::cerr << "Error! Threads and colors must be > 0\n";
+                return 1;
+            }
+            if (flag_fd == 1 or uss_flag > 0 or window > 0 or !budgets.empty() or flags.count("checkpoint") or
+                flags.count("resume") or flags.count("telemetry")) {
+                std::cerr << "Error! Sharded mode is only supported for insertion-only streams, without USS, window, "
+                             "multiple budgets, checkpoints and telemetry.\n";
+                return 1;
+            }
+            if (num_threads == 0) num_threads = (int) std::max(1u, std::thread::hardware_concurrency());
+            if (num_colors == 0) num_colors = Tonic_Sharded::default_colors(num_threads);
+        }
+
+        // -- optional trajectory: exact count and estimates of n seeds on the same prefixes, in one pass
+        int trajectory_seeds = flags.count("trajectory-seeds") ? std::stoi(flags["trajectory-seeds"]) : 1;
+        if (flags.count("trajectory")) {
+            if (trajectory_seeds <= 0) {
+                std::cerr << "Error! Trajectory seeds must be > 0\n";
+                return 1;
+            }
+            if (uss_flag > 0 or window > 0 or !budgets.empty() or num_threads > 0 or flags.count("checkpoint") or
+                flags.count("resume") or flags.count("telemetry")) {
+                std::cerr << "Error! Trajectory mode is not supported with USS, window, multiple budgets, sharded "
+                             "mode, checkpoints and telemetry.\n";
+                return 1;
+            }
+        }
+
+        // -- optional checkpoints, every N edges and on SIGINT, SIGTERM or SIGUSR1
+        CheckpointOptions checkpoint;
+        if (flags.count("checkpoint")) {
+            checkpoint.path = flags["checkpoint"];
+            checkpoint.every = flags.count("checkpoint-every") ? std::stoull(flags["checkpoint-every"]) : 0;
+            std::signal(SIGINT, on_checkpoint_signal);
+            std::signal(SIGTERM, on_checkpoint_signal);
+            std::signal(SIGUSR1, on_checkpoint_signal);
+        }
+
         std::chrono::time_point start = std::chrono::high_resolution_clock::now();
         double time, time_oracle;
         bool edge_oracle_flag = false;
         int size_oracle;
-        emhash5::HashMap<int, int> node_oracle;
-        emhash5::HashMap<long, int> edge_oracle;
+        size_t oracle_bytes;
+        // -- read once, then shared (not copied) by the algorithm
+        SharedOracle oracle;
         if (oracle_type == "nodes") {
+            emhash5::HashMap<int, int> node_oracle;
             if (!Utils::read_node_oracle(oracle_path, ' ', 0, node_oracle)) return 1;
+            size_oracle = (int) node_oracle.size();
+            if (num_dense_nodes > 0) {
+                std::vector<int> dense_node_oracle;
+                size_t found = Utils::relabel_node_oracle(node_oracle, node_mapping, dense_node_oracle);
+                // -- the oracle must use the original ids of the mapping, its other nodes get no dense id
+                if (found < node_oracle.size()) {
+                    std::cerr << "Warning! " << node_oracle.size() - found << " of the " << node_oracle.size()
+                              << " nodes of the oracle are not in the node mapping, and are ignored\n";
+                }
+                oracle = std::make_shared<const Oracle>(std::move(dense_node_oracle));
+            } else {
+                oracle = std::make_shared<const Oracle>(std::move(node_oracle));
+            }
             time_oracle = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(
                     std::chrono::high_resolution_clock::now() - start)).count()) / 1000;
-            printf("Node Oracle successfully read in time %.3f! Size of the oracle = %d nodes\n",
-                   time_oracle, node_oracle.size());
-            size_oracle = (int) node_oracle.size();
+            oracle_bytes = oracle->memory_bytes();
+            printf("Node Oracle successfully read in time %.3f! Size of the oracle = %d nodes (%zu bytes)\n",
+                   time_oracle, size_oracle, oracle_bytes);
         } else if (oracle_type == "edges") {
             edge_oracle_flag = true;
-            if (!Utils::read_edge_oracle(oracle_path, ' ', 0, edge_oracle)) return 1;
+            emhash5::HashMap<long, int> edge_oracle;
+            if (!Utils::read_edge_oracle(oracle_path, ' ', 0, edge_oracle, node_mapping)) return 1;
+            oracle = std::make_shared<const Oracle>(std::move(edge_oracle));
             time_oracle = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(
                     std::chrono::high_resolution_clock::now() - start)).count()) / 1000;
-            printf("Edge Oracle successfully read in time %.3f! Size of the oracle = %d edges\n",
-                   time_oracle, edge_oracle.size());
-            size_oracle = (int) edge_oracle.size();
+            oracle_bytes = oracle->memory_bytes();
+            size_oracle = (int) oracle->size();
+            printf("Edge Oracle successfully read in time %.3f! Size of the oracle = %d edges (%zu bytes)\n",
+                   time_oracle, size_oracle, oracle_bytes);
+        } else if (oracle_type == "cuckoo") {
+            edge_oracle_flag = true;
+            CuckooEdgeOracle cuckoo_oracle;
+            if (!cuckoo_oracle.load(oracle_path)) return 1;
+            // -- the edge ids of the oracle must be built on the same node ids of the stream
+            if (cuckoo_oracle.num_dense_nodes() != num_dense_nodes) {
+                std::cerr << "Error! The cuckoo oracle was built for " << cuckoo_oracle.num_dense_nodes()
+                          << " dense nodes, the dataset has " << num_dense_nodes << "\n";
+                return 1;
+            }
+            time_oracle = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(
+                    std::chrono::high_resolution_clock::now() - start)).count()) / 1000;
+            oracle_bytes = cuckoo_oracle.memory_bytes();
+            printf("Cuckoo Edge Oracle successfully read in time %.3f! Size of the oracle = %zu edges (%zu bytes, "
+                   "%d + %d bits per entry)\n", time_oracle, cuckoo_oracle.size(), oracle_bytes,
+                   cuckoo_oracle.fingerprint_bits(), cuckoo_oracle.value_bits());
+            size_oracle = (int) cuckoo_oracle.size();
+            oracle = std::make_shared<const Oracle>(std::move(cuckoo_oracle));
         } else {
-            std::cerr << "Error! Oracle type must be nodes or edges\n";
+            std::cerr << "Error! Oracle type must be nodes, edges or cuckoo\n";
             return 1;
         }
-        if (flag_fd == 1) {
+
+        // -- optional results store, one shard and one run id per process
+        ResultsStore *results_store = ResultsStore::for_process(flags["results-db"]);
+        auto record_result = [&](const std::string &name, double estimate, double run_time, int seed) {
+            if (results_store == nullptr) return;
+            ResultRecord record;
+            record.algo = name;
+            record.dataset = std::filesystem::absolute(dataset_path).string();
+            record.seed = seed;
+            record.alpha = alpha;
+            record.beta = beta;
+            record.memory_budget = memory_budget;
+            record.oracle_type = oracle_type;
+            record.oracle_path = std::filesystem::absolute(oracle_path).string();
+            record.oracle_size = size_oracle;
+            record.oracle_time = time_oracle;
+            record.oracle_bytes = (long) oracle_bytes;
+            record.estimate = estimate;
+            record.time = run_time;
+            results_store->append(record);
+        };
+
+        // -- one pass of the exact algorithm and of the instances with seeds random_seed, random_seed + 1, ...
+        auto run_trajectory = [&](auto &algos, const std::string &name) -> bool {
+            using Algo = typename std::decay_t<decltype(algos)>::value_type::element_type;
+            std::vector<int> seeds;
+            for (int i = 0; i < trajectory_seeds; i++) {
+                seeds.push_back(random_seed + i);
+                algos.push_back(std::make_unique<Algo>(random_seed + i, memory_budget, alpha, beta));
+                if (num_dense_nodes > 0)
+                    algos.back()->set_dense_nodes(num_dense_nodes);
+                algos.back()->set_oracle(oracle);
+            }
+            unsigned long long every_edges = flags.count("trajectory-every") ?
+                    std::stoull(flags["trajectory-every"]) : 100000;
+            double growth = flags.count("trajectory-growth") ? std::stod(flags["trajectory-growth"]) : 1.0;
+            TrajectoryWriter trajectory(flags["trajectory"], seeds, every_edges, growth);
+            if (!trajectory.is_open()) return false;
+            ExactCounter exact;
+
+            start = std::chrono::high_resolution_clock::now();
+            if (!run_tonic_algo_trajectory(dataset_path, algos, exact, trajectory, cache.get())) return false;
+            time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(
+                    std::chrono::high_resolution_clock::now() - start)).count()) / 1000;
+            printf("Trajectory of %d seeds written to %s: %llu records || Exact count T = %ld\n", trajectory_seeds,
+                   flags["trajectory"].c_str(), trajectory.get_num_records(), exact.get_triangles());
+
+            // -- one row per seed, all with the time of the single pass
+            for (size_t i = 0; i < algos.size(); i++) {
+                write_results(name, algos[i]->get_global_triangles(), time, output_path, edge_oracle_flag, alpha,
+                              beta, memory_budget, size_oracle, time_oracle);
+                record_result(name, algos[i]->get_global_triangles(), time, seeds[i]);
+            }
+            return true;
+        };
+
+        if (flags.count("trajectory")) {
+            if (flag_fd == 1) {
+                std::vector<std::unique_ptr<Tonic_FD>> tonic_FD_algos;
+                if (!run_trajectory(tonic_FD_algos, "TonicFDTrajectory")) return 1;
+            } else {
+                std::vector<std::unique_ptr<Tonic>> tonic_algos;
+                if (!run_trajectory(tonic_algos, "TonicINSTrajectory")) return 1;
+            }
+
+        } else if (!budgets.empty()) {
+            Tonic_MultiBudget tonic_multi_algo(random_seed, budgets, alpha, beta);
+            tonic_multi_algo.set_oracle(oracle);
+
+            start = std::chrono::high_resolution_clock::now();
+            if (!run_tonic_algo_multi_budget(dataset_path, tonic_multi_algo, cache.get())) return 1;
+            time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(
+                    std::chrono::high_resolution_clock::now() - start)).count()) / 1000;
+            printf("Sampled edges at the end of the stream (all budgets) = %ld\n", tonic_multi_algo.get_num_edges());
+
+            // -- one row per budget, all with the time of the single pass
+            for (int i = 0; i < tonic_multi_algo.get_num_budgets(); i++) {
+                memory_budget = tonic_multi_algo.get_budget(i);
+                write_results(std::string("TonicMultiBudget"), tonic_multi_algo.get_global_triangles(i), time,
+                              output_path, edge_oracle_flag, alpha, beta, memory_budget, size_oracle, time_oracle);
+                record_result("TonicMultiBudget", tonic_multi_algo.get_global_triangles(i), time, random_seed);
+            }
+
+        } else if (num_threads > 0) {
+            // -- with --scaling, the same shards are run on 1, 2, 4, ... and num_threads threads
+            std::vector<int> thread_counts;
+            if (flags.count("scaling")) {
+                for (int n = 1; n < num_threads; n *= 2) thread_counts.push_back(n);
+            }
+            thread_counts.push_back(num_threads);
+
+            double base_time = 0.0;
+            for (int n: thread_counts) {
+                Tonic_Sharded tonic_sharded_algo(random_seed, memory_budget, alpha, beta, num_colors, n);
+                if (num_dense_nodes > 0)
+                    tonic_sharded_algo.set_dense_nodes(num_dense_nodes);
+                tonic_sharded_algo.set_oracle(oracle);
+
+                start = std::chrono::high_resolution_clock::now();
+                if (!run_tonic_algo_sharded(dataset_path, tonic_sharded_algo, cache.get())) return 1;
+                time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(
+                        std::chrono::high_resolution_clock::now() - start)).count()) / 1000;
+                if (n == thread_counts.front()) base_time = time;
+                printf("Threads = %d || Time = %.3f s || Speedup = %.2f || Estimated count T = %f\n", n, time,
+                       time > 0 ? base_time / time : 0.0, tonic_sharded_algo.get_global_triangles());
+
+                if (n == num_threads) {
+                    print_oracle_stats(tonic_sharded_algo);
+                    write_results(std::string("TonicSharded"), tonic_sharded_algo.get_global_triangles(), time,
+                                  output_path, edge_oracle_flag, alpha, beta, memory_budget, size_oracle,
+                                  time_oracle);
+                    record_result("TonicSharded", tonic_sharded_algo.get_global_triangles(), time, random_seed);
+                }
+            }
+
+        } else if (window > 0) {
+            // -- the edges leaving the window are deletions of a fully-dynamic stream
+            Tonic_FD tonic_window_algo(random_seed, memory_budget, alpha, beta);
+            if (num_dense_nodes > 0)
+                tonic_window_algo.set_dense_nodes(num_dense_nodes);
+            tonic_window_algo.set_oracle(oracle);
+
+            start = std::chrono::high_resolution_clock::now();
+            if (!run_tonic_algo_window(dataset_path, tonic_window_algo, window, time_window, telemetry.get(),
+                                       cache.get())) return 1;
+            time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(
+                    std::chrono::high_resolution_clock::now() - start)).count()) / 1000;
+
+#ifdef TONIC_PROFILE
+            tonic_window_algo.get_profiler().report("TonicWindow");
+#endif
+
+            print_oracle_stats(tonic_window_algo);
+            write_results(std::string("TonicWindow"), tonic_window_algo.get_global_triangles(), time,
+                          output_path, edge_oracle_flag, alpha, beta, memory_budget, size_oracle, time_oracle);
+            record_result("TonicWindow", tonic_window_algo.get_global_triangles(), time, random_seed);
+
+        } else if (flag_fd == 1) {
             Tonic_FD tonic_FD_algo(random_seed, memory_budget, alpha, beta);
-            if (edge_oracle_flag)
-                tonic_FD_algo.set_edge_oracle(edge_oracle);
-            else
-                tonic_FD_algo.set_node_oracle(node_oracle);
+            if (num_dense_nodes > 0)
+                tonic_FD_algo.set_dense_nodes(num_dense_nodes);
+            tonic_FD_algo.set_oracle(oracle);
+
+            if (flags.count("resume") and !load_checkpoint(flags["resume"], "TonicFD", checkpoint, tonic_FD_algo))
+                return 1;
 
             start = std::chrono::high_resolution_clock::now();
-            run_tonic_algo_FD(dataset_path, tonic_FD_algo);
+            int status = run_tonic_algo_FD(dataset_path, tonic_FD_algo, telemetry.get(), checkpoint, cache.get());
+            if (status != 0) return status;
             time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(
                     std::chrono::high_resolution_clock::now() - start)).count()) / 1000;
 
+#ifdef TONIC_PROFILE
+            tonic_FD_algo.get_profiler().report("TonicFD");
+#endif
+
+            print_oracle_stats(tonic_FD_algo);
             write_results(std::string("TonicFD"), tonic_FD_algo.get_global_triangles(), time,
                           output_path, edge_oracle_flag, alpha, beta, memory_budget, size_oracle, time_oracle);
+            record_result("TonicFD", tonic_FD_algo.get_global_triangles(), time, random_seed);
 
 
         } else {
             Tonic tonic_algo(random_seed, memory_budget, alpha, beta);
+            if (num_dense_nodes > 0)
+                tonic_algo.set_dense_nodes(num_dense_nodes);
             
             if(uss_flag == 1){
                 tonic_algo.update_map_capacity = update_map_capacity;
                 tonic_algo.setup_space_saving();
             }
 
-            if (edge_oracle_flag)
-                tonic_algo.set_edge_oracle(edge_oracle);
-            else
-                tonic_algo.set_node_oracle(node_oracle);
+            tonic_algo.set_oracle(oracle);
 
-            const std::vector<UnbiasedSpaceSaving::HeapNode>* top_nodes = nullptr;
+            if (flags.count("resume") and !load_checkpoint(flags["resume"], "TonicINS", checkpoint, tonic_algo))
+                return 1;
+
+            std::vector<UnbiasedSpaceSaving::HeapNode> top_nodes;
 
             start = std::chrono::high_resolution_clock::now();
 
-            run_tonic_algo(dataset_path, tonic_algo);
+            int status = run_tonic_algo(dataset_path, tonic_algo, telemetry.get(), checkpoint, cache.get());
+            if (status != 0) return status;
             
             // put the sorting and slicing within the measured time (USS)
             if(uss_flag == 1){
-                top_nodes = &tonic_algo.get_top_nodes(next_oracle_size);
+                top_nodes = tonic_algo.get_top_nodes(next_oracle_size);
+            } else if (uss_flag == 2) {
+                top_nodes = tonic_algo.get_sampled_top_nodes(next_oracle_size);
             }
 
             time = (double) ((std::chrono::duration_cast<std::chrono::milliseconds>(
                     std::chrono::high_resolution_clock::now() - start)).count()) / 1000;
 
+#ifdef TONIC_PROFILE
+            tonic_algo.get_profiler().report("TonicINS");
+#endif
+
+            print_oracle_stats(tonic_algo);
             write_results(std::string("TonicINS"), tonic_algo.get_global_triangles(), time,
                           output_path, edge_oracle_flag, alpha, beta, memory_budget, size_oracle, time_oracle);
+            record_result("TonicINS", tonic_algo.get_global_triangles(), time, random_seed);
             
             // put the writing outside of measured time (USS)
-            if(uss_flag == 1){
-                Utils::write_top_nodes(output_path, *top_nodes);
+            if(uss_flag > 0){
+                Utils::write_top_nodes(output_path, top_nodes, node_mapping);
                 Utils::write_map_capacity(output_path, update_map_capacity, next_oracle_size);
             }
         }